@@ -3,18 +3,26 @@ API服务器模块，提供HTTP接口供iPhone捷径等外部服务调用
 """
 import os
 import json
+import socket
+import select
 import asyncio
-from typing import Dict, Any
-from threading import Thread
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+from threading import Thread, Event
 from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
 
 from flask import Flask, request, jsonify
 
+from core.deadline import Deadline, DeadlineExceeded, current_deadline
 from config.logging_config import setup_logger
-from config.settings import DOUBAN_COOKIES
-from core.browser import PlaywrightBrowser
-from scrapers.douban_scraper import DoubanScraper
-from sync.notion_sync import NotionSyncModule, test_database_connection
+from config.settings import (
+    DOUBAN_COOKIES,
+    DOUBAN_SEARCH_BASE_URL,
+    WORKER_PAGE_CONCURRENCY,
+    JOB_RESULT_TIMEOUT,
+    API_REQUEST_TIMEOUT
+)
 
 # 创建日志记录器
 logger = setup_logger("api_server")
@@ -25,23 +33,120 @@ app = Flask(__name__)
 # 用于存储任务结果的队列
 results_queue = Queue()
 
-def run_task(title: str) -> Dict[str, Any]:
+# 多进程抓取引擎，未启用时为None，在API进程内抓取
+engine = None
+
+# 任务代理，设置后请求交给工作节点处理，API只负责排队和返回结果
+broker = None
+
+# 批量请求通过任务代理处理时，同时等待的最大任务数
+MAX_BATCH_PARALLEL = 16
+
+# 检查客户端是否断开的间隔(秒)
+DISCONNECT_POLL_INTERVAL = 0.5
+
+def client_disconnected(sock) -> bool:
+    """
+    检查客户端是否已关闭连接
+    
+    Args:
+        sock: 请求的套接字
+        
+    Returns:
+        可读且读到EOF时为True；客户端只是发送了更多数据时为False
+    """
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        return bool(readable) and sock.recv(1, socket.MSG_PEEK) == b""
+    except (OSError, ValueError):
+        return True
+
+@contextmanager
+def watch_disconnect(deadline: Deadline) -> Iterator[Deadline]:
+    """
+    在代码块执行期间监视客户端连接，客户端断开时取消请求
+    
+    只有Werkzeug开发服务器和Gunicorn同步工作进程会在环境中提供套接字，
+    其他服务器下不监视，请求仍受截止时间限制
+    
+    Args:
+        deadline: 请求的截止时间
+    """
+    sock = request.environ.get("werkzeug.socket") or request.environ.get("gunicorn.socket")
+    if sock is None:
+        yield deadline
+        return
+    
+    done = Event()
+    
+    def watch():
+        while not done.wait(DISCONNECT_POLL_INTERVAL):
+            if deadline.expired:
+                return
+            if client_disconnected(sock):
+                deadline.cancel("客户端已断开连接")
+                return
+    
+    Thread(target=watch, name="disconnect-watcher", daemon=True).start()
+    try:
+        yield deadline
+    finally:
+        done.set()
+
+def run_task(title: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
     """
     运行异步任务，爬取并同步电影数据
     
     Args:
         title: 电影名称
+        deadline: 请求的截止时间，超时或被取消时停止全部工作
         
     Returns:
-        处理结果
+        处理结果，超时时 timed_out 为True
     """
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     try:
-        return loop.run_until_complete(scrape_and_sync_movie_async(title))
+        if deadline is None:
+            return loop.run_until_complete(scrape_and_sync_movie_async(title))
+        return loop.run_until_complete(deadline.run(scrape_and_sync_movie_async(title)))
+    except DeadlineExceeded as e:
+        logger.warning(f"处理电影 '{title}' 超时: {e}")
+        return {"success": False, "title": title, "message": f"处理电影 '{title}' 超时: {e}", "data": {}, "timed_out": True}
     finally:
         loop.close()
 
+async def fetch_movie_data(title: str) -> Dict[str, Any]:
+    """
+    抓取影视数据，启用多进程抓取时交给工作进程，否则在当前进程中启动浏览器
+    
+    Args:
+        title: 电影名称
+        
+    Returns:
+        电影数据字典，未找到时为空字典
+    
+    Raises:
+        AntiBotBlocked: 豆瓣冷却中或抓取时被反爬拦截
+    """
+    from core.antibot import domain_cooldown
+    
+    # 冷却中时不必启动浏览器或分发任务
+    domain_cooldown.check(DOUBAN_SEARCH_BASE_URL)
+    
+    if engine is not None:
+        from workers.engine import TASK_TITLE
+        # 截止时间随任务交给工作进程，请求被取消时这里的等待也随之取消
+        return await asyncio.wrap_future(engine.submit(TASK_TITLE, title, deadline=current_deadline()))
+    
+    # 爬虫依赖Playwright，首次处理请求时再导入，加快服务启动
+    from core.browser import PlaywrightBrowser
+    from scrapers.douban_scraper import DoubanScraper
+    
+    async with PlaywrightBrowser(headless=True, cookies=DOUBAN_COOKIES) as browser:
+        scraper = DoubanScraper(browser)
+        return await scraper.get_movie_by_title(title)
+
 async def scrape_and_sync_movie_async(title: str) -> Dict[str, Any]:
     """
     爬取并同步单部电影数据的异步任务
@@ -52,6 +157,10 @@ async def scrape_and_sync_movie_async(title: str) -> Dict[str, Any]:
     Returns:
         处理结果
     """
+    # 同步模块依赖requests，首次处理请求时再导入，加快服务启动
+    from sync.notion_sync import NotionSyncModule, test_database_connection
+    from core.antibot import AntiBotBlocked
+    
     result = {
         "success": False,
         "title": title,
@@ -86,45 +195,52 @@ async def scrape_and_sync_movie_async(title: str) -> Dict[str, Any]:
         # 初始化同步模块
         notion_sync = NotionSyncModule()
         
-        # 创建浏览器实例并爬取数据
-        async with PlaywrightBrowser(headless=True, cookies=DOUBAN_COOKIES) as browser:
-            # 创建爬虫实例
-            scraper = DoubanScraper(browser)
-            
-            # 获取电影数据
-            movie_data = await scraper.get_movie_by_title(title)
-            
-            if not movie_data:
-                error_msg = f"未找到电影: {title}"
-                logger.warning(error_msg)
-                result["message"] = error_msg
-                return result
-            
-            logger.info(f"成功获取电影数据: {movie_data.get('title')} ({movie_data.get('category')}, 评分: {movie_data.get('rating')})")
-            
-            # 检查封面URL
-            if movie_data.get('cover_url'):
-                logger.info(f"获取到封面URL: {movie_data.get('cover_url')}")
-            else:
-                logger.warning("未获取到封面URL")
-            
-            # 同步到Notion
-            sync_result = notion_sync.sync_movie(movie_data)
-            logger.info(f"同步结果: {sync_result}")
-            
-            # 设置成功结果
-            result["success"] = True
-            result["message"] = "处理成功"
-            result["data"] = {
-                "title": movie_data.get("title"),
-                "category": movie_data.get("category"),
-                "rating": movie_data.get("rating"),
-                "rounded_rating": min(9, round(movie_data.get("rating", 0)) if movie_data.get("rating") else 0),
-                "notion_page_id": sync_result.get("item_id"),
-                "cover_url": movie_data.get("cover_url"),
-                "has_cover": sync_result.get("has_cover", False)
-            }
+        # 获取电影数据
+        movie_data = await fetch_movie_data(title)
+        
+        if not movie_data:
+            error_msg = f"未找到电影: {title}"
+            logger.warning(error_msg)
+            result["message"] = error_msg
+            return result
+        
+        logger.info(f"成功获取电影数据: {movie_data.get('title')} ({movie_data.get('category')}, 评分: {movie_data.get('rating')})")
+        
+        # 检查封面URL
+        if movie_data.get('cover_url'):
+            logger.info(f"获取到封面URL: {movie_data.get('cover_url')}")
+        else:
+            logger.warning("未获取到封面URL")
+        
+        # 同步到Notion
+        sync_result = notion_sync.sync_movie(movie_data)
+        logger.info(f"同步结果: {sync_result}")
+        
+        # 设置成功结果
+        result["success"] = True
+        result["message"] = "处理成功"
+        result["data"] = {
+            "title": movie_data.get("title"),
+            "category": movie_data.get("category"),
+            "rating": movie_data.get("rating"),
+            "rounded_rating": min(9, round(movie_data.get("rating", 0)) if movie_data.get("rating") else 0),
+            "notion_page_id": sync_result.get("item_id"),
+            "cover_url": movie_data.get("cover_url"),
+            "has_cover": sync_result.get("has_cover", False)
+        }
             
+    except AntiBotBlocked as e:
+        error_msg = f"处理电影 '{title}' 失败: {e}"
+        logger.warning(error_msg)
+        result["message"] = error_msg
+        result["retry_after"] = int(e.retry_after) + 1
+        
+    except DeadlineExceeded as e:
+        error_msg = f"处理电影 '{title}' 超时: {e}"
+        logger.warning(error_msg)
+        result["message"] = error_msg
+        result["timed_out"] = True
+        
     except Exception as e:
         error_msg = f"处理电影 '{title}' 出错: {str(e)}"
         logger.error(error_msg)
@@ -132,6 +248,39 @@ async def scrape_and_sync_movie_async(title: str) -> Dict[str, Any]:
         
     return result
 
+def run_job(title: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    """
+    将任务交给工作节点处理并等待结果
+    
+    任务本身不受请求截止时间限制，客户端可以稍后查询结果；截止时间只缩短这里的等待
+    
+    Args:
+        title: 电影名称
+        deadline: 请求的截止时间
+        
+    Returns:
+        处理结果，超时时 success 为False并带有 job_id，可稍后通过 /api/jobs/<job_id> 查询
+    """
+    from jobs.broker import STATE_DONE
+    from jobs.worker import movie_job
+    
+    job_id = broker.enqueue(movie_job(title))
+    logger.info(f"已加入任务队列: {title} ({job_id})")
+    # 截止时间到达或客户端断开时停止等待，任务继续由工作节点处理
+    job = broker.wait_result(job_id, JOB_RESULT_TIMEOUT, deadline=deadline)
+    
+    if job is None:
+        return {"success": False, "title": title, "message": "任务仍在处理中", "job_id": job_id, "data": {}}
+    if job["state"] != STATE_DONE:
+        return {"success": False, "title": title, "message": f"处理失败: {job['error']}", "job_id": job_id, "data": {}}
+    return dict(job["result"], job_id=job_id)
+
+def process_title(title: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    """处理一个标题，配置了任务代理时交给工作节点，否则在本机处理"""
+    if broker is not None:
+        return run_job(title, deadline)
+    return run_task(title, deadline)
+
 @app.route('/api/movie', methods=['POST'])
 def process_movie():
     """处理电影请求的API端点"""
@@ -154,23 +303,149 @@ def process_movie():
     
     logger.info(f"收到API请求，电影标题: {title}")
     
-    # 在新线程中运行异步任务
-    result = run_task(title)
+    # 在新线程中运行异步任务，或交给工作节点；超时或客户端断开时取消
+    deadline = Deadline(API_REQUEST_TIMEOUT)
+    with watch_disconnect(deadline):
+        result = process_title(title, deadline)
     
+    # 被反爬拦截时告知客户端何时重试
+    if result.get("retry_after"):
+        return jsonify(result), 503, {"Retry-After": str(result["retry_after"])}
+    if result.get("timed_out"):
+        return jsonify(result), 504
     return jsonify(result)
 
+@app.route('/api/movies', methods=['POST'])
+def process_movies():
+    """批量处理电影请求的API端点，启用多进程抓取时各标题并行处理"""
+    data = request.get_json()
+    titles = [title for title in (data or {}).get('titles', []) if isinstance(title, str) and title.strip()]
+    
+    if not titles:
+        return jsonify({
+            "success": False,
+            "message": "请提供电影标题列表",
+            "results": []
+        }), 400
+    
+    logger.info(f"收到批量API请求，共 {len(titles)} 个标题")
+    
+    # 每个标题一个线程，实际并发由工作节点或工作进程数决定
+    if broker is not None:
+        parallel = min(len(titles), MAX_BATCH_PARALLEL)
+    elif engine is not None:
+        parallel = engine.workers * engine.page_concurrency
+    else:
+        parallel = 1
+    # 所有标题共用一个截止时间
+    deadline = Deadline(API_REQUEST_TIMEOUT)
+    with watch_disconnect(deadline), ThreadPoolExecutor(max_workers=parallel) as executor:
+        results = list(executor.map(lambda title: process_title(title, deadline), titles))
+    
+    return jsonify({
+        "success": all(result["success"] for result in results),
+        "message": f"成功 {sum(1 for result in results if result['success'])}/{len(results)}",
+        "results": results
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id: str):
+    """查询任务状态和结果的API端点"""
+    if broker is None:
+        return jsonify({"success": False, "message": "未启用任务队列"}), 404
+    
+    job = broker.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": "任务不存在或已过期"}), 404
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "state": job["state"],
+        "attempts": job["attempts"],
+        "error": job["error"],
+        "result": job["result"]
+    })
+
+@app.route('/api/concurrency', methods=['GET'])
+def concurrency_status():
+    """豆瓣导航并发控制的当前上限和调整历史，以及反爬冷却、请求节奏和访问身份状态"""
+    from core.antibot import domain_cooldown
+    from core.concurrency import navigation_limiter
+    from core.identity import identity_pool
+    from core.pacing import navigation_pacer
+    
+    return jsonify(dict(
+        navigation_limiter.snapshot(),
+        cooldown=domain_cooldown.snapshot(),
+        pacing=navigation_pacer.snapshot(),
+        identities=identity_pool.snapshot()
+    ))
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """健康检查API端点"""
-    return jsonify({
+    response = {
         "status": "healthy",
         "message": "API服务正常运行"
-    })
+    }
+    if engine is not None:
+        response["workers"] = engine.stats()
+    if broker is not None:
+        response["jobs"] = broker.stats()
+    return jsonify(response)
+
+def start_engine(workers: int, page_concurrency: int = WORKER_PAGE_CONCURRENCY):
+    """
+    启动多进程抓取引擎，之后的请求交给工作进程抓取
+    
+    Args:
+        workers: 工作进程数，None表示根据CPU和内存限制自动确定
+        page_concurrency: 每个工作进程同时处理的页面数
+    """
+    global engine
+    from workers.engine import ScrapeEngine
+    
+    engine = ScrapeEngine(workers, page_concurrency)
+    engine.start()
 
-def run_server(host='0.0.0.0', port=6000, debug=False):
-    """启动API服务器"""
+def start_broker(broker_url: str):
+    """
+    连接任务代理，之后的请求交给工作节点处理
+    
+    Args:
+        broker_url: 任务代理地址
+    """
+    global broker
+    from jobs.broker import create_broker
+    
+    broker = create_broker(broker_url)
+    logger.info(f"已连接任务代理，请求将交给工作节点处理: {broker_url}")
+
+def run_server(host='0.0.0.0', port=6000, debug=False, workers: Optional[int] = 0, broker_url: str = ""):
+    """
+    启动API服务器
+    
+    Args:
+        host: 监听地址
+        port: 端口
+        debug: 是否启用调试模式
+        workers: 工作进程数，0表示在API进程内抓取，None表示根据CPU和内存限制自动确定
+        broker_url: 任务代理地址，设置后请求交给工作节点处理，workers不再生效
+    """
+    if broker_url:
+        start_broker(broker_url)
+    elif workers != 0:
+        start_engine(workers)
+    
     logger.info(f"启动API服务器，监听地址: {host}:{port}")
-    app.run(host=host, port=port, debug=debug)
+    try:
+        # 自动重载会再启动一个服务进程，与工作进程同时使用时关闭
+        app.run(host=host, port=port, debug=debug, use_reloader=debug and engine is None)
+    finally:
+        if engine is not None:
+            engine.close()
+        if broker is not None:
+            broker.close()
 
 if __name__ == "__main__":
     run_server() 
\ No newline at end of file
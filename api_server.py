@@ -4,12 +4,24 @@ API服务器启动程序
 import os
 import sys
 import argparse
-from api.server import run_server
 from config.logging_config import setup_logger
+from config.settings import SCRAPE_WORKERS, JOB_BROKER_URL
 
 # 创建日志记录器
 logger = setup_logger("api_launcher")
 
+def parse_workers(value: str):
+    """解析工作进程数参数，auto返回None（按CPU和内存限制确定）"""
+    if value.strip().lower() == "auto":
+        return None
+    try:
+        workers = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"工作进程数应为非负整数或auto: {value}")
+    if workers < 0:
+        raise argparse.ArgumentTypeError(f"工作进程数应为非负整数或auto: {value}")
+    return workers
+
 def main():
     """主程序入口"""
     # 确认控制台使用UTF-8编码
@@ -22,6 +34,10 @@ def main():
     parser.add_argument("--host", type=str, default="0.0.0.0", help="服务器监听地址")
     parser.add_argument("--port", type=int, default=6000, help="服务器端口")
     parser.add_argument("--debug", action="store_true", help="启用调试模式")
+    parser.add_argument("--workers", type=parse_workers, default=SCRAPE_WORKERS,
+                        help="抓取工作进程数，auto表示按CPU和内存限制确定，0表示在API进程内抓取")
+    parser.add_argument("--broker", type=str, default=JOB_BROKER_URL,
+                        help="任务代理地址（redis://主机:端口/0 或 sqlite:///jobs.db），设置后请求交给工作节点处理")
     
     args = parser.parse_args()
     
@@ -38,13 +54,17 @@ def main():
     logger.info("API接口:")
     logger.info("  - 健康检查: GET /api/health")
     logger.info("  - 处理电影: POST /api/movie (需要JSON格式的title字段)")
+    logger.info("  - 批量处理: POST /api/movies (需要JSON格式的titles列表)")
+    logger.info("  - 任务状态: GET /api/jobs/<job_id> (启用任务队列时)")
+    logger.info("  - 并发状态: GET /api/concurrency")
     logger.info("iPhone捷径调用示例：")
     logger.info("  1. 使用'获取内容'操作，设置URL为服务器地址+/api/movie")
     logger.info("  2. 请求方法选择POST，请求体JSON格式: {\"title\": \"电影名称\"}")
     logger.info("  3. 使用'获取词典值'操作处理返回的JSON数据")
     
-    # 启动服务器
-    run_server(host=args.host, port=args.port, debug=args.debug)
+    # 启动服务器（参数解析完成后再导入Flask应用，--help等操作无需加载依赖）
+    from api.server import run_server
+    run_server(host=args.host, port=args.port, debug=args.debug, workers=args.workers, broker_url=args.broker)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
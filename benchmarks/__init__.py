@@ -0,0 +1,3 @@
+"""
+基准测试模块，包含启动耗时、吞吐量等性能测量脚本
+"""
\ No newline at end of file
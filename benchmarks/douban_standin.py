@@ -0,0 +1,455 @@
+"""
+豆瓣本地替身服务器
+
+使用 benchmarks/corpus/douban 下录制的页面模拟豆瓣的搜索页、联想接口和详情页，
+可配置响应延迟、错误率和反爬验证页比例，用于在不访问真实豆瓣的情况下
+测量 DoubanScraper 和 API 服务器的吞吐量。
+
+还提供 /people/<用户>/collect 列表页和 /top250 榜单页（每页 LIST_PAGE_SIZE 条），
+用于测试批量导入和目录爬取。
+启动后设置环境变量 DOUBAN_STANDIN_URL 指向本服务器即可：
+
+    python -m benchmarks.douban_standin --port 8765 --latency-ms 150 --error-rate 0.02
+    DOUBAN_STANDIN_URL=http://127.0.0.1:8765 python api_server.py
+"""
+import os
+import json
+import time
+import random
+import argparse
+import threading
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, parse_qs, quote
+
+# 录制页面目录
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "douban")
+
+# 看过/想看列表每页条目数，语料较少，取较小值以覆盖翻页
+LIST_PAGE_SIZE = 2
+
+# 录制页面中需要替换为替身服务器地址的豆瓣域名
+REWRITE_ORIGINS = ["https://movie.douban.com", "https://search.douban.com"]
+
+class StandinConfig:
+    """替身服务器的行为配置"""
+    
+    def __init__(self,
+                 latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0,
+                 error_rate: float = 0.0,
+                 interstitial_rate: float = 0.0,
+                 forbidden_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        初始化配置
+        
+        Args:
+            latency_ms: 每个响应的基础延迟(毫秒)
+            jitter_ms: 延迟的随机波动范围(毫秒)
+            error_rate: 返回500错误的比例
+            interstitial_rate: 重定向到反爬验证页的比例
+            forbidden_rate: 返回403的比例
+            seed: 随机数种子，便于复现
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.interstitial_rate = interstitial_rate
+        self.forbidden_rate = forbidden_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+    
+    def roll(self) -> float:
+        """线程安全地生成随机数"""
+        with self.lock:
+            return self.random.random()
+    
+    def delay(self) -> float:
+        """计算本次响应的延迟(秒)"""
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+class StandinCorpus:
+    """录制页面语料"""
+    
+    def __init__(self, corpus_dir: str = CORPUS_DIR):
+        """
+        加载语料索引和页面
+        
+        Args:
+            corpus_dir: 语料目录
+        """
+        with open(os.path.join(corpus_dir, "index.json"), encoding="utf-8") as f:
+            self.entries: List[Dict] = json.load(f)
+        
+        self.pages: Dict[str, str] = {}
+        for entry in self.entries:
+            with open(os.path.join(corpus_dir, entry["file"]), encoding="utf-8") as f:
+                self.pages[entry["id"]] = f.read()
+        
+        with open(os.path.join(corpus_dir, "sec_captcha.html"), encoding="utf-8") as f:
+            self.captcha_page = f.read()
+    
+    def search(self, text: str) -> List[Dict]:
+        """
+        按标题搜索语料
+        
+        Args:
+            text: 搜索文本
+        
+        Returns:
+            匹配的语料条目
+        """
+        text = text.strip().lower()
+        if not text:
+            return []
+        return [
+            entry for entry in self.entries
+            if text in entry["title"].lower() or (entry.get("original_title") and text in entry["original_title"].lower())
+        ]
+    
+    def suggest(self, text: str) -> List[Dict]:
+        """
+        按联想接口的方式匹配语料：标题包含搜索文本，或搜索文本以标题开头
+        
+        与豆瓣一样，搜索 "Blade Runner 2049" 时同时返回《银翼杀手》和《银翼杀手2049》
+        
+        Args:
+            text: 搜索文本
+        
+        Returns:
+            匹配的语料条目
+        """
+        text = text.strip().lower()
+        if not text:
+            return []
+        matches = []
+        for entry in self.entries:
+            titles = [title.lower() for title in (entry["title"], entry.get("original_title")) if title]
+            if any(text in title or text.startswith(title) for title in titles):
+                matches.append(entry)
+        return matches
+
+class StandinStats:
+    """线程安全的请求计数器"""
+    
+    def __init__(self):
+        """初始化计数器"""
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def increment(self, key: str):
+        """计数加一"""
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+    
+    def snapshot(self) -> Dict[str, int]:
+        """获取当前计数"""
+        with self._lock:
+            return dict(self._counts)
+
+class StandinRequestHandler(BaseHTTPRequestHandler):
+    """替身服务器请求处理器"""
+    
+    server_version = "dae"
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        """关闭默认的访问日志输出"""
+        pass
+    
+    @property
+    def base_url(self) -> str:
+        """替身服务器地址"""
+        return self.server.base_url
+    
+    def _send(self, status: int, body: str, content_type: str = "text/html; charset=utf-8", headers: Dict = None):
+        """发送响应"""
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+    
+    def _rewrite(self, html: str) -> str:
+        """将页面中的豆瓣域名替换为替身服务器地址"""
+        for origin in REWRITE_ORIGINS:
+            html = html.replace(origin, self.base_url)
+        return html
+    
+    def _render_search(self, text: str) -> str:
+        """渲染搜索结果页"""
+        items = []
+        for entry in self.server.corpus.search(text):
+            subject_url = f"{self.base_url}/subject/{entry['id']}/"
+            items.append(f'''<div class="item-root">
+    <a href="{subject_url}" class="cover-link"><img src="https://img9.doubanio.com/view/photo/s_ratio_poster/public/p{entry['id']}.webp" alt="{escape(entry['title'])}" class="cover"></a>
+    <div class="detail">
+        <div class="title"><a href="{subject_url}" class="title-text">{escape(entry['title'])} {escape(entry.get('original_title') or '')} ({entry['year']})</a></div>
+    </div>
+</div>''')
+        results = "\n".join(items) if items else '<div class="empty">没有找到关于 “{}” 的结果</div>'.format(escape(text))
+        return f'''<!DOCTYPE html>
+<html lang="zh-CN">
+<head><meta charset="utf-8"><title>{escape(text)} - 电影 - 豆瓣搜索</title></head>
+<body>
+<div id="root">
+    <div class="search__content">
+        <div class="result-list">
+{results}
+        </div>
+    </div>
+</div>
+</body>
+</html>'''
+
+    def _render_suggest(self, text: str) -> str:
+        """渲染联想接口的JSON响应，字段与 /j/subject_suggest 一致"""
+        items = []
+        for entry in self.server.corpus.suggest(text):
+            items.append({
+                "episode": "" if entry.get("type") != "tv" else "12",
+                "img": f"https://img9.doubanio.com/view/photo/s_ratio_poster/public/p{entry['id']}.webp",
+                "title": entry["title"],
+                "url": f"{self.base_url}/subject/{entry['id']}/?suggest={quote(text)}",
+                "type": "movie",
+                "year": entry["year"],
+                "sub_title": entry.get("original_title") or "",
+                "id": entry["id"],
+            })
+        return json.dumps(items, ensure_ascii=False)
+    
+    def _render_list(self, user: str, kind: str, start: int) -> str:
+        """渲染看过/想看列表页（网格模式）"""
+        entries = self.server.corpus.entries
+        items = []
+        for entry in entries[start:start + LIST_PAGE_SIZE]:
+            subject_url = f"{self.base_url}/subject/{entry['id']}/"
+            items.append(f'''<div class="item comment-item">
+    <div class="info">
+        <ul>
+            <li class="title"><a href="{subject_url}"><em>{escape(entry['title'])}</em></a></li>
+            <li class="intro">{entry['year']}</li>
+        </ul>
+    </div>
+</div>''')
+        next_link = ""
+        if start + LIST_PAGE_SIZE < len(entries):
+            next_link = f'<span class="next"><a href="/people/{user}/{kind}?start={start + LIST_PAGE_SIZE}&amp;sort=time&amp;mode=grid">后页&gt;</a></span>'
+        return f'''<!DOCTYPE html>
+<html lang="zh-CN">
+<head><meta charset="utf-8"><title>{escape(user)}看过的影视</title></head>
+<body>
+<div id="content">
+    <div class="grid-view">
+{chr(10).join(items)}
+    </div>
+    <div class="paginator">{next_link}</div>
+</div>
+</body>
+</html>'''
+
+    def _render_top250(self, start: int) -> str:
+        """渲染Top250榜单页"""
+        entries = self.server.corpus.entries
+        items = []
+        for rank, entry in enumerate(entries[start:start + LIST_PAGE_SIZE], start + 1):
+            subject_url = f"{self.base_url}/subject/{entry['id']}/"
+            items.append(f'''<li>
+    <div class="item">
+        <div class="pic"><em>{rank}</em><a href="{subject_url}"><img src="https://img9.doubanio.com/view/photo/s_ratio_poster/public/p{entry['id']}.jpg"></a></div>
+        <div class="info"><div class="hd"><a href="{subject_url}"><span class="title">{escape(entry['title'])}</span></a></div></div>
+    </div>
+</li>''')
+        next_link = ""
+        if start + LIST_PAGE_SIZE < len(entries):
+            next_link = f'<span class="next"><a href="?start={start + LIST_PAGE_SIZE}&amp;filter=">后页&gt;</a></span>'
+        return f'''<!DOCTYPE html>
+<html lang="zh-CN">
+<head><meta charset="utf-8"><title>豆瓣电影 Top 250</title></head>
+<body>
+<div id="content">
+    <ol class="grid_view">
+{chr(10).join(items)}
+    </ol>
+    <div class="paginator">{next_link}</div>
+</div>
+</body>
+</html>'''
+
+    def _inject_faults(self) -> bool:
+        """
+        根据配置注入延迟和故障
+        
+        Returns:
+            是否已发送故障响应
+        """
+        config = self.server.config
+        stats = self.server.stats
+        
+        delay = config.delay()
+        if delay:
+            time.sleep(delay)
+        
+        roll = config.roll()
+        if roll < config.error_rate:
+            stats.increment("error")
+            self._send(500, "<html><head><title>500 Internal Server Error</title></head><body></body></html>")
+            return True
+        roll -= config.error_rate
+        if roll < config.forbidden_rate:
+            stats.increment("forbidden")
+            self._send(403, "<html><head><title>403 Forbidden</title></head><body><h1>403 Forbidden</h1></body></html>")
+            return True
+        roll -= config.forbidden_rate
+        if roll < config.interstitial_rate:
+            stats.increment("interstitial")
+            redirect = quote(f"{self.base_url}{self.path}", safe="")
+            self._send(302, "", headers={"Location": f"{self.base_url}/sec/c?r={redirect}"})
+            return True
+        return False
+    
+    def do_HEAD(self):
+        """处理HEAD请求"""
+        self.do_GET()
+    
+    def do_GET(self):
+        """处理GET请求"""
+        parts = urlsplit(self.path)
+        path = parts.path
+        query = parse_qs(parts.query)
+        stats = self.server.stats
+        stats.increment("requests")
+        
+        if path == "/__stats":
+            self._send(200, json.dumps(stats.snapshot()), "application/json")
+            return
+        
+        if path.startswith("/sec/"):
+            stats.increment("captcha_pages")
+            redirect = escape(query.get("r", [""])[0])
+            self._send(200, self.server.corpus.captcha_page.replace("{redirect}", redirect))
+            return
+        
+        if self._inject_faults():
+            return
+        
+        if path == "/movie/subject_search":
+            stats.increment("search")
+            self._send(200, self._render_search(query.get("search_text", [""])[0]))
+            return
+        
+        if path == "/j/subject_suggest":
+            stats.increment("suggest")
+            self._send(200, self._render_suggest(query.get("q", [""])[0]), "application/json; charset=utf-8")
+            return
+        
+        if path == "/top250":
+            stats.increment("top250")
+            start_text = query.get("start", ["0"])[0]
+            self._send(200, self._render_top250(int(start_text) if start_text.isdigit() else 0))
+            return
+        
+        segments = [segment for segment in path.split("/") if segment]
+        if len(segments) == 3 and segments[0] == "people" and segments[2] in ("collect", "wish"):
+            stats.increment("list")
+            start_text = query.get("start", ["0"])[0]
+            start = int(start_text) if start_text.isdigit() else 0
+            self._send(200, self._render_list(segments[1], segments[2], start))
+            return
+        
+        if len(segments) == 2 and segments[0] == "subject":
+            page = self.server.corpus.pages.get(segments[1])
+            if page is not None:
+                stats.increment("subject")
+                self._send(200, self._rewrite(page))
+                return
+        
+        stats.increment("not_found")
+        self._send(404, "<html><head><title>页面不存在</title></head><body></body></html>")
+
+class DoubanStandinServer:
+    """可在后台线程运行的豆瓣替身服务器"""
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: StandinConfig = None,
+                 corpus: StandinCorpus = None):
+        """
+        初始化替身服务器
+        
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示自动选择
+            config: 行为配置
+            corpus: 页面语料
+        """
+        self.httpd = ThreadingHTTPServer((host, port), StandinRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = config or StandinConfig()
+        self.httpd.corpus = corpus or StandinCorpus()
+        self.httpd.stats = StandinStats()
+        self.httpd.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+    
+    @property
+    def base_url(self) -> str:
+        """服务器地址，用作 DOUBAN_STANDIN_URL"""
+        return self.httpd.base_url
+    
+    @property
+    def stats(self) -> StandinStats:
+        """请求统计"""
+        return self.httpd.stats
+    
+    def start(self) -> "DoubanStandinServer":
+        """在后台线程启动服务器"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="douban-standin", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """停止服务器"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="豆瓣本地替身服务器")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="基础响应延迟(毫秒)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="延迟随机波动(毫秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回500错误的比例")
+    parser.add_argument("--interstitial-rate", type=float, default=0.0, help="重定向到反爬验证页的比例")
+    parser.add_argument("--forbidden-rate", type=float, default=0.0, help="返回403的比例")
+    parser.add_argument("--seed", type=int, default=None, help="随机数种子")
+    args = parser.parse_args()
+    
+    config = StandinConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        interstitial_rate=args.interstitial_rate,
+        forbidden_rate=args.forbidden_rate,
+        seed=args.seed
+    )
+    server = DoubanStandinServer(args.host, args.port, config)
+    print(f"豆瓣替身服务器已启动: {server.base_url}")
+    print(f"设置 DOUBAN_STANDIN_URL={server.base_url} 后启动爬虫或API服务器")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
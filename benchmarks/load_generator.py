@@ -0,0 +1,306 @@
+"""
+API端到端压测工具
+
+以指定并发向 /api/movie 发送请求，统计延迟分位数(p50/p95/p99)、吞吐量，
+并在压测期间采样Chromium进程的内存占用。
+
+对已运行的API服务器压测：
+
+    python -m benchmarks.load_generator --url http://127.0.0.1:6000 --concurrency 4 --requests 40
+
+自动启动豆瓣替身服务器和API服务器后压测（不访问真实豆瓣）：
+
+    python -m benchmarks.load_generator --spawn --concurrency 4 --requests 40 --latency-ms 150
+
+加上 --spawn-notion 时同步写入本地Notion模拟器，完全离线运行：
+
+    python -m benchmarks.load_generator --spawn --spawn-notion --concurrency 4 --requests 40
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+from core.browser_watchdog import chromium_rss_mb
+from benchmarks.douban_standin import DoubanStandinServer, StandinConfig, StandinCorpus
+from benchmarks.notion_emulator import NotionEmulator
+
+# 项目根目录
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(samples: List[float], percent: float) -> float:
+    """
+    计算分位数（线性插值）
+    
+    Args:
+        samples: 样本列表
+        percent: 分位(0-100)
+    
+    Returns:
+        分位数值
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * percent / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+class MemorySampler(threading.Thread):
+    """后台采样Chromium内存占用"""
+    
+    def __init__(self, root_pid: Optional[int] = None, interval: float = 0.5):
+        """
+        初始化采样器
+        
+        Args:
+            root_pid: 只统计该进程的子孙进程
+            interval: 采样间隔(秒)
+        """
+        super().__init__(name="memory-sampler", daemon=True)
+        self.root_pid = root_pid
+        self.interval = interval
+        self.samples: List[float] = []
+        self._stop_event = threading.Event()
+    
+    def run(self):
+        """按间隔采样直到停止"""
+        while not self._stop_event.is_set():
+            self.samples.append(chromium_rss_mb(self.root_pid))
+            self._stop_event.wait(self.interval)
+    
+    def stop(self) -> Dict[str, float]:
+        """
+        停止采样并返回统计
+        
+        Returns:
+            峰值和平均内存(MB)
+        """
+        self._stop_event.set()
+        self.join(timeout=5)
+        if not self.samples:
+            return {"peak_mb": 0.0, "mean_mb": 0.0}
+        return {
+            "peak_mb": round(max(self.samples), 1),
+            "mean_mb": round(sum(self.samples) / len(self.samples), 1),
+        }
+
+def _post_movie(url: str, title: str, timeout: float) -> Dict:
+    """
+    发送单个 /api/movie 请求
+    
+    Returns:
+        包含延迟、状态码和是否成功的字典
+    """
+    body = json.dumps({"title": title}).encode("utf-8")
+    request = urllib.request.Request(
+        f"{url}/api/movie", data=body, headers={"Content-Type": "application/json"}, method="POST"
+    )
+    started = time.perf_counter()
+    status, success = 0, False
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status = response.status
+            success = bool(json.loads(response.read().decode("utf-8")).get("success"))
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (OSError, ValueError):
+        status = 0
+    return {"latency": time.perf_counter() - started, "status": status, "success": success}
+
+def run_load(url: str, titles: List[str], concurrency: int, total_requests: int,
+             timeout: float = 300.0, server_pid: Optional[int] = None) -> Dict:
+    """
+    以固定并发发送请求直到完成指定数量
+    
+    Args:
+        url: API服务器地址
+        titles: 轮流使用的电影名称
+        concurrency: 并发数
+        total_requests: 请求总数
+        timeout: 单个请求超时(秒)
+        server_pid: API服务器进程ID，用于只统计其Chromium子进程
+    
+    Returns:
+        压测报告
+    """
+    results: List[Dict] = []
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+    
+    def worker():
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            result = _post_movie(url, titles[index % len(titles)], timeout)
+            with lock:
+                results.append(result)
+    
+    sampler = MemorySampler(server_pid)
+    sampler.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    memory = sampler.stop()
+    
+    latencies = [result["latency"] * 1000.0 for result in results]
+    succeeded = sum(1 for result in results if result["success"])
+    status_counts: Dict[str, int] = {}
+    for result in results:
+        status_counts[str(result["status"])] = status_counts.get(str(result["status"]), 0) + 1
+    
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "status_counts": status_counts,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(results) / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "p99": round(percentile(latencies, 99), 1),
+            "max": round(max(latencies), 1) if latencies else 0.0,
+        },
+        "chromium_memory": memory,
+    }
+
+def _free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _wait_healthy(url: str, proc: subprocess.Popen, timeout: float = 60.0):
+    """等待API服务器健康检查通过"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API服务器提前退出，返回码: {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"{url}/api/health", timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("等待API服务器启动超时")
+
+def spawn_api_server(env: Dict[str, str]) -> Tuple[subprocess.Popen, str]:
+    """
+    以子进程启动API服务器
+    
+    Args:
+        env: 附加的环境变量
+    
+    Returns:
+        (进程对象, 服务器地址)
+    """
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(
+        [sys.executable, "api_server.py", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    _wait_healthy(url, proc)
+    return proc, url
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="API端到端压测工具")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:6000", help="API服务器地址")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发数")
+    parser.add_argument("--requests", type=int, default=40, help="请求总数")
+    parser.add_argument("--timeout", type=float, default=300.0, help="单个请求超时(秒)")
+    parser.add_argument("--title", action="append", dest="titles", help="电影名称，可多次指定，默认使用语料中的标题")
+    parser.add_argument("--server-pid", type=int, help="API服务器进程ID，只统计其Chromium子进程")
+    parser.add_argument("--spawn", action="store_true", help="自动启动豆瓣替身服务器和API服务器")
+    parser.add_argument("--spawn-notion", action="store_true", help="同时启动Notion模拟器，API服务器同步到模拟器")
+    parser.add_argument("--notion-rate-limit", type=float, default=3.0, help="Notion模拟器平均每秒允许的请求数")
+    parser.add_argument("--env", action="append", default=[], help="启动API服务器时附加的环境变量 KEY=VALUE")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="替身服务器基础延迟(毫秒)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="替身服务器延迟波动(毫秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="替身服务器500错误比例")
+    parser.add_argument("--interstitial-rate", type=float, default=0.0, help="替身服务器反爬验证页比例")
+    parser.add_argument("--pacing-interval", type=float, default=0.0, help="API服务器访问替身服务器的平均请求间隔(秒)，默认不限制")
+    parser.add_argument("--antibot-cooldown", type=float, default=2.0, help="API服务器遇到验证页后暂停访问替身服务器的时间(秒)")
+    parser.add_argument("--output", type=str, help="结果JSON文件路径")
+    args = parser.parse_args()
+    
+    titles = args.titles or [entry["title"] for entry in StandinCorpus().entries]
+    standin, notion, api_proc, url, server_pid = None, None, None, args.url, args.server_pid
+    
+    try:
+        if args.spawn:
+            config = StandinConfig(
+                latency_ms=args.latency_ms,
+                jitter_ms=args.jitter_ms,
+                error_rate=args.error_rate,
+                interstitial_rate=args.interstitial_rate
+            )
+            standin = DoubanStandinServer(config=config).start()
+            # 替身服务器的验证页是随机注入的，不需要像真实封禁那样长时间暂停；
+            # 默认不限制请求间隔，测得的是抓取本身的开销；不保存存储状态和页面归档，每次测试都从干净的上下文开始
+            env = {
+                "DOUBAN_STANDIN_URL": standin.base_url,
+                "ANTIBOT_COOLDOWN": str(args.antibot_cooldown),
+                "PACING_INTERVAL": str(args.pacing_interval),
+                "STORAGE_STATE_DIR": "",
+                "HTML_ARCHIVE_DIR": "",
+            }
+            if args.spawn_notion:
+                notion = NotionEmulator(token="load-test-token", rate_limit=args.notion_rate_limit).start()
+                env.update({
+                    "NOTION_API_BASE_URL": notion.base_url,
+                    "NOTION_TOKEN": "load-test-token",
+                    "NOTION_DATABASE_ID": notion.database_id,
+                    # 模拟器无法访问外部图片，关闭封面校验
+                    "COVER_VALIDATION_ENABLED": "false",
+                })
+            env.update(dict(item.split("=", 1) for item in args.env))
+            api_proc, url = spawn_api_server(env)
+            server_pid = api_proc.pid
+            print(f"豆瓣替身服务器: {standin.base_url}，API服务器: {url}")
+        
+        report = run_load(url, titles, args.concurrency, args.requests, args.timeout, server_pid)
+        if standin:
+            report["standin_stats"] = standin.stats.snapshot()
+        if notion:
+            report["notion_stats"] = notion.stats.snapshot()
+            report["notion_pages"] = len(notion.pages)
+    finally:
+        if api_proc:
+            api_proc.terminate()
+            try:
+                api_proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                api_proc.kill()
+        if standin:
+            standin.stop()
+        if notion:
+            notion.stop()
+    
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,623 @@
+"""
+Notion API本地模拟器
+
+实现 NotionSyncModule 使用的接口：
+
+- GET   /v1/databases/{id}
+- POST  /v1/databases/{id}/query
+- POST  /v1/pages
+- PATCH /v1/pages/{id}
+
+并模拟Notion的平均3次/秒速率限制（令牌桶，超限返回429和Retry-After）、
+属性校验错误(400 validation_error)、认证错误和可注入的响应延迟与故障。
+设置 NOTION_API_BASE_URL 指向模拟器即可离线测试同步逻辑：
+
+    python -m benchmarks.notion_emulator --port 8766 --database-id test-db --token secret
+    NOTION_API_BASE_URL=http://127.0.0.1:8766/v1 NOTION_DATABASE_ID=test-db NOTION_TOKEN=secret python main.py
+"""
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# 默认数据库结构，与README中的数据库结构一致
+DEFAULT_SCHEMA = {
+    "名称": "title",
+    "类别": "select",
+    "导演": "rich_text",
+    "编剧": "rich_text",
+    "主演": "rich_text",
+    "类型": "multi_select",
+    "语言": "multi_select",
+    "评分": "number",
+    "IMDb": "rich_text",
+    "首播": "rich_text",
+    "简介": "rich_text",
+    "又名": "rich_text",
+}
+
+# Notion对富文本单段内容的长度限制
+RICH_TEXT_LIMIT = 2000
+
+class NotionError(Exception):
+    """模拟器内部使用的Notion错误"""
+    
+    def __init__(self, status: int, code: str, message: str, headers: Dict[str, str] = None):
+        """
+        初始化错误
+        
+        Args:
+            status: HTTP状态码
+            code: Notion错误码
+            message: 错误信息
+            headers: 附加的响应头
+        """
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+        self.headers = headers or {}
+    
+    def to_body(self) -> Dict:
+        """转换为Notion错误响应体"""
+        return {"object": "error", "status": self.status, "code": self.code, "message": self.message}
+
+def _now_iso() -> str:
+    """当前时间的ISO格式字符串"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+class TokenBucket:
+    """线程安全的令牌桶"""
+    
+    def __init__(self, rate: float, capacity: float):
+        """
+        初始化令牌桶
+        
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量，即允许的突发请求数
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self) -> float:
+        """
+        尝试取出一个令牌
+        
+        Returns:
+            0表示成功，否则为需要等待的秒数
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+class EmulatorStats:
+    """请求统计"""
+    
+    def __init__(self):
+        """初始化统计"""
+        self.counts: Dict[str, int] = {}
+        self.lock = threading.Lock()
+    
+    def increment(self, key: str):
+        """计数加一"""
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+    
+    def snapshot(self) -> Dict[str, int]:
+        """获取当前统计"""
+        with self.lock:
+            return dict(self.counts)
+
+class NotionState:
+    """模拟器的内存数据"""
+    
+    def __init__(self, database_id: str, title: str, schema: Dict[str, str]):
+        """
+        初始化数据
+        
+        Args:
+            database_id: 数据库ID
+            title: 数据库标题
+            schema: 属性名 -> 属性类型
+        """
+        self.database_id = database_id
+        self.title = title
+        self.schema = schema
+        self.property_ids = {name: ("title" if kind == "title" else uuid.uuid4().hex[:4]) for name, kind in schema.items()}
+        self.pages: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+    
+    def database_object(self) -> Dict:
+        """数据库对象"""
+        return {
+            "object": "database",
+            "id": self.database_id,
+            "title": [{"type": "text", "text": {"content": self.title, "link": None}, "plain_text": self.title}],
+            "properties": {
+                name: {"id": self.property_ids[name], "name": name, "type": kind, kind: {}}
+                for name, kind in self.schema.items()
+            },
+        }
+
+def _validate_rich_text(path: str, items: Any) -> List[Dict]:
+    """校验并规范化富文本数组"""
+    if not isinstance(items, list):
+        raise NotionError(400, "validation_error", f"{path} should be an array, instead was `{json.dumps(items, ensure_ascii=False)}`.")
+    normalized = []
+    for index, item in enumerate(items):
+        text = item.get("text") if isinstance(item, dict) else None
+        content = text.get("content") if isinstance(text, dict) else None
+        if not isinstance(content, str):
+            raise NotionError(400, "validation_error", f"{path}[{index}].text.content should be a string, instead was `{json.dumps(content)}`.")
+        if len(content) > RICH_TEXT_LIMIT:
+            raise NotionError(400, "validation_error", f"{path}[{index}].text.content.length should be ≤ `{RICH_TEXT_LIMIT}`, instead was `{len(content)}`.")
+        link = text.get("link")
+        if link is not None:
+            _validate_url(f"{path}[{index}].text.link.url", link.get("url") if isinstance(link, dict) else None)
+        normalized.append({
+            "type": "text",
+            "text": {"content": content, "link": link},
+            "plain_text": content,
+            "href": link.get("url") if link else None,
+        })
+    return normalized
+
+def _validate_url(path: str, url: Any):
+    """校验URL格式"""
+    if not isinstance(url, str) or not url:
+        raise NotionError(400, "validation_error", f"{path} should be a string, instead was `{json.dumps(url)}`.")
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.netloc or len(url) > RICH_TEXT_LIMIT:
+        raise NotionError(400, "validation_error", f"Invalid URL for {path}: {url}")
+
+def _validate_properties(state: NotionState, properties: Any) -> Dict[str, Dict]:
+    """
+    按数据库结构校验属性并转换为Notion返回格式
+    
+    Args:
+        state: 模拟器数据
+        properties: 请求中的属性
+    
+    Returns:
+        规范化后的属性
+    """
+    if not isinstance(properties, dict):
+        raise NotionError(400, "validation_error", "body.properties should be an object.")
+    
+    result = {}
+    for name, value in properties.items():
+        kind = state.schema.get(name)
+        if kind is None:
+            raise NotionError(400, "validation_error", f"{name} is not a property that exists.")
+        if not isinstance(value, dict) or kind not in value:
+            raise NotionError(400, "validation_error", f"{name} is expected to be {kind}.")
+        
+        path = f"body.properties.{name}.{kind}"
+        raw = value[kind]
+        if kind in ("title", "rich_text"):
+            normalized = _validate_rich_text(path, raw)
+        elif kind == "number":
+            if raw is not None and (isinstance(raw, bool) or not isinstance(raw, (int, float))):
+                raise NotionError(400, "validation_error", f"{path} should be a number or `null`, instead was `{json.dumps(raw, ensure_ascii=False)}`.")
+            normalized = raw
+        elif kind == "select":
+            if raw is not None and not (isinstance(raw, dict) and isinstance(raw.get("name"), str)):
+                raise NotionError(400, "validation_error", f"{path}.name should be a string.")
+            normalized = {"name": raw["name"], "color": "default"} if raw else None
+        elif kind == "multi_select":
+            if not isinstance(raw, list) or not all(isinstance(item, dict) and isinstance(item.get("name"), str) for item in raw):
+                raise NotionError(400, "validation_error", f"{path} should be an array of options.")
+            for item in raw:
+                if "," in item["name"]:
+                    raise NotionError(400, "validation_error", f"Invalid multi_select value: commas not allowed: {item['name']}")
+            normalized = [{"name": item["name"], "color": "default"} for item in raw]
+        else:
+            normalized = raw
+        result[name] = {"id": state.property_ids[name], "type": kind, kind: normalized}
+    return result
+
+def _validate_cover_and_icon(body: Dict) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """校验封面和图标"""
+    cover = body.get("cover")
+    if cover is not None:
+        if not isinstance(cover, dict) or cover.get("type") != "external":
+            raise NotionError(400, "validation_error", "body.cover.type should be `external`.")
+        _validate_url("body.cover.external.url", (cover.get("external") or {}).get("url"))
+    
+    icon = body.get("icon")
+    if icon is not None:
+        if not isinstance(icon, dict) or icon.get("type") not in ("emoji", "external"):
+            raise NotionError(400, "validation_error", "body.icon.type should be `emoji` or `external`.")
+        if icon["type"] == "emoji" and not isinstance(icon.get("emoji"), str):
+            raise NotionError(400, "validation_error", "body.icon.emoji should be a string.")
+    return cover, icon
+
+def _plain_text(value: Dict) -> str:
+    """获取属性值的纯文本，用于查询过滤"""
+    kind = value.get("type")
+    raw = value.get(kind)
+    if kind in ("title", "rich_text"):
+        return "".join(item.get("plain_text", "") for item in raw or [])
+    if kind == "select":
+        return raw["name"] if raw else ""
+    if raw is None:
+        return ""
+    return str(raw)
+
+def _match_filter(state: NotionState, page: Dict, query_filter: Optional[Dict]) -> bool:
+    """
+    判断页面是否满足查询过滤条件，支持文本equals/contains、数字equals和and/or组合
+    
+    Args:
+        state: 模拟器数据
+        page: 页面对象
+        query_filter: 过滤条件
+    
+    Returns:
+        是否匹配
+    """
+    if not query_filter:
+        return True
+    if "and" in query_filter:
+        return all(_match_filter(state, page, item) for item in query_filter["and"])
+    if "or" in query_filter:
+        return any(_match_filter(state, page, item) for item in query_filter["or"])
+    
+    name = query_filter.get("property")
+    if name not in state.schema:
+        raise NotionError(400, "validation_error", f"Could not find property with name or id: {name}")
+    value = page["properties"].get(name, {"type": state.schema[name], state.schema[name]: None})
+    conditions = query_filter.get(state.schema[name]) or next(
+        (query_filter[key] for key in ("title", "rich_text", "number", "select") if key in query_filter), {}
+    )
+    
+    if "is_empty" in conditions:
+        return not _plain_text(value)
+    if "is_not_empty" in conditions:
+        return bool(_plain_text(value))
+    if "equals" in conditions:
+        if state.schema[name] == "number":
+            return value.get("number") == conditions["equals"]
+        return _plain_text(value) == str(conditions["equals"])
+    if "contains" in conditions:
+        return str(conditions["contains"]) in _plain_text(value)
+    raise NotionError(400, "validation_error", f"Unsupported filter for property {name}.")
+
+class NotionRequestHandler(BaseHTTPRequestHandler):
+    """模拟器请求处理器"""
+    
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        """关闭默认的访问日志输出"""
+        pass
+    
+    def _send_json(self, status: int, body: Dict, headers: Dict[str, str] = None):
+        """发送JSON响应"""
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _consume_body(self) -> bytes:
+        """
+        读取完整的请求体
+        
+        需要在发送任何响应之前调用：keep-alive连接上未读取的请求体会被当作下一个请求解析，
+        客户端按 Retry-After 重试时会收到 400
+        """
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length > 0 else b""
+    
+    def _read_body(self) -> Dict:
+        """解析JSON请求体"""
+        if not self._raw_body:
+            return {}
+        try:
+            body = json.loads(self._raw_body.decode("utf-8"))
+        except ValueError:
+            raise NotionError(400, "invalid_json", "Error parsing JSON body.")
+        if not isinstance(body, dict):
+            raise NotionError(400, "validation_error", "body should be an object.")
+        return body
+    
+    def _check_request(self):
+        """执行延迟、故障、认证、版本和速率限制检查"""
+        emulator = self.server.emulator
+        
+        delay = emulator.next_delay()
+        if delay:
+            time.sleep(delay)
+        
+        if emulator.token and self.headers.get("Authorization") != f"Bearer {emulator.token}":
+            raise NotionError(401, "unauthorized", "API token is invalid.")
+        if not self.headers.get("Notion-Version"):
+            raise NotionError(400, "missing_version", "Notion-Version header failed validation: Notion-Version header should be defined.")
+        
+        wait = emulator.bucket.acquire()
+        if wait:
+            raise NotionError(
+                429, "rate_limited",
+                "You have been rate limited. Please try again in a few minutes.",
+                {"Retry-After": str(max(1, math.ceil(wait)))}
+            )
+        
+        if emulator.roll_error():
+            raise NotionError(503, "service_unavailable", "Notion is unavailable, please try again later.")
+    
+    def _handle(self, method: str):
+        """分发请求并统一处理错误"""
+        emulator = self.server.emulator
+        path = urlsplit(self.path).path
+        stats = emulator.stats
+        self._raw_body = self._consume_body()
+        
+        if method == "GET" and path == "/__stats":
+            self._send_json(200, stats.snapshot())
+            return
+        
+        stats.increment("requests")
+        try:
+            self._check_request()
+            segments = [segment for segment in path.split("/") if segment]
+            if segments[:1] != ["v1"]:
+                raise NotionError(400, "invalid_request_url", "Invalid request URL.")
+            segments = segments[1:]
+            
+            if method == "GET" and len(segments) == 2 and segments[0] == "databases":
+                status, body = 200, emulator.get_database(segments[1])
+            elif method == "POST" and len(segments) == 3 and segments[0] == "databases" and segments[2] == "query":
+                status, body = 200, emulator.query_database(segments[1], self._read_body())
+            elif method == "POST" and segments == ["pages"]:
+                status, body = 200, emulator.create_page(self._read_body())
+            elif method == "PATCH" and len(segments) == 2 and segments[0] == "pages":
+                status, body = 200, emulator.update_page(segments[1], self._read_body())
+            else:
+                raise NotionError(400, "invalid_request_url", "Invalid request URL.")
+            
+            stats.increment(f"{method} {segments[0]}")
+            self._send_json(status, body)
+        except NotionError as e:
+            stats.increment(f"status_{e.status}")
+            self._send_json(e.status, e.to_body(), e.headers)
+    
+    def do_GET(self):
+        """处理GET请求"""
+        self._handle("GET")
+    
+    def do_POST(self):
+        """处理POST请求"""
+        self._handle("POST")
+    
+    def do_PATCH(self):
+        """处理PATCH请求"""
+        self._handle("PATCH")
+
+class NotionEmulator:
+    """可在后台线程运行的Notion API模拟器"""
+    
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 database_id: str = None,
+                 token: str = None,
+                 rate_limit: float = 3.0,
+                 burst: float = 3.0,
+                 latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0,
+                 error_rate: float = 0.0,
+                 schema: Dict[str, str] = None,
+                 title: str = "影视数据库",
+                 seed: Optional[int] = None):
+        """
+        初始化模拟器
+        
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示自动选择
+            database_id: 数据库ID，默认随机生成
+            token: 要求的API Token，None表示不校验
+            rate_limit: 平均每秒允许的请求数
+            burst: 允许的突发请求数
+            latency_ms: 每个响应的基础延迟(毫秒)
+            jitter_ms: 延迟的随机波动范围(毫秒)
+            error_rate: 返回503错误的比例
+            schema: 数据库结构，默认使用DEFAULT_SCHEMA
+            title: 数据库标题
+            seed: 随机数种子
+        """
+        self.state = NotionState(database_id or str(uuid.uuid4()), title, schema or dict(DEFAULT_SCHEMA))
+        self.token = token
+        self.bucket = TokenBucket(rate_limit, burst)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.stats = EmulatorStats()
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        
+        self.httpd = ThreadingHTTPServer((host, port), NotionRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.emulator = self
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}/v1"
+        self._thread = None
+    
+    @property
+    def database_id(self) -> str:
+        """数据库ID"""
+        return self.state.database_id
+    
+    @property
+    def pages(self) -> Dict[str, Dict]:
+        """已创建的页面"""
+        return self.state.pages
+    
+    def next_delay(self) -> float:
+        """计算本次响应的延迟(秒)"""
+        with self._random_lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+    
+    def roll_error(self) -> bool:
+        """按错误率判断本次是否注入故障"""
+        if not self.error_rate:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+    
+    def _require_database(self, database_id: str):
+        """检查数据库是否存在"""
+        if database_id.replace("-", "") != self.state.database_id.replace("-", ""):
+            raise NotionError(404, "object_not_found", f"Could not find database with ID: {database_id}.")
+    
+    def get_database(self, database_id: str) -> Dict:
+        """获取数据库"""
+        self._require_database(database_id)
+        return self.state.database_object()
+    
+    def create_page(self, body: Dict) -> Dict:
+        """创建页面"""
+        parent = body.get("parent") or {}
+        if not parent.get("database_id"):
+            raise NotionError(400, "validation_error", "body.parent.database_id should be defined.")
+        self._require_database(parent["database_id"])
+        
+        properties = _validate_properties(self.state, body.get("properties"))
+        cover, icon = _validate_cover_and_icon(body)
+        
+        page_id = str(uuid.uuid4())
+        now = _now_iso()
+        page = {
+            "object": "page",
+            "id": page_id,
+            "created_time": now,
+            "last_edited_time": now,
+            "archived": False,
+            "cover": cover,
+            "icon": icon,
+            "parent": {"type": "database_id", "database_id": self.state.database_id},
+            "properties": properties,
+            "url": f"https://www.notion.so/{page_id.replace('-', '')}",
+        }
+        with self.state.lock:
+            self.state.pages[page_id] = page
+        return page
+    
+    def update_page(self, page_id: str, body: Dict) -> Dict:
+        """更新页面"""
+        with self.state.lock:
+            page = self.state.pages.get(page_id)
+        if page is None:
+            raise NotionError(404, "object_not_found", f"Could not find page with ID: {page_id}.")
+        
+        properties = _validate_properties(self.state, body.get("properties", {}))
+        cover, icon = _validate_cover_and_icon(body)
+        
+        with self.state.lock:
+            page["properties"].update(properties)
+            if "cover" in body:
+                page["cover"] = cover
+            if "icon" in body:
+                page["icon"] = icon
+            page["last_edited_time"] = _now_iso()
+        return page
+    
+    def query_database(self, database_id: str, body: Dict) -> Dict:
+        """查询数据库，支持过滤和游标分页"""
+        self._require_database(database_id)
+        
+        page_size = body.get("page_size", 100)
+        if not isinstance(page_size, int) or not 1 <= page_size <= 100:
+            raise NotionError(400, "validation_error", "body.page_size should be ≤ `100`.")
+        
+        with self.state.lock:
+            pages = list(self.state.pages.values())
+        matched = [page for page in pages if _match_filter(self.state, page, body.get("filter"))]
+        
+        start = 0
+        cursor = body.get("start_cursor")
+        if cursor:
+            ids = [page["id"] for page in matched]
+            if cursor not in ids:
+                raise NotionError(400, "validation_error", "start_cursor provided is invalid.")
+            start = ids.index(cursor)
+        
+        results = matched[start:start + page_size]
+        has_more = start + page_size < len(matched)
+        return {
+            "object": "list",
+            "results": results,
+            "next_cursor": matched[start + page_size]["id"] if has_more else None,
+            "has_more": has_more,
+            "type": "page_or_database",
+        }
+    
+    def start(self) -> "NotionEmulator":
+        """在后台线程启动模拟器"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="notion-emulator", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """停止模拟器"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="Notion API本地模拟器")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8766, help="监听端口")
+    parser.add_argument("--database-id", type=str, default=None, help="数据库ID，默认随机生成")
+    parser.add_argument("--token", type=str, default=None, help="要求的API Token，不设置则不校验")
+    parser.add_argument("--rate-limit", type=float, default=3.0, help="平均每秒允许的请求数")
+    parser.add_argument("--burst", type=float, default=3.0, help="允许的突发请求数")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="基础响应延迟(毫秒)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="延迟随机波动(毫秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回503错误的比例")
+    args = parser.parse_args()
+    
+    emulator = NotionEmulator(
+        host=args.host,
+        port=args.port,
+        database_id=args.database_id,
+        token=args.token,
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate
+    )
+    print(f"Notion模拟器已启动: {emulator.base_url}")
+    print(f"设置 NOTION_API_BASE_URL={emulator.base_url} NOTION_DATABASE_ID={emulator.database_id}")
+    try:
+        emulator.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,378 @@
+"""
+解析器基准测试
+
+使用 benchmarks/corpus/douban 下录制的详情页测量解析路径的性能：
+1. DoubanParser.extract_movie_data 每个页面的解析耗时、Python内存分配
+   以及与浏览器之间的往返次数（query_selector、text_content等调用），
+   另外单独测量评分刷新只提取部分字段时的耗时和往返次数
+2. clean_title 和 NotionSyncModule.convert_to_notion_properties 的微基准
+
+页面通过 page.route 以原始URL加载，不访问网络。结果写入JSON文件并记录当前提交，
+可与另一次结果比较以发现性能回退：
+
+    python -m benchmarks.parser_bench --runs 20 --output parser.json
+    python -m benchmarks.parser_bench --compare parser.json --threshold 20
+"""
+import os
+import sys
+import json
+import time
+import timeit
+import asyncio
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+# 项目根目录
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 录制页面目录
+CORPUS_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "corpus", "douban")
+
+# 录制页面对应的原始地址
+SUBJECT_URL = "https://movie.douban.com/subject/{id}/"
+
+# clean_title微基准使用的标题样本
+TITLE_SAMPLES = [
+    "肖申克的救赎 The Shawshank Redemption (1994)",
+    "霸王别姬 (1993)",
+    "漫长的季节",
+    "千与千寻 千と千尋の神隠し (2001)",
+    "星际穿越 Interstellar",
+]
+
+class RoundTripCounter:
+    """按方法名统计与浏览器之间的往返次数"""
+    
+    def __init__(self):
+        """初始化计数器"""
+        self.counts: Dict[str, int] = {}
+    
+    def increment(self, name: str):
+        """计数加一"""
+        self.counts[name] = self.counts.get(name, 0) + 1
+    
+    @property
+    def total(self) -> int:
+        """往返总次数"""
+        return sum(self.counts.values())
+
+class CountingProxy:
+    """
+    包装Page或ElementHandle，统计每次异步方法调用
+    
+    返回的元素同样被包装，因此元素上的 text_content、get_attribute 等调用也会计数
+    """
+    
+    def __init__(self, target: Any, counter: RoundTripCounter):
+        """
+        初始化代理
+        
+        Args:
+            target: 被包装的Page或ElementHandle
+            counter: 往返计数器
+        """
+        self._target = target
+        self._counter = counter
+    
+    def _wrap(self, value: Any) -> Any:
+        """包装返回的元素"""
+        if isinstance(value, list):
+            return [self._wrap(item) for item in value]
+        if value is not None and hasattr(value, "query_selector"):
+            return CountingProxy(value, self._counter)
+        return value
+    
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+        
+        async def counted(*args, **kwargs):
+            self._counter.increment(name)
+            return self._wrap(await attr(*args, **kwargs))
+        return counted
+
+def load_corpus(corpus_dir: str = CORPUS_DIR) -> List[Dict]:
+    """
+    加载语料索引和页面内容
+    
+    Args:
+        corpus_dir: 语料目录
+    
+    Returns:
+        语料条目列表，每项附带 html 字段
+    """
+    with open(os.path.join(corpus_dir, "index.json"), encoding="utf-8") as f:
+        entries = json.load(f)
+    for entry in entries:
+        with open(os.path.join(corpus_dir, entry["file"]), encoding="utf-8") as f:
+            entry["html"] = f.read()
+    return entries
+
+def git_commit() -> Optional[str]:
+    """获取当前提交的哈希，不在git仓库中返回None"""
+    try:
+        proc = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return proc.stdout.strip() or None
+
+def _summarize(samples: List[float]) -> Dict[str, float]:
+    """汇总耗时样本(毫秒)"""
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+async def _open_recorded_page(context, entry: Dict):
+    """
+    以原始URL打开录制的页面，其他资源请求全部拦截
+    
+    Args:
+        context: 浏览器上下文
+        entry: 语料条目
+    
+    Returns:
+        加载完成的页面
+    """
+    url = SUBJECT_URL.format(id=entry["id"])
+    page = await context.new_page()
+    
+    async def handle(route):
+        if route.request.url == url:
+            await route.fulfill(status=200, content_type="text/html; charset=utf-8", body=entry["html"])
+        else:
+            await route.abort()
+    
+    await page.route("**/*", handle)
+    await page.goto(url, wait_until="domcontentloaded")
+    return page
+
+async def bench_extract(entries: List[Dict], runs: int) -> Tuple[Dict[str, Dict], List[Dict]]:
+    """
+    测量每个页面的 extract_movie_data 性能
+    
+    Args:
+        entries: 语料条目
+        runs: 每个页面的重复次数
+    
+    Returns:
+        (页面ID -> 测量结果, 提取到的影视数据列表)
+    """
+    from playwright.async_api import async_playwright
+    from parsers.douban_parser import DoubanParser
+    from sync.refresh_scheduler import REFRESH_FIELDS
+    
+    results, extracted = {}, []
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        context = await browser.new_context()
+        try:
+            for entry in entries:
+                page = await _open_recorded_page(context, entry)
+                
+                # 预热一次，并统计往返次数和提取到的字段
+                counter = RoundTripCounter()
+                data = await DoubanParser.extract_movie_data(CountingProxy(page, counter))
+                extracted.append(data)
+                
+                timings = []
+                for _ in range(runs):
+                    started = time.perf_counter()
+                    await DoubanParser.extract_movie_data(page)
+                    timings.append((time.perf_counter() - started) * 1000.0)
+                
+                # 单独测量内存分配，避免tracemalloc影响耗时
+                tracemalloc.start()
+                before = tracemalloc.take_snapshot()
+                await DoubanParser.extract_movie_data(page)
+                after = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                stats = after.compare_to(before, "filename")
+                
+                # 评分刷新路径：只执行需要的提取器
+                partial_counter = RoundTripCounter()
+                await DoubanParser.extract_movie_data(CountingProxy(page, partial_counter), fields=REFRESH_FIELDS)
+                partial_timings = []
+                for _ in range(runs):
+                    started = time.perf_counter()
+                    await DoubanParser.extract_movie_data(page, fields=REFRESH_FIELDS)
+                    partial_timings.append((time.perf_counter() - started) * 1000.0)
+                
+                results[entry["id"]] = {
+                    "title": entry["title"],
+                    "case": entry["case"],
+                    "parse": _summarize(timings),
+                    "allocations": {
+                        "blocks": sum(max(stat.count_diff, 0) for stat in stats),
+                        "net_kb": round(sum(stat.size_diff for stat in stats) / 1024.0, 1),
+                        "peak_kb": round(peak / 1024.0, 1),
+                    },
+                    "round_trips": {"total": counter.total, "by_method": counter.counts},
+                    "refresh": {
+                        "fields": list(REFRESH_FIELDS),
+                        "parse": _summarize(partial_timings),
+                        "round_trips": partial_counter.total,
+                    },
+                    "fields": sorted(key for key, value in data.items() if value not in (None, "", [])),
+                }
+                await page.close()
+        finally:
+            await context.close()
+            await browser.close()
+    return results, extracted
+
+def bench_micro(parsed: List[Dict], number: int) -> Dict[str, Dict]:
+    """
+    clean_title 和 convert_to_notion_properties 的微基准
+    
+    Args:
+        parsed: 用于属性转换的影视数据
+        number: 每轮调用次数
+    
+    Returns:
+        函数名 -> 每次调用耗时(微秒)
+    """
+    from core.utils import clean_title
+    from sync.notion_sync import NotionSyncModule
+    
+    # 属性转换不涉及网络请求，使用占位配置即可
+    module = NotionSyncModule("benchmark-database", "benchmark-token")
+    
+    def per_call_us(func, calls: int) -> Dict[str, float]:
+        samples = timeit.repeat(func, number=number, repeat=5)
+        return {
+            "best_us": round(min(samples) / (number * calls) * 1e6, 3),
+            "median_us": round(statistics.median(samples) / (number * calls) * 1e6, 3),
+        }
+    
+    results = {
+        "clean_title": per_call_us(lambda: [clean_title(title) for title in TITLE_SAMPLES], len(TITLE_SAMPLES)),
+    }
+    # 转换函数会修改部分字段，每次使用副本
+    results["convert_to_notion_properties"] = per_call_us(
+        lambda: [module.convert_to_notion_properties(dict(data)) for data in parsed], len(parsed)
+    )
+    module.close()
+    return results
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    比较两次结果，返回超过阈值的回退项
+    
+    Args:
+        current: 本次结果
+        baseline: 基线结果
+        threshold: 允许的变慢比例(百分比)
+    
+    Returns:
+        回退描述列表
+    """
+    regressions = []
+    
+    def check(name: str, now: float, before: float, unit: str):
+        change = (now - before) / before * 100.0 if before else 0.0
+        print(f"{name:<48} {before:>10.3f} -> {now:>10.3f} {unit} ({change:+.1f}%)")
+        if change > threshold:
+            regressions.append(f"{name}: {change:+.1f}%")
+    
+    for page_id, result in current.get("pages", {}).items():
+        old = baseline.get("pages", {}).get(page_id)
+        if not old:
+            continue
+        check(f"{page_id} parse", result["parse"]["median_ms"], old["parse"]["median_ms"], "ms")
+        check(f"{page_id} round_trips", result["round_trips"]["total"], old["round_trips"]["total"], "")
+        check(f"{page_id} alloc_blocks", result["allocations"]["blocks"], old["allocations"]["blocks"], "")
+        if "refresh" in result and "refresh" in old:
+            check(f"{page_id} refresh_parse", result["refresh"]["parse"]["median_ms"],
+                  old["refresh"]["parse"]["median_ms"], "ms")
+            check(f"{page_id} refresh_round_trips", result["refresh"]["round_trips"],
+                  old["refresh"]["round_trips"], "")
+    
+    for name, result in current.get("micro", {}).items():
+        old = baseline.get("micro", {}).get(name)
+        if old:
+            check(name, result["best_us"], old["best_us"], "us")
+    return regressions
+
+def run_benchmark(runs: int, number: int, micro_only: bool = False) -> Dict:
+    """
+    运行全部基准测试
+    
+    Args:
+        runs: 每个页面的解析次数
+        number: 微基准每轮调用次数
+        micro_only: 只运行微基准，不启动浏览器
+    
+    Returns:
+        测试报告
+    """
+    # 解析器每个字段都会输出INFO日志，会掩盖解析本身的耗时
+    logging.disable(logging.INFO)
+    
+    entries = load_corpus()
+    pages, parsed = ({}, []) if micro_only else asyncio.run(bench_extract(entries, runs))
+    
+    # 属性转换优先使用真实的解析结果，只运行微基准时使用合成数据
+    if not parsed:
+        parsed = [{
+            "title": entry["title"],
+            "category": "电视剧" if entry["type"] == "tv" else "电影",
+            "directors": [{"name": "导演", "url": "https://www.douban.com/personage/1/"}],
+            "actors": [{"name": f"演员{i}", "url": f"https://www.douban.com/personage/{i}/"} for i in range(20)],
+            "genres": ["剧情"],
+            "rating": 9.0,
+            "release_date": f"{entry['year']}-01-01",
+            "summary": "简介" * 200,
+            "cover_url": "https://img9.doubanio.com/view/photo/l_ratio_poster/public/p1.jpg",
+        } for entry in entries]
+    
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "runs": runs,
+        "pages": pages,
+        "micro": bench_micro(parsed, number),
+    }
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="解析器基准测试")
+    parser.add_argument("--runs", type=int, default=20, help="每个页面的解析次数")
+    parser.add_argument("--number", type=int, default=1000, help="微基准每轮调用次数")
+    parser.add_argument("--micro-only", action="store_true", help="只运行微基准，不启动浏览器")
+    parser.add_argument("--output", type=str, help="结果JSON文件路径")
+    parser.add_argument("--compare", type=str, help="与之前的结果JSON比较")
+    parser.add_argument("--threshold", type=float, default=20.0, help="比较时允许的变慢比例(百分比)")
+    args = parser.parse_args()
+    
+    report = run_benchmark(args.runs, args.number, args.micro_only)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\n比较基线 {baseline.get('commit')} -> 当前 {report['commit']}")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print("性能回退: " + ", ".join(regressions))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,301 @@
+"""
+HTTP代理本地替身服务器
+
+转发普通HTTP请求（绝对地址形式）和HTTPS隧道（CONNECT），可注入延迟、
+502错误和反爬拦截，用于在本机测试访问身份池的轮换、健康度评分和冷却：
+
+    python -m benchmarks.douban_standin --port 8765
+    python -m benchmarks.proxy_standin --port 8801
+    python -m benchmarks.proxy_standin --port 8802 --block-rate 1.0
+
+身份文件中两个身份分别使用 http://127.0.0.1:8801 和 http://127.0.0.1:8802，
+设置 DOUBAN_STANDIN_URL 和 IDENTITY_FILE 后启动API服务器，第二个身份会被拦截并进入冷却。
+
+也可以在测试代码中启动：
+
+    proxy = ProxyStandinServer(config=ProxyConfig(block_rate=1.0)).start()
+    identity = Identity("blocked", proxy=proxy.url)
+"""
+import time
+import random
+import select
+import socket
+import argparse
+import threading
+import http.client
+from typing import Dict, Optional
+from urllib.parse import urlsplit, quote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 不转发的逐跳请求头
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "proxy-connection", "te", "trailers", "transfer-encoding", "upgrade"
+}
+
+# 转发超时(秒)
+UPSTREAM_TIMEOUT = 30
+
+class ProxyConfig:
+    """代理的故障注入配置"""
+    
+    def __init__(self,
+                 latency_ms: float = 0.0,
+                 error_rate: float = 0.0,
+                 block_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        初始化配置
+        
+        Args:
+            latency_ms: 每个请求附加的延迟(毫秒)
+            error_rate: 返回502错误的比例
+            block_rate: 模拟该出口IP被拦截、重定向到验证页的比例，1.0表示完全被封
+            seed: 随机数种子
+        """
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.block_rate = block_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def roll(self) -> float:
+        """线程安全的随机数"""
+        with self._lock:
+            return self._random.random()
+
+class ProxyStats:
+    """线程安全的计数器"""
+    
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def increment(self, key: str):
+        """计数加一"""
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+    
+    def snapshot(self) -> Dict[str, int]:
+        """当前计数"""
+        with self._lock:
+            return dict(self._counts)
+
+class ProxyStandinHandler(BaseHTTPRequestHandler):
+    """代理请求处理"""
+    
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        """不输出访问日志"""
+        pass
+    
+    def _send(self, status: int, body: bytes = b"", headers: Dict[str, str] = None):
+        """发送由代理自身生成的响应"""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+    
+    def _inject_faults(self, target: str) -> bool:
+        """
+        根据配置注入延迟和故障
+        
+        Args:
+            target: 请求的目标地址
+        
+        Returns:
+            是否已发送故障响应
+        """
+        config = self.server.config
+        stats = self.server.stats
+        
+        if config.latency_ms:
+            time.sleep(config.latency_ms / 1000.0)
+        
+        roll = config.roll()
+        if roll < config.error_rate:
+            stats.increment("errors")
+            self._send(502, b"Bad Gateway", {"Content-Type": "text/plain"})
+            return True
+        roll -= config.error_rate
+        if roll < config.block_rate:
+            # 和豆瓣一样把被封的出口IP重定向到验证页
+            stats.increment("blocked")
+            parts = urlsplit(target)
+            location = f"{parts.scheme}://{parts.netloc}/sec/c?r={quote(target, safe='')}"
+            self._send(302, headers={"Location": location})
+            return True
+        return False
+    
+    def _forward(self):
+        """转发绝对地址形式的HTTP请求"""
+        stats = self.server.stats
+        stats.increment("requests")
+        parts = urlsplit(self.path)
+        if parts.scheme != "http" or not parts.hostname:
+            self._send(400, b"absolute http URL required", {"Content-Type": "text/plain"})
+            return
+        # 验证页本身不再拦截，否则会无限重定向
+        if not parts.path.startswith("/sec/") and self._inject_faults(self.path):
+            return
+        
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        headers = {
+            name: value for name, value in self.headers.items()
+            if name.lower() not in HOP_BY_HOP_HEADERS
+        }
+        headers["Via"] = f"1.1 proxy-standin-{self.server.server_address[1]}"
+        
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=UPSTREAM_TIMEOUT)
+        try:
+            connection.request(self.command, path, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+        except OSError as e:
+            stats.increment("errors")
+            self._send(502, f"upstream error: {e}".encode("utf-8"), {"Content-Type": "text/plain"})
+            return
+        finally:
+            connection.close()
+        
+        stats.increment("forwarded")
+        self.send_response(response.status, response.reason)
+        for name, value in response.getheaders():
+            if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() != "content-length":
+                self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload)
+    
+    def do_GET(self):
+        """处理GET请求"""
+        self._forward()
+    
+    def do_HEAD(self):
+        """处理HEAD请求"""
+        self._forward()
+    
+    def do_POST(self):
+        """处理POST请求"""
+        self._forward()
+    
+    def do_CONNECT(self):
+        """建立HTTPS隧道，隧道内容是加密的，只能在建立时注入故障"""
+        stats = self.server.stats
+        stats.increment("tunnels")
+        config = self.server.config
+        if config.latency_ms:
+            time.sleep(config.latency_ms / 1000.0)
+        if config.roll() < config.error_rate + config.block_rate:
+            stats.increment("errors")
+            self._send(502, b"Bad Gateway", {"Content-Type": "text/plain"})
+            return
+        
+        host, _, port = self.path.rpartition(":")
+        try:
+            upstream = socket.create_connection((host, int(port)), timeout=UPSTREAM_TIMEOUT)
+        except (OSError, ValueError) as e:
+            stats.increment("errors")
+            self._send(502, f"connect failed: {e}".encode("utf-8"), {"Content-Type": "text/plain"})
+            return
+        
+        self.send_response(200, "Connection Established")
+        self.end_headers()
+        sockets = [self.connection, upstream]
+        try:
+            while True:
+                readable, _, errored = select.select(sockets, [], sockets, UPSTREAM_TIMEOUT)
+                if errored or not readable:
+                    break
+                for source in readable:
+                    data = source.recv(65536)
+                    if not data:
+                        return
+                    (upstream if source is self.connection else self.connection).sendall(data)
+        except OSError:
+            pass
+        finally:
+            upstream.close()
+            self.close_connection = True
+
+class ProxyStandinServer:
+    """可在后台线程运行的代理替身服务器"""
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: ProxyConfig = None):
+        """
+        初始化代理替身服务器
+        
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示自动选择
+            config: 故障注入配置
+        """
+        ThreadingHTTPServer.allow_reuse_address = True
+        self.server = ThreadingHTTPServer((host, port), ProxyStandinHandler)
+        self.server.daemon_threads = True
+        self.server.config = config or ProxyConfig()
+        self.server.stats = ProxyStats()
+        self.host = host
+        self._thread = None
+    
+    @property
+    def port(self) -> int:
+        """实际监听的端口"""
+        return self.server.server_address[1]
+    
+    @property
+    def url(self) -> str:
+        """代理地址，用作身份的 proxy"""
+        return f"http://{self.host}:{self.port}"
+    
+    @property
+    def stats(self) -> ProxyStats:
+        """请求计数"""
+        return self.server.stats
+    
+    def start(self) -> "ProxyStandinServer":
+        """在后台线程启动服务器"""
+        self._thread = threading.Thread(target=self.server.serve_forever, name="proxy-standin", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """停止服务器"""
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="HTTP代理本地替身服务器")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8801, help="监听端口")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每个请求附加的延迟(毫秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回502错误的比例")
+    parser.add_argument("--block-rate", type=float, default=0.0, help="重定向到验证页的比例，1.0表示出口IP完全被封")
+    parser.add_argument("--seed", type=int, default=None, help="随机数种子")
+    args = parser.parse_args()
+    
+    config = ProxyConfig(args.latency_ms, args.error_rate, args.block_rate, args.seed)
+    server = ProxyStandinServer(args.host, args.port, config)
+    print(f"代理替身服务器已启动: {server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+        print(f"请求统计: {server.stats.snapshot()}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
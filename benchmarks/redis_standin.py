@@ -0,0 +1,450 @@
+"""
+Redis协议本地替身服务器
+
+在进程内实现任务代理用到的Redis命令子集（字符串、哈希、列表、有序集合、
+过期时间以及 WATCH/MULTI/EXEC 事务），用于在没有Redis的环境中测试
+RedisBroker 和多节点任务分发：
+
+    python -m benchmarks.redis_standin --port 6390
+    JOB_BROKER_URL=redis://127.0.0.1:6390/0 python worker_node.py
+
+也可以在测试代码中启动：
+
+    server = RedisStandinServer().start()
+    broker = RedisBroker("127.0.0.1", server.port)
+"""
+import time
+import argparse
+import threading
+import socketserver
+from typing import Any, Dict, List, Optional
+
+class CommandError(Exception):
+    """命令错误，以RESP错误回复返回"""
+    pass
+
+class RedisStandinStore:
+    """
+    数据存储，所有命令在一把锁内执行
+    
+    每个键有一个版本号，写操作时递增，用于实现WATCH
+    """
+    
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+        self.expires: Dict[str, float] = {}
+        self.versions: Dict[str, int] = {}
+        self.lock = threading.RLock()
+        self.commands = 0
+    
+    def _expire_if_needed(self, key: str):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.time():
+            self._delete(key)
+    
+    def _delete(self, key: str) -> bool:
+        existed = self.data.pop(key, None) is not None
+        self.expires.pop(key, None)
+        if existed:
+            self._touch(key)
+        return existed
+    
+    def _touch(self, key: str):
+        self.versions[key] = self.versions.get(key, 0) + 1
+    
+    def version(self, key: str) -> int:
+        with self.lock:
+            self._expire_if_needed(key)
+            return self.versions.get(key, 0)
+    
+    def _get(self, key: str, kind: type, create: bool = False):
+        self._expire_if_needed(key)
+        value = self.data.get(key)
+        if value is None:
+            if not create:
+                return None
+            value = self.data[key] = kind()
+        if not isinstance(value, kind):
+            raise CommandError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+    
+    def _cleanup(self, key: str):
+        """容器为空时删除键，与Redis行为一致"""
+        if key in self.data and not self.data[key]:
+            self._delete(key)
+    
+    def execute(self, args: List[str]) -> Any:
+        """
+        执行一条命令
+        
+        Args:
+            args: 命令及参数
+        
+        Returns:
+            回复值：str为状态回复，bytes为字符串，int为整数，list为数组，None为空
+        """
+        command = args[0].upper()
+        handler = getattr(self, f"cmd_{command.lower()}", None)
+        if handler is None:
+            raise CommandError(f"ERR unknown command '{args[0]}'")
+        with self.lock:
+            self.commands += 1
+            return handler(*args[1:])
+    
+    @staticmethod
+    def _score(value: str) -> float:
+        if value in ("-inf", "+inf", "inf"):
+            return float(value)
+        if value.startswith("("):
+            raise CommandError("ERR exclusive ranges are not supported")
+        try:
+            return float(value)
+        except ValueError:
+            raise CommandError("ERR value is not a valid float")
+    
+    def cmd_ping(self, *args):
+        return args[0].encode() if args else "PONG"
+    
+    def cmd_select(self, db):
+        return "OK"
+    
+    def cmd_auth(self, *args):
+        return "OK"
+    
+    def cmd_flushall(self, *args):
+        for key in list(self.data):
+            self._delete(key)
+        return "OK"
+    
+    def cmd_get(self, key):
+        value = self._get(key, str)
+        return value.encode() if value is not None else None
+    
+    def cmd_set(self, key, value, *options):
+        self.data[key] = value
+        self.expires.pop(key, None)
+        self._touch(key)
+        return "OK"
+    
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            self._expire_if_needed(key)
+            removed += self._delete(key)
+        return removed
+    
+    def cmd_exists(self, *keys):
+        count = 0
+        for key in keys:
+            self._expire_if_needed(key)
+            count += key in self.data
+        return count
+    
+    def cmd_expire(self, key, seconds):
+        self._expire_if_needed(key)
+        if key not in self.data:
+            return 0
+        self.expires[key] = time.time() + int(seconds)
+        return 1
+    
+    def cmd_ttl(self, key):
+        self._expire_if_needed(key)
+        if key not in self.data:
+            return -2
+        deadline = self.expires.get(key)
+        return -1 if deadline is None else int(deadline - time.time())
+    
+    def cmd_hset(self, key, *pairs):
+        if not pairs or len(pairs) % 2:
+            raise CommandError("ERR wrong number of arguments for 'hset' command")
+        hash_value = self._get(key, dict, create=True)
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in hash_value
+            hash_value[field] = value
+        self._touch(key)
+        return added
+    
+    def cmd_hget(self, key, field):
+        hash_value = self._get(key, dict) or {}
+        value = hash_value.get(field)
+        return value.encode() if value is not None else None
+    
+    def cmd_hgetall(self, key):
+        hash_value = self._get(key, dict) or {}
+        reply = []
+        for field, value in hash_value.items():
+            reply.extend([field.encode(), value.encode()])
+        return reply
+    
+    def cmd_hdel(self, key, *fields):
+        hash_value = self._get(key, dict) or {}
+        removed = sum(1 for field in fields if hash_value.pop(field, None) is not None)
+        if removed:
+            self._touch(key)
+            self._cleanup(key)
+        return removed
+    
+    def cmd_hincrby(self, key, field, amount):
+        hash_value = self._get(key, dict, create=True)
+        value = int(hash_value.get(field, 0)) + int(amount)
+        hash_value[field] = str(value)
+        self._touch(key)
+        return value
+    
+    def _push(self, key, values, left: bool):
+        list_value = self._get(key, list, create=True)
+        for value in values:
+            if left:
+                list_value.insert(0, value)
+            else:
+                list_value.append(value)
+        self._touch(key)
+        return len(list_value)
+    
+    def cmd_lpush(self, key, *values):
+        return self._push(key, values, left=True)
+    
+    def cmd_rpush(self, key, *values):
+        return self._push(key, values, left=False)
+    
+    def cmd_llen(self, key):
+        return len(self._get(key, list) or [])
+    
+    def cmd_lrange(self, key, start, stop):
+        list_value = self._get(key, list) or []
+        start, stop = int(start), int(stop)
+        stop = len(list_value) + stop if stop < 0 else stop
+        return [value.encode() for value in list_value[start:stop + 1]]
+    
+    def cmd_lrem(self, key, count, value):
+        list_value = self._get(key, list) or []
+        count = int(count)
+        removed = 0
+        indexes = range(len(list_value)) if count >= 0 else range(len(list_value) - 1, -1, -1)
+        for index in list(indexes):
+            if list_value[index] == value and (count == 0 or removed < abs(count)):
+                list_value[index] = None
+                removed += 1
+        list_value[:] = [item for item in list_value if item is not None]
+        if removed:
+            self._touch(key)
+            self._cleanup(key)
+        return removed
+    
+    def cmd_zadd(self, key, *args):
+        if not args or len(args) % 2:
+            raise CommandError("ERR syntax error")
+        zset = self._get(key, dict, create=True)
+        added = 0
+        for score, member in zip(args[::2], args[1::2]):
+            added += member not in zset
+            zset[member] = self._score(score)
+        self._touch(key)
+        return added
+    
+    def cmd_zrem(self, key, *members):
+        zset = self._get(key, dict) or {}
+        removed = sum(1 for member in members if zset.pop(member, None) is not None)
+        if removed:
+            self._touch(key)
+            self._cleanup(key)
+        return removed
+    
+    def cmd_zscore(self, key, member):
+        score = (self._get(key, dict) or {}).get(member)
+        return repr(score).encode() if score is not None else None
+    
+    def cmd_zcard(self, key):
+        return len(self._get(key, dict) or {})
+    
+    def cmd_zcount(self, key, low, high):
+        low, high = self._score(low), self._score(high)
+        return sum(1 for score in (self._get(key, dict) or {}).values() if low <= score <= high)
+    
+    def cmd_zrangebyscore(self, key, low, high, *options):
+        low, high = self._score(low), self._score(high)
+        items = sorted(
+            ((score, member) for member, score in (self._get(key, dict) or {}).items() if low <= score <= high)
+        )
+        options = [option.upper() for option in options]
+        with_scores = "WITHSCORES" in options
+        if "LIMIT" in options:
+            index = options.index("LIMIT")
+            offset, count = int(options[index + 1]), int(options[index + 2])
+            items = items[offset:] if count < 0 else items[offset:offset + count]
+        reply = []
+        for score, member in items:
+            reply.append(member.encode())
+            if with_scores:
+                reply.append(repr(score).encode())
+        return reply
+
+class RedisStandinHandler(socketserver.StreamRequestHandler):
+    """单个客户端连接，维护该连接的WATCH和MULTI状态"""
+    
+    def _read_command(self) -> Optional[List[str]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # 内联命令，便于用 telnet/nc 调试
+            return line.decode("utf-8").split()
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2].decode("utf-8"))
+        return args
+    
+    def _encode(self, value: Any) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, CommandError):
+            return b"-" + str(value).encode("utf-8") + b"\r\n"
+        if isinstance(value, str):
+            return b"+" + value.encode("utf-8") + b"\r\n"
+        if isinstance(value, bool) or isinstance(value, int):
+            return b":%d\r\n" % int(value)
+        if isinstance(value, bytes):
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(self._encode(item) for item in value)
+        raise TypeError(f"无法编码的回复: {value!r}")
+    
+    def handle(self):
+        store: RedisStandinStore = self.server.store
+        watched: Dict[str, int] = {}
+        queued: Optional[List[List[str]]] = None
+        
+        while True:
+            try:
+                args = self._read_command()
+            except (OSError, ValueError):
+                return
+            if args is None:
+                return
+            if not args:
+                continue
+            
+            command = args[0].upper()
+            try:
+                if command == "WATCH":
+                    if queued is not None:
+                        raise CommandError("ERR WATCH inside MULTI is not allowed")
+                    for key in args[1:]:
+                        watched[key] = store.version(key)
+                    reply = "OK"
+                elif command == "UNWATCH":
+                    watched.clear()
+                    reply = "OK"
+                elif command == "MULTI":
+                    if queued is not None:
+                        raise CommandError("ERR MULTI calls can not be nested")
+                    queued = []
+                    reply = "OK"
+                elif command == "DISCARD":
+                    if queued is None:
+                        raise CommandError("ERR DISCARD without MULTI")
+                    queued = None
+                    watched.clear()
+                    reply = "OK"
+                elif command == "EXEC":
+                    if queued is None:
+                        raise CommandError("ERR EXEC without MULTI")
+                    with store.lock:
+                        if any(store.version(key) != version for key, version in watched.items()):
+                            reply = None
+                        else:
+                            reply = []
+                            for queued_args in queued:
+                                try:
+                                    reply.append(store.execute(queued_args))
+                                except CommandError as e:
+                                    reply.append(e)
+                    queued = None
+                    watched.clear()
+                elif command == "QUIT":
+                    self.wfile.write(b"+OK\r\n")
+                    return
+                elif queued is not None:
+                    if not hasattr(store, f"cmd_{command.lower()}"):
+                        raise CommandError(f"ERR unknown command '{args[0]}'")
+                    queued.append(args)
+                    reply = "QUEUED"
+                else:
+                    reply = store.execute(args)
+            except CommandError as e:
+                reply = e
+            except (TypeError, ValueError, IndexError):
+                reply = CommandError(f"ERR wrong number or type of arguments for '{args[0]}' command")
+            
+            try:
+                self.wfile.write(self._encode(reply))
+            except OSError:
+                return
+
+class RedisStandinServer:
+    """可在后台线程运行的Redis替身服务器"""
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        """
+        初始化替身服务器
+        
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示自动选择
+        """
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((host, port), RedisStandinHandler)
+        self.server.daemon_threads = True
+        self.server.store = RedisStandinStore()
+        self.host = host
+        self._thread = None
+    
+    @property
+    def port(self) -> int:
+        """实际监听的端口"""
+        return self.server.server_address[1]
+    
+    @property
+    def url(self) -> str:
+        """任务代理地址，用作 JOB_BROKER_URL"""
+        return f"redis://{self.host}:{self.port}/0"
+    
+    @property
+    def store(self) -> RedisStandinStore:
+        """数据存储"""
+        return self.server.store
+    
+    def start(self) -> "RedisStandinServer":
+        """在后台线程启动服务器"""
+        self._thread = threading.Thread(target=self.server.serve_forever, name="redis-standin", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """停止服务器"""
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="Redis协议本地替身服务器")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=6390, help="监听端口")
+    args = parser.parse_args()
+    
+    server = RedisStandinServer(args.host, args.port)
+    print(f"Redis替身服务器已启动: {server.url}")
+    print(f"设置 JOB_BROKER_URL={server.url} 后启动API服务器和工作节点")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+启动耗时基准测试
+
+测量两项指标：
+1. 各模块在全新解释器中的导入耗时（基于 python -X importtime）
+2. 启动 api_server.py 到 /api/health 首次返回200的耗时
+
+每项测量都在独立子进程中进行，保证是冷启动。用法：
+
+    python -m benchmarks.startup_bench --runs 5 --output startup.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.request
+from typing import Dict, List, Optional
+
+# 项目根目录
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 默认测量的项目模块
+DEFAULT_MODULES = [
+    "config.settings",
+    "config.logging_config",
+    "core.browser",
+    "parsers.douban_parser",
+    "scrapers.douban_scraper",
+    "sync.notion_sync",
+    "api.server",
+    "main",
+]
+
+# 需要单独关注的重量级依赖
+HEAVY_DEPENDENCIES = ["playwright", "requests", "flask", "dotenv"]
+
+def _parse_importtime(stderr: str) -> Dict[str, int]:
+    """
+    解析 -X importtime 的输出
+    
+    Args:
+        stderr: 子进程标准错误输出
+    
+    Returns:
+        模块名 -> 累计导入耗时(微秒)
+    """
+    result = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        # 格式: "import time:  自身耗时 |  累计耗时 |   模块名"
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            continue
+        # 同一模块只记录第一次（真正执行导入的那次）
+        result.setdefault(parts[2].strip(), cumulative_us)
+    return result
+
+def measure_import(module: str) -> Dict[str, float]:
+    """
+    在全新解释器中导入指定模块并记录耗时
+    
+    Args:
+        module: 模块名
+    
+    Returns:
+        包含模块自身和重量级依赖导入耗时(毫秒)的字典
+    """
+    env = os.environ.copy()
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败: {proc.stderr.strip().splitlines()[-1:]}")
+    
+    timings = _parse_importtime(proc.stderr)
+    measurement = {"total_ms": timings.get(module, 0) / 1000.0}
+    for dependency in HEAVY_DEPENDENCIES:
+        if dependency in timings:
+            measurement[f"{dependency}_ms"] = timings[dependency] / 1000.0
+    return measurement
+
+def _free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_health(timeout: float = 30.0) -> Optional[float]:
+    """
+    启动API服务器并测量首次健康检查成功的耗时
+    
+    Args:
+        timeout: 最长等待时间(秒)
+    
+    Returns:
+        耗时(毫秒)，超时返回None
+    """
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/api/health"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "api_server.py", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=PROJECT_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"API服务器提前退出，返回码: {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000.0
+            except OSError:
+                time.sleep(0.01)
+        return None
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+def _summarize(samples: List[float]) -> Dict[str, float]:
+    """计算样本的统计值"""
+    return {
+        "median": round(statistics.median(samples), 2),
+        "min": round(min(samples), 2),
+        "max": round(max(samples), 2),
+    }
+
+def run_benchmark(modules: List[str], runs: int, skip_health: bool = False) -> Dict:
+    """
+    运行完整的启动基准测试
+    
+    Args:
+        modules: 需要测量的模块列表
+        runs: 每项测量的重复次数
+        skip_health: 是否跳过健康检查测量
+    
+    Returns:
+        测量结果字典
+    """
+    report = {"python": sys.version.split()[0], "runs": runs, "imports": {}, "health": None}
+    
+    for module in modules:
+        samples = [measure_import(module) for _ in range(runs)]
+        summary = {}
+        for key in samples[0]:
+            summary[key] = _summarize([sample.get(key, 0.0) for sample in samples])
+        report["imports"][module] = summary
+        print(f"{module:28s} {summary['total_ms']['median']:8.1f} ms")
+    
+    if not skip_health:
+        samples = [measure_health() for _ in range(runs)]
+        valid = [sample for sample in samples if sample is not None]
+        report["health"] = _summarize(valid) if valid else None
+        if valid:
+            print(f"{'首次健康检查':24s} {report['health']['median']:8.1f} ms")
+        else:
+            print("健康检查在超时时间内未成功")
+    
+    return report
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="启动耗时基准测试")
+    parser.add_argument("--runs", type=int, default=5, help="每项测量的重复次数")
+    parser.add_argument("--module", action="append", dest="modules", help="需要测量的模块，可多次指定")
+    parser.add_argument("--skip-health", action="store_true", help="跳过API健康检查测量")
+    parser.add_argument("--output", type=str, help="结果JSON文件路径")
+    args = parser.parse_args()
+    
+    report = run_benchmark(args.modules or DEFAULT_MODULES, args.runs, args.skip_health)
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入: {args.output}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
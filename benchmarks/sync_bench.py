@@ -0,0 +1,170 @@
+"""
+Notion同步吞吐量基准测试
+
+在后台启动Notion模拟器，用多个线程调用 NotionSyncModule.sync_movie，
+统计同步吞吐量、被限流(429)次数和重试情况，并检查所有记录都已写入且带有封面、
+没有收到400错误。任一检查不通过时以非零状态码退出，可作为离线回归检查：
+
+    python -m benchmarks.sync_bench --records 30 --workers 4 --output sync.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from typing import Dict, List
+
+from benchmarks.notion_emulator import NotionEmulator
+
+# 基准测试使用的影视数据样本
+SAMPLE_MOVIE = {
+    "title": "肖申克的救赎",
+    "category": "电影",
+    "directors": [{"name": "弗兰克·德拉邦特", "url": "https://www.douban.com/personage/27260288/"}],
+    "screenwriters": [
+        {"name": "弗兰克·德拉邦特", "url": "https://www.douban.com/personage/27260288/"},
+        {"name": "斯蒂芬·金", "url": "https://www.douban.com/personage/27228768/"},
+    ],
+    "actors": [
+        {"name": "蒂姆·罗宾斯", "url": "https://www.douban.com/personage/27259270/"},
+        {"name": "摩根·弗里曼", "url": "https://www.douban.com/personage/27245839/"},
+    ],
+    "genres": ["剧情", "犯罪"],
+    "languages": ["英语"],
+    "rating": 9.7,
+    "imdb_id": "tt0111161",
+    "release_date": "1994-09-10(多伦多电影节)",
+    "summary": "　　一场谋杀案使银行家安迪蒙冤入狱，谋杀妻子及其情人的指控将囚禁他终生。",
+    "aka": "月黑高飞(港)/刺激1995(台)",
+    "cover_url": "https://img9.doubanio.com/view/photo/l_ratio_poster/public/p480747492.jpg",
+}
+
+def make_records(count: int) -> List[Dict]:
+    """生成指定数量的影视数据"""
+    records = []
+    for index in range(count):
+        record = dict(SAMPLE_MOVIE)
+        record["title"] = f"{SAMPLE_MOVIE['title']} #{index + 1}"
+        records.append(record)
+    return records
+
+def run_benchmark(records: int, workers: int, rate_limit: float, burst: float,
+                  latency_ms: float, error_rate: float, retry_delay: int) -> Dict:
+    """
+    运行同步基准测试
+    
+    Args:
+        records: 同步的记录数
+        workers: 并发线程数
+        rate_limit: 模拟器平均每秒允许的请求数
+        burst: 模拟器允许的突发请求数
+        latency_ms: 模拟器响应延迟(毫秒)
+        error_rate: 模拟器返回503的比例
+        retry_delay: NotionSyncModule的初始重试延迟(秒)
+    
+    Returns:
+        测试报告
+    """
+    emulator = NotionEmulator(
+        token="benchmark-token",
+        rate_limit=rate_limit,
+        burst=burst,
+        latency_ms=latency_ms,
+        error_rate=error_rate,
+        seed=0
+    ).start()
+    
+    # 同步模块在导入时读取配置，需先设置环境变量
+    os.environ["NOTION_API_BASE_URL"] = emulator.base_url
+    os.environ["COVER_VALIDATION_ENABLED"] = "false"
+    from sync.notion_sync import NotionSyncModule
+    
+    pending = make_records(records)
+    failures: List[str] = []
+    lock = threading.Lock()
+    
+    def worker():
+        # requests.Session不保证线程安全，每个线程使用独立的同步模块
+        module = NotionSyncModule(emulator.database_id, "benchmark-token", retry_delay=retry_delay)
+        module.api_base_url = emulator.base_url
+        try:
+            while True:
+                with lock:
+                    if not pending:
+                        return
+                    record = pending.pop()
+                try:
+                    module.sync_movie(record)
+                except Exception as e:
+                    with lock:
+                        failures.append(f"{record['title']}: {e}")
+        finally:
+            module.close()
+    
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    stats = emulator.stats.snapshot()
+    created = len(emulator.pages)
+    with_cover = sum(1 for page in emulator.pages.values() if page.get("cover"))
+    emulator.stop()
+    
+    return {
+        "records": records,
+        "workers": workers,
+        "rate_limit": rate_limit,
+        "created": created,
+        "with_cover": with_cover,
+        "failures": failures,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_pages_per_s": round(created / elapsed, 3) if elapsed else 0.0,
+        "requests": stats.get("requests", 0),
+        "rate_limited": stats.get("status_429", 0),
+        "server_errors": stats.get("status_503", 0),
+        "bad_requests": stats.get("status_400", 0),
+        "emulator_stats": stats,
+    }
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="Notion同步吞吐量基准测试")
+    parser.add_argument("--records", type=int, default=30, help="同步的记录数")
+    parser.add_argument("--workers", type=int, default=4, help="并发线程数")
+    parser.add_argument("--rate-limit", type=float, default=3.0, help="模拟器平均每秒允许的请求数")
+    parser.add_argument("--burst", type=float, default=3.0, help="模拟器允许的突发请求数")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="模拟器响应延迟(毫秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟器返回503的比例")
+    parser.add_argument("--retry-delay", type=int, default=1, help="同步模块初始重试延迟(秒)")
+    parser.add_argument("--output", type=str, help="结果JSON文件路径")
+    args = parser.parse_args()
+    
+    report = run_benchmark(
+        args.records, args.workers, args.rate_limit, args.burst,
+        args.latency_ms, args.error_rate, args.retry_delay
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    
+    problems = []
+    if report["created"] != args.records:
+        problems.append(f"写入数量不符: 期望 {args.records}，实际 {report['created']}")
+    if report["with_cover"] != report["created"]:
+        # 样本封面有效，缺少封面说明同步模块因其他错误去掉了封面
+        problems.append(f"封面数量不符: {report['created']} 条记录中 {report['with_cover']} 条带有封面")
+    if report["bad_requests"]:
+        problems.append(f"收到 {report['bad_requests']} 次400错误")
+    if problems:
+        print("\n".join(problems))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
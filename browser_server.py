@@ -0,0 +1,27 @@
+"""
+共享浏览器服务启动程序，供多个API进程或工作进程共用一个Chromium
+"""
+import argparse
+
+from config.logging_config import setup_logger
+from config.settings import BROWSER_SERVER_PORT
+
+# 创建日志记录器
+logger = setup_logger("browser_launcher")
+
+def main():
+    """程序主入口"""
+    parser = argparse.ArgumentParser(description="启动并守护共享的Chromium浏览器")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="远程调试监听地址，容器间共享时设为0.0.0.0（端口没有认证，只能在内部网络中使用）")
+    parser.add_argument("--port", type=int, default=BROWSER_SERVER_PORT, help="远程调试端口")
+    parser.add_argument("--executable", type=str, default=None, help="Chromium可执行文件路径，默认使用Playwright安装的Chromium")
+    args = parser.parse_args()
+    
+    from core.browser_server import BrowserServer
+    
+    server = BrowserServer(port=args.port, host=args.host, executable=args.executable)
+    logger.info(f"其他进程设置 BROWSER_CDP_ENDPOINT={server.endpoint} 即可连接共享浏览器")
+    server.supervise()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+豆瓣列表批量导入程序，将用户的看过/想看列表或豆列导入Notion
+"""
+import os
+import sys
+import asyncio
+import argparse
+from typing import Optional
+
+from config.logging_config import setup_logger
+from config.settings import DOUBAN_COOKIES, CHECKPOINT_DIR
+
+# 创建日志记录器
+logger = setup_logger("bulk_import")
+
+async def bulk_import(list_url: str, checkpoint_path: Optional[str] = None, limit: Optional[int] = None) -> bool:
+    """
+    批量导入列表中的全部条目，进度实时写入文件，中断后重新运行即可继续
+    
+    Args:
+        list_url: 列表地址
+        checkpoint_path: 进度文件路径，默认按列表生成
+        limit: 本次最多处理的条目数
+    
+    Returns:
+        列表是否已全部处理完成
+    """
+    from core.antibot import AntiBotBlocked
+    from core.browser import PlaywrightBrowser
+    from scrapers.douban_scraper import DoubanScraper
+    from scrapers.douban_list_scraper import DoubanListScraper, ListImportCheckpoint
+    from sync.notion_sync import NotionSyncModule, test_database_connection
+    
+    checkpoint_path = checkpoint_path or os.path.join(CHECKPOINT_DIR, f"{DoubanListScraper.list_key(list_url)}.json")
+    checkpoint = ListImportCheckpoint(checkpoint_path, list_url)
+    if checkpoint.finished and not checkpoint.failed:
+        logger.info(f"列表已全部导入，共 {len(checkpoint.done)} 条")
+        return True
+    
+    database_id = os.environ.get("NOTION_DATABASE_ID")
+    token = os.environ.get("NOTION_TOKEN")
+    if not database_id or not token:
+        logger.error("未设置Notion配置，请设置NOTION_DATABASE_ID和NOTION_TOKEN环境变量")
+        return False
+    
+    notion_sync = NotionSyncModule(database_id, token)
+    loop = asyncio.get_running_loop()
+    success, message = await loop.run_in_executor(
+        None, lambda: test_database_connection(database_id, token, session=notion_sync.session)
+    )
+    logger.info(message)
+    if not success:
+        notion_sync.close()
+        return False
+    
+    browser = PlaywrightBrowser(headless=True, cookies=DOUBAN_COOKIES)
+    detail_scraper = DoubanScraper(browser)
+    list_scraper = DoubanListScraper(browser)
+    await browser.init_browser()
+    
+    processed = 0
+    
+    async def import_subject(subject_id: str) -> bool:
+        """抓取并同步单个条目，返回是否已达到本次处理上限"""
+        nonlocal processed
+        # 直接使用详情页地址，跳过搜索
+        movie_data = await detail_scraper.get_movie_by_url(list_scraper.subject_url(subject_id))
+        if not movie_data:
+            checkpoint.mark_failed(subject_id, "未获取到影视数据")
+        else:
+            try:
+                result = await loop.run_in_executor(None, notion_sync.sync_movie, movie_data)
+                checkpoint.mark_done(subject_id, result.get("status", "synced"))
+                logger.info(f"已导入: {movie_data.get('title')} ({len(checkpoint.done)} 条)")
+            except Exception as e:
+                logger.error(f"同步 {subject_id} 失败: {e}")
+                checkpoint.mark_failed(subject_id, str(e))
+        processed += 1
+        return limit is not None and processed >= limit
+    
+    pages = None
+    try:
+        # 先重试之前失败的条目，它们所在的页可能已经处理过
+        for subject_id in list(checkpoint.failed):
+            if await import_subject(subject_id):
+                return False
+        
+        if not checkpoint.finished:
+            pages = list_scraper.iter_pages(checkpoint.page_url)
+            async for page_url, subject_ids, next_url in pages:
+                for subject_id in subject_ids:
+                    if checkpoint.is_done(subject_id):
+                        continue
+                    if await import_subject(subject_id):
+                        return False
+                checkpoint.advance(next_url)
+    except (RuntimeError, AntiBotBlocked) as e:
+        # 重试失败条目或加载列表页时被拦截、加载失败，保留进度，下次从当前位置继续
+        checkpoint.save()
+        logger.error(f"{e}，进度已保存到 {checkpoint_path}，重新运行相同命令即可继续")
+        return False
+    finally:
+        if pages is not None:
+            # 提前返回时关闭生成器，取消下一页的预取
+            await pages.aclose()
+        await browser.close()
+        notion_sync.close()
+    
+    logger.info(f"列表导入结束: 成功 {len(checkpoint.done)} 条，失败 {len(checkpoint.failed)} 条")
+    return not checkpoint.failed
+
+def main():
+    """程序主入口"""
+    parser = argparse.ArgumentParser(description="豆瓣列表批量导入Notion")
+    parser.add_argument("url", type=str, help="看过/想看列表或豆列地址，例如 https://movie.douban.com/people/<用户ID>/collect")
+    parser.add_argument("--checkpoint", type=str, help="进度文件路径，默认保存在CHECKPOINT_DIR目录")
+    parser.add_argument("--limit", type=int, help="本次最多处理的条目数")
+    args = parser.parse_args()
+    
+    try:
+        finished = asyncio.run(bulk_import(args.url, args.checkpoint, args.limit))
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(2)
+    except KeyboardInterrupt:
+        print("\n导入已中断，重新运行相同命令即可继续")
+        sys.exit(130)
+    sys.exit(0 if finished else 1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -7,9 +7,8 @@ import sys
 import codecs
 from datetime import datetime
 
-# 日志目录
+# 日志目录（首次写日志时才创建，避免导入时产生磁盘操作）
 LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)
 
 # 日志文件命名格式：logs/app_年月日.log
 current_date = datetime.now().strftime("%Y%m%d")
@@ -38,6 +37,52 @@ if sys.platform == 'win32':
     except Exception as e:
         print(f"设置控制台UTF-8编码失败: {e}")
 
+# 按日志文件缓存的共享处理器，所有logger共用同一组文件句柄
+_shared_handlers = {}
+
+class _LazyFileHandler(logging.FileHandler):
+    """延迟打开的文件处理器，第一次写入日志时才创建目录和文件"""
+    
+    def __init__(self, filename, encoding=None):
+        super().__init__(filename, encoding=encoding, delay=True)
+    
+    def _open(self):
+        log_dir = os.path.dirname(self.baseFilename)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        return super()._open()
+
+def _get_shared_handlers(log_file, level):
+    """
+    获取指定日志文件对应的共享处理器，不存在时创建
+    
+    Args:
+        log_file: 日志文件路径
+        level: 日志级别
+        
+    Returns:
+        (文件处理器, 控制台处理器)
+    """
+    key = (log_file, level)
+    handlers = _shared_handlers.get(key)
+    if handlers is None:
+        # 创建格式器，使用不包含毫秒的时间格式
+        formatter = logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
+        
+        # 创建文件处理器，使用UTF-8编码
+        file_handler = _LazyFileHandler(log_file, encoding='utf-8')
+        file_handler.setLevel(level)
+        file_handler.setFormatter(formatter)
+        
+        # 创建控制台处理器
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(level)
+        console_handler.setFormatter(formatter)
+        
+        handlers = (file_handler, console_handler)
+        _shared_handlers[key] = handlers
+    return handlers
+
 def setup_logger(name, log_file=None, level=None):
     """
     设置并返回一个新的logger
@@ -60,18 +105,8 @@ def setup_logger(name, log_file=None, level=None):
     if logger.handlers:
         logger.handlers.clear()
     
-    # 创建文件处理器，使用UTF-8编码
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setLevel(level)
-    
-    # 创建控制台处理器
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(level)
-    
-    # 创建格式器，使用不包含毫秒的时间格式
-    formatter = logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
+    # 复用共享处理器，文件在第一次写入时才打开
+    file_handler, console_handler = _get_shared_handlers(log_file, level)
     
     # 添加处理器
     logger.addHandler(file_handler)
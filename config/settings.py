@@ -10,10 +10,26 @@ load_dotenv()
 # API配置
 NOTION_DATABASE_ID = os.environ.get("NOTION_DATABASE_ID")
 NOTION_TOKEN = os.environ.get("NOTION_TOKEN")
+API_REQUEST_TIMEOUT = float(os.environ.get("API_REQUEST_TIMEOUT", "120"))  # API请求从收到到返回的总时长上限（秒），抓取和同步的各阶段按剩余时间设置超时
 
 # 浏览器配置
 DEFAULT_TIMEOUT = 30000  # 默认超时时间（毫秒）
 DEFAULT_HEADLESS = True  # 默认无头模式
+BROWSER_CDP_ENDPOINT = os.environ.get("BROWSER_CDP_ENDPOINT", "")  # 共享浏览器地址（如 http://127.0.0.1:9222），设置后连接该浏览器而不是自行启动
+BROWSER_SERVER_PORT = int(os.environ.get("BROWSER_SERVER_PORT", "9222"))  # 共享浏览器的远程调试端口
+BROWSER_EXECUTABLE_PATH = os.environ.get("BROWSER_EXECUTABLE_PATH", "")  # 共享浏览器使用的Chromium路径，为空时使用Playwright安装的Chromium
+BROWSER_RECYCLE_PAGES = int(os.environ.get("BROWSER_RECYCLE_PAGES", "500"))  # 打开多少个页面后重启浏览器，0表示不限制
+BROWSER_RECYCLE_MEMORY_MB = int(os.environ.get("BROWSER_RECYCLE_MEMORY_MB", "1536"))  # Chromium进程内存合计超过该值（MB）时重启浏览器，0表示不检查
+BROWSER_RECYCLE_ERRORS = int(os.environ.get("BROWSER_RECYCLE_ERRORS", "5"))  # 连续导航出错多少次后重启浏览器，0表示不限制
+BROWSER_MEMORY_CHECK_INTERVAL = 30  # 检查Chromium内存占用的间隔（秒）
+DEBUG_CAPTURE_DIR = os.environ.get("DEBUG_CAPTURE_DIR", "debug_captures")  # 出错页面的调试信息保存目录，为空时不保存
+DEBUG_CAPTURE_MAX_MB = float(os.environ.get("DEBUG_CAPTURE_MAX_MB", "100"))  # 调试信息目录的大小上限（MB），超过时删除最早的记录
+DEBUG_CAPTURE_INTERVAL = float(os.environ.get("DEBUG_CAPTURE_INTERVAL", "60"))  # 同一类错误两次保存的最小间隔（秒）
+DEBUG_CAPTURE_RATE = float(os.environ.get("DEBUG_CAPTURE_RATE", "1.0"))  # 满足间隔后实际保存的比例
+DEBUG_CAPTURE_SCREENSHOT = os.environ.get("DEBUG_CAPTURE_SCREENSHOT", "true").lower() in ("1", "true", "yes")  # 是否保存截图，关闭时只保存HTML
+HTML_ARCHIVE_DIR = os.environ.get("HTML_ARCHIVE_DIR", "html_archive")  # 抓取到的页面归档目录，为空时不归档
+HTML_ARCHIVE_MODE = os.environ.get("HTML_ARCHIVE_MODE", "record")  # record：抓取时归档；replay：从归档回放，不访问网络
+HTML_ARCHIVE_RESOURCE_TYPES = [t.strip() for t in os.environ.get("HTML_ARCHIVE_RESOURCE_TYPES", "document").split(",") if t.strip()]  # 归档的资源类型，回放渲染搜索页需要再加上 script,xhr,fetch
 
 # 豆瓣Cookie配置
 DOUBAN_COOKIES = [
@@ -51,10 +67,63 @@ BROWSER_HEADERS = {
 
 # 爬虫配置
 DEFAULT_RETRY_TIMES = 3  # 默认重试次数
+CONCURRENCY_INITIAL = int(os.environ.get("CONCURRENCY_INITIAL", "2"))  # 豆瓣页面导航的初始并发上限
+CONCURRENCY_MIN = int(os.environ.get("CONCURRENCY_MIN", "1"))  # 并发上限的最小值
+CONCURRENCY_MAX = int(os.environ.get("CONCURRENCY_MAX", "8"))  # 并发上限的最大值
+CONCURRENCY_LATENCY_TARGET = float(os.environ.get("CONCURRENCY_LATENCY_TARGET", "5.0"))  # 导航耗时目标（秒），超过时不再提高并发
+ANTIBOT_COOLDOWN = float(os.environ.get("ANTIBOT_COOLDOWN", "300"))  # 遇到验证页或封禁后暂停访问该域名的时间（秒），连续被拦截时加倍
+ANTIBOT_COOLDOWN_MAX = float(os.environ.get("ANTIBOT_COOLDOWN_MAX", "3600"))  # 暂停时间上限（秒）
+PACING_INTERVAL = float(os.environ.get("PACING_INTERVAL", "2.0"))  # 同一站点两次请求的平均间隔（秒），0表示不限制（用于基准测试）
+PACING_BURST = int(os.environ.get("PACING_BURST", "2"))  # 空闲后允许连续发出的请求数
+PACING_JITTER = float(os.environ.get("PACING_JITTER", "0.5"))  # 需要等待时附加的随机间隔，占平均间隔的比例
+IDENTITY_FILE = os.environ.get("IDENTITY_FILE", "")  # 访问身份（Cookie、User-Agent、代理）列表的JSON文件，为空时只使用默认Cookie
+IDENTITY_COOLDOWN = float(os.environ.get("IDENTITY_COOLDOWN", str(ANTIBOT_COOLDOWN)))  # 单个身份被拦截后的冷却时间（秒），连续被拦截时加倍
+IDENTITY_MIN_SCORE = float(os.environ.get("IDENTITY_MIN_SCORE", "0.3"))  # 健康度低于该值的身份暂停轮换，只定期试用
+STORAGE_STATE_DIR = os.environ.get("STORAGE_STATE_DIR", "storage_state")  # 浏览器Cookie和localStorage的保存目录，为空时每次启动都使用干净的上下文
+STORAGE_STATE_INTERVAL = float(os.environ.get("STORAGE_STATE_INTERVAL", "300"))  # 保存存储状态的间隔（秒）
+STORAGE_STATE_MAX_AGE = float(os.environ.get("STORAGE_STATE_MAX_AGE", str(7 * 24 * 3600)))  # 存储状态的有效期（秒），过期后重新使用配置中的Cookie
+CHECKPOINT_DIR = os.environ.get("CHECKPOINT_DIR", "checkpoints")  # 批量导入进度文件目录
+
+# 目录爬取配置
+CRAWL_STATE_DIR = os.environ.get("CRAWL_STATE_DIR", "crawl_state")  # 队列、结果和去重集合的保存目录
+CRAWL_HOST_INTERVAL = float(os.environ.get("CRAWL_HOST_INTERVAL", "3.0"))  # 同一域名的最小请求间隔（秒）
+CRAWL_CHECKPOINT_INTERVAL = 30  # 保存爬取进度的间隔（秒）
+
+# 多进程抓取配置
+SCRAPE_WORKERS = os.environ.get("SCRAPE_WORKERS", "0")  # API服务的工作进程数，auto表示按CPU和内存限制确定，0表示在API进程内抓取
+WORKER_PAGE_CONCURRENCY = int(os.environ.get("WORKER_PAGE_CONCURRENCY", "2"))  # 每个工作进程同时处理的页面数
+WORKER_MEMORY_MB = int(os.environ.get("WORKER_MEMORY_MB", "512"))  # 每个工作进程（含浏览器）预留的内存（MB）
+
+# 分布式任务队列配置
+JOB_BROKER_URL = os.environ.get("JOB_BROKER_URL", "")  # 任务代理地址：sqlite:///jobs.db 或 redis://主机:端口/0，为空时API直接处理请求
+JOB_VISIBILITY_TIMEOUT = float(os.environ.get("JOB_VISIBILITY_TIMEOUT", "300"))  # 领取任务后多少秒内未确认则重新投递
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))  # 最大尝试次数，超过后进入死信队列
+JOB_RESULT_TTL = 7 * 24 * 3600  # 已完成任务结果的保留时间（秒）
+JOB_RESULT_TIMEOUT = float(os.environ.get("JOB_RESULT_TIMEOUT", "180"))  # API等待任务结果的最长时间（秒）
+
+# 豆瓣站点地址，设置DOUBAN_STANDIN_URL后爬虫改为访问本地替身服务器（用于基准测试）
+DOUBAN_STANDIN_URL = os.environ.get("DOUBAN_STANDIN_URL", "").rstrip("/")
+DOUBAN_SEARCH_BASE_URL = DOUBAN_STANDIN_URL or "https://search.douban.com"
+DOUBAN_MOVIE_BASE_URL = DOUBAN_STANDIN_URL or "https://movie.douban.com"
+DOUBAN_SUGGEST_ENABLED = os.environ.get("DOUBAN_SUGGEST_ENABLED", "true").lower() in ("1", "true", "yes")  # 搜索时是否先查询联想接口，关闭时只使用搜索页
+DOUBAN_SUGGEST_MIN_SIMILARITY = float(os.environ.get("DOUBAN_SUGGEST_MIN_SIMILARITY", "0.5"))  # 联想结果的标题相似度低于该值时改用搜索页
 
 # Notion API设置
 NOTION_API_VERSION = "2022-06-28"
-NOTION_API_BASE_URL = "https://api.notion.com/v1"
+NOTION_API_BASE_URL = os.environ.get("NOTION_API_BASE_URL", "https://api.notion.com/v1").rstrip("/")  # 可指向本地模拟器
+NOTION_DOUBAN_URL_PROPERTY = os.environ.get("NOTION_DOUBAN_URL_PROPERTY", "")  # 保存豆瓣链接的URL类型属性名，为空则不写入
+NOTION_REQUEST_TIMEOUT = float(os.environ.get("NOTION_REQUEST_TIMEOUT", "30"))  # 单次Notion API请求的超时时间（秒）
+
+# 定时刷新配置
+REFRESH_HOURLY_BUDGET = int(os.environ.get("REFRESH_HOURLY_BUDGET", "30"))  # 每小时最多访问豆瓣的次数
+REFRESH_STATE_PATH = os.environ.get("REFRESH_STATE_PATH", "refresh_state.db")  # 刷新状态数据库
+
+# 封面校验配置
+COVER_VALIDATION_ENABLED = os.environ.get("COVER_VALIDATION_ENABLED", "true").lower() in ("1", "true", "yes")  # 写入前是否检查封面URL
+COVER_CHECK_TIMEOUT = 5  # 单次封面检查超时时间（秒）
+COVER_CACHE_TTL = 24 * 3600  # 封面校验结果缓存时间（秒）
+COVER_PATTERN_FAILURE_LIMIT = 3  # 同一域名和尺寸模式连续失败多少次后直接跳过
+COVER_PATTERN_RETRY_INTERVAL = 600  # 跳过期间每隔多少秒放行一次检查，成功后恢复该模式（秒）
 
 # 用户代理列表
 USER_AGENTS = [
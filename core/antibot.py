@@ -0,0 +1,219 @@
+"""
+反爬检测模块，在导航完成后立即识别验证页和封禁响应，并按域名暂停后续请求
+"""
+import time
+import asyncio
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from core.utils import site_key
+from config.logging_config import setup_logger
+from config.settings import ANTIBOT_COOLDOWN, ANTIBOT_COOLDOWN_MAX
+
+# 创建日志记录器
+logger = setup_logger('antibot')
+
+# 封禁时的状态码，豆瓣对疑似爬虫的请求返回403或418
+BLOCKED_STATUSES = (403, 418)
+
+# 验证页和封禁页的地址特征
+BLOCKED_HOSTS = ("sec.douban.com",)
+BLOCKED_PATH_PREFIXES = ("/sec/", "/misc/sorry")
+
+# 验证页标题
+BLOCKED_TITLES = ("禁止访问", "豆瓣 - 登录跳转页")
+
+# 验证页正文特征，只在正文开头查找，避免影评等用户内容误判
+BLOCKED_MARKERS = ("检测到有异常请求", "tcaptcha_transform", "captcha_solution")
+MARKER_SCAN_LENGTH = 3000
+
+# 一次取回标题和正文开头，只需一次往返
+PAGE_SIGNALS_SCRIPT = f"""() => [
+    document.title || "",
+    document.documentElement ? document.documentElement.outerHTML.slice(0, {MARKER_SCAN_LENGTH}) : ""
+]"""
+
+class AntiBotBlocked(Exception):
+    """请求被反爬机制拦截，在冷却结束前不应再访问该域名"""
+    
+    def __init__(self, url: str, reason: str, retry_after: float):
+        """
+        Args:
+            url: 被拦截的地址
+            reason: 判断依据
+            retry_after: 距离冷却结束的秒数
+        """
+        super().__init__(f"访问 {url} 被反爬拦截 ({reason})，{retry_after:.0f} 秒后再试")
+        self.url = url
+        self.reason = reason
+        self.retry_after = retry_after
+
+def detect_block(url: str, status: int = 0, title: str = "", html: str = "") -> Optional[str]:
+    """
+    根据导航后的地址、状态码、标题和页面开头判断是否被拦截
+    
+    Args:
+        url: 导航后（跟随重定向后）的地址
+        status: 响应状态码，未知时为0
+        title: 页面标题
+        html: 页面HTML的开头部分
+    
+    Returns:
+        被拦截时返回判断依据，否则返回None
+    """
+    parts = urlsplit(url)
+    if parts.hostname in BLOCKED_HOSTS:
+        return f"跳转到 {parts.hostname}"
+    if parts.path.startswith(BLOCKED_PATH_PREFIXES):
+        return f"跳转到 {parts.path}"
+    if status in BLOCKED_STATUSES:
+        return f"状态码 {status}"
+    if title and title.strip() in BLOCKED_TITLES:
+        return f"页面标题 {title.strip()}"
+    head = html[:MARKER_SCAN_LENGTH]
+    for marker in BLOCKED_MARKERS:
+        if marker in head:
+            return f"页面包含 {marker}"
+    return None
+
+async def inspect_page(page, status: int = 0) -> Optional[str]:
+    """
+    检查已导航的页面是否为验证页
+    
+    Args:
+        page: Playwright页面对象
+        status: 响应状态码
+    
+    Returns:
+        被拦截时返回判断依据，否则返回None
+    """
+    # 地址和状态码不需要访问页面，先判断
+    reason = detect_block(page.url, status)
+    if reason:
+        return reason
+    try:
+        title, html = await page.evaluate(PAGE_SIGNALS_SCRIPT)
+    except Exception as e:
+        logger.debug(f"读取页面特征失败: {e}")
+        return None
+    return detect_block(page.url, status, title, html)
+
+class DomainCooldown:
+    """
+    按站点的共享冷却（见 core.utils.site_key）
+    
+    某个任务被拦截后，同一进程内所有任务在冷却结束前都不再访问该域名。
+    冷却期间再次被拦截时冷却时间加倍，直到 max_seconds；冷却结束后第一次
+    成功访问会重置加倍。可以被多个线程中的事件循环共用
+    """
+    
+    def __init__(self, base_seconds: float = ANTIBOT_COOLDOWN, max_seconds: float = ANTIBOT_COOLDOWN_MAX):
+        """
+        初始化冷却
+        
+        Args:
+            base_seconds: 第一次被拦截后的冷却时间(秒)
+            max_seconds: 冷却时间上限(秒)
+        """
+        self.base_seconds = base_seconds
+        self.max_seconds = max(base_seconds, max_seconds)
+        self._until: Dict[str, float] = {}
+        self._strikes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def remaining(self, url: Optional[str] = None) -> float:
+        """
+        距离冷却结束的秒数
+        
+        Args:
+            url: 请求地址，None表示所有域名中最长的剩余时间
+        
+        Returns:
+            剩余秒数，不在冷却中时为0
+        """
+        now = time.monotonic()
+        with self._lock:
+            if url is None:
+                until = max(self._until.values(), default=0.0)
+            else:
+                until = self._until.get(site_key(url), 0.0)
+        return max(0.0, until - now)
+    
+    def check(self, url: str):
+        """
+        冷却中时立即抛出 AntiBotBlocked，不发出请求
+        
+        Args:
+            url: 请求地址
+        """
+        remaining = self.remaining(url)
+        if remaining > 0:
+            raise AntiBotBlocked(url, "域名冷却中", remaining)
+    
+    async def wait(self, url: Optional[str] = None):
+        """
+        等待冷却结束
+        
+        Args:
+            url: 请求地址，None表示等待所有域名
+        """
+        remaining = self.remaining(url)
+        while remaining > 0:
+            await asyncio.sleep(remaining)
+            remaining = self.remaining(url)
+    
+    def block(self, url: str, reason: str, seconds: Optional[float] = None) -> AntiBotBlocked:
+        """
+        记录一次拦截并开始（或延长）冷却
+        
+        Args:
+            url: 被拦截的地址
+            reason: 判断依据
+            seconds: 冷却时间(秒)，用于同步其他进程已确定的冷却，None表示按连续拦截次数计算
+        
+        Returns:
+            可直接抛出的 AntiBotBlocked
+        """
+        key = site_key(url)
+        now = time.monotonic()
+        with self._lock:
+            # 冷却期间发出的请求陆续返回时不重复加倍
+            if self._until.get(key, 0.0) > now:
+                return AntiBotBlocked(url, reason, self._until[key] - now)
+            strikes = self._strikes.get(key, 0) + 1
+            self._strikes[key] = strikes
+            if seconds is None:
+                seconds = min(self.max_seconds, self.base_seconds * 2 ** (strikes - 1))
+            self._until[key] = now + seconds
+        logger.warning(f"{key} 反爬拦截 ({reason})，第 {strikes} 次，暂停访问 {seconds:.0f} 秒")
+        return AntiBotBlocked(url, reason, seconds)
+    
+    def success(self, url: str):
+        """
+        记录一次正常访问，冷却结束后重置加倍
+        
+        Args:
+            url: 访问的地址
+        """
+        key = site_key(url)
+        with self._lock:
+            if key in self._strikes and self._until.get(key, 0.0) <= time.monotonic():
+                del self._strikes[key]
+    
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        当前状态
+        
+        Returns:
+            按域名的剩余冷却秒数和连续拦截次数
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: {"remaining": round(max(0.0, until - now), 1), "strikes": self._strikes.get(key, 0)}
+                for key, until in self._until.items()
+            }
+
+# 进程内共用的域名冷却
+domain_cooldown = DomainCooldown()
\ No newline at end of file
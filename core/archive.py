@@ -0,0 +1,340 @@
+"""
+页面归档模块，按内容寻址压缩保存抓取到的文档，用SQLite按地址和时间建立索引，
+回放模式下浏览器的请求直接由归档响应，不访问网络
+"""
+import os
+import gzip
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urldefrag
+
+from config.logging_config import setup_logger
+from config.settings import HTML_ARCHIVE_DIR, HTML_ARCHIVE_MODE, HTML_ARCHIVE_RESOURCE_TYPES
+
+# 创建日志记录器
+logger = setup_logger('archive')
+
+# 归档模式
+ARCHIVE_RECORD = "record"
+ARCHIVE_REPLAY = "replay"
+
+# 归档的资源类型，默认只归档文档（详情页、列表页和联想接口）；
+# 脚本和接口响应每次请求都有多个且不去重索引，需要回放渲染搜索页时再通过配置加上
+ARCHIVE_RESOURCE_TYPES = tuple(HTML_ARCHIVE_RESOURCE_TYPES)
+
+# 压缩格式及文件扩展名
+CODEC_ZSTD = "zstd"
+CODEC_GZIP = "gzip"
+CODEC_EXTENSIONS = {CODEC_ZSTD: ".zst", CODEC_GZIP: ".gz"}
+
+INDEX_FILENAME = "index.db"
+OBJECTS_DIRNAME = "objects"
+
+def _zstd():
+    """zstandard 已安装时返回该模块，否则返回None，改用gzip"""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+def compress(data: bytes) -> Tuple[str, bytes]:
+    """
+    压缩数据，优先使用zstd
+    
+    Args:
+        data: 原始数据
+    
+    Returns:
+        (压缩格式, 压缩后的数据)
+    """
+    zstandard = _zstd()
+    if zstandard is not None:
+        return CODEC_ZSTD, zstandard.ZstdCompressor(level=10).compress(data)
+    return CODEC_GZIP, gzip.compress(data)
+
+def decompress(codec: str, data: bytes) -> bytes:
+    """
+    解压数据
+    
+    Args:
+        codec: 压缩格式
+        data: 压缩后的数据
+    
+    Returns:
+        原始数据
+    
+    Raises:
+        RuntimeError: 归档使用zstd压缩而当前环境未安装 zstandard
+    """
+    if codec == CODEC_GZIP:
+        return gzip.decompress(data)
+    zstandard = _zstd()
+    if zstandard is None:
+        raise RuntimeError("归档使用zstd压缩，需要安装 zstandard")
+    return zstandard.ZstdDecompressor().decompress(data)
+
+def archive_key(url: str) -> str:
+    """
+    归档索引使用的地址：去掉锚点并解码，浏览器编码后的地址和代码中拼接的地址对应同一条记录
+    
+    Args:
+        url: 请求地址
+    
+    Returns:
+        索引键
+    """
+    return unquote(urldefrag(url)[0])
+
+class HtmlArchive:
+    """
+    内容寻址的页面归档
+    
+    - 文件按内容的SHA-256命名，保存在 objects/前两位/ 下，内容相同的页面只保存一份
+    - index.db 记录每次抓取的地址、时间、状态码、内容类型和内容摘要，
+      同一地址可以有多条记录，回放时默认使用最新的一条
+    - 写文件和索引在后台线程中完成，不占用抓取时间；多个进程可以共用一个目录
+    """
+    
+    def __init__(self, directory: str = HTML_ARCHIVE_DIR, mode: str = HTML_ARCHIVE_MODE,
+                 resource_types: Tuple[str, ...] = ARCHIVE_RESOURCE_TYPES):
+        """
+        初始化页面归档
+        
+        Args:
+            directory: 归档目录，为空时不归档也不回放
+            mode: record（抓取时归档）或 replay（从归档回放，不访问网络）
+            resource_types: 抓取时归档的资源类型，如 document、script、xhr、fetch
+        """
+        if mode not in (ARCHIVE_RECORD, ARCHIVE_REPLAY):
+            raise ValueError(f"未知的归档模式: {mode}")
+        self.directory = directory
+        self.mode = mode
+        self.resource_types = tuple(resource_types)
+        self.recorded = 0
+        self.replayed = 0
+        self.missed = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    @property
+    def recording(self) -> bool:
+        """是否在抓取时归档"""
+        return bool(self.directory) and self.mode == ARCHIVE_RECORD
+    
+    @property
+    def replaying(self) -> bool:
+        """是否从归档回放"""
+        return bool(self.directory) and self.mode == ARCHIVE_REPLAY
+    
+    def _connect(self) -> sqlite3.Connection:
+        """打开索引数据库，调用方需持有 _lock"""
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.directory, INDEX_FILENAME), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    status INTEGER NOT NULL,
+                    content_type TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    codec TEXT NOT NULL,
+                    size INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS documents_url ON documents (url, fetched_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+    
+    def _object_path(self, digest: str, codec: str) -> str:
+        """内容文件路径"""
+        return os.path.join(self.directory, OBJECTS_DIRNAME, digest[:2], digest + CODEC_EXTENSIONS[codec])
+    
+    def store(self, url: str, body: bytes, status: int = 200, content_type: str = "text/html; charset=utf-8",
+              fetched_at: Optional[float] = None) -> str:
+        """
+        保存一次抓取的内容并写入索引
+        
+        Args:
+            url: 请求地址
+            body: 响应内容
+            status: 状态码
+            content_type: 内容类型
+            fetched_at: 抓取时间戳，默认为当前时间
+        
+        Returns:
+            内容的SHA-256摘要
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT codec FROM documents WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        codec = row[0] if row else None
+        if codec is None or not os.path.exists(self._object_path(digest, codec)):
+            codec, data = compress(body)
+            path = self._object_path(digest, codec)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件，其他进程读取时不会看到不完整的文件
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO documents (url, fetched_at, status, content_type, digest, codec, size) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (archive_key(url), fetched_at if fetched_at is not None else time.time(),
+                 status, content_type, digest, codec, len(body))
+            )
+            conn.commit()
+        self.recorded += 1
+        return digest
+    
+    def lookup(self, url: str, before: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        读取地址最近一次的归档
+        
+        Args:
+            url: 请求地址
+            before: 只查找该时间戳之前的归档，None表示最新的一条
+        
+        Returns:
+            包含 url、fetched_at、status、content_type、digest 和 body 的字典，没有归档时返回None
+        """
+        query = "SELECT url, fetched_at, status, content_type, digest, codec FROM documents WHERE url = ?"
+        params: tuple = (archive_key(url),)
+        if before is not None:
+            query += " AND fetched_at <= ?"
+            params += (before,)
+        with self._lock:
+            row = self._connect().execute(query + " ORDER BY fetched_at DESC LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+        
+        key, fetched_at, status, content_type, digest, codec = row
+        try:
+            with open(self._object_path(digest, codec), "rb") as f:
+                body = decompress(codec, f.read())
+        except OSError as e:
+            logger.warning(f"读取归档内容失败 {key}: {e}")
+            return None
+        return {
+            "url": key,
+            "fetched_at": fetched_at,
+            "status": status,
+            "content_type": content_type,
+            "digest": digest,
+            "body": body,
+        }
+    
+    def latest_documents(self, url_pattern: str = "%") -> List[Tuple[str, str]]:
+        """
+        每个地址最新一次归档的HTML文档
+        
+        Args:
+            url_pattern: SQL LIKE 格式的地址条件，如 '%/subject/%'
+        
+        Returns:
+            (地址, 内容文件路径) 列表，按地址排序
+        """
+        with self._lock:
+            rows = self._connect().execute("""
+                SELECT url, digest, codec, MAX(fetched_at) FROM documents
+                WHERE url LIKE ? AND content_type LIKE 'text/html%'
+                GROUP BY url ORDER BY url
+            """, (url_pattern,)).fetchall()
+        return [(url, self._object_path(digest, codec)) for url, digest, codec, _ in rows]
+    
+    async def record_response(self, response):
+        """
+        归档一个响应，作为页面的 response 事件回调
+        
+        只保存成功（2xx）且类型在 resource_types 中的响应；读取响应内容后交给后台线程写入
+        
+        Args:
+            response: Playwright响应对象
+        """
+        if not self.recording or not response.ok or response.request.resource_type not in self.resource_types:
+            return
+        try:
+            body = await response.body()
+        except Exception as e:
+            logger.debug(f"读取响应内容失败 {response.url}: {e}")
+            return
+        content_type = response.headers.get("content-type", "")
+        # 在锁内提交：任一浏览器关闭时都会调用共用归档的 flush，锁外提交可能用到已被置空或关闭的线程池
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="html-archive")
+            self._executor.submit(self._store_quietly, response.url, body, response.status, content_type)
+    
+    def _store_quietly(self, url: str, body: bytes, status: int, content_type: str):
+        """在后台线程中保存，失败时只记录日志"""
+        try:
+            self.store(url, body, status, content_type)
+        except Exception as e:
+            logger.error(f"归档 {url} 失败: {e}")
+    
+    async def replay_route(self, route):
+        """
+        回放模式下的请求处理，作为 context.route 的回调
+        
+        有归档时直接用归档内容响应，没有时中止请求，保证不访问网络
+        
+        Args:
+            route: Playwright路由对象
+        """
+        url = route.request.url
+        # 读取索引和解压放到线程中，不阻塞其他页面
+        entry = await asyncio.get_running_loop().run_in_executor(None, self.lookup, url)
+        if entry is None:
+            self.missed += 1
+            if route.request.resource_type == "document":
+                logger.warning(f"归档中没有 {url}")
+            await route.abort()
+            return
+        self.replayed += 1
+        await route.fulfill(status=entry["status"], content_type=entry["content_type"], body=entry["body"])
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        归档统计
+        
+        Returns:
+            模式、本进程归档和回放的次数、回放时未命中的次数
+        """
+        return {
+            "mode": self.mode if self.directory else "off",
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "missed": self.missed,
+        }
+    
+    def flush(self):
+        """等待后台写入完成"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+    
+    def close(self):
+        """等待后台写入完成并关闭索引数据库"""
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# 进程内共用的页面归档
+html_archive = HtmlArchive()
\ No newline at end of file
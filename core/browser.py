@@ -1,21 +1,32 @@
 """
 浏览器管理模块，提供Playwright浏览器的基础功能
 """
+import os
 import asyncio
 import random
 import time
-from typing import Optional, List, Dict, Any
-
-from playwright.async_api import async_playwright, Page, Browser, BrowserContext, TimeoutError
+from typing import Optional, List, Dict, Any, Tuple, TYPE_CHECKING
 
+from core.archive import HtmlArchive, html_archive
+from core.storage_state import StorageStateStore, merge_cookies
+from core.browser_watchdog import BrowserWatchdog, chromium_rss_mb
+from core.debug_capture import debug_capture
+from core.deadline import budget_ms, current_deadline
 from config.logging_config import setup_logger
 from config.settings import (
     DEFAULT_TIMEOUT, 
     DEFAULT_HEADLESS, 
+    BROWSER_CDP_ENDPOINT,
     BROWSER_HEADERS,
+    STORAGE_STATE_INTERVAL,
     USER_AGENTS
 )
 
+# Playwright导入较慢，仅用于类型标注时导入，运行时在启动浏览器时再导入
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext, Page, Response
+    from core.identity import Identity
+
 # 创建日志记录器
 logger = setup_logger('browser')
 
@@ -27,7 +38,11 @@ class PlaywrightBrowser:
                  proxy: Optional[str] = None, 
                  user_agent: Optional[str] = None,
                  timeout: int = DEFAULT_TIMEOUT,
-                 cookies: Optional[List[Dict[str, str]]] = None):
+                 cookies: Optional[List[Dict[str, str]]] = None,
+                 cdp_endpoint: Optional[str] = BROWSER_CDP_ENDPOINT,
+                 storage: Optional[StorageStateStore] = None,
+                 watchdog: Optional[BrowserWatchdog] = None,
+                 archive: Optional[HtmlArchive] = None):
         """
         初始化浏览器管理器
         
@@ -37,15 +52,32 @@ class PlaywrightBrowser:
             user_agent: 自定义User-Agent
             timeout: 页面加载超时时间(毫秒)
             cookies: 浏览器Cookie列表
+            cdp_endpoint: 共享浏览器地址，设置后连接该浏览器并创建独立的上下文，不再自行启动浏览器
+            storage: 上下文存储状态的保存位置，默认保存到 STORAGE_STATE_DIR
+            watchdog: 浏览器回收策略，默认按 BROWSER_RECYCLE_* 配置
+            archive: 页面归档，默认使用进程内共用的 html_archive
         """
         self.headless = headless
         self.proxy = proxy
         self.user_agent = user_agent or self._get_random_ua()
         self.timeout = timeout
         self.cookies = cookies or []
+        self.cdp_endpoint = cdp_endpoint
         self.browser = None
         self.context = None
         self.playwright = None
+        # 各访问身份的独立上下文，按身份名索引
+        self.identity_contexts: Dict[str, "BrowserContext"] = {}
+        self.storage = storage or StorageStateStore()
+        self.storage_saved_at = 0.0
+        self.watchdog = watchdog or BrowserWatchdog()
+        self.archive = archive or html_archive
+        
+        # 每次回收后代数加一，旧代的浏览器和上下文在其页面全部关闭后再关闭
+        self.generation = 0
+        self._open_pages: Dict[int, int] = {}
+        self._draining: Dict[int, Tuple[Any, List["BrowserContext"]]] = {}
+        self._page_lock: Optional[asyncio.Lock] = None
         
         # 请求头
         self.headers = BROWSER_HEADERS.copy()
@@ -63,14 +95,27 @@ class PlaywrightBrowser:
     
     async def init_browser(self):
         """初始化浏览器和上下文"""
+        from playwright.async_api import async_playwright
+        
         self.playwright = await async_playwright().start()
-        browser_args = {}
         
-        if self.proxy:
-            browser_args["proxy"] = {"server": self.proxy}
+        if self.cdp_endpoint:
+            # 连接共享浏览器，关闭时只断开连接并清理本进程创建的上下文
+            self.browser = await self.playwright.chromium.connect_over_cdp(self.cdp_endpoint)
+            logger.info(f"已连接共享浏览器: {self.cdp_endpoint}")
+        else:
+            self.browser = await self._launch()
+        
+        self.context = await self._create_context(self.user_agent, self.proxy, self.cookies, "default")
+        self.storage_saved_at = time.monotonic()
         
+        logger.info("浏览器模块初始化完成")
+        return self.context
+    
+    async def _launch(self):
+        """启动本进程的Chromium"""
         # 启动浏览器时设置更多真实特性
-        self.browser = await self.playwright.chromium.launch(
+        return await self.playwright.chromium.launch(
             headless=self.headless,
             args=[
                 '--disable-blink-features=AutomationControlled',
@@ -79,50 +124,221 @@ class PlaywrightBrowser:
                 '--disable-setuid-sandbox'
             ]
         )
+    
+    async def _create_context(self, user_agent: str, proxy: Optional[str],
+                              cookies: List[Dict[str, str]], state_name: str) -> "BrowserContext":
+        """
+        创建浏览器上下文，有保存的存储状态时从中恢复
+        
+        Args:
+            user_agent: User-Agent
+            proxy: 代理服务器地址，None表示直连
+            cookies: Cookie列表，只添加存储状态中没有的Cookie
+            state_name: 存储状态的名称
+            
+        Returns:
+            浏览器上下文
+        """
+        context_args = {}
+        if proxy:
+            context_args["proxy"] = {"server": proxy}
+        
+        state = self.storage.load(state_name)
+        if state:
+            context_args["storage_state"] = state
+            cookies = merge_cookies(state, cookies)
+            logger.info(f"已恢复 {state_name} 的存储状态（{len(state['cookies'])} 个Cookie）")
         
         # 创建上下文时设置更多真实参数
-        self.context = await self.browser.new_context(
-            user_agent=self.user_agent,
+        context = await self.browser.new_context(
+            user_agent=user_agent,
             viewport={"width": 1920, "height": 1080},
             device_scale_factor=1,
             locale="zh-CN",
             timezone_id="Asia/Shanghai",
-            **browser_args
+            **context_args
         )
         
         # 添加Cookie
-        if self.cookies:
-            await self.context.add_cookies(self.cookies)
+        if cookies:
+            await context.add_cookies(cookies)
         
         # 设置额外的headers
-        await self.context.set_extra_http_headers(self.headers)
+        await context.set_extra_http_headers(self.headers)
         
         # 仅阻止图片等资源加载，提高速度
-        await self.context.route("**/*.{png,jpg,jpeg,gif,svg,ico}", lambda route: route.abort())
+        await context.route("**/*.{png,jpg,jpeg,gif,svg,ico}", lambda route: route.abort())
+        if self.archive.replaying:
+            # 后注册的路由优先，所有请求都由归档响应，归档中没有的请求直接中止
+            await context.route("**/*", self.archive.replay_route)
+        return context
+    
+    def _named_contexts(self) -> List[Tuple[str, "BrowserContext"]]:
+        """所有上下文及其存储状态名称"""
+        contexts = [("default", self.context)] if self.context else []
+        contexts.extend((f"identity-{name}", context) for name, context in self.identity_contexts.items())
+        return contexts
+    
+    async def save_storage_state(self):
+        """保存所有上下文的存储状态，豆瓣在访问过程中刷新的Cookie在重启后仍然有效"""
+        if not self.storage.enabled:
+            return
+        for name, context in self._named_contexts():
+            try:
+                self.storage.save(name, await context.storage_state())
+            except Exception as e:
+                logger.warning(f"读取 {name} 的存储状态失败: {e}")
+        self.storage_saved_at = time.monotonic()
+    
+    async def recycle(self, reason: str):
+        """
+        回收浏览器：启动新的浏览器（连接共享浏览器时只重建上下文）供之后的页面使用，
+        旧浏览器上仍在处理的页面不受影响，全部关闭后再关闭旧浏览器
         
-        logger.info("浏览器模块初始化完成")
-        return self.context
+        Args:
+            reason: 回收原因，见 core.browser_watchdog
+        """
+        # 先保存存储状态，新的上下文从中恢复会话
+        await self.save_storage_state()
+        old_generation = self.generation
+        old_browser = None if self.cdp_endpoint else self.browser
+        old_contexts = [context for _, context in self._named_contexts()]
+        
+        browser = self.browser if self.cdp_endpoint else await self._launch()
+        self.browser = browser
+        self.identity_contexts = {}
+        self.context = await self._create_context(self.user_agent, self.proxy, self.cookies, "default")
+        self.generation += 1
+        self.watchdog.recycled(reason, "context" if self.cdp_endpoint else "browser")
+        
+        self._draining[old_generation] = (old_browser, old_contexts)
+        if not self._open_pages.get(old_generation):
+            await self._close_generation(old_generation)
+    
+    async def _close_generation(self, generation: int):
+        """关闭已回收的一代浏览器和上下文"""
+        self._open_pages.pop(generation, None)
+        old_browser, old_contexts = self._draining.pop(generation, (None, []))
+        try:
+            for context in old_contexts:
+                await context.close()
+            if old_browser:
+                await old_browser.close()
+        except Exception as e:
+            logger.warning(f"关闭已回收的浏览器出错: {e}")
+    
+    def _page_closed(self, generation: int):
+        """页面关闭回调，已回收的一代没有页面后关闭"""
+        self._open_pages[generation] = self._open_pages.get(generation, 1) - 1
+        if generation in self._draining and self._open_pages[generation] <= 0:
+            asyncio.ensure_future(self._close_generation(generation))
+    
+    async def _check_recycle(self):
+        """按需检查内存，达到回收条件时回收"""
+        # 共享浏览器不是本进程的子进程，内存由守护进程管理；旧浏览器关闭前内存会重复统计，暂不检查
+        if not self.cdp_endpoint and not self._draining and self.watchdog.memory_check_due():
+            loop = asyncio.get_running_loop()
+            self.watchdog.record_memory(await loop.run_in_executor(None, chromium_rss_mb, os.getpid()))
+        reason = self.watchdog.due()
+        if reason:
+            await self.recycle(reason)
+    
+    def metrics(self) -> Dict[str, Any]:
+        """
+        浏览器运行状态
+        
+        Returns:
+            回收策略的统计，当前代数、打开的页面数、等待关闭的旧浏览器数，以及页面归档的统计
+        """
+        return dict(
+            self.watchdog.snapshot(),
+            generation=self.generation,
+            open_pages=sum(self._open_pages.values()),
+            draining=len(self._draining),
+            archive=self.archive.stats()
+        )
     
     async def close(self):
-        """关闭浏览器"""
-        if self.context:
-            await self.context.close()
+        """关闭浏览器，关闭前保存存储状态"""
+        for generation in list(self._draining):
+            await self._close_generation(generation)
+        # 共享浏览器重启后连接已断开，上下文无需再关闭
+        if self.browser and self.browser.is_connected():
+            await self.save_storage_state()
+            for context in [self.context, *self.identity_contexts.values()]:
+                if context:
+                    await context.close()
         if self.browser:
             await self.browser.close()
         if self.playwright:
             await self.playwright.stop()
+        # 等待页面归档和调试信息写完，进程随后退出时不丢失最后几个页面
+        self.archive.flush()
+        debug_capture.flush()
+        self.context = None
+        self.identity_contexts = {}
+        self.browser = None
+        self.playwright = None
         logger.info("浏览器已关闭")
     
-    async def new_page(self) -> Page:
-        """创建新页面"""
+    async def new_page(self, identity: Optional["Identity"] = None) -> "Page":
+        """
+        创建新页面
+        
+        Args:
+            identity: 访问身份，在该身份的上下文中创建页面；None或没有自定义设置的身份使用默认上下文
+            
+        Returns:
+            页面对象
+        """
+        # 回收和创建上下文不能与其他页面的创建交错进行
+        if self._page_lock is None:
+            self._page_lock = asyncio.Lock()
+        async with self._page_lock:
+            page = await self._new_page_locked(identity)
+        page.set_default_navigation_timeout(self.timeout)
+        return page
+    
+    async def _new_page_locked(self, identity: Optional["Identity"]) -> "Page":
+        """在页面锁内创建页面，并记录页面所属的代"""
+        if self.context and self.cdp_endpoint and not self.browser.is_connected():
+            # 共享浏览器被守护进程重启后重新连接
+            logger.warning("与共享浏览器的连接已断开，重新连接")
+            await self.close()
         if not self.context:
             await self.init_browser()
+        else:
+            await self._check_recycle()
         
-        page = await self.context.new_page()
-        page.set_default_navigation_timeout(self.timeout)
+        context = self.context
+        if identity is not None and not identity.uses_default_context:
+            context = self.identity_contexts.get(identity.name)
+            if context is None:
+                # 身份没有指定的部分沿用浏览器的默认设置
+                context = await self._create_context(
+                    identity.user_agent or self.user_agent,
+                    identity.proxy or self.proxy,
+                    identity.cookies if identity.cookies is not None else self.cookies,
+                    f"identity-{identity.name}"
+                )
+                self.identity_contexts[identity.name] = context
+                logger.info(f"已创建身份 {identity.name} 的浏览器上下文")
+        
+        # 定期保存，进程被强制结束时最多丢失一个间隔内的变化
+        if self.storage.enabled and time.monotonic() - self.storage_saved_at >= STORAGE_STATE_INTERVAL:
+            await self.save_storage_state()
+        
+        page = await context.new_page()
+        generation = self.generation
+        self._open_pages[generation] = self._open_pages.get(generation, 0) + 1
+        page.on("close", lambda _: self._page_closed(generation))
+        page.on("crash", lambda _: self.watchdog.page_crashed())
+        if self.archive.recording:
+            page.on("response", self.archive.record_response)
+        self.watchdog.page_opened()
         return page
     
-    async def navigate(self, page: Page, url: str, wait_until: str = "domcontentloaded") -> bool:
+    async def navigate(self, page: "Page", url: str, wait_until: str = "domcontentloaded") -> bool:
         """
         导航到指定URL
         
@@ -135,13 +351,41 @@ class PlaywrightBrowser:
             是否导航成功
         """
         try:
-            await page.goto(url, wait_until=wait_until)
+            await self.goto(page, url, wait_until)
             return True
         except Exception as e:
             logger.error(f"导航到 {url} 失败: {e}")
             return False
     
-    async def wait_for_selector(self, page: Page, selector: str, timeout: int = 10000) -> bool:
+    async def goto(self, page: "Page", url: str, wait_until: str = "domcontentloaded") -> Optional["Response"]:
+        """
+        导航到指定URL，出错时抛出异常，供需要区分超时和检查响应状态的调用方使用
+        
+        Args:
+            page: Playwright页面对象
+            url: 目标URL
+            wait_until: 等待页面加载策略
+            
+        Returns:
+            主文档的响应
+        
+        Raises:
+            DeadlineExceeded: 当前请求已超过截止时间
+        """
+        # 请求有截止时间时按剩余时间缩短导航超时
+        timeout = budget_ms(self.timeout, "导航")
+        try:
+            response = await page.goto(url, wait_until=wait_until, timeout=timeout)
+        except Exception:
+            # 因请求截止时间到达而超时不是浏览器的问题，不计入连续错误
+            deadline = current_deadline()
+            if deadline is None or not deadline.expired:
+                self.watchdog.navigation_failed()
+            raise
+        self.watchdog.navigation_succeeded()
+        return response
+    
+    async def wait_for_selector(self, page: "Page", selector: str, timeout: int = 10000) -> bool:
         """
         等待选择器出现
         
@@ -152,7 +396,11 @@ class PlaywrightBrowser:
             
         Returns:
             是否等待成功
+        
+        Raises:
+            DeadlineExceeded: 当前请求已超过截止时间
         """
+        timeout = budget_ms(timeout, "等待页面元素")
         try:
             await page.wait_for_selector(selector, timeout=timeout)
             return True
@@ -165,7 +413,7 @@ class PlaywrightBrowser:
         sleep_time = random.uniform(min_seconds, max_seconds)
         await asyncio.sleep(sleep_time)
     
-    async def simulate_human_behavior(self, page: Page):
+    async def simulate_human_behavior(self, page: "Page"):
         """模拟人类行为，随机滚动页面"""
         try:
             # 随机滚动页面
@@ -175,30 +423,16 @@ class PlaywrightBrowser:
                     window.scrollTo(0, Math.floor(Math.random() * scrollHeight));
                 }
             """)
-            
-            # 随机暂停
-            await self.random_sleep(1.0, 2.0)
         except Exception as e:
             logger.warning(f"模拟人类行为失败: {e}")
     
-    async def save_debug_info(self, page: Page, prefix: str = "debug"):
+    async def save_debug_info(self, page: "Page", kind: str = "debug", label: str = ""):
         """
-        保存页面截图和HTML用于调试
+        抽样保存页面截图和HTML用于调试，写文件在后台完成，见 core.debug_capture
         
         Args:
             page: Playwright页面对象
-            prefix: 文件名前缀
+            kind: 错误类别，同一类别按间隔和比例抽样
+            label: 附加说明，记录在索引中
         """
-        try:
-            timestamp = int(time.time())
-            filename = f"{prefix}_{timestamp}"
-            
-            await page.screenshot(path=f"{filename}.png")
-            
-            page_content = await page.content()
-            with open(f"{filename}.html", "w", encoding="utf-8") as f:
-                f.write(page_content)
-                
-            logger.info(f"已保存调试信息: {filename}.png 和 {filename}.html")
-        except Exception as e:
-            logger.error(f"保存调试信息失败: {e}") 
\ No newline at end of file
+        await debug_capture.capture(page, kind, label)
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+共享浏览器服务，启动一个开启远程调试端口的Chromium并在其退出后重启
+
+多个API进程或工作进程通过 BROWSER_CDP_ENDPOINT 连接到同一个浏览器，
+各自创建独立的 BrowserContext，不必每个进程都启动一个Chromium
+"""
+import json
+import time
+import shutil
+import signal
+import tempfile
+import subprocess
+import urllib.request
+from typing import List, Optional
+
+from config.logging_config import setup_logger
+from config.settings import BROWSER_SERVER_PORT, BROWSER_EXECUTABLE_PATH
+
+# 创建日志记录器
+logger = setup_logger('browser_server')
+
+# 重启间隔的上限(秒)
+MAX_RESTART_DELAY = 30.0
+
+# 运行超过该时间后视为稳定，重启间隔重新从1秒开始
+STABLE_UPTIME = 60.0
+
+def find_chromium_executable() -> str:
+    """
+    查找Chromium可执行文件，优先使用 BROWSER_EXECUTABLE_PATH，否则使用Playwright安装的Chromium
+    
+    Returns:
+        可执行文件路径
+    """
+    if BROWSER_EXECUTABLE_PATH:
+        return BROWSER_EXECUTABLE_PATH
+    
+    from playwright.sync_api import sync_playwright
+    
+    with sync_playwright() as playwright:
+        return playwright.chromium.executable_path
+
+class BrowserServer:
+    """
+    共享Chromium的管理器
+    
+    浏览器以远程调试模式启动，客户端通过 http://host:port 或其返回的
+    websocket地址使用 connect_over_cdp 连接
+    """
+    
+    def __init__(self,
+                 port: int = BROWSER_SERVER_PORT,
+                 host: str = "127.0.0.1",
+                 executable: Optional[str] = None,
+                 extra_args: Optional[List[str]] = None):
+        """
+        初始化共享浏览器
+        
+        Args:
+            port: 远程调试端口
+            host: 远程调试监听地址，容器间共享时设为0.0.0.0；远程调试端口没有认证，只能暴露在内部网络中
+            executable: Chromium可执行文件路径，None时自动查找
+            extra_args: 额外的启动参数
+        """
+        self.port = port
+        self.host = host
+        self.executable = executable
+        self.extra_args = extra_args or []
+        self.process: Optional[subprocess.Popen] = None
+        self.user_data_dir: Optional[str] = None
+        self._stopping = False
+    
+    @property
+    def endpoint(self) -> str:
+        """客户端连接地址"""
+        host = "127.0.0.1" if self.host in ("0.0.0.0", "") else self.host
+        return f"http://{host}:{self.port}"
+    
+    def _command(self) -> List[str]:
+        """浏览器启动命令"""
+        return [
+            self.executable,
+            "--headless=new",
+            f"--remote-debugging-port={self.port}",
+            f"--remote-debugging-address={self.host}",
+            f"--user-data-dir={self.user_data_dir}",
+            "--disable-blink-features=AutomationControlled",
+            "--disable-features=IsolateOrigins,site-per-process",
+            "--disable-dev-shm-usage",
+            "--no-sandbox",
+            "--disable-setuid-sandbox",
+            "--no-first-run",
+            "--no-default-browser-check",
+            *self.extra_args,
+            "about:blank",
+        ]
+    
+    def start(self, timeout: float = 30.0) -> str:
+        """
+        启动浏览器并等待远程调试端口可用
+        
+        Args:
+            timeout: 等待时间(秒)
+        
+        Returns:
+            浏览器的websocket调试地址
+        """
+        if not self.executable:
+            self.executable = find_chromium_executable()
+        # 每次启动使用新的用户目录，避免上次异常退出留下的锁文件
+        self.user_data_dir = tempfile.mkdtemp(prefix="haibaoqiang-browser-")
+        self.process = subprocess.Popen(self._command(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            code = self.process.poll()
+            if code is not None:
+                self.stop()
+                raise RuntimeError(f"浏览器启动后立即退出 (退出码 {code})")
+            ws_endpoint = self.websocket_endpoint()
+            if ws_endpoint:
+                logger.info(f"共享浏览器已启动 (pid {self.process.pid}): {self.endpoint}")
+                return ws_endpoint
+            time.sleep(0.2)
+        
+        self.stop()
+        raise RuntimeError(f"等待浏览器调试端口超时: {self.endpoint}")
+    
+    def websocket_endpoint(self) -> Optional[str]:
+        """查询浏览器的websocket调试地址，浏览器不可用时返回None"""
+        try:
+            with urllib.request.urlopen(f"{self.endpoint}/json/version", timeout=2) as response:
+                return json.loads(response.read().decode("utf-8")).get("webSocketDebuggerUrl")
+        except (OSError, ValueError):
+            return None
+    
+    def stop(self, timeout: float = 10.0):
+        """
+        关闭浏览器并删除用户目录
+        
+        Args:
+            timeout: 等待浏览器退出的时间(秒)，超时后强制结束
+        """
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+            self.user_data_dir = None
+    
+    def supervise(self, check_interval: float = 2.0):
+        """
+        启动浏览器并在其退出或失去响应后重启，收到SIGTERM或SIGINT时关闭浏览器并返回
+        
+        连续失败时重启间隔按指数增长，最长 MAX_RESTART_DELAY 秒
+        
+        Args:
+            check_interval: 检查浏览器状态的间隔(秒)
+        """
+        def handle_signal(signum, frame):
+            self._stopping = True
+        
+        signal.signal(signal.SIGTERM, handle_signal)
+        signal.signal(signal.SIGINT, handle_signal)
+        
+        delay = 1.0
+        try:
+            while not self._stopping:
+                started = time.monotonic()
+                try:
+                    self.start()
+                except (RuntimeError, OSError) as e:
+                    logger.error(f"共享浏览器启动失败: {e}")
+                
+                # 进程存活时还要确认调试端口有响应，卡死的浏览器同样需要重启
+                while not self._stopping and self.process and self.process.poll() is None:
+                    time.sleep(check_interval)
+                    if not self._stopping and self.websocket_endpoint() is None and self.process.poll() is None:
+                        logger.warning("共享浏览器失去响应")
+                        break
+                if self._stopping:
+                    break
+                
+                code = self.process.poll() if self.process else None
+                self.stop()
+                if time.monotonic() - started > STABLE_UPTIME:
+                    delay = 1.0
+                logger.warning(f"共享浏览器已退出 (退出码 {code})，{delay:.0f} 秒后重启")
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RESTART_DELAY)
+        finally:
+            self.stop()
+            logger.info("共享浏览器已关闭")
\ No newline at end of file
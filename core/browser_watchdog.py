@@ -0,0 +1,215 @@
+"""
+浏览器回收策略模块，统计页面数、连续错误和Chromium内存占用，判断何时重启浏览器
+"""
+import os
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from config.logging_config import setup_logger
+from config.settings import (
+    BROWSER_RECYCLE_PAGES,
+    BROWSER_RECYCLE_MEMORY_MB,
+    BROWSER_RECYCLE_ERRORS,
+    BROWSER_MEMORY_CHECK_INTERVAL
+)
+
+# 创建日志记录器
+logger = setup_logger('browser_watchdog')
+
+# Chromium相关进程名
+CHROMIUM_PROCESS_NAMES = ("chrome", "chromium", "headless_shell")
+
+# 回收原因
+RECYCLE_PAGES = "pages"
+RECYCLE_MEMORY = "memory"
+RECYCLE_ERRORS = "errors"
+RECYCLE_CRASH = "crash"
+
+# 保留的最近回收记录数
+RECYCLE_HISTORY = 20
+
+def _read_proc_file(pid: int, name: str) -> str:
+    """读取 /proc/<pid>/ 下的文件，进程已退出时返回空字符串"""
+    try:
+        with open(f"/proc/{pid}/{name}", "rb") as f:
+            return f.read().decode("utf-8", "replace")
+    except OSError:
+        return ""
+
+def _descendants(root_pid: int) -> set:
+    """获取进程的所有子孙进程ID"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        status = _read_proc_file(int(entry), "status")
+        for line in status.splitlines():
+            if line.startswith("PPid:"):
+                children.setdefault(int(line.split()[1]), []).append(int(entry))
+                break
+    
+    result, stack = set(), [root_pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            if child not in result:
+                result.add(child)
+                stack.append(child)
+    return result
+
+def chromium_rss_mb(root_pid: Optional[int] = None) -> float:
+    """
+    统计Chromium进程的常驻内存总和，仅支持Linux
+    
+    Args:
+        root_pid: 只统计该进程的子孙进程，None表示统计所有Chromium进程
+    
+    Returns:
+        内存占用(MB)
+    """
+    if not os.path.isdir("/proc"):
+        return 0.0
+    
+    pids = _descendants(root_pid) if root_pid else [int(entry) for entry in os.listdir("/proc") if entry.isdigit()]
+    total_kb = 0
+    for pid in pids:
+        comm = _read_proc_file(pid, "comm").strip()
+        if not any(name in comm for name in CHROMIUM_PROCESS_NAMES):
+            continue
+        for line in _read_proc_file(pid, "status").splitlines():
+            if line.startswith("VmRSS:"):
+                total_kb += int(line.split()[1])
+                break
+    return total_kb / 1024.0
+
+class BrowserWatchdog:
+    """
+    浏览器回收策略
+    
+    达到以下任一条件时建议回收：自上次回收后打开的页面数达到 max_pages、
+    Chromium内存合计超过 max_memory_mb、连续 max_errors 次导航出错、页面崩溃。
+    各项为0时不检查。只负责统计和判断，回收由 PlaywrightBrowser 完成
+    """
+    
+    def __init__(self,
+                 max_pages: int = BROWSER_RECYCLE_PAGES,
+                 max_memory_mb: int = BROWSER_RECYCLE_MEMORY_MB,
+                 max_errors: int = BROWSER_RECYCLE_ERRORS,
+                 check_interval: float = BROWSER_MEMORY_CHECK_INTERVAL):
+        """
+        初始化回收策略
+        
+        Args:
+            max_pages: 打开多少个页面后回收
+            max_memory_mb: Chromium内存合计上限(MB)
+            max_errors: 连续导航出错次数上限
+            check_interval: 检查内存的间隔(秒)
+        """
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.max_errors = max_errors
+        self.check_interval = check_interval
+        
+        self.pages_served = 0
+        self.pages_since_recycle = 0
+        self.consecutive_errors = 0
+        self.crashes = 0
+        self.rss_mb = 0.0
+        self.peak_rss_mb = 0.0
+        self.checked_at = 0.0
+        self.recycles: Dict[str, int] = {}
+        self.history = deque(maxlen=RECYCLE_HISTORY)
+    
+    def page_opened(self):
+        """记录打开一个页面"""
+        self.pages_served += 1
+        self.pages_since_recycle += 1
+    
+    def navigation_succeeded(self):
+        """记录一次导航成功"""
+        self.consecutive_errors = 0
+    
+    def navigation_failed(self):
+        """记录一次导航出错"""
+        self.consecutive_errors += 1
+    
+    def page_crashed(self):
+        """记录页面崩溃，下次打开页面前回收"""
+        self.crashes += 1
+    
+    def memory_check_due(self) -> bool:
+        """是否到了检查内存的时间"""
+        return self.max_memory_mb > 0 and time.monotonic() - self.checked_at >= self.check_interval
+    
+    def record_memory(self, rss_mb: float):
+        """
+        记录一次内存检查结果
+        
+        Args:
+            rss_mb: Chromium进程内存合计(MB)
+        """
+        self.rss_mb = rss_mb
+        self.peak_rss_mb = max(self.peak_rss_mb, rss_mb)
+        self.checked_at = time.monotonic()
+    
+    def due(self) -> Optional[str]:
+        """
+        判断是否需要回收
+        
+        Returns:
+            回收原因，不需要时返回None
+        """
+        if self.crashes:
+            return RECYCLE_CRASH
+        if self.max_errors and self.consecutive_errors >= self.max_errors:
+            return RECYCLE_ERRORS
+        if self.max_memory_mb and self.rss_mb >= self.max_memory_mb:
+            return RECYCLE_MEMORY
+        if self.max_pages and self.pages_since_recycle >= self.max_pages:
+            return RECYCLE_PAGES
+        return None
+    
+    def recycled(self, reason: str, scope: str):
+        """
+        记录一次回收并重置计数
+        
+        Args:
+            reason: 回收原因
+            scope: 回收范围，browser（重启浏览器）或 context（只重建上下文）
+        """
+        self.recycles[reason] = self.recycles.get(reason, 0) + 1
+        self.history.append({
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "reason": reason,
+            "scope": scope,
+            "pages": self.pages_since_recycle,
+            "rss_mb": round(self.rss_mb, 1),
+            "errors": self.consecutive_errors,
+        })
+        logger.info(
+            f"回收浏览器{'上下文' if scope == 'context' else ''} ({reason})：已打开 {self.pages_since_recycle} 个页面，"
+            f"内存 {self.rss_mb:.0f}MB，连续错误 {self.consecutive_errors} 次"
+        )
+        self.pages_since_recycle = 0
+        self.consecutive_errors = 0
+        self.crashes = 0
+        # 重启后重新计算内存，旧浏览器关闭前不会立即下降
+        self.rss_mb = 0.0
+        self.checked_at = time.monotonic()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        当前状态
+        
+        Returns:
+            页面数、内存、连续错误数、按原因统计的回收次数和最近的回收记录
+        """
+        return {
+            "pages_served": self.pages_served,
+            "pages_since_recycle": self.pages_since_recycle,
+            "consecutive_errors": self.consecutive_errors,
+            "rss_mb": round(self.rss_mb, 1),
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "recycles": dict(self.recycles),
+            "history": list(self.history),
+        }
\ No newline at end of file
@@ -0,0 +1,235 @@
+"""
+自适应并发控制模块，按AIMD（加性增、乘性减）调整允许同时进行的豆瓣页面导航数
+"""
+import time
+import math
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Tuple
+
+from config.logging_config import setup_logger
+from config.settings import (
+    CONCURRENCY_INITIAL,
+    CONCURRENCY_MIN,
+    CONCURRENCY_MAX,
+    CONCURRENCY_LATENCY_TARGET
+)
+
+# 创建日志记录器
+logger = setup_logger('concurrency')
+
+# 导航结果
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_BLOCKED = "blocked"
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD并发控制
+    
+    - 最近一个窗口内错误率和平均延迟都正常时，每成功完成 limit 次导航，上限加1
+    - 超时、403或跳转到验证页时立即把上限乘以 decrease_factor
+    - 窗口内错误率过高或平均延迟超过目标的两倍时同样减小上限
+    减小后的 decrease_cooldown 秒内不再重复减小，避免在此之前发出的请求连续触发
+    
+    限制器可以被多个线程中的事件循环共用（API服务器每个请求一个事件循环）
+    """
+    
+    def __init__(self,
+                 initial: int = CONCURRENCY_INITIAL,
+                 min_limit: int = CONCURRENCY_MIN,
+                 max_limit: int = CONCURRENCY_MAX,
+                 latency_target: float = CONCURRENCY_LATENCY_TARGET,
+                 decrease_factor: float = 0.5,
+                 error_threshold: float = 0.2,
+                 window: int = 20,
+                 decrease_cooldown: float = 10.0,
+                 history_size: int = 100):
+        """
+        初始化并发控制
+        
+        Args:
+            initial: 初始上限
+            min_limit: 最小上限
+            max_limit: 最大上限
+            latency_target: 导航耗时目标(秒)，平均耗时超过该值时不再增加上限
+            decrease_factor: 乘性减小的系数
+            error_threshold: 窗口内错误率超过该值时减小上限
+            window: 统计错误率和延迟的最近导航次数
+            decrease_cooldown: 两次减小之间的最短间隔(秒)
+            history_size: 保留的上限变化记录数
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.error_threshold = error_threshold
+        self.decrease_cooldown = decrease_cooldown
+        
+        self.in_flight = 0
+        self._recent: Deque[Tuple[str, float]] = deque(maxlen=window)
+        self._successes_since_change = 0
+        self._last_decrease = 0.0
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self._counts = {OUTCOME_OK: 0, OUTCOME_ERROR: 0, OUTCOME_TIMEOUT: 0, OUTCOME_BLOCKED: 0}
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._lock = threading.Lock()
+    
+    async def acquire(self):
+        """等待到有空闲的并发名额"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+                    else:
+                        # 已被唤醒但被取消，把机会让给下一个等待者
+                        self._wake()
+                raise
+    
+    def release(self):
+        """归还并发名额"""
+        with self._lock:
+            self.in_flight -= 1
+            self._wake()
+    
+    def slot(self) -> "_Slot":
+        """
+        获取一个并发名额的上下文管理器
+        
+        Returns:
+            async with 使用的上下文管理器
+        """
+        return _Slot(self)
+    
+    def _wake(self):
+        """唤醒与空闲名额数量相同的等待者，调用方需持有锁"""
+        free = self.limit - self.in_flight
+        while free > 0 and self._waiters:
+            loop, waiter = self._waiters.popleft()
+            loop.call_soon_threadsafe(_resolve, waiter)
+            free -= 1
+    
+    def record(self, outcome: str, latency: float):
+        """
+        记录一次导航结果并调整上限
+        
+        Args:
+            outcome: OUTCOME_OK、OUTCOME_ERROR、OUTCOME_TIMEOUT 或 OUTCOME_BLOCKED
+            latency: 导航耗时(秒)
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._counts[outcome] = self._counts.get(outcome, 0) + 1
+            self._recent.append((outcome, latency))
+            
+            if outcome in (OUTCOME_TIMEOUT, OUTCOME_BLOCKED):
+                self._decrease(now, outcome)
+                return
+            
+            error_rate, mean_latency = self._window_stats()
+            if len(self._recent) >= self._recent.maxlen // 2:
+                if error_rate > self.error_threshold:
+                    self._decrease(now, f"错误率 {error_rate:.0%}")
+                    return
+                if mean_latency > self.latency_target * 2:
+                    self._decrease(now, f"平均耗时 {mean_latency:.1f}s")
+                    return
+            
+            if outcome != OUTCOME_OK:
+                return
+            self._successes_since_change += 1
+            healthy = error_rate <= self.error_threshold / 2 and mean_latency <= self.latency_target
+            # 每完成一轮（limit次）成功导航才加1，与TCP拥塞控制类似
+            if healthy and self._successes_since_change >= self.limit and self.limit < self.max_limit:
+                self._change(self.limit + 1, f"平均耗时 {mean_latency:.1f}s，错误率 {error_rate:.0%}")
+    
+    def _window_stats(self) -> Tuple[float, float]:
+        """最近窗口内的错误率和成功导航的平均耗时"""
+        if not self._recent:
+            return 0.0, 0.0
+        errors = sum(1 for outcome, _ in self._recent if outcome != OUTCOME_OK)
+        latencies = [latency for outcome, latency in self._recent if outcome == OUTCOME_OK]
+        mean_latency = sum(latencies) / len(latencies) if latencies else 0.0
+        return errors / len(self._recent), mean_latency
+    
+    def _decrease(self, now: float, reason: str):
+        """乘性减小上限，调用方需持有锁"""
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        new_limit = max(self.min_limit, int(math.floor(self.limit * self.decrease_factor)))
+        # 减小后重新统计，避免旧窗口中的错误再次触发
+        self._recent.clear()
+        if new_limit != self.limit:
+            self._change(new_limit, reason)
+    
+    def _change(self, new_limit: int, reason: str):
+        """修改上限并记录，调用方需持有锁"""
+        old_limit = self.limit
+        self.limit = new_limit
+        self._successes_since_change = 0
+        self._history.append({
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "from": old_limit,
+            "to": new_limit,
+            "reason": reason,
+        })
+        logger.info(f"并发上限 {old_limit} -> {new_limit} ({reason})")
+        self._wake()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        当前状态
+        
+        Returns:
+            包含当前上限、进行中的导航数、窗口统计、累计结果和上限变化历史的字典
+        """
+        with self._lock:
+            error_rate, mean_latency = self._window_stats()
+            history: List[Dict[str, Any]] = list(self._history)
+            return {
+                "limit": self.limit,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiters),
+                "window_error_rate": round(error_rate, 3),
+                "window_mean_latency": round(mean_latency, 3),
+                "outcomes": dict(self._counts),
+                "history": history,
+            }
+
+class _Slot:
+    """AdaptiveConcurrencyLimiter.slot 返回的上下文管理器"""
+    
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter):
+        self.limiter = limiter
+    
+    async def __aenter__(self):
+        await self.limiter.acquire()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.limiter.release()
+
+def _resolve(waiter: asyncio.Future):
+    """在等待者所在的事件循环中唤醒它"""
+    if not waiter.done():
+        waiter.set_result(None)
+
+# 进程内共用的豆瓣导航并发控制
+navigation_limiter = AdaptiveConcurrencyLimiter()
\ No newline at end of file
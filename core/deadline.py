@@ -0,0 +1,199 @@
+"""
+请求截止时间模块，通过 contextvars 在一次请求的各个阶段间传递截止时间，
+各阶段按剩余时间设置超时，超时或客户端断开时取消请求的全部工作
+"""
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Iterator, Optional
+
+from config.logging_config import setup_logger
+
+# 创建日志记录器
+logger = setup_logger('deadline')
+
+class DeadlineExceeded(Exception):
+    """请求已超过截止时间或已被取消"""
+    
+    def __init__(self, reason: str = "已超过截止时间", stage: str = ""):
+        """
+        Args:
+            reason: 超时或取消的原因
+            stage: 检查截止时间的阶段
+        """
+        super().__init__(f"{stage}: {reason}" if stage else reason)
+        self.reason = reason
+        self.stage = stage
+
+class Deadline:
+    """
+    一次请求的截止时间
+    
+    使用墙上时间，可以随任务传给其他进程。cancel 可以在任意线程中调用，
+    通过 run 执行的协程会被立即取消
+    """
+    
+    def __init__(self, seconds: Optional[float] = None, expires_at: Optional[float] = None):
+        """
+        初始化截止时间
+        
+        Args:
+            seconds: 从现在起的时长(秒)
+            expires_at: 截止时间的时间戳，与 seconds 二选一
+        """
+        self.expires_at = expires_at if expires_at is not None else time.time() + (seconds or 0.0)
+        self.cancel_reason: Optional[str] = None
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Future] = None
+    
+    def remaining(self) -> float:
+        """剩余秒数，已取消或已超时时为0"""
+        if self.cancel_reason:
+            return 0.0
+        return max(0.0, self.expires_at - time.time())
+    
+    @property
+    def expired(self) -> bool:
+        """是否已超时或已取消"""
+        return self.remaining() <= 0
+    
+    def check(self, stage: str = ""):
+        """
+        已超时或已取消时抛出 DeadlineExceeded
+        
+        Args:
+            stage: 当前阶段，用于异常信息
+        """
+        if self.expired:
+            raise DeadlineExceeded(self.cancel_reason or "已超过截止时间", stage)
+    
+    def timeout(self, default: float, stage: str = "") -> float:
+        """
+        按剩余时间缩短超时时间
+        
+        Args:
+            default: 原本的超时时间(秒)
+            stage: 当前阶段，用于异常信息
+        
+        Returns:
+            不超过剩余时间的超时时间(秒)
+        """
+        self.check(stage)
+        return min(default, self.remaining())
+    
+    def cancel(self, reason: str):
+        """
+        取消请求，如客户端已断开
+        
+        Args:
+            reason: 取消原因
+        """
+        with self._lock:
+            if self.cancel_reason:
+                return
+            self.cancel_reason = reason
+            loop, task = self._loop, self._task
+        logger.info(f"取消请求: {reason}")
+        if loop is not None and task is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(task.cancel)
+    
+    async def run(self, awaitable: Awaitable[Any]) -> Any:
+        """
+        在截止时间内执行协程，协程中的各阶段可以通过 current_deadline 读取截止时间
+        
+        Args:
+            awaitable: 要执行的协程
+        
+        Returns:
+            协程的返回值
+        
+        Raises:
+            DeadlineExceeded: 超时或被取消
+        """
+        token = _current.set(self)
+        try:
+            # 任务创建时复制当前上下文，协程内的各阶段都能读到截止时间
+            task = asyncio.ensure_future(awaitable)
+        finally:
+            _current.reset(token)
+        with self._lock:
+            self._loop, self._task = asyncio.get_running_loop(), task
+            cancelled = self.cancel_reason
+        if cancelled:
+            task.cancel()
+        try:
+            return await asyncio.wait_for(task, self.remaining())
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if not self.expired:
+                raise
+            raise DeadlineExceeded(self.cancel_reason or "已超过截止时间")
+        finally:
+            with self._lock:
+                self._loop, self._task = None, None
+
+# 当前请求的截止时间，没有时为None
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    """当前请求的截止时间，不在请求中时返回None"""
+    return _current.get()
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """
+    在代码块内设置当前截止时间，用于同步代码或已在运行的任务
+    
+    Args:
+        deadline: 截止时间，None表示不限制
+    """
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+def check_deadline(stage: str = ""):
+    """
+    当前请求已超时或已取消时抛出 DeadlineExceeded，不在请求中时不做检查
+    
+    Args:
+        stage: 当前阶段，用于异常信息
+    """
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+def budget(default: float, stage: str = "") -> float:
+    """
+    按当前请求的剩余时间缩短超时时间
+    
+    Args:
+        default: 原本的超时时间(秒)
+        stage: 当前阶段，用于异常信息
+    
+    Returns:
+        超时时间(秒)，不在请求中时返回 default
+    
+    Raises:
+        DeadlineExceeded: 已超时或已取消
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return default
+    return deadline.timeout(default, stage)
+
+def budget_ms(default_ms: float, stage: str = "") -> float:
+    """
+    同 budget，用于Playwright等以毫秒为单位的超时
+    
+    Args:
+        default_ms: 原本的超时时间(毫秒)
+        stage: 当前阶段，用于异常信息
+    
+    Returns:
+        超时时间(毫秒)，至少为1
+    """
+    return max(1.0, budget(default_ms / 1000.0, stage) * 1000.0)
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+调试信息保存模块，按错误类别抽样保存出错页面，压缩后写入有大小上限的循环目录
+"""
+import os
+import re
+import gzip
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from config.logging_config import setup_logger
+from config.settings import (
+    DEBUG_CAPTURE_DIR,
+    DEBUG_CAPTURE_MAX_MB,
+    DEBUG_CAPTURE_INTERVAL,
+    DEBUG_CAPTURE_RATE,
+    DEBUG_CAPTURE_SCREENSHOT
+)
+
+# 创建日志记录器
+logger = setup_logger('debug_capture')
+
+# 索引文件名，每行一条记录
+INDEX_FILENAME = "index.jsonl"
+
+# 截图使用JPEG，比PNG小得多，足够看清页面
+SCREENSHOT_QUALITY = 60
+
+# 文件名中不允许的字符
+UNSAFE_NAME_PATTERN = re.compile(r"[^\w.-]")
+
+class DebugCapture:
+    """
+    出错页面的调试信息保存
+    
+    - 抽样：同一类错误在 interval 秒内只保存一次，满足间隔后再按 rate 抽样，
+      其间跳过的次数记录在下一条记录中
+    - 只在页面打开时读取HTML和截图，压缩和写文件在后台线程中完成，不占用抓取时间
+    - 文件按时间命名，HTML用gzip压缩；目录总大小超过上限时删除最早的记录
+    - index.jsonl 记录每次保存的时间、类别、地址和文件名，多个进程可以共用一个目录
+    """
+    
+    def __init__(self,
+                 directory: str = DEBUG_CAPTURE_DIR,
+                 max_bytes: int = int(DEBUG_CAPTURE_MAX_MB * 1024 * 1024),
+                 interval: float = DEBUG_CAPTURE_INTERVAL,
+                 rate: float = DEBUG_CAPTURE_RATE,
+                 screenshot: bool = DEBUG_CAPTURE_SCREENSHOT):
+        """
+        初始化调试信息保存
+        
+        Args:
+            directory: 保存目录，为空时不保存
+            max_bytes: 目录大小上限(字节)
+            interval: 同一类错误两次保存的最小间隔(秒)
+            rate: 满足间隔后实际保存的比例
+            screenshot: 是否保存截图，False时只保存HTML
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.rate = rate
+        self.screenshot = screenshot
+        self._last: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    @property
+    def enabled(self) -> bool:
+        """是否保存调试信息"""
+        return bool(self.directory)
+    
+    def should_capture(self, kind: str) -> bool:
+        """
+        按错误类别抽样
+        
+        Args:
+            kind: 错误类别
+        
+        Returns:
+            本次是否保存
+        """
+        if not self.enabled:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(kind)
+            if (last is not None and now - last < self.interval) or random.random() >= self.rate:
+                self._suppressed[kind] = self._suppressed.get(kind, 0) + 1
+                return False
+            self._last[kind] = now
+        return True
+    
+    async def capture(self, page, kind: str, label: str = "") -> bool:
+        """
+        抽样保存页面的HTML和截图
+        
+        Args:
+            page: Playwright页面对象
+            kind: 错误类别，如 detail_timeout、navigate_error，按类别抽样
+            label: 附加说明，如影视名称或重试次数，只记录在索引中
+        
+        Returns:
+            是否保存（写文件在后台完成）
+        """
+        if not self.should_capture(kind):
+            return False
+        try:
+            url = page.url
+            html = await page.content()
+            image = await page.screenshot(type="jpeg", quality=SCREENSHOT_QUALITY) if self.screenshot else None
+        except Exception as e:
+            logger.error(f"读取调试信息失败: {e}")
+            return False
+        
+        with self._lock:
+            suppressed = self._suppressed.pop(kind, 0)
+            entry = {
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "kind": kind,
+                "label": label,
+                "url": url,
+                "suppressed": suppressed,
+            }
+            # 在锁内提交，flush 在另一个线程关闭线程池时不会提交到已关闭的线程池
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="debug-capture")
+            self._executor.submit(self._write, entry, html, image)
+        return True
+    
+    def _write(self, entry: Dict[str, Any], html: str, image: Optional[bytes]):
+        """在后台线程中压缩、写入文件并更新索引"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            base = f"{int(time.time() * 1000)}_{os.getpid()}_{UNSAFE_NAME_PATTERN.sub('_', entry['kind'])}"
+            files = {f"{base}.html.gz": gzip.compress(html.encode("utf-8"))}
+            if image:
+                files[f"{base}.jpg"] = image
+            for name, data in files.items():
+                path = os.path.join(self.directory, name)
+                # 先写临时文件，其他进程清理目录时不会看到不完整的文件
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            
+            entry["files"] = list(files)
+            entry["bytes"] = sum(len(data) for data in files.values())
+            with open(os.path.join(self.directory, INDEX_FILENAME), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            logger.info(f"已保存调试信息: {', '.join(files)}")
+            self._evict()
+        except Exception as e:
+            logger.error(f"保存调试信息失败: {e}")
+    
+    def _evict(self):
+        """目录超过大小上限时删除最早的文件，并从索引中去掉对应的记录"""
+        sizes = []
+        for name in os.listdir(self.directory):
+            if name == INDEX_FILENAME or name.endswith(".tmp"):
+                continue
+            try:
+                sizes.append((name, os.path.getsize(os.path.join(self.directory, name))))
+            except OSError:
+                continue
+        total = sum(size for _, size in sizes)
+        if total <= self.max_bytes:
+            return
+        
+        # 文件名以毫秒时间戳开头，按名称排序即按时间排序
+        for name, size in sorted(sizes):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+        self._compact_index()
+    
+    def _compact_index(self):
+        """
+        去掉文件已被删除的索引记录
+        
+        其他进程在读取和替换之间追加的记录可能丢失，索引只用于查找，不影响文件本身
+        """
+        path = os.path.join(self.directory, INDEX_FILENAME)
+        existing = set(os.listdir(self.directory))
+        kept: List[str] = []
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        files = json.loads(line).get("files", [])
+                    except ValueError:
+                        continue
+                    if any(name in existing for name in files):
+                        kept.append(line)
+        except OSError:
+            return
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+        os.replace(tmp_path, path)
+    
+    def flush(self):
+        """等待后台写入完成"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+
+# 进程内共用的调试信息保存
+debug_capture = DebugCapture()
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""
+爬取队列模块，提供持久化的优先级队列和详情页ID去重集合
+"""
+import os
+import time
+import sqlite3
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from core.models import MovieRecord
+from config.logging_config import setup_logger
+
+# 创建日志记录器
+logger = setup_logger('frontier')
+
+# 队列条目状态
+STATE_PENDING = 0
+STATE_IN_PROGRESS = 1
+STATE_DONE = 2
+STATE_FAILED = 3
+
+class SubjectSeenSet:
+    """
+    详情页ID去重集合
+    
+    豆瓣详情页ID是连续的整数，用位图记录（每个ID一位），
+    4000万个ID只占约5MB，内存占用与已见数量无关
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        """
+        初始化去重集合，文件存在时加载
+        
+        Args:
+            path: 持久化文件路径，None表示只保存在内存中
+        """
+        self.path = path
+        self.bits = bytearray()
+        self.count = 0
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                self.bits = bytearray(f.read())
+            self.count = bin(int.from_bytes(self.bits, "little")).count("1")
+            logger.info(f"已加载去重集合: {self.count} 个ID，{len(self.bits) // 1024} KB")
+    
+    def __contains__(self, subject_id: int) -> bool:
+        index = subject_id >> 3
+        return index < len(self.bits) and bool(self.bits[index] & (1 << (subject_id & 7)))
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def add(self, subject_id: int) -> bool:
+        """
+        添加ID
+        
+        Args:
+            subject_id: 详情页ID
+        
+        Returns:
+            是否为新ID
+        """
+        index = subject_id >> 3
+        if index >= len(self.bits):
+            # 按需扩容，多预留一些空间减少扩容次数
+            self.bits.extend(bytes(index - len(self.bits) + 1 + (1 << 16)))
+        mask = 1 << (subject_id & 7)
+        if self.bits[index] & mask:
+            return False
+        self.bits[index] |= mask
+        self.count += 1
+        return True
+    
+    def save(self):
+        """原子写入位图文件"""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.bits.rstrip(b"\x00"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+class CrawlFrontier:
+    """
+    基于SQLite的持久化优先级队列
+    
+    优先级高的先出队，同优先级按加入顺序。爬取结果保存在同一数据库中，
+    与队列状态在同一事务中提交。写操作不立即提交，由 commit 统一提交，减少磁盘同步次数
+    """
+    
+    def __init__(self, path: str):
+        """
+        打开或创建队列数据库
+        
+        Args:
+            path: 数据库文件路径
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                url TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                priority REAL NOT NULL,
+                depth INTEGER NOT NULL DEFAULT 0,
+                state INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                added_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_frontier_pending ON frontier (state, priority DESC, added_at)"
+        )
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS subjects (
+                subject_id INTEGER PRIMARY KEY,
+                title TEXT,
+                data TEXT NOT NULL,
+                crawled_at REAL NOT NULL
+            )
+        """)
+        # 上次中断时正在处理的条目重新放回队列
+        recovered = self.conn.execute(
+            "UPDATE frontier SET state = ? WHERE state = ?", (STATE_PENDING, STATE_IN_PROGRESS)
+        ).rowcount
+        self.conn.commit()
+        if recovered:
+            logger.info(f"恢复了 {recovered} 个未完成的队列条目")
+    
+    def push(self, url: str, kind: str, priority: float, depth: int = 0) -> bool:
+        """
+        加入队列，已存在的URL忽略
+        
+        Args:
+            url: 页面地址
+            kind: 页面类型，"list" 或 "subject"
+            priority: 优先级，越大越先处理
+            depth: 发现深度
+        
+        Returns:
+            是否为新条目
+        """
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO frontier (url, kind, priority, depth, added_at) VALUES (?, ?, ?, ?, ?)",
+            (url, kind, priority, depth, time.time())
+        )
+        return cursor.rowcount > 0
+    
+    def push_many(self, items: Iterable[Tuple[str, str, float, int]]) -> int:
+        """
+        批量加入队列
+        
+        Args:
+            items: (url, kind, priority, depth) 列表
+        
+        Returns:
+            新加入的条目数
+        """
+        now = time.time()
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO frontier (url, kind, priority, depth, added_at) VALUES (?, ?, ?, ?, ?)",
+            [(url, kind, priority, depth, now) for url, kind, priority, depth in items]
+        )
+        return self.conn.total_changes - before
+    
+    def pop(self) -> Optional[Tuple[str, str, int]]:
+        """
+        取出优先级最高的待处理条目，并标记为处理中
+        
+        Returns:
+            (url, kind, depth)，队列为空返回None
+        """
+        row = self.conn.execute(
+            "SELECT url, kind, depth FROM frontier WHERE state = ? ORDER BY priority DESC, added_at, rowid LIMIT 1",
+            (STATE_PENDING,)
+        ).fetchone()
+        if row is None:
+            return None
+        self.conn.execute(
+            "UPDATE frontier SET state = ?, attempts = attempts + 1 WHERE url = ?", (STATE_IN_PROGRESS, row[0])
+        )
+        return row[0], row[1], row[2]
+    
+    def complete(self, url: str):
+        """标记条目处理完成"""
+        self.conn.execute("UPDATE frontier SET state = ? WHERE url = ?", (STATE_DONE, url))
+    
+    def fail(self, url: str, max_attempts: int = 3):
+        """
+        标记条目处理失败，未超过最大尝试次数时降低优先级重新排队
+        
+        Args:
+            url: 页面地址
+            max_attempts: 最大尝试次数
+        """
+        self.conn.execute(
+            "UPDATE frontier SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, priority = priority - 1 "
+            "WHERE url = ?",
+            (max_attempts, STATE_FAILED, STATE_PENDING, url)
+        )
+    
+    def release(self, url: str):
+        """
+        把处理中的条目原样放回队列，不计入尝试次数（用于被反爬拦截等与条目本身无关的失败）
+        
+        Args:
+            url: 页面地址
+        """
+        self.conn.execute(
+            "UPDATE frontier SET state = ?, attempts = MAX(attempts - 1, 0) WHERE url = ? AND state = ?",
+            (STATE_PENDING, url, STATE_IN_PROGRESS)
+        )
+    
+    def store_subject(self, subject_id: int, movie_data: Dict):
+        """
+        保存爬取到的影视数据
+        
+        Args:
+            subject_id: 详情页ID
+            movie_data: 影视数据，MovieRecord 或字典
+        """
+        self.conn.execute(
+            "INSERT OR REPLACE INTO subjects (subject_id, title, data, crawled_at) VALUES (?, ?, ?, ?)",
+            (subject_id, movie_data.get("title"), MovieRecord.coerce(movie_data).to_json(), time.time())
+        )
+    
+    def iter_subjects(self) -> Iterator[MovieRecord]:
+        """按ID顺序遍历已保存的影视数据，兼容没有版本号的旧数据"""
+        for subject_id, data in self.conn.execute("SELECT subject_id, data FROM subjects ORDER BY subject_id"):
+            movie_data = MovieRecord.from_json(data)
+            movie_data["subject_id"] = subject_id
+            yield movie_data
+    
+    def stats(self) -> Dict[str, int]:
+        """各状态的条目数和已保存的影视数"""
+        names = {STATE_PENDING: "pending", STATE_IN_PROGRESS: "in_progress", STATE_DONE: "done", STATE_FAILED: "failed"}
+        result = {name: 0 for name in names.values()}
+        for state, count in self.conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state"):
+            result[names.get(state, str(state))] = count
+        result["subjects"] = self.conn.execute("SELECT COUNT(*) FROM subjects").fetchone()[0]
+        return result
+    
+    def commit(self):
+        """提交未保存的修改"""
+        self.conn.commit()
+    
+    def close(self):
+        """提交并关闭数据库"""
+        self.conn.commit()
+        self.conn.close()
\ No newline at end of file
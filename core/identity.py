@@ -0,0 +1,285 @@
+"""
+访问身份池模块，每个身份由一组Cookie、User-Agent和代理组成，按健康度轮换使用
+"""
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+from core.antibot import AntiBotBlocked
+from core.concurrency import OUTCOME_OK, OUTCOME_BLOCKED
+from config.logging_config import setup_logger
+from config.settings import (
+    IDENTITY_FILE,
+    IDENTITY_COOLDOWN,
+    IDENTITY_MIN_SCORE,
+    ANTIBOT_COOLDOWN_MAX,
+    CONCURRENCY_LATENCY_TARGET
+)
+
+# 创建日志记录器
+logger = setup_logger('identity')
+
+# 未配置身份文件时使用的身份名，对应浏览器默认的上下文
+DEFAULT_IDENTITY = "default"
+
+# 健康度统计的平滑系数，越大越看重最近的结果
+HEALTH_DECAY = 0.2
+
+def parse_cookie_string(cookie_string: str, domain: str = ".douban.com") -> List[Dict[str, str]]:
+    """
+    把浏览器中复制的Cookie请求头转换为Playwright的Cookie列表
+    
+    Args:
+        cookie_string: 形如 "bid=xxx; ll=yyy" 的Cookie字符串
+        domain: Cookie所属域名
+    
+    Returns:
+        Cookie列表
+    """
+    cookies = []
+    for item in cookie_string.split(";"):
+        name, sep, value = item.strip().partition("=")
+        if sep and name:
+            cookies.append({"name": name, "value": value, "domain": domain, "path": "/"})
+    return cookies
+
+class Identity:
+    """一个访问身份及其健康度统计"""
+    
+    def __init__(self,
+                 name: str,
+                 cookies: Optional[List[Dict[str, str]]] = None,
+                 user_agent: Optional[str] = None,
+                 proxy: Optional[str] = None):
+        """
+        初始化身份
+        
+        Args:
+            name: 身份名称，同一个池中唯一
+            cookies: Cookie列表，None表示使用浏览器默认Cookie
+            user_agent: User-Agent，None表示使用浏览器默认值
+            proxy: 代理地址，如 "http://127.0.0.1:8080"，None表示直连
+        """
+        self.name = name
+        self.cookies = cookies
+        self.user_agent = user_agent
+        self.proxy = proxy
+        
+        self.in_use = 0
+        self.last_used = 0.0
+        self.success_rate = 1.0
+        self.latency = 0.0
+        self.requests = 0
+        self.blocks = 0
+        self.strikes = 0
+        self.cooldown_until = 0.0
+    
+    @property
+    def uses_default_context(self) -> bool:
+        """没有任何自定义设置时直接使用浏览器默认的上下文"""
+        return self.cookies is None and self.user_agent is None and self.proxy is None
+    
+    def score(self, latency_target: float = CONCURRENCY_LATENCY_TARGET) -> float:
+        """
+        健康度：成功率按平均耗时打折，耗时等于目标值时打五折
+        
+        Args:
+            latency_target: 导航耗时目标(秒)
+        
+        Returns:
+            0到1之间的分数
+        """
+        return self.success_rate / (1.0 + self.latency / max(latency_target, 0.001))
+    
+    def cooldown_remaining(self, now: Optional[float] = None) -> float:
+        """距离冷却结束的秒数"""
+        return max(0.0, self.cooldown_until - (time.monotonic() if now is None else now))
+    
+    def __repr__(self) -> str:
+        return f"Identity({self.name})"
+
+def load_identities(path: str) -> List[Identity]:
+    """
+    从JSON文件读取身份列表
+    
+    文件内容为数组，每项包含 name 以及可选的 cookies（Cookie字符串或Playwright
+    Cookie列表）、user_agent、proxy
+    
+    Args:
+        path: 身份文件路径，为空时返回只含默认身份的列表
+    
+    Returns:
+        身份列表
+    
+    Raises:
+        ValueError: 文件格式错误或身份名重复
+    """
+    if not path:
+        return [Identity(DEFAULT_IDENTITY)]
+    
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"身份文件 {path} 应为非空数组")
+    
+    identities = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"身份文件 {path} 第 {index + 1} 项不是对象")
+        cookies = entry.get("cookies")
+        if isinstance(cookies, str):
+            cookies = parse_cookie_string(cookies)
+        identities.append(Identity(
+            str(entry.get("name") or f"identity-{index + 1}"),
+            cookies=cookies,
+            user_agent=entry.get("user_agent"),
+            proxy=entry.get("proxy")
+        ))
+    
+    names = [identity.name for identity in identities]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"身份文件 {path} 中的身份名重复: {', '.join(duplicates)}")
+    return identities
+
+class IdentityPool:
+    """
+    身份池
+    
+    - 每次导航租用一个身份：跳过冷却中的身份，优先健康度达标的身份，
+      其中正在使用的页面最少、最久未使用的优先；健康度低的身份定期试用
+    - 归还时记录结果和耗时，更新成功率和平均耗时
+    - 被拦截的身份进入冷却，连续被拦截时冷却时间加倍；冷却结束后第一次成功会重置加倍
+    所有身份都在冷却中时租用直接抛出 AntiBotBlocked。可以被多个线程中的事件循环共用
+    """
+    
+    def __init__(self,
+                 identities: List[Identity],
+                 cooldown: float = IDENTITY_COOLDOWN,
+                 max_cooldown: float = ANTIBOT_COOLDOWN_MAX,
+                 min_score: float = IDENTITY_MIN_SCORE):
+        """
+        初始化身份池
+        
+        Args:
+            identities: 身份列表
+            cooldown: 身份第一次被拦截后的冷却时间(秒)
+            max_cooldown: 冷却时间上限(秒)
+            min_score: 健康度低于该值的身份只在没有其他可用身份或距上次使用超过 cooldown 秒时使用
+        """
+        if not identities:
+            raise ValueError("身份池不能为空")
+        self.identities = identities
+        self.cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self.min_score = min_score
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self.identities)
+    
+    def acquire(self, url: str = "") -> Identity:
+        """
+        租用一个身份，用完后必须调用 release
+        
+        Args:
+            url: 即将访问的地址，仅用于异常信息
+        
+        Returns:
+            身份
+        
+        Raises:
+            AntiBotBlocked: 所有身份都在冷却中
+        """
+        now = time.monotonic()
+        with self._lock:
+            available = [identity for identity in self.identities if identity.cooldown_until <= now]
+            if not available:
+                retry_after = min(identity.cooldown_remaining(now) for identity in self.identities)
+                raise AntiBotBlocked(url, "所有身份都在冷却中", retry_after)
+            # 健康度低的身份每隔 cooldown 秒才试用一次，恢复后重新参与轮换
+            identity = min(available, key=lambda item: (
+                item.score() < self.min_score and now - item.last_used < self.cooldown,
+                item.in_use,
+                item.last_used
+            ))
+            identity.in_use += 1
+            identity.last_used = now
+        return identity
+    
+    def release(self, identity: Identity, outcome: Optional[str], latency: float = 0.0) -> float:
+        """
+        归还身份并记录结果
+        
+        Args:
+            identity: acquire 返回的身份
+            outcome: core.concurrency 中的 OUTCOME_* 之一，None表示没有发出请求，不计入健康度
+            latency: 导航耗时(秒)
+        
+        Returns:
+            被拦截时返回该身份的冷却秒数，否则为0
+        """
+        now = time.monotonic()
+        seconds = 0.0
+        with self._lock:
+            identity.in_use = max(0, identity.in_use - 1)
+            if outcome is None:
+                return 0.0
+            identity.requests += 1
+            succeeded = 1.0 if outcome == OUTCOME_OK else 0.0
+            identity.success_rate += HEALTH_DECAY * (succeeded - identity.success_rate)
+            if outcome == OUTCOME_OK:
+                identity.latency += HEALTH_DECAY * (latency - identity.latency)
+                if identity.cooldown_until <= now:
+                    identity.strikes = 0
+            elif outcome == OUTCOME_BLOCKED:
+                identity.blocks += 1
+                # 冷却期间发出的请求陆续返回时不重复加倍
+                if identity.cooldown_until > now:
+                    return identity.cooldown_until - now
+                identity.strikes += 1
+                seconds = min(self.max_cooldown, self.cooldown * 2 ** (identity.strikes - 1))
+                identity.cooldown_until = now + seconds
+        if seconds:
+            logger.warning(f"身份 {identity.name} 被拦截，第 {identity.strikes} 次，冷却 {seconds:.0f} 秒")
+        return seconds
+    
+    def available_count(self) -> int:
+        """不在冷却中的身份数"""
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for identity in self.identities if identity.cooldown_until <= now)
+    
+    def next_available_in(self) -> float:
+        """最早结束冷却的身份还需等待的秒数，有可用身份时为0"""
+        now = time.monotonic()
+        with self._lock:
+            return min(identity.cooldown_remaining(now) for identity in self.identities)
+    
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        当前状态，不包含Cookie
+        
+        Returns:
+            每个身份的代理、健康度、耗时、使用情况和冷却时间
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "name": identity.name,
+                    "proxy": identity.proxy,
+                    "score": round(identity.score(), 3),
+                    "success_rate": round(identity.success_rate, 3),
+                    "latency": round(identity.latency, 3),
+                    "requests": identity.requests,
+                    "blocks": identity.blocks,
+                    "in_use": identity.in_use,
+                    "cooldown": round(identity.cooldown_remaining(now), 1),
+                }
+                for identity in self.identities
+            ]
+
+# 进程内共用的身份池，未配置 IDENTITY_FILE 时只有一个默认身份
+identity_pool = IdentityPool(load_identities(IDENTITY_FILE))
\ No newline at end of file
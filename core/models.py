@@ -0,0 +1,306 @@
+"""
+影视数据模型，提供紧凑的 MovieRecord 和 Person，以及带版本号的JSON和二进制序列化
+"""
+import json
+import marshal
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+# 序列化格式版本，格式变化时加一，读取时拒绝更新的版本
+RECORD_VERSION = 1
+
+# JSON中的版本号键
+VERSION_KEY = "_version"
+
+# 二进制格式的文件头，后接一个字节的版本号
+BINARY_MAGIC = b"MR"
+
+# marshal格式版本，固定后不随Python版本变化
+MARSHAL_VERSION = 4
+
+# 影视数据的字段，顺序即二进制格式中的顺序，新增字段只能追加在末尾
+MOVIE_FIELDS = (
+    "url",
+    "title",
+    "directors",
+    "screenwriters",
+    "actors",
+    "genres",
+    "languages",
+    "rating",
+    "votes",
+    "imdb_id",
+    "release_date",
+    "summary",
+    "aka",
+    "category",
+    "cover_url",
+)
+
+# 人员列表字段
+PEOPLE_FIELDS = frozenset(("directors", "screenwriters", "actors"))
+
+# 字符串列表字段
+TAG_FIELDS = frozenset(("genres", "languages"))
+
+_FIELD_SET = frozenset(MOVIE_FIELDS)
+
+class Person:
+    """导演、编剧或演员"""
+    
+    __slots__ = ("name", "url")
+    
+    def __init__(self, name: str, url: Optional[str] = None):
+        """
+        Args:
+            name: 姓名
+            url: 豆瓣人物页地址
+        """
+        self.name = name
+        self.url = url
+    
+    @classmethod
+    def from_value(cls, value: Union["Person", Dict[str, Any], str]) -> "Person":
+        """
+        从 Person、{"name", "url"} 字典或旧格式的姓名字符串创建
+        
+        Args:
+            value: 人员数据
+        
+        Returns:
+            Person，传入 Person 时原样返回
+        """
+        if isinstance(value, Person):
+            return value
+        if isinstance(value, Mapping):
+            return cls(value.get("name") or "", value.get("url"))
+        return cls(str(value))
+    
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        """转换为 {"name", "url"} 字典"""
+        return {"name": self.name, "url": self.url}
+    
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Person):
+            return self.name == other.name and self.url == other.url
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+    
+    def __hash__(self) -> int:
+        return hash((self.name, self.url))
+    
+    def __repr__(self) -> str:
+        return f"Person({self.name!r}, {self.url!r})"
+
+class MovieRecord(MutableMapping):
+    """
+    一部影视的数据
+    
+    字段保存在 __slots__ 中，比字典占用的内存少；同时实现了映射接口，
+    record["title"]、record.get("rating")、"rating" in record 与原来的字典用法一致。
+    只提取了部分字段时，未提取的字段不存在（不在 in 判断中，也不会序列化），
+    与值为None的字段不同。人员字段总是 Person 列表，其他键保存在附加字段中
+    """
+    
+    __slots__ = MOVIE_FIELDS + ("_extra",)
+    
+    def __init__(self, data: Optional[Mapping] = None, **fields: Any):
+        """
+        Args:
+            data: 影视数据字典，人员可以是 Person、字典或姓名字符串
+            fields: 其他字段，覆盖 data 中的同名字段
+        """
+        if data:
+            self.update(data)
+        if fields:
+            self.update(fields)
+    
+    @classmethod
+    def coerce(cls, data: Mapping) -> "MovieRecord":
+        """
+        转换为 MovieRecord，已经是 MovieRecord 时原样返回
+        
+        Args:
+            data: MovieRecord 或影视数据字典
+        
+        Returns:
+            MovieRecord
+        """
+        return data if isinstance(data, MovieRecord) else cls(data)
+    
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        try:
+            return self._extra[key]
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def __setitem__(self, key: str, value: Any):
+        if key in PEOPLE_FIELDS:
+            value = [Person.from_value(person) for person in value or ()]
+        elif key in TAG_FIELDS:
+            value = list(value or ())
+        elif key not in _FIELD_SET:
+            if key == VERSION_KEY:
+                return
+            try:
+                self._extra[key] = value
+            except AttributeError:
+                self._extra = {key: value}
+            return
+        setattr(self, key, value)
+    
+    def __delitem__(self, key: str):
+        try:
+            if key in _FIELD_SET:
+                delattr(self, key)
+            else:
+                del self._extra[key]
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def __contains__(self, key: object) -> bool:
+        if key in _FIELD_SET:
+            return hasattr(self, key)
+        return key in getattr(self, "_extra", ())
+    
+    def __iter__(self) -> Iterator[str]:
+        for field in MOVIE_FIELDS:
+            if hasattr(self, field):
+                yield field
+        yield from getattr(self, "_extra", ())
+    
+    def __len__(self) -> int:
+        return sum(1 for field in MOVIE_FIELDS if hasattr(self, field)) + len(getattr(self, "_extra", ()))
+    
+    def __repr__(self) -> str:
+        return f"MovieRecord({dict(self.items())!r})"
+    
+    def __reduce__(self):
+        # 进程间传递（如多进程抓取的结果队列）时使用紧凑的二进制格式
+        return MovieRecord.from_bytes, (self.to_bytes(),)
+    
+    def copy(self) -> "MovieRecord":
+        """浅复制，列表字段另行复制"""
+        return MovieRecord(self)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为普通字典，人员转换为 {"name", "url"} 字典
+        
+        Returns:
+            与原来的影视数据字典格式相同的字典
+        """
+        data: Dict[str, Any] = {}
+        for key, value in self.items():
+            if key in PEOPLE_FIELDS:
+                value = [person.to_dict() for person in value]
+            elif key in TAG_FIELDS:
+                value = list(value)
+            data[key] = value
+        return data
+    
+    def to_json(self) -> str:
+        """
+        序列化为带版本号的JSON
+        
+        Returns:
+            JSON文本，旧版本的读取方可以忽略 _version 键按字典使用
+        """
+        data = self.to_dict()
+        data[VERSION_KEY] = RECORD_VERSION
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    
+    @classmethod
+    def from_json(cls, text: Union[str, bytes]) -> "MovieRecord":
+        """
+        从JSON读取，兼容没有版本号的旧数据
+        
+        Args:
+            text: JSON文本
+        
+        Returns:
+            MovieRecord
+        
+        Raises:
+            ValueError: JSON无效或版本比当前程序新
+        """
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError("影视数据必须是JSON对象")
+        if data.get(VERSION_KEY, RECORD_VERSION) > RECORD_VERSION:
+            raise ValueError(f"不支持的影视数据版本: {data[VERSION_KEY]}")
+        return cls(data)
+    
+    def to_bytes(self) -> bytes:
+        """
+        序列化为紧凑的二进制格式
+        
+        格式为 MR + 版本号 + marshal数据，marshal数据为
+        (字段存在位图, 存在的字段值, 附加字段)，人员为 (姓名, 地址) 元组。
+        marshal只包含基本类型，读取时不会执行代码
+        
+        Returns:
+            二进制数据
+        
+        Raises:
+            ValueError: 附加字段中有无法序列化的值
+        """
+        mask = 0
+        values: List[Any] = []
+        for index, field in enumerate(MOVIE_FIELDS):
+            try:
+                value = getattr(self, field)
+            except AttributeError:
+                continue
+            mask |= 1 << index
+            if field in PEOPLE_FIELDS:
+                value = tuple((person.name, person.url) for person in value)
+            elif field in TAG_FIELDS:
+                value = tuple(value)
+            values.append(value)
+        extra = getattr(self, "_extra", None)
+        return BINARY_MAGIC + bytes((RECORD_VERSION,)) + marshal.dumps((mask, tuple(values), extra), MARSHAL_VERSION)
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "MovieRecord":
+        """
+        从二进制格式读取
+        
+        Args:
+            data: to_bytes 的输出
+        
+        Returns:
+            MovieRecord
+        
+        Raises:
+            ValueError: 数据格式无效或版本比当前程序新
+        """
+        if data[:2] != BINARY_MAGIC or len(data) < 3:
+            raise ValueError("不是影视数据的二进制格式")
+        if data[2] > RECORD_VERSION:
+            raise ValueError(f"不支持的影视数据版本: {data[2]}")
+        try:
+            mask, values, extra = marshal.loads(data[3:])
+        except (EOFError, TypeError, ValueError) as e:
+            raise ValueError(f"影视数据已损坏: {e}") from None
+        
+        record = cls()
+        value_iter = iter(values)
+        for index, field in enumerate(MOVIE_FIELDS):
+            if not mask & (1 << index):
+                continue
+            value = next(value_iter)
+            if field in PEOPLE_FIELDS:
+                value = [Person(name, url) for name, url in value]
+            elif field in TAG_FIELDS:
+                value = list(value)
+            setattr(record, field, value)
+        if extra:
+            record._extra = extra
+        return record
\ No newline at end of file
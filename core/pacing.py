@@ -0,0 +1,128 @@
+"""
+请求节奏控制模块，按站点用令牌桶控制请求间隔，取代各处固定的随机等待
+"""
+import time
+import random
+import asyncio
+import threading
+from typing import Any, Dict, List
+
+from core.utils import site_key
+from config.logging_config import setup_logger
+from config.settings import PACING_INTERVAL, PACING_BURST, PACING_JITTER
+
+# 创建日志记录器
+logger = setup_logger('pacing')
+
+class _Bucket:
+    """单个站点的令牌桶状态"""
+    
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+        self.requests = 0
+        self.delayed = 0
+        self.total_delay = 0.0
+
+class PacingScheduler:
+    """
+    按站点的请求节奏控制
+    
+    每个站点一个令牌桶，平均每 interval 秒补充一个令牌，最多积累 burst 个。
+    有令牌时请求立即发出；请求过于密集时等待到下一个令牌，并加上最多
+    jitter * interval 的随机间隔，避免请求间隔过于规整。
+    等待中的请求预先占用令牌，并发请求依次排开而不是同时醒来。
+    interval 为0时不等待，用于本地替身服务器等基准测试。
+    可以被多个线程中的事件循环共用
+    """
+    
+    def __init__(self,
+                 interval: float = PACING_INTERVAL,
+                 burst: int = PACING_BURST,
+                 jitter: float = PACING_JITTER):
+        """
+        初始化节奏控制
+        
+        Args:
+            interval: 同一站点两次请求的平均间隔(秒)，0表示不限制
+            burst: 空闲后允许连续发出的请求数
+            jitter: 需要等待时附加的随机间隔，占 interval 的比例
+        """
+        self.interval = max(0.0, interval)
+        self.burst = max(1, burst)
+        self.jitter = max(0.0, jitter)
+        self._buckets: Dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self) -> bool:
+        """是否限制请求间隔"""
+        return self.interval > 0
+    
+    def reserve(self, url: str, scope: str = "") -> float:
+        """
+        为一次请求占用令牌
+        
+        Args:
+            url: 即将请求的地址
+            scope: 同一站点下独立计算间隔的范围，如访问身份名；为空时整个站点共用
+        
+        Returns:
+            发出请求前需要等待的秒数
+        """
+        if not self.enabled:
+            return 0.0
+        
+        key = f"{site_key(url)}@{scope}" if scope else site_key(url)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(float(self.burst), now)
+            bucket.tokens = min(float(self.burst), bucket.tokens + (now - bucket.updated) / self.interval)
+            bucket.updated = now
+            bucket.tokens -= 1.0
+            bucket.requests += 1
+            if bucket.tokens >= 0:
+                return 0.0
+            
+            # 令牌为负表示前面已有请求在排队，等待时间随之顺延
+            delay = -bucket.tokens * self.interval + random.uniform(0.0, self.jitter * self.interval)
+            bucket.delayed += 1
+            bucket.total_delay += delay
+        return delay
+    
+    async def wait(self, url: str, scope: str = ""):
+        """
+        等待到允许请求该站点为止
+        
+        Args:
+            url: 即将请求的地址
+            scope: 同一站点下独立计算间隔的范围，见 reserve
+        """
+        delay = self.reserve(url, scope)
+        if delay > 0:
+            logger.debug(f"请求 {url} 前等待 {delay:.2f} 秒")
+            await asyncio.sleep(delay)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        当前状态
+        
+        Returns:
+            配置和按站点的请求数、等待次数、累计等待时间
+        """
+        with self._lock:
+            sites: List[Dict[str, Any]] = [
+                {
+                    "site": key,
+                    "requests": bucket.requests,
+                    "delayed": bucket.delayed,
+                    "total_delay": round(bucket.total_delay, 2),
+                }
+                for key, bucket in self._buckets.items()
+            ]
+        return {"interval": self.interval, "burst": self.burst, "jitter": self.jitter, "sites": sites}
+
+# 进程内共用的豆瓣请求节奏控制
+navigation_pacer = PacingScheduler()
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+浏览器存储状态持久化模块，按上下文保存Cookie和localStorage，重启后恢复已预热的会话
+"""
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from core.utils import atomic_write_json, read_json
+from config.logging_config import setup_logger
+from config.settings import STORAGE_STATE_DIR, STORAGE_STATE_MAX_AGE
+
+# 创建日志记录器
+logger = setup_logger('storage_state')
+
+# 存储文件格式版本，格式变化时旧文件直接忽略
+STORAGE_STATE_VERSION = 1
+
+# 文件名中不允许的字符
+UNSAFE_NAME_PATTERN = re.compile(r"[^\w.-]")
+
+def drop_expired_cookies(cookies: List[Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    去掉已过期的Cookie，会话Cookie（expires为-1）保留
+    
+    Args:
+        cookies: Playwright存储状态中的Cookie列表
+        now: 当前时间戳，默认为当前时间
+    
+    Returns:
+        未过期的Cookie列表
+    """
+    now = time.time() if now is None else now
+    return [cookie for cookie in cookies if not 0 < cookie.get("expires", -1) <= now]
+
+def merge_cookies(state: Dict[str, Any], cookies: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    找出存储状态中没有的配置Cookie，已保存的Cookie是豆瓣刷新过的值，不应被配置中的旧值覆盖
+    
+    Args:
+        state: Playwright存储状态
+        cookies: 配置中的Cookie列表
+    
+    Returns:
+        需要额外添加的Cookie
+    """
+    saved = {(cookie.get("name"), cookie.get("domain", "").lstrip(".")) for cookie in state.get("cookies", [])}
+    return [
+        cookie for cookie in cookies
+        if (cookie.get("name"), cookie.get("domain", "").lstrip(".")) not in saved
+    ]
+
+class StorageStateStore:
+    """
+    按名称保存浏览器上下文的存储状态（Cookie和localStorage）
+    
+    每个名称一个JSON文件，原子写入；超过 max_age 未更新的文件和已过期的Cookie
+    在读取时丢弃
+    """
+    
+    def __init__(self, directory: str = STORAGE_STATE_DIR, max_age: float = STORAGE_STATE_MAX_AGE):
+        """
+        初始化存储
+        
+        Args:
+            directory: 保存目录，为空时不读写
+            max_age: 存储状态的有效期(秒)
+        """
+        self.directory = directory
+        self.max_age = max_age
+    
+    @property
+    def enabled(self) -> bool:
+        """是否保存存储状态"""
+        return bool(self.directory)
+    
+    def path(self, name: str) -> str:
+        """
+        存储文件路径
+        
+        Args:
+            name: 上下文名称
+        
+        Returns:
+            文件路径
+        """
+        return os.path.join(self.directory, UNSAFE_NAME_PATTERN.sub("_", name) + ".json")
+    
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        读取存储状态
+        
+        Args:
+            name: 上下文名称
+        
+        Returns:
+            可直接传给 new_context(storage_state=...) 的存储状态，不存在、损坏或已过期时返回None
+        """
+        if not self.enabled:
+            return None
+        data = read_json(self.path(name))
+        if not isinstance(data, dict) or data.get("version") != STORAGE_STATE_VERSION:
+            return None
+        age = time.time() - data.get("saved_at", 0)
+        if age > self.max_age:
+            logger.info(f"{name} 的存储状态已保存 {age / 3600:.1f} 小时，超过有效期，不再使用")
+            return None
+        state = data.get("state") or {}
+        return {
+            "cookies": drop_expired_cookies(state.get("cookies", [])),
+            "origins": state.get("origins", [])
+        }
+    
+    def save(self, name: str, state: Dict[str, Any]):
+        """
+        原子写入存储状态，失败时只记录日志
+        
+        Args:
+            name: 上下文名称
+            state: context.storage_state() 的返回值
+        """
+        if not self.enabled:
+            return
+        try:
+            atomic_write_json(self.path(name), {
+                "version": STORAGE_STATE_VERSION,
+                "saved_at": time.time(),
+                "state": state
+            })
+        except OSError as e:
+            logger.warning(f"保存 {name} 的存储状态失败: {e}")
\ No newline at end of file
@@ -1,10 +1,15 @@
 """
 通用工具函数模块
 """
+import os
 import re
+import json
 import time
 import random
+import tempfile
+import ipaddress
 from typing import List, Dict, Any, Optional
+from urllib.parse import urlsplit
 
 def clean_text(text: str) -> str:
     """
@@ -80,4 +85,68 @@ def extract_year(text: str) -> Optional[str]:
     match = re.search(r'\((\d{4})\)', text)
     if match:
         return match.group(1)
-    return None 
\ No newline at end of file
+    return None
+
+def atomic_write_json(path: str, data: Any):
+    """
+    原子写入JSON文件，先写临时文件再替换，中途中断不会留下损坏的文件
+    
+    Args:
+        path: 文件路径
+        data: 要写入的数据
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # 每次写入使用唯一的临时文件，同一进程的多个线程或多个进程写同一文件时互不干扰，最后替换的一方生效
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def read_json(path: str, default: Any = None) -> Any:
+    """
+    读取JSON文件，文件不存在或内容损坏时返回默认值
+    
+    Args:
+        path: 文件路径
+        default: 默认值
+        
+    Returns:
+        读取的数据
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def site_key(url: str) -> str:
+    """
+    按站点归并地址，豆瓣按IP限制访问，search、movie等子域名算作同一站点
+    
+    Args:
+        url: 请求地址
+        
+    Returns:
+        主域名，IP地址或本地主机名原样返回（含端口）
+    """
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    try:
+        ipaddress.ip_address(host)
+        return parts.netloc
+    except ValueError:
+        pass
+    labels = host.split(".")
+    if len(labels) < 2:
+        return parts.netloc
+    return ".".join(labels[-2:])
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+豆瓣目录爬取程序，从标签页和Top250出发建立本地影视目录
+"""
+import os
+import sys
+import asyncio
+import argparse
+from typing import List
+
+from config.logging_config import setup_logger
+from config.settings import DOUBAN_COOKIES, CRAWL_STATE_DIR, CRAWL_HOST_INTERVAL
+
+# 创建日志记录器
+logger = setup_logger("crawl")
+
+async def crawl(seeds: List[str], state_dir: str, concurrency: int, max_depth: int,
+                max_subjects: int, host_interval: float):
+    """
+    运行目录爬取
+    
+    Args:
+        seeds: 起始列表页地址
+        state_dir: 进度保存目录
+        concurrency: 并发任务数
+        max_depth: 沿推荐链接发现的最大深度
+        max_subjects: 本次最多抓取的详情页数量
+        host_interval: 同一域名的最小请求间隔(秒)
+    """
+    from core.browser import PlaywrightBrowser
+    from scrapers.douban_crawler import DoubanCrawler
+    
+    browser = PlaywrightBrowser(headless=True, cookies=DOUBAN_COOKIES)
+    crawler = DoubanCrawler(browser, state_dir, host_interval=host_interval, max_depth=max_depth)
+    try:
+        added = crawler.add_seeds(seeds)
+        logger.info(f"加入 {added} 个新的起始页，队列状态: {crawler.frontier.stats()}")
+        await browser.init_browser()
+        stats = await crawler.run(concurrency, max_subjects)
+        logger.info(f"爬取结束: {stats}")
+    finally:
+        await browser.close()
+        crawler.close()
+
+def export_catalogue(state_dir: str, output: str) -> int:
+    """
+    将已抓取的影视数据导出为JSON Lines文件
+    
+    Args:
+        state_dir: 进度保存目录
+        output: 输出文件路径
+    
+    Returns:
+        导出的数量
+    """
+    from core.frontier import CrawlFrontier
+    
+    frontier = CrawlFrontier(os.path.join(state_dir, "frontier.db"))
+    count = 0
+    try:
+        with open(output, "w", encoding="utf-8") as f:
+            for movie_data in frontier.iter_subjects():
+                f.write(movie_data.to_json() + "\n")
+                count += 1
+    finally:
+        frontier.close()
+    return count
+
+def main():
+    """程序主入口"""
+    parser = argparse.ArgumentParser(description="豆瓣目录爬取")
+    parser.add_argument("--top250", action="store_true", help="从Top250榜单开始")
+    parser.add_argument("--tag", action="append", default=[], help="从指定标签页开始，可多次指定")
+    parser.add_argument("--seed", action="append", default=[], help="其他起始列表页地址，可多次指定")
+    parser.add_argument("--state-dir", type=str, default=CRAWL_STATE_DIR, help="进度保存目录")
+    parser.add_argument("--concurrency", type=int, default=2, help="并发任务数")
+    parser.add_argument("--max-depth", type=int, default=1, help="沿推荐链接发现详情页的最大深度")
+    parser.add_argument("--max-subjects", type=int, default=None, help="本次最多抓取的详情页数量")
+    parser.add_argument("--host-interval", type=float, default=CRAWL_HOST_INTERVAL, help="同一域名的最小请求间隔(秒)")
+    parser.add_argument("--export", type=str, help="只导出已抓取的数据到JSON Lines文件")
+    args = parser.parse_args()
+    
+    if args.export:
+        count = export_catalogue(args.state_dir, args.export)
+        print(f"已导出 {count} 部影视到 {args.export}")
+        return
+    
+    from scrapers.douban_crawler import DoubanCrawler
+    
+    seeds = list(args.seed) + [DoubanCrawler.tag_url(tag) for tag in args.tag]
+    if args.top250 or not seeds:
+        seeds.append(DoubanCrawler.top250_url())
+    
+    try:
+        asyncio.run(crawl(seeds, args.state_dir, args.concurrency, args.max_depth,
+                          args.max_subjects, args.host_interval))
+    except KeyboardInterrupt:
+        print("\n爬取已中断，重新运行即可继续")
+        sys.exit(130)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+任务队列模块，通过可替换的消息代理在多台主机之间分发抓取任务
+"""
\ No newline at end of file
@@ -0,0 +1,222 @@
+"""
+任务代理基类
+
+任务至少投递一次：工作节点领取任务后获得一个租约，租约在可见性超时内
+未确认时任务重新可见，由其他节点再次领取；超过最大尝试次数的任务进入死信队列
+"""
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from config.logging_config import setup_logger
+from config.settings import JOB_VISIBILITY_TIMEOUT, JOB_MAX_ATTEMPTS
+from core.deadline import Deadline
+
+# 创建日志记录器
+logger = setup_logger('job_broker')
+
+# 任务状态
+STATE_QUEUED = "queued"
+STATE_RESERVED = "reserved"
+STATE_DONE = "done"
+STATE_DEAD = "dead"
+
+# nack 的处理结果
+NACK_RETRY = "retry"
+NACK_DEAD = "dead"
+
+class BrokerError(Exception):
+    """任务代理异常"""
+    pass
+
+class Job:
+    """已领取的任务，lease 用于确认时校验租约是否仍然有效"""
+    
+    def __init__(self, job_id: str, payload: Dict[str, Any], attempts: int, lease: str):
+        """
+        初始化任务
+        
+        Args:
+            job_id: 任务ID
+            payload: 任务内容
+            attempts: 包括本次在内的尝试次数
+            lease: 本次领取的租约标识
+        """
+        self.id = job_id
+        self.payload = payload
+        self.attempts = attempts
+        self.lease = lease
+    
+    def __repr__(self) -> str:
+        return f"Job({self.id}, attempts={self.attempts})"
+
+class Broker:
+    """
+    任务代理接口，子类实现具体的存储
+    
+    任务状态按 queued -> reserved -> done/dead 变化，reserved 的任务租约过期后
+    视为 queued。ack、nack、extend 只对持有当前租约的任务生效
+    """
+    
+    def __init__(self, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT, max_attempts: int = JOB_MAX_ATTEMPTS):
+        """
+        初始化任务代理
+        
+        Args:
+            visibility_timeout: 领取后多少秒内未确认则重新投递
+            max_attempts: 最大尝试次数，超过后进入死信队列
+        """
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+    
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        """
+        加入任务
+        
+        Args:
+            payload: 可JSON序列化的任务内容
+        
+        Returns:
+            任务ID
+        """
+        raise NotImplementedError("子类必须实现enqueue方法")
+    
+    def reserve(self) -> Optional[Job]:
+        """
+        领取一个可见的任务，没有任务时立即返回None
+        
+        Returns:
+            已领取的任务
+        """
+        raise NotImplementedError("子类必须实现reserve方法")
+    
+    def ack(self, job: Job, result: Dict[str, Any]) -> bool:
+        """
+        确认任务完成并保存结果
+        
+        Args:
+            job: 已领取的任务
+            result: 可JSON序列化的任务结果
+        
+        Returns:
+            是否确认成功，租约已过期（任务已被重新投递）时返回False
+        """
+        raise NotImplementedError("子类必须实现ack方法")
+    
+    def nack(self, job: Job, error: str, retry_delay: float = 0.0) -> Optional[str]:
+        """
+        报告任务失败，未超过最大尝试次数时重新排队，否则进入死信队列
+        
+        Args:
+            job: 已领取的任务
+            error: 错误信息
+            retry_delay: 重新可见前的等待时间(秒)
+        
+        Returns:
+            NACK_RETRY、NACK_DEAD，租约已过期时返回None
+        """
+        raise NotImplementedError("子类必须实现nack方法")
+    
+    def extend(self, job: Job) -> bool:
+        """
+        延长租约，处理时间可能超过可见性超时的任务应定期调用
+        
+        Args:
+            job: 已领取的任务
+        
+        Returns:
+            租约是否仍然有效
+        """
+        raise NotImplementedError("子类必须实现extend方法")
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        查询任务
+        
+        Args:
+            job_id: 任务ID
+        
+        Returns:
+            包含 id、state、attempts、payload、result、error 的字典，任务不存在时返回None
+        """
+        raise NotImplementedError("子类必须实现get方法")
+    
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        列出死信队列中的任务
+        
+        Args:
+            limit: 最多返回的数量
+        
+        Returns:
+            任务字典列表，最近进入的在前
+        """
+        raise NotImplementedError("子类必须实现dead_letters方法")
+    
+    def requeue_dead(self, job_id: str) -> bool:
+        """
+        将死信任务重新排队，尝试次数清零
+        
+        Args:
+            job_id: 任务ID
+        
+        Returns:
+            是否重新排队
+        """
+        raise NotImplementedError("子类必须实现requeue_dead方法")
+    
+    def stats(self) -> Dict[str, int]:
+        """各状态的任务数"""
+        raise NotImplementedError("子类必须实现stats方法")
+    
+    def close(self):
+        """释放连接"""
+        pass
+    
+    def wait_result(self, job_id: str, timeout: float, poll_interval: float = 0.5,
+                    deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        等待任务完成或进入死信队列
+        
+        Args:
+            job_id: 任务ID
+            timeout: 最长等待时间(秒)
+            poll_interval: 查询间隔(秒)
+            deadline: 请求的截止时间，超时或被取消（如客户端断开）时停止等待
+        
+        Returns:
+            任务字典，超时或截止时间已到时返回None
+        """
+        wait_until = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job and job["state"] in (STATE_DONE, STATE_DEAD):
+                return job
+            remaining = wait_until - time.monotonic()
+            if deadline is not None:
+                remaining = min(remaining, deadline.remaining())
+            if remaining <= 0:
+                return None
+            time.sleep(min(poll_interval, remaining))
+
+def create_broker(url: str, **kwargs) -> Broker:
+    """
+    根据地址创建任务代理
+    
+    Args:
+        url: sqlite:///路径（单机）或 redis://主机:端口/数据库（多台主机）
+        **kwargs: 传给代理的其他参数，如 visibility_timeout、max_attempts
+    
+    Returns:
+        任务代理实例
+    """
+    parts = urlsplit(url)
+    if parts.scheme == "sqlite":
+        from jobs.sqlite_broker import SQLiteBroker
+        return SQLiteBroker(url[len("sqlite:///"):] if url.startswith("sqlite:///") else parts.path, **kwargs)
+    if parts.scheme == "redis":
+        from jobs.redis_broker import RedisBroker
+        db = int(parts.path.strip("/") or 0)
+        return RedisBroker(parts.hostname or "127.0.0.1", parts.port or 6379, db=db,
+                           password=parts.password, **kwargs)
+    raise BrokerError(f"不支持的任务代理地址: {url}")
\ No newline at end of file
@@ -0,0 +1,415 @@
+"""
+基于Redis协议的任务代理，多台主机上的工作节点共用一个Redis
+
+不依赖第三方客户端，通过套接字直接使用RESP协议，可连接Redis或兼容的服务。
+所有任务（排队中和已领取）都在一个有序集合中，分数为任务可见的时间：
+领取时用 WATCH/MULTI/EXEC 把分数改为租约到期时间，确认时才从集合中删除，
+工作节点在领取和确认之间崩溃不会丢失任务
+"""
+import json
+import time
+import uuid
+import random
+import socket
+import threading
+from typing import Any, Dict, List, Optional
+
+from jobs.broker import (
+    Broker, BrokerError, Job, STATE_QUEUED, STATE_RESERVED, STATE_DONE, STATE_DEAD, NACK_RETRY, NACK_DEAD
+)
+from config.logging_config import setup_logger
+from config.settings import JOB_VISIBILITY_TIMEOUT, JOB_MAX_ATTEMPTS, JOB_RESULT_TTL
+
+# 创建日志记录器
+logger = setup_logger('redis_broker')
+
+# 键名前缀
+KEY_PREFIX = "haibaoqiang:jobs"
+
+# 事务冲突时的最大重试次数
+MAX_TRANSACTION_RETRIES = 10
+
+# 每次领取时读取的候选任务数
+RESERVE_SCAN_SIZE = 16
+
+class RespError(BrokerError):
+    """服务端返回的错误"""
+    pass
+
+class RespClient:
+    """
+    最小的RESP客户端
+    
+    一个连接同时只能执行一条命令；WATCH/MULTI/EXEC 需要连续执行多条命令，
+    调用方应在整个事务期间持有 lock
+    """
+    
+    def __init__(self, host: str, port: int, db: int = 0, password: Optional[str] = None, timeout: float = 10.0):
+        """
+        初始化客户端，首次执行命令时连接
+        
+        Args:
+            host: 服务器地址
+            port: 服务器端口
+            db: 数据库编号
+            password: 密码
+            timeout: 套接字超时(秒)
+        """
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.lock = threading.RLock()
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._in_transaction = False
+    
+    def _connect(self):
+        """建立连接并完成认证和选库"""
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._send("AUTH", self.password)
+        if self.db:
+            self._send("SELECT", self.db)
+    
+    def close(self):
+        """关闭连接"""
+        with self.lock:
+            if self._sock:
+                try:
+                    self._reader.close()
+                    self._sock.close()
+                except OSError:
+                    pass
+            self._sock = None
+            self._reader = None
+            self._in_transaction = False
+    
+    @staticmethod
+    def _encode(args) -> bytes:
+        """按RESP数组格式编码命令"""
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, bytes):
+                data = arg
+            elif isinstance(arg, float):
+                data = repr(arg).encode()
+            else:
+                data = str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+    
+    def _read_reply(self) -> Any:
+        """读取一个回复，字符串按UTF-8解码"""
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("连接已被服务器关闭")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode("utf-8")
+        if kind == b"-":
+            raise RespError(body.decode("utf-8"))
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)[:-2]
+            return data.decode("utf-8")
+        if kind == b"*":
+            count = int(body)
+            if count < 0:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise BrokerError(f"无法解析的回复: {line!r}")
+    
+    def _send(self, *args) -> Any:
+        """在已有连接上发送命令并读取回复"""
+        self._sock.sendall(self._encode(args))
+        return self._read_reply()
+    
+    def execute(self, *args) -> Any:
+        """
+        执行一条命令，连接断开时重新连接并重试一次
+        
+        事务进行中（WATCH之后）断开连接不会重试，由调用方整体重试事务
+        
+        Args:
+            *args: 命令及参数
+        
+        Returns:
+            解析后的回复
+        """
+        command = str(args[0]).upper()
+        with self.lock:
+            for attempt in range(2):
+                if self._sock is None:
+                    self._connect()
+                # 重新连接会丢失WATCH，事务中途断开时不能单独重试某条命令
+                retry = not attempt and not self._in_transaction
+                if command in ("WATCH", "MULTI"):
+                    self._in_transaction = True
+                elif command in ("EXEC", "UNWATCH", "DISCARD"):
+                    self._in_transaction = False
+                try:
+                    return self._send(*args)
+                except (OSError, ConnectionError):
+                    self.close()
+                    if not retry:
+                        raise
+            return None
+
+class RedisBroker(Broker):
+    """Redis协议任务代理"""
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, db: int = 0, password: Optional[str] = None,
+                 visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+                 max_attempts: int = JOB_MAX_ATTEMPTS,
+                 result_ttl: float = JOB_RESULT_TTL,
+                 prefix: str = KEY_PREFIX):
+        """
+        初始化Redis任务代理
+        
+        Args:
+            host: 服务器地址
+            port: 服务器端口
+            db: 数据库编号
+            password: 密码
+            visibility_timeout: 领取后多少秒内未确认则重新投递
+            max_attempts: 最大尝试次数
+            result_ttl: 已完成任务的保留时间(秒)
+            prefix: 键名前缀
+        """
+        super().__init__(visibility_timeout, max_attempts)
+        self.client = RespClient(host, port, db, password)
+        self.result_ttl = result_ttl
+        self.pending_key = f"{prefix}:pending"
+        self.dead_key = f"{prefix}:dead"
+        self.job_prefix = f"{prefix}:job:"
+    
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.job_prefix}{job_id}"
+    
+    def _hgetall(self, key: str) -> Dict[str, str]:
+        """HGETALL的回复转换为字典"""
+        reply = self.client.execute("HGETALL", key) or []
+        return dict(zip(reply[::2], reply[1::2]))
+    
+    def _transaction(self, watch: List[str], prepare) -> Any:
+        """
+        乐观事务：WATCH 指定键后调用 prepare 读取数据并返回 (命令列表, 返回值)；
+        命令列表为None时放弃事务直接返回。被监视的键在EXEC前被修改时重试
+        
+        Args:
+            watch: 需要监视的键
+            prepare: 读取当前数据、决定要执行的命令的函数
+        
+        Returns:
+            prepare 给出的返回值
+        """
+        with self.client.lock:
+            for _ in range(MAX_TRANSACTION_RETRIES):
+                try:
+                    if watch:
+                        self.client.execute("WATCH", *watch)
+                    commands, value = prepare()
+                    if commands is None:
+                        if watch:
+                            self.client.execute("UNWATCH")
+                        return value
+                    
+                    self.client.execute("MULTI")
+                    for command in commands:
+                        self.client.execute(*command)
+                    if self.client.execute("EXEC") is not None:
+                        return value
+                except Exception:
+                    # 连接可能停留在事务中，断开后下次重新连接
+                    self.client.close()
+                    raise
+            raise BrokerError("任务代理事务冲突次数过多")
+    
+    def _parse_job(self, job_id: str, fields: Dict[str, str]) -> Dict[str, Any]:
+        """将任务哈希转换为任务字典"""
+        state = fields.get("state", STATE_QUEUED)
+        return {
+            "id": job_id,
+            "state": state,
+            "attempts": int(fields.get("attempts", 0)),
+            "payload": json.loads(fields.get("payload", "{}")),
+            "result": json.loads(fields["result"]) if fields.get("result") else None,
+            "error": fields.get("error") or None,
+            "created_at": float(fields.get("created_at", 0)),
+            "updated_at": float(fields.get("updated_at", 0)),
+        }
+    
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._transaction([], lambda: ([
+            ("HSET", self._job_key(job_id), "payload", json.dumps(payload, ensure_ascii=False),
+             "state", STATE_QUEUED, "attempts", 0, "created_at", now, "updated_at", now),
+            ("ZADD", self.pending_key, now, job_id),
+        ], None))
+        return job_id
+    
+    def reserve(self) -> Optional[Job]:
+        while True:
+            now = time.time()
+            candidates = self.client.execute("ZRANGEBYSCORE", self.pending_key, "-inf", now,
+                                             "LIMIT", 0, RESERVE_SCAN_SIZE)
+            if not candidates:
+                return None
+            # 从随机位置开始尝试，减少多个节点争抢同一个任务
+            offset = random.randrange(len(candidates))
+            for job_id in candidates[offset:] + candidates[:offset]:
+                job = self._claim(job_id, now)
+                if job is not None:
+                    return job
+    
+    def _claim(self, job_id: str, now: float) -> Optional[Job]:
+        """
+        尝试领取指定任务
+        
+        只监视任务哈希：领取、确认和重新排队都会修改它，
+        其他节点先领取时本次事务失败，重试时会发现任务已不可见
+        
+        Args:
+            job_id: 任务ID
+            now: 当前时间
+        
+        Returns:
+            领取成功时返回任务，任务已被领取或进入死信队列时返回None
+        """
+        key = self._job_key(job_id)
+        
+        def prepare():
+            score = self.client.execute("ZSCORE", self.pending_key, job_id)
+            if score is None or float(score) > now:
+                return None, None
+            fields = self._hgetall(key)
+            if not fields:
+                # 任务哈希已过期或被删除，只需移出队列
+                return [("ZREM", self.pending_key, job_id)], None
+            
+            attempts = int(fields.get("attempts", 0))
+            if attempts >= self.max_attempts:
+                # 最后一次尝试的租约也已过期（工作节点崩溃或超时）
+                logger.warning(f"任务 {job_id} 超过最大尝试次数，进入死信队列")
+                return [
+                    ("ZREM", self.pending_key, job_id),
+                    ("HSET", key, "state", STATE_DEAD, "lease", "",
+                     "error", fields.get("error") or "租约超时次数过多", "updated_at", now),
+                    ("LPUSH", self.dead_key, job_id),
+                ], None
+            
+            lease = uuid.uuid4().hex
+            return [
+                ("ZADD", self.pending_key, now + self.visibility_timeout, job_id),
+                ("HSET", key, "state", STATE_RESERVED, "lease", lease, "attempts", attempts + 1, "updated_at", now),
+            ], Job(job_id, json.loads(fields["payload"]), attempts + 1, lease)
+        
+        return self._transaction([key], prepare)
+    
+    def _with_lease(self, job: Job, commands_for) -> Any:
+        """
+        租约仍然有效时执行 commands_for 返回的命令
+        
+        Args:
+            job: 已领取的任务
+            commands_for: 返回 (命令列表, 返回值) 的函数
+        
+        Returns:
+            租约有效时为 commands_for 给出的返回值，否则为None
+        """
+        key = self._job_key(job.id)
+        
+        def prepare():
+            if self.client.execute("HGET", key, "lease") != job.lease:
+                return None, None
+            return commands_for()
+        
+        return self._transaction([key], prepare)
+    
+    def ack(self, job: Job, result: Dict[str, Any]) -> bool:
+        key = self._job_key(job.id)
+        done = self._with_lease(job, lambda: ([
+            ("ZREM", self.pending_key, job.id),
+            ("HSET", key, "state", STATE_DONE, "lease", "",
+             "result", json.dumps(result, ensure_ascii=False), "updated_at", time.time()),
+            ("EXPIRE", key, int(self.result_ttl)),
+        ], True))
+        return bool(done)
+    
+    def nack(self, job: Job, error: str, retry_delay: float = 0.0) -> Optional[str]:
+        key = self._job_key(job.id)
+        now = time.time()
+        if job.attempts >= self.max_attempts:
+            return self._with_lease(job, lambda: ([
+                ("ZREM", self.pending_key, job.id),
+                ("HSET", key, "state", STATE_DEAD, "lease", "", "error", error, "updated_at", now),
+                ("LPUSH", self.dead_key, job.id),
+            ], NACK_DEAD))
+        return self._with_lease(job, lambda: ([
+            ("ZADD", self.pending_key, now + retry_delay, job.id),
+            ("HSET", key, "state", STATE_QUEUED, "lease", "", "error", error, "updated_at", now),
+        ], NACK_RETRY))
+    
+    def extend(self, job: Job) -> bool:
+        return bool(self._with_lease(job, lambda: ([
+            ("ZADD", self.pending_key, time.time() + self.visibility_timeout, job.id),
+        ], True)))
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        fields = self._hgetall(self._job_key(job_id))
+        if not fields:
+            return None
+        job = self._parse_job(job_id, fields)
+        if job["state"] == STATE_RESERVED:
+            # 租约已过期的任务等同于排队中
+            score = self.client.execute("ZSCORE", self.pending_key, job_id)
+            if score is not None and float(score) <= time.time():
+                job["state"] = STATE_QUEUED
+        return job
+    
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        jobs = []
+        for job_id in self.client.execute("LRANGE", self.dead_key, 0, limit - 1) or []:
+            job = self.get(job_id)
+            if job:
+                jobs.append(job)
+        return jobs
+    
+    def requeue_dead(self, job_id: str) -> bool:
+        key = self._job_key(job_id)
+        now = time.time()
+        
+        def prepare():
+            if self.client.execute("HGET", key, "state") != STATE_DEAD:
+                return None, False
+            return [
+                ("LREM", self.dead_key, 0, job_id),
+                ("HSET", key, "state", STATE_QUEUED, "attempts", 0, "error", "", "updated_at", now),
+                ("ZADD", self.pending_key, now, job_id),
+            ], True
+        
+        return self._transaction([key], prepare)
+    
+    def stats(self) -> Dict[str, int]:
+        now = time.time()
+        visible = self.client.execute("ZCOUNT", self.pending_key, "-inf", now)
+        total = self.client.execute("ZCARD", self.pending_key)
+        return {
+            STATE_QUEUED: visible,
+            STATE_RESERVED: total - visible,
+            # 已完成的任务只保留带过期时间的哈希，没有集合可以计数，与 SQLiteBroker 返回相同的键
+            STATE_DONE: 0,
+            STATE_DEAD: self.client.execute("LLEN", self.dead_key),
+        }
+    
+    def close(self):
+        self.client.close()
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+基于SQLite的任务代理，适用于单台主机上的多个工作进程
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from jobs.broker import (
+    Broker, Job, STATE_QUEUED, STATE_RESERVED, STATE_DONE, STATE_DEAD, NACK_RETRY, NACK_DEAD
+)
+from config.logging_config import setup_logger
+from config.settings import JOB_VISIBILITY_TIMEOUT, JOB_MAX_ATTEMPTS, JOB_RESULT_TTL
+
+# 创建日志记录器
+logger = setup_logger('sqlite_broker')
+
+class SQLiteBroker(Broker):
+    """
+    SQLite任务代理
+    
+    领取任务在 BEGIN IMMEDIATE 事务中完成，同一数据库文件可被多个进程共用。
+    reserved 状态的任务 visible_at 为租约到期时间，到期后可再次被领取
+    """
+    
+    def __init__(self, path: str,
+                 visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+                 max_attempts: int = JOB_MAX_ATTEMPTS,
+                 result_ttl: float = JOB_RESULT_TTL):
+        """
+        初始化SQLite任务代理
+        
+        Args:
+            path: 数据库文件路径
+            visibility_timeout: 领取后多少秒内未确认则重新投递
+            max_attempts: 最大尝试次数
+            result_ttl: 已完成任务的保留时间(秒)
+        """
+        super().__init__(visibility_timeout, max_attempts)
+        self.result_ttl = result_ttl
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # 连接在API线程和执行器线程之间共用，由锁保证串行
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease TEXT,
+                visible_at REAL NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_visible ON jobs (state, visible_at)")
+        self._lock = threading.Lock()
+    
+    def _row_to_dict(self, row) -> Dict[str, Any]:
+        """将查询结果转换为任务字典"""
+        job_id, payload, state, attempts, result, error, created_at, updated_at = row
+        return {
+            "id": job_id,
+            "state": state,
+            "attempts": attempts,
+            "payload": json.loads(payload),
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+    
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO jobs (id, payload, state, visible_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(payload, ensure_ascii=False), STATE_QUEUED, now, now, now)
+            )
+            # 顺便清理过期的已完成任务
+            self.conn.execute("DELETE FROM jobs WHERE state = ? AND updated_at < ?", (STATE_DONE, now - self.result_ttl))
+        return job_id
+    
+    def reserve(self) -> Optional[Job]:
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self.conn.execute("""
+                        SELECT id, payload, attempts FROM jobs
+                        WHERE state IN (?, ?) AND visible_at <= ?
+                        ORDER BY visible_at LIMIT 1
+                    """, (STATE_QUEUED, STATE_RESERVED, now)).fetchone()
+                    if row is None:
+                        self.conn.execute("COMMIT")
+                        return None
+                    
+                    job_id, payload, attempts = row
+                    if attempts >= self.max_attempts:
+                        # 最后一次尝试的租约也已过期（工作节点崩溃或超时）
+                        self.conn.execute(
+                            "UPDATE jobs SET state = ?, lease = NULL, error = COALESCE(error, ?), updated_at = ? WHERE id = ?",
+                            (STATE_DEAD, "租约超时次数过多", now, job_id)
+                        )
+                        logger.warning(f"任务 {job_id} 超过最大尝试次数，进入死信队列")
+                        continue
+                    
+                    lease = uuid.uuid4().hex
+                    self.conn.execute(
+                        "UPDATE jobs SET state = ?, attempts = ?, lease = ?, visible_at = ?, updated_at = ? WHERE id = ?",
+                        (STATE_RESERVED, attempts + 1, lease, now + self.visibility_timeout, now, job_id)
+                    )
+                    self.conn.execute("COMMIT")
+                    return Job(job_id, json.loads(payload), attempts + 1, lease)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+    
+    def ack(self, job: Job, result: Dict[str, Any]) -> bool:
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET state = ?, lease = NULL, result = ?, updated_at = ? WHERE id = ? AND lease = ?",
+                (STATE_DONE, json.dumps(result, ensure_ascii=False), time.time(), job.id, job.lease)
+            )
+        return cursor.rowcount == 1
+    
+    def nack(self, job: Job, error: str, retry_delay: float = 0.0) -> Optional[str]:
+        now = time.time()
+        outcome = NACK_DEAD if job.attempts >= self.max_attempts else NACK_RETRY
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET state = ?, lease = NULL, error = ?, visible_at = ?, updated_at = ? WHERE id = ? AND lease = ?",
+                (STATE_DEAD if outcome == NACK_DEAD else STATE_QUEUED, error, now + retry_delay, now, job.id, job.lease)
+            )
+        return outcome if cursor.rowcount == 1 else None
+    
+    def extend(self, job: Job) -> bool:
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET visible_at = ? WHERE id = ? AND lease = ?",
+                (time.time() + self.visibility_timeout, job.id, job.lease)
+            )
+        return cursor.rowcount == 1
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT id, payload, state, attempts, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+    
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT id, payload, state, attempts, result, error, created_at, updated_at FROM jobs
+                WHERE state = ? ORDER BY updated_at DESC LIMIT ?
+            """, (STATE_DEAD, limit)).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+    
+    def requeue_dead(self, job_id: str) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = 0, error = NULL, visible_at = ?, updated_at = ? WHERE id = ? AND state = ?",
+                (STATE_QUEUED, now, now, job_id, STATE_DEAD)
+            )
+        return cursor.rowcount == 1
+    
+    def stats(self) -> Dict[str, int]:
+        now = time.time()
+        with self._lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+            expired = self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = ? AND visible_at <= ?", (STATE_RESERVED, now)
+            ).fetchone()[0]
+        counts = {STATE_QUEUED: 0, STATE_RESERVED: 0, STATE_DONE: 0, STATE_DEAD: 0}
+        counts.update(dict(rows))
+        # 租约已过期的任务等同于排队中
+        counts[STATE_QUEUED] += expired
+        counts[STATE_RESERVED] -= expired
+        return counts
+    
+    def close(self):
+        with self._lock:
+            self.conn.close()
\ No newline at end of file
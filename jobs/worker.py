@@ -0,0 +1,160 @@
+"""
+任务队列工作节点，从任务代理领取任务，抓取豆瓣数据并同步到Notion
+"""
+import asyncio
+from typing import Any, Dict, Optional
+
+from core.antibot import AntiBotBlocked, domain_cooldown
+from jobs.broker import Broker, Job, NACK_DEAD
+from config.logging_config import setup_logger
+
+# 创建日志记录器
+logger = setup_logger('job_worker')
+
+# 任务类型
+JOB_MOVIE = "movie"
+
+def movie_job(title: str) -> Dict[str, Any]:
+    """
+    生成按标题抓取并同步的任务内容
+    
+    Args:
+        title: 影视标题
+    
+    Returns:
+        任务内容
+    """
+    return {"type": JOB_MOVIE, "title": title}
+
+class JobWorker:
+    """
+    工作节点
+    
+    同时处理 concurrency 个任务；处理期间定期延长租约，处理出错时报告失败，
+    由任务代理决定重新排队或进入死信队列。未找到影视属于正常结果，不会重试
+    """
+    
+    def __init__(self, broker: Broker, scraper, notion_sync, concurrency: int = 2, poll_interval: float = 1.0):
+        """
+        初始化工作节点
+        
+        Args:
+            broker: 任务代理
+            scraper: 豆瓣爬虫（DoubanScraper），需已启动浏览器
+            notion_sync: Notion同步模块
+            concurrency: 同时处理的任务数
+            poll_interval: 没有任务时的等待间隔(秒)
+        """
+        self.broker = broker
+        self.scraper = scraper
+        self.notion_sync = notion_sync
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.processed = 0
+        self.failed = 0
+        self._stopping = False
+    
+    def stop(self):
+        """处理完手上的任务后退出"""
+        self._stopping = True
+    
+    async def handle(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        处理一个任务
+        
+        Args:
+            payload: 任务内容
+        
+        Returns:
+            与API /api/movie 相同格式的处理结果
+        """
+        if payload.get("type") != JOB_MOVIE or not payload.get("title"):
+            raise ValueError(f"无法处理的任务: {payload}")
+        
+        title = payload["title"]
+        result = {"success": False, "title": title, "message": "", "data": {}}
+        movie_data = await self.scraper.get_movie_by_title(title)
+        if not movie_data:
+            result["message"] = f"未找到电影: {title}"
+            return result
+        
+        loop = asyncio.get_running_loop()
+        sync_result = await loop.run_in_executor(None, self.notion_sync.sync_movie, movie_data)
+        rating = movie_data.get("rating")
+        result["success"] = True
+        result["message"] = "处理成功"
+        result["data"] = {
+            "title": movie_data.get("title"),
+            "category": movie_data.get("category"),
+            "rating": rating,
+            "rounded_rating": min(9, round(rating)) if rating else 0,
+            "notion_page_id": sync_result.get("item_id"),
+            "cover_url": movie_data.get("cover_url"),
+            "has_cover": sync_result.get("has_cover", False)
+        }
+        return result
+    
+    async def _keep_lease(self, job: Job):
+        """在处理期间每隔三分之一可见性超时延长一次租约"""
+        loop = asyncio.get_running_loop()
+        interval = max(1.0, self.broker.visibility_timeout / 3)
+        while True:
+            await asyncio.sleep(interval)
+            if not await loop.run_in_executor(None, self.broker.extend, job):
+                logger.warning(f"任务 {job.id} 的租约已失效，可能会被重复处理")
+                return
+    
+    async def process(self, job: Job):
+        """
+        处理已领取的任务并确认结果
+        
+        Args:
+            job: 已领取的任务
+        """
+        loop = asyncio.get_running_loop()
+        keeper = asyncio.ensure_future(self._keep_lease(job))
+        try:
+            result = await self.handle(job.payload)
+        except AntiBotBlocked as e:
+            self.failed += 1
+            # 冷却结束后再重新可见，期间其他节点也不会领取到它
+            outcome = await loop.run_in_executor(None, self.broker.nack, job, str(e), e.retry_after)
+            logger.warning(f"任务 {job.id} 被反爬拦截 ({outcome or '租约已失效'}): {e}")
+            return
+        except Exception as e:
+            self.failed += 1
+            # 失败次数越多，重新可见前等待越久
+            outcome = await loop.run_in_executor(None, self.broker.nack, job, str(e), 5.0 * job.attempts)
+            level = logger.error if outcome == NACK_DEAD else logger.warning
+            level(f"任务 {job.id} 第 {job.attempts} 次处理失败 ({outcome or '租约已失效'}): {e}")
+            return
+        finally:
+            keeper.cancel()
+        
+        self.processed += 1
+        if not await loop.run_in_executor(None, self.broker.ack, job, result):
+            logger.warning(f"任务 {job.id} 确认时租约已失效，结果可能被其他节点覆盖")
+        logger.info(f"任务 {job.id} 完成: {result['message']}")
+    
+    async def run(self, max_jobs: Optional[int] = None):
+        """
+        持续领取并处理任务，直到调用stop或处理完 max_jobs 个任务
+        
+        Args:
+            max_jobs: 最多处理的任务数，None表示不限
+        """
+        loop = asyncio.get_running_loop()
+        
+        async def consume():
+            while not self._stopping and (max_jobs is None or self.processed + self.failed < max_jobs):
+                # 被反爬拦截后暂停领取，把任务留给其他节点
+                await domain_cooldown.wait()
+                job = await loop.run_in_executor(None, self.broker.reserve)
+                if job is None:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                await self.process(job)
+        
+        logger.info(f"工作节点开始处理任务，并发数: {self.concurrency}")
+        await asyncio.gather(*(consume() for _ in range(self.concurrency)))
+        logger.info(f"工作节点退出: 完成 {self.processed} 个，失败 {self.failed} 个")
\ No newline at end of file
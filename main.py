@@ -2,14 +2,13 @@
 豆瓣影视数据爬取与Notion同步主程序
 """
 import os
+import re
 import sys
 import asyncio
+from typing import Dict, List, Any
 
 from config.logging_config import setup_logger
 from config.settings import DOUBAN_COOKIES
-from core.browser import PlaywrightBrowser
-from scrapers.douban_scraper import DoubanScraper
-from sync.notion_sync import NotionSyncModule, test_database_connection
 
 # 创建日志记录器
 logger = setup_logger("main")
@@ -23,6 +22,127 @@ if sys.platform == 'win32':
     if hasattr(sys.stdin, 'reconfigure'):
         sys.stdin.reconfigure(encoding='utf-8')
 
+class InteractiveSession:
+    """
+    交互式会话，在整个会话期间复用同一个浏览器上下文和Notion连接，
+    并支持在用户确认当前结果时预取下一部影视的搜索结果
+    """
+    
+    def __init__(self):
+        """初始化会话，浏览器和同步模块在start中创建"""
+        self.browser = None
+        self.scraper = None
+        self.notion_sync = None
+        # 预取任务: 标题 -> 返回详情页URL的任务
+        self._prefetch_tasks: Dict[str, asyncio.Task] = {}
+    
+    async def start(self) -> bool:
+        """
+        检查配置、测试Notion连接并启动浏览器，仅在会话开始时执行一次
+        
+        Returns:
+            是否初始化成功
+        """
+        # 浏览器、爬虫和同步模块在首次处理时导入，交互界面可立即出现
+        from core.browser import PlaywrightBrowser
+        from scrapers.douban_scraper import DoubanScraper
+        from sync.notion_sync import NotionSyncModule, test_database_connection
+        
+        # 检查Notion配置
+        database_id = os.environ.get("NOTION_DATABASE_ID")
+        token = os.environ.get("NOTION_TOKEN")
+        
+        if not database_id or not token:
+            logger.error("未设置Notion配置，请设置NOTION_DATABASE_ID和NOTION_TOKEN环境变量")
+            return False
+        
+        # 初始化同步模块，测试连接时复用其HTTP会话
+        self.notion_sync = NotionSyncModule(database_id, token)
+        
+        # 测试数据库连接
+        logger.info("测试Notion数据库连接...")
+        loop = asyncio.get_running_loop()
+        success, message = await loop.run_in_executor(
+            None, lambda: test_database_connection(database_id, token, session=self.notion_sync.session)
+        )
+        logger.info(message)
+        
+        if not success:
+            logger.error("数据库连接测试失败，请检查配置后重试")
+            return False
+        
+        # 启动浏览器，整个会话期间保持上下文
+        self.browser = PlaywrightBrowser(headless=True, cookies=DOUBAN_COOKIES)
+        self.scraper = DoubanScraper(self.browser)
+        await self.browser.init_browser()
+        return True
+    
+    async def close(self):
+        """取消未完成的预取任务，关闭浏览器和Notion会话"""
+        for task in self._prefetch_tasks.values():
+            task.cancel()
+        self._prefetch_tasks.clear()
+        
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+        if self.notion_sync:
+            self.notion_sync.close()
+            self.notion_sync = None
+    
+    def prefetch(self, title: str):
+        """
+        在后台预取影视搜索结果
+        
+        Args:
+            title: 电影名称
+        """
+        if title not in self._prefetch_tasks:
+            logger.info(f"预取搜索结果: {title}")
+            self._prefetch_tasks[title] = asyncio.ensure_future(self.scraper.search_movie(title))
+    
+    async def lookup(self, title: str) -> Dict[str, Any]:
+        """
+        获取影视数据，优先使用预取的搜索结果
+        
+        Args:
+            title: 电影名称
+        
+        Returns:
+            电影数据字典
+        """
+        task = self._prefetch_tasks.pop(title, None)
+        if task is None:
+            return await self.scraper.get_movie_by_title(title)
+        
+        detail_url = await task
+        if not detail_url:
+            logger.warning(f"未找到电影: {title}")
+            return {}
+        return await self.scraper.get_movie_by_url(detail_url)
+    
+    async def sync(self, movie_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        同步影视数据到Notion，在线程池中执行以免阻塞预取任务
+        
+        Args:
+            movie_data: 电影数据字典
+        
+        Returns:
+            同步结果
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.notion_sync.sync_movie, movie_data)
+
+async def _ainput(prompt: str) -> str:
+    """在线程池中读取输入，等待用户输入时后台任务可继续运行"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, input, prompt)
+
+def _split_titles(text: str) -> List[str]:
+    """将一次输入拆分为多个电影名称，支持中英文分号分隔"""
+    return [title.strip() for title in re.split(r'[;；]', text) if title.strip()]
+
 async def scrape_and_sync_movie(title: str):
     """
     爬取并同步单部电影数据
@@ -32,33 +152,12 @@ async def scrape_and_sync_movie(title: str):
     """
     logger.info(f"开始处理电影: {title}")
     
-    # 检查Notion配置
-    database_id = os.environ.get("NOTION_DATABASE_ID")
-    token = os.environ.get("NOTION_TOKEN")
-    
-    if not database_id or not token:
-        logger.error("未设置Notion配置，请设置NOTION_DATABASE_ID和NOTION_TOKEN环境变量")
-        return
-    
-    # 测试数据库连接
-    logger.info("测试Notion数据库连接...")
-    success, message = test_database_connection(database_id, token)
-    logger.info(message)
-    
-    if not success:
-        logger.error("数据库连接测试失败，请检查配置后重试")
-        return
-    
-    # 初始化同步模块
-    notion_sync = NotionSyncModule()
-    
-    # 创建浏览器实例并爬取数据
-    async with PlaywrightBrowser(headless=True, cookies=DOUBAN_COOKIES) as browser:
-        # 创建爬虫实例
-        scraper = DoubanScraper(browser)
+    session = InteractiveSession()
+    try:
+        if not await session.start():
+            return
         
-        # 获取电影数据
-        movie_data = await scraper.get_movie_by_title(title)
+        movie_data = await session.lookup(title)
         
         if not movie_data:
             logger.warning(f"未找到电影: {title}")
@@ -68,31 +167,70 @@ async def scrape_and_sync_movie(title: str):
         
         try:
             # 同步到Notion
-            result = notion_sync.sync_movie(movie_data)
+            result = await session.sync(movie_data)
             logger.info(f"同步结果: {result}")
         except Exception as e:
             logger.error(f"同步电影 {title} 失败: {e}")
+    finally:
+        await session.close()
+
+async def interactive_loop():
+    """交互式主循环，整个会话共享一个事件循环、浏览器和Notion连接"""
+    session = InteractiveSession()
+    try:
+        if not await session.start():
+            print("初始化失败，请检查配置后重试")
+            return
+        
+        while True:
+            try:
+                text = await _ainput("请输入电影名称 (多个名称用;分隔，输入q退出): ")
+            except EOFError:
+                text = 'q'
+            
+            if text.strip().lower() == 'q':
+                print("程序已退出")
+                break
+            
+            titles = _split_titles(text)
+            if not titles:
+                print("电影名称不能为空，请重新输入")
+                continue
+            
+            for index, title in enumerate(titles):
+                print(f"\n开始处理: {title}\n")
+                movie_data = await session.lookup(title)
+                
+                # 用户确认当前结果期间，预取下一部的搜索结果
+                if index + 1 < len(titles):
+                    session.prefetch(titles[index + 1])
+                
+                if not movie_data:
+                    print(f"未找到电影: {title}")
+                    continue
+                
+                print(f"找到: {movie_data.get('title')} ({movie_data.get('category')}, 评分: {movie_data.get('rating')})")
+                answer = await _ainput("是否同步到Notion? [Y/n]: ")
+                if answer.strip().lower() in ('n', 'no'):
+                    print("已跳过")
+                    continue
+                
+                try:
+                    result = await session.sync(movie_data)
+                    logger.info(f"同步结果: {result}")
+                except Exception as e:
+                    logger.error(f"同步电影 {title} 失败: {e}")
+            
+            print("\n处理完成，可以继续输入下一部电影名称\n")
+    finally:
+        await session.close()
 
 def main():
     """程序主入口"""
     print("\n===== 豆瓣影视数据爬取与Notion同步工具 =====\n")
     
-    # 使用交互式输入获取电影名称
-    while True:
-        title = input("请输入电影名称 (输入q退出): ")
-        
-        if title.lower() == 'q':
-            print("程序已退出")
-            break
-            
-        if not title.strip():
-            print("电影名称不能为空，请重新输入")
-            continue
-            
-        # 运行爬取和同步任务
-        print(f"\n开始处理: {title}\n")
-        asyncio.run(scrape_and_sync_movie(title))
-        print("\n处理完成，可以继续输入下一部电影名称\n")
+    # 整个交互会话只使用一个事件循环
+    asyncio.run(interactive_loop())
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
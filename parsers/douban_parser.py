@@ -2,16 +2,81 @@
 豆瓣数据解析模块，负责从页面提取结构化数据
 """
 import re
-from typing import Dict, List, Any
-
-from playwright.async_api import Page
+import copy
+from typing import List, Iterable, Optional, TYPE_CHECKING
 
 from core.utils import clean_title
+from core.models import MovieRecord, Person
+from parsers.html_document import HtmlDocument
 from config.logging_config import setup_logger
 
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
 # 创建解析器日志记录器
 logger = setup_logger('douban_parser')
 
+# 可单独提取的字段: 字段名 -> (日志中的名称, 出错时的默认值)，顺序即完整提取时的顺序
+FIELDS = {
+    'title': ('标题', None),
+    'directors': ('导演', []),
+    'screenwriters': ('编剧', []),
+    'actors': ('主演', []),
+    'genres': ('类型', []),
+    'languages': ('语言', []),
+    'rating': ('评分', None),
+    'votes': ('评价人数', None),
+    'imdb_id': ('IMDb ID', None),
+    'release_date': ('上映日期', None),
+    'summary': ('剧情简介', None),
+    'aka': ('又名', ""),
+    'category': ('内容类型', "电影"),
+    'cover_url': ('封面图URL', None),
+}
+
+# 提取某字段前需要先提取的字段
+FIELD_DEPENDENCIES = {
+    'category': ('genres',),
+}
+
+def _run_sync(coro):
+    """执行不会挂起的协程，HtmlDocument 的查询方法都立即返回，不需要事件循环"""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coro.close()
+    raise RuntimeError("协程被挂起，不能同步执行")
+
+class _InfoSection:
+    """缓存 #info 区块，多个字段共用时只查询一次"""
+    
+    def __init__(self, page: "Page"):
+        self.page = page
+        self._elem = None
+        self._queried = False
+        self._text: Optional[str] = None
+        self._html: Optional[str] = None
+    
+    async def elem(self):
+        """#info 元素，不存在时为None"""
+        if not self._queried:
+            self._elem = await self.page.query_selector('#info')
+            self._queried = True
+        return self._elem
+    
+    async def text(self) -> Optional[str]:
+        """#info 的文本内容，元素不存在时为None"""
+        if self._text is None and await self.elem():
+            self._text = await self._elem.text_content()
+        return self._text
+    
+    async def html(self) -> Optional[str]:
+        """#info 的HTML内容，元素不存在时为None"""
+        if self._html is None and await self.elem():
+            self._html = await self._elem.inner_html()
+        return self._html
+
 class DoubanParser:
     """豆瓣数据解析器，负责从页面提取影视信息"""
     
@@ -54,251 +119,259 @@ class DoubanParser:
         return "电影"
     
     @classmethod
-    async def extract_movie_data(cls, page: Page) -> Dict[str, Any]:
+    def resolve_fields(cls, fields: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        确定需要执行的提取器，包含字段依赖，按完整提取时的顺序排列
+        
+        Args:
+            fields: 需要的字段，None表示全部字段
+            
+        Returns:
+            需要提取的字段列表
+        """
+        if fields is None:
+            return list(FIELDS)
+        
+        wanted = set(fields)
+        unknown = wanted - set(FIELDS) - {'url'}
+        if unknown:
+            raise ValueError(f"不支持的字段: {', '.join(sorted(unknown))}")
+        for field in list(wanted):
+            wanted.update(FIELD_DEPENDENCIES.get(field, ()))
+        return [field for field in FIELDS if field in wanted]
+    
+    @classmethod
+    async def extract_movie_data(cls, page: "Page", fields: Optional[Iterable[str]] = None) -> MovieRecord:
         """
         从页面提取电影数据
         
         Args:
             page: Playwright页面对象
+            fields: 只提取这些字段，返回部分数据；None表示提取全部字段
             
         Returns:
-            电影数据字典
+            电影数据，总是包含详情页地址 url
         """
-        movie_data = {}
+        requested = None if fields is None else set(fields)
+        info = _InfoSection(page)
         
-        # 提取标题
-        try:
-            title_elem = await page.query_selector('h1 span[property="v:itemreviewed"]')
-            if title_elem:
-                original_title = await title_elem.text_content()
-                movie_data['title'] = cls._clean_title(original_title)
-            else:
-                # 备选提取方法
-                h1_elem = await page.query_selector('h1')
-                if h1_elem:
-                    original_title = await h1_elem.text_content()
-                    movie_data['title'] = cls._clean_title(original_title)
-                else:
-                    movie_data['title'] = None
-        except Exception as e:
-            logger.error(f"提取标题出错: {e}")
-            movie_data['title'] = None
-            
-        # 提取导演
-        try:
-            directors = []
-            director_elems = await page.query_selector_all('a[rel="v:directedBy"]')
-            for director_elem in director_elems:
-                name = await director_elem.text_content()
-                url = await director_elem.get_attribute('href')
-                directors.append({"name": name.strip(), "url": url})
-            movie_data['directors'] = directors
-        except Exception as e:
-            logger.error(f"提取导演出错: {e}")
-            movie_data['directors'] = []
-            
-        # 提取编剧
-        try:
-            screenwriters = []
-            info_elem = await page.query_selector('#info')
-            if info_elem:
-                info_html = await info_elem.inner_html()
-                # 使用正则表达式提取编剧信息
-                screenwriter_match = re.search(r'编剧</span>:(.*?)<br/?>', info_html, re.DOTALL)
-                if screenwriter_match:
-                    screenwriter_html = screenwriter_match.group(1)
-                    # 提取所有<a>标签
-                    sw_links = re.findall(r'<a href="([^"]+)"[^>]*>([^<]+)</a>', screenwriter_html)
-                    for url, name in sw_links:
-                        screenwriters.append({"name": name.strip(), "url": url})
-            movie_data['screenwriters'] = screenwriters
-        except Exception as e:
-            logger.error(f"提取编剧出错: {e}")
-            movie_data['screenwriters'] = []
-            
-        # 提取主演 (前5名)
-        try:
-            actors = []
-            actor_elems = await page.query_selector_all('a[rel="v:starring"]')
-            for actor_elem in actor_elems[:5]:  # 只取前5名
-                name = await actor_elem.text_content()
-                url = await actor_elem.get_attribute('href')
-                actors.append({"name": name.strip(), "url": url})
-            movie_data['actors'] = actors
-        except Exception as e:
-            logger.error(f"提取主演出错: {e}")
-            movie_data['actors'] = []
-            
-        # 提取类型
-        try:
-            genres = []
-            genre_elems = await page.query_selector_all('span[property="v:genre"]')
-            for genre_elem in genre_elems:
-                genre_text = await genre_elem.text_content()
-                genres.append(genre_text.strip())
-            movie_data['genres'] = genres
-        except Exception as e:
-            logger.error(f"提取类型出错: {e}")
-            movie_data['genres'] = []
-            
-        # 提取语言
-        try:
-            info_elem = await page.query_selector('#info')
-            if info_elem:
-                info_text = await info_elem.text_content()
-                language_match = re.search(r'语言:\s*(.*?)(?:\n|$)', info_text)
-                if language_match:
-                    languages = [lang.strip() for lang in language_match.group(1).split('/')]
-                    movie_data['languages'] = languages
-                else:
-                    movie_data['languages'] = []
-            else:
-                movie_data['languages'] = []
-        except Exception as e:
-            logger.error(f"提取语言出错: {e}")
-            movie_data['languages'] = []
-            
-        # 提取评分
-        try:
-            rating_elem = await page.query_selector('strong[property="v:average"]')
-            if rating_elem:
-                rating_text = await rating_elem.text_content()
-                try:
-                    movie_data['rating'] = float(rating_text)
-                except ValueError:
-                    movie_data['rating'] = None
-            else:
-                movie_data['rating'] = None
-        except Exception as e:
-            logger.error(f"提取评分出错: {e}")
-            movie_data['rating'] = None
-            
-        # 提取IMDb ID
-        try:
-            info_elem = await page.query_selector('#info')
-            if info_elem:
-                info_text = await info_elem.text_content()
-                imdb_match = re.search(r'IMDb:\s*(tt\d+)', info_text)
-                if imdb_match:
-                    movie_data['imdb_id'] = imdb_match.group(1)
-                else:
-                    # 尝试其他匹配方式
-                    info_html = await info_elem.inner_html()
-                    imdb_link_match = re.search(r'href="https?://www\.imdb\.com/title/(tt\d+)"', info_html)
-                    if imdb_link_match:
-                        movie_data['imdb_id'] = imdb_link_match.group(1)
-                    else:
-                        movie_data['imdb_id'] = None
-            else:
-                movie_data['imdb_id'] = None
-        except Exception as e:
-            logger.error(f"提取IMDb ID出错: {e}")
-            movie_data['imdb_id'] = None
-            
-        # 提取上映日期（首播）
-        try:
-            release_elem = await page.query_selector('span[property="v:initialReleaseDate"]')
-            if release_elem:
-                release_text = await release_elem.text_content()
-                # 保留完整日期文本，包括地区信息
-                movie_data['release_date'] = release_text.strip()
-            else:
-                movie_data['release_date'] = None
-        except Exception as e:
-            logger.error(f"提取上映日期出错: {e}")
-            movie_data['release_date'] = None
-            
-        # 提取剧情简介
-        try:
-            # 尝试获取展开的完整简介
-            summary_elem = await page.query_selector('span[property="v:summary"]')
-            if not summary_elem:
-                # 尝试其他可能的选择器
-                summary_elem = await page.query_selector('div.related-info div.indent span.short')
-            
-            if summary_elem:
-                summary_text = await summary_elem.text_content()
-                # 清理简介文本
-                summary_text = re.sub(r'[\t\f\v ]+', ' ', summary_text).strip()
-                # 将文本按段落分割
-                paragraphs = re.split(r'\n+', summary_text)
-                # 在每个段落前添加中文缩进空格
-                formatted_paragraphs = ["　　" + p.strip() for p in paragraphs if p.strip()]
-                # 重新组合文本，使用换行符连接
-                summary_text = "\n".join(formatted_paragraphs)
-                # 限制简介长度
-                if len(summary_text) > 1000:
-                    summary_text = summary_text[:997] + "..."
-                movie_data['summary'] = summary_text
-            else:
-                movie_data['summary'] = None
-        except Exception as e:
-            logger.error(f"提取剧情简介出错: {e}")
-            movie_data['summary'] = None
-            
-        # 提取又名
-        try:
-            info_elem = await page.query_selector('#info')
-            if info_elem:
-                info_text = await info_elem.text_content()
-                aka_match = re.search(r'又名:(.*?)(?:\n|$)', info_text)
-                if aka_match:
-                    akas = [aka.strip() for aka in aka_match.group(1).split('/')]
-                    movie_data['aka'] = "/".join([aka for aka in akas if aka])
-                else:
-                    movie_data['aka'] = ""
-            else:
-                movie_data['aka'] = ""
-        except Exception as e:
-            logger.error(f"提取又名出错: {e}")
-            movie_data['aka'] = ""
-            
-        # 确定内容类型（电影或电视剧）
-        try:
-            url = page.url
-            info_elem = await page.query_selector('#info')
-            info_text = await info_elem.text_content() if info_elem else ""
-            movie_data['category'] = cls._determine_content_type(url, movie_data.get('genres', []), info_text)
-        except Exception as e:
-            logger.error(f"确定内容类型出错: {e}")
-            movie_data['category'] = "电影"  # 默认为电影
+        # 详情页地址，用于之后重新抓取
+        movie_data = MovieRecord(url=page.url.split('?')[0])
+        
+        for field in cls.resolve_fields(requested):
+            label, default = FIELDS[field]
+            try:
+                movie_data[field] = await getattr(cls, f'_extract_{field}')(page, info, movie_data)
+            except Exception as e:
+                logger.error(f"提取{label}出错: {e}")
+                movie_data[field] = copy.copy(default)
+        
+        # 去掉只为依赖而提取的字段
+        if requested is not None:
+            for key in [key for key in movie_data if key != 'url' and key not in requested]:
+                del movie_data[key]
+        return movie_data
+    
+    @classmethod
+    def parse_html(cls, html: str, url: str = "", fields: Optional[Iterable[str]] = None) -> MovieRecord:
+        """
+        不经浏览器解析保存的详情页HTML，提取规则与 extract_movie_data 相同
+        
+        Args:
+            html: 详情页HTML
+            url: 详情页地址，为空时从页面的 canonical 链接读取
+            fields: 只提取这些字段，None表示提取全部字段
             
-        # 提取封面图URL
-        try:
-            cover_elem = await page.query_selector('div#mainpic img')
-            if cover_elem:
-                cover_url = await cover_elem.get_attribute('src')
-                # 尝试获取更高质量的图片
-                if cover_url:
-                    # 豆瓣图片链接通常有小中大三种尺寸，尝试获取大图
-                    # s_ratio_poster -> l_ratio_poster
-                    cover_url = re.sub(r's_ratio_poster', 'l_ratio_poster', cover_url)
-                    # webp.image -> large.image
-                    cover_url = re.sub(r'webp\.image', 'large.image', cover_url)
-                    # x-small -> large
-                    cover_url = re.sub(r'x-small', 'large', cover_url)
-                    
-                    # 确保URL有效，并且能够被Notion访问
-                    # 处理一些特殊的URL格式问题
-                    if '?' in cover_url:
-                        cover_url = cover_url.split('?')[0]
-                    
-                    # 豆瓣的图片服务器可能被Notion封锁，尝试替换为CDN域名
-                    if 'img1.doubanio.com' in cover_url:
-                        cover_url = cover_url.replace('img1.doubanio.com', 'img9.doubanio.com')
-                    elif 'img2.doubanio.com' in cover_url:
-                        cover_url = cover_url.replace('img2.doubanio.com', 'img9.doubanio.com')
-                    
-                    logger.info(f"提取到封面URL: {cover_url}")
-                    movie_data['cover_url'] = cover_url
-                else:
-                    logger.warning("未能提取到封面图URL属性")
-                    movie_data['cover_url'] = None
-            else:
-                logger.warning("未找到封面图元素")
-                movie_data['cover_url'] = None
-        except Exception as e:
-            logger.error(f"提取封面图URL出错: {e}")
-            movie_data['cover_url'] = None
+        Returns:
+            电影数据
+        """
+        return _run_sync(cls.extract_movie_data(HtmlDocument(html, url), fields))
+    
+    @classmethod
+    async def _extract_title(cls, page: "Page", info: _InfoSection, movie_data: MovieRecord) -> Optional[str]:
+        """提取标题"""
+        title_elem = await page.query_selector('h1 span[property="v:itemreviewed"]')
+        if not title_elem:
+            # 备选提取方法
+            title_elem = await page.query_selector('h1')
+        if title_elem:
+            original_title = await title_elem.text_content()
+            return cls._clean_title(original_title)
+        return None
+    
+    @staticmethod
+    async def _extract_people(page: "Page", selector: str, limit: Optional[int] = None) -> List[Person]:
+        """提取人员链接的名称和地址"""
+        people = []
+        elems = await page.query_selector_all(selector)
+        for elem in elems[:limit]:
+            name = await elem.text_content()
+            url = await elem.get_attribute('href')
+            people.append(Person(name.strip(), url))
+        return people
+    
+    @classmethod
+    async def _extract_directors(cls, page: "Page", info: _InfoSection, movie_data: MovieRecord) -> List[Person]:
+        """提取导演"""
+        return await cls._extract_people(page, 'a[rel="v:directedBy"]')
+    
+    @classmethod
+    async def _extract_screenwriters(cls, page: "Page", info: _InfoSection, movie_data: MovieRecord) -> List[Person]:
+        """提取编剧"""
+        screenwriters = []
+        info_html = await info.html()
+        if info_html:
+            # 使用正则表达式提取编剧信息
+            screenwriter_match = re.search(r'编剧</span>:(.*?)<br/?>', info_html, re.DOTALL)
+            if screenwriter_match:
+                screenwriter_html = screenwriter_match.group(1)
+                # 提取所有<a>标签
+                sw_links = re.findall(r'<a href="([^"]+)"[^>]*>([^<]+)</a>', screenwriter_html)
+                for url, name in sw_links:
+                    screenwriters.append(Person(name.strip(), url))
+        return screenwriters
+    
+    @classmethod
+    async def _extract_actors(cls, page: "Page", info: _InfoSection, movie_data: MovieRecord) -> List[Person]:
+        """提取主演 (前5名)"""
+        return await cls._extract_people(page, 'a[rel="v:starring"]', limit=5)
+    
+    @classmethod
+    async def _extract_genres(cls, page: "Page", info: _InfoSection, movie_data: MovieRecord) -> List[str]:
+        """提取类型"""
+        genres = []
+        genre_elems = await page.query_selector_all('span[property="v:genre"]')
+        for genre_elem in genre_elems:
+            genre_text = await genre_elem.text_content()
+            genres.append(genre_text.strip())
+        return genres
+    
+    @classmethod
+    async def _extract_languages(cls, page: "Page", info: _InfoSection, movie_data: MovieRecord) -> List[str]:
+        """提取语言"""
+        info_text = await info.text()
+        if info_text:
+            language_match = re.search(r'语言:\s*(.*?)(?:\n|$)', info_text)
+            if language_match:
+                return [lang.strip() for lang in language_match.group(1).split('/')]
+        return []
+    
+    @classmethod
+    async def _extract_rating(cls, page: "Page", info: _InfoSection, movie_data: MovieRecord) -> Optional[float]:
+        """提取评分"""
+        rating_elem = await page.query_selector('strong[property="v:average"]')
+        if rating_elem:
+            rating_text = await rating_elem.text_content()
+            try:
+                return float(rating_text)
+            except ValueError:
+                return None
+        return None
+    
+    @classmethod
+    async def _extract_votes(cls, page: "Page", info: _InfoSection, movie_data: MovieRecord) -> Optional[int]:
+        """提取评价人数"""
+        votes_elem = await page.query_selector('span[property="v:votes"]')
+        votes_text = await votes_elem.text_content() if votes_elem else ""
+        return int(votes_text.strip()) if votes_text.strip().isdigit() else None
+    
+    @classmethod
+    async def _extract_imdb_id(cls, page: "Page", info: _InfoSection, movie_data: MovieRecord) -> Optional[str]:
+        """提取IMDb ID"""
+        info_text = await info.text()
+        if info_text is None:
+            return None
+        imdb_match = re.search(r'IMDb:\s*(tt\d+)', info_text)
+        if imdb_match:
+            return imdb_match.group(1)
+        # 尝试其他匹配方式
+        imdb_link_match = re.search(r'href="https?://www\.imdb\.com/title/(tt\d+)"', await info.html())
+        return imdb_link_match.group(1) if imdb_link_match else None
+    
+    @classmethod
+    async def _extract_release_date(cls, page: "Page", info: _InfoSection, movie_data: MovieRecord) -> Optional[str]:
+        """提取上映日期（首播）"""
+        release_elem = await page.query_selector('span[property="v:initialReleaseDate"]')
+        if release_elem:
+            release_text = await release_elem.text_content()
+            # 保留完整日期文本，包括地区信息
+            return release_text.strip()
+        return None
+    
+    @classmethod
+    async def _extract_summary(cls, page: "Page", info: _InfoSection, movie_data: MovieRecord) -> Optional[str]:
+        """提取剧情简介"""
+        # 尝试获取展开的完整简介
+        summary_elem = await page.query_selector('span[property="v:summary"]')
+        if not summary_elem:
+            # 尝试其他可能的选择器
+            summary_elem = await page.query_selector('div.related-info div.indent span.short')
+        if not summary_elem:
+            return None
+        
+        summary_text = await summary_elem.text_content()
+        # 清理简介文本
+        summary_text = re.sub(r'[\t\f\v ]+', ' ', summary_text).strip()
+        # 将文本按段落分割
+        paragraphs = re.split(r'\n+', summary_text)
+        # 在每个段落前添加中文缩进空格
+        formatted_paragraphs = ["　　" + p.strip() for p in paragraphs if p.strip()]
+        # 重新组合文本，使用换行符连接
+        summary_text = "\n".join(formatted_paragraphs)
+        # 限制简介长度
+        if len(summary_text) > 1000:
+            summary_text = summary_text[:997] + "..."
+        return summary_text
+    
+    @classmethod
+    async def _extract_aka(cls, page: "Page", info: _InfoSection, movie_data: MovieRecord) -> str:
+        """提取又名"""
+        info_text = await info.text()
+        if info_text:
+            aka_match = re.search(r'又名:(.*?)(?:\n|$)', info_text)
+            if aka_match:
+                akas = [aka.strip() for aka in aka_match.group(1).split('/')]
+                return "/".join([aka for aka in akas if aka])
+        return ""
+    
+    @classmethod
+    async def _extract_category(cls, page: "Page", info: _InfoSection, movie_data: MovieRecord) -> str:
+        """确定内容类型（电影或电视剧）"""
+        info_text = await info.text() or ""
+        return cls._determine_content_type(page.url, movie_data.get('genres', []), info_text)
+    
+    @classmethod
+    async def _extract_cover_url(cls, page: "Page", info: _InfoSection, movie_data: MovieRecord) -> Optional[str]:
+        """提取封面图URL"""
+        cover_elem = await page.query_selector('div#mainpic img')
+        if not cover_elem:
+            logger.warning("未找到封面图元素")
+            return None
+        
+        cover_url = await cover_elem.get_attribute('src')
+        if not cover_url:
+            logger.warning("未能提取到封面图URL属性")
+            return None
+        
+        # 尝试获取更高质量的图片
+        # 豆瓣图片链接通常有小中大三种尺寸，尝试获取大图
+        # s_ratio_poster -> l_ratio_poster
+        cover_url = re.sub(r's_ratio_poster', 'l_ratio_poster', cover_url)
+        # webp.image -> large.image
+        cover_url = re.sub(r'webp\.image', 'large.image', cover_url)
+        # x-small -> large
+        cover_url = re.sub(r'x-small', 'large', cover_url)
+        
+        # 确保URL有效，并且能够被Notion访问
+        # 处理一些特殊的URL格式问题
+        if '?' in cover_url:
+            cover_url = cover_url.split('?')[0]
+        
+        # 豆瓣的图片服务器可能被Notion封锁，尝试替换为CDN域名
+        if 'img1.doubanio.com' in cover_url:
+            cover_url = cover_url.replace('img1.doubanio.com', 'img9.doubanio.com')
+        elif 'img2.doubanio.com' in cover_url:
+            cover_url = cover_url.replace('img2.doubanio.com', 'img9.doubanio.com')
         
-        return movie_data 
\ No newline at end of file
+        logger.info(f"提取到封面URL: {cover_url}")
+        return cover_url
\ No newline at end of file
@@ -0,0 +1,283 @@
+"""
+HTML文档模块，用标准库 html.parser 建立简单的DOM，提供与Playwright页面相同的查询接口，
+DoubanParser 可以不经浏览器直接解析保存的HTML
+"""
+import re
+from html import escape
+from html.parser import HTMLParser
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 没有结束标签的元素
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr"
+}
+
+# 内容不转义的元素
+RAW_TEXT_ELEMENTS = {"script", "style"}
+
+# 选择器中的单个条件：标签名、#id、.class、[属性] 或 [属性="值"]
+SELECTOR_TOKEN_PATTERN = re.compile(
+    r'([\w-]+)|#([\w-]+)|\.([\w-]+)|\[\s*([\w:-]+)\s*(?:=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\]\s]*)))?\s*\]'
+)
+
+class HtmlElement:
+    """
+    DOM元素，提供 DoubanParser 用到的 ElementHandle 方法
+    
+    查询方法为协程，与Playwright的接口一致，但不会挂起
+    """
+    
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["HtmlElement"] = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        # 子节点：HtmlElement 或文本
+        self.children: List[object] = []
+    
+    @property
+    def classes(self) -> List[str]:
+        """class属性中的类名"""
+        return self.attrs.get("class", "").split()
+    
+    def iter_descendants(self) -> Iterator["HtmlElement"]:
+        """按文档顺序遍历所有后代元素"""
+        stack = [child for child in reversed(self.children) if isinstance(child, HtmlElement)]
+        while stack:
+            elem = stack.pop()
+            yield elem
+            stack.extend(child for child in reversed(elem.children) if isinstance(child, HtmlElement))
+    
+    def text(self) -> str:
+        """所有后代文本，同DOM的 textContent"""
+        parts = []
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            if isinstance(node, HtmlElement):
+                stack.extend(reversed(node.children))
+            else:
+                parts.append(node)
+        return "".join(parts)
+    
+    def html(self) -> str:
+        """子节点的HTML，按浏览器 innerHTML 的规则序列化（属性用双引号，空元素不带斜杠）"""
+        parts: List[str] = []
+        for child in self.children:
+            if isinstance(child, HtmlElement):
+                child._serialize(parts)
+            elif self.tag in RAW_TEXT_ELEMENTS:
+                parts.append(child)
+            else:
+                parts.append(escape(child, quote=False).replace("\xa0", "&nbsp;"))
+        return "".join(parts)
+    
+    def _serialize(self, parts: List[str]):
+        """序列化元素本身及其子节点"""
+        attrs = "".join(
+            f' {name}="{value.replace("&", "&amp;").replace(chr(34), "&quot;").replace(chr(160), "&nbsp;")}"'
+            for name, value in self.attrs.items()
+        )
+        parts.append(f"<{self.tag}{attrs}>")
+        if self.tag in VOID_ELEMENTS:
+            return
+        parts.append(self.html())
+        parts.append(f"</{self.tag}>")
+    
+    def select(self, selector: str) -> List["HtmlElement"]:
+        """
+        查找匹配选择器的后代元素
+        
+        Args:
+            selector: 由后代组合符连接的简单选择器，如 'div#mainpic img'、'a[rel="v:starring"]'，
+                多个选择器用逗号分隔
+        
+        Returns:
+            按文档顺序排列的元素列表
+        """
+        return list(self._iter_matches(selector))
+    
+    def _iter_matches(self, selector: str) -> Iterator["HtmlElement"]:
+        """按文档顺序逐个返回匹配的后代元素"""
+        chains = [parse_selector(part) for part in selector.split(",")]
+        for elem in self.iter_descendants():
+            if any(_matches_chain(elem, chain) for chain in chains):
+                yield elem
+    
+    async def query_selector(self, selector: str) -> Optional["HtmlElement"]:
+        """第一个匹配的后代元素，没有时返回None"""
+        return next(self._iter_matches(selector), None)
+    
+    async def query_selector_all(self, selector: str) -> List["HtmlElement"]:
+        """所有匹配的后代元素"""
+        return self.select(selector)
+    
+    async def text_content(self) -> str:
+        """同 ElementHandle.text_content"""
+        return self.text()
+    
+    async def inner_html(self) -> str:
+        """同 ElementHandle.inner_html"""
+        return self.html()
+    
+    async def get_attribute(self, name: str) -> Optional[str]:
+        """同 ElementHandle.get_attribute"""
+        return self.attrs.get(name)
+
+class HtmlDocument(HtmlElement):
+    """
+    解析后的HTML文档，提供 DoubanParser 用到的 Page 方法
+    
+    文档地址依次取自参数、<link rel="canonical"> 和 <meta property="og:url">
+    """
+    
+    def __init__(self, html: str, url: str = ""):
+        """
+        解析HTML
+        
+        Args:
+            html: HTML文本
+            url: 文档地址，为空时从文档中读取
+        """
+        super().__init__("#document", {})
+        builder = _TreeBuilder(self)
+        builder.feed(html)
+        builder.close()
+        self.url = url or self._declared_url()
+    
+    def _declared_url(self) -> str:
+        """文档中声明的地址"""
+        for elem in self.iter_descendants():
+            if elem.tag == "link" and "canonical" in elem.attrs.get("rel", "").split():
+                return elem.attrs.get("href", "")
+            if elem.tag == "meta" and elem.attrs.get("property") == "og:url":
+                return elem.attrs.get("content", "")
+        return ""
+
+class _TreeBuilder(HTMLParser):
+    """把 html.parser 的事件组装为元素树，容忍未闭合和多余的结束标签"""
+    
+    def __init__(self, root: HtmlElement):
+        super().__init__(convert_charrefs=True)
+        self.stack = [root]
+    
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        parent = self.stack[-1]
+        elem = HtmlElement(tag, {name: value or "" for name, value in attrs}, parent)
+        parent.children.append(elem)
+        if tag not in VOID_ELEMENTS:
+            self.stack.append(elem)
+    
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        # HTML中非空元素的自闭合斜杠没有意义，这里按空元素处理
+        parent = self.stack[-1]
+        parent.children.append(HtmlElement(tag, {name: value or "" for name, value in attrs}, parent))
+    
+    def handle_endtag(self, tag: str):
+        # 关闭最近的同名元素及其中未闭合的元素，找不到时忽略
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].tag == tag:
+                del self.stack[index:]
+                return
+    
+    def handle_data(self, data: str):
+        self.stack[-1].children.append(data)
+
+# 已解析的选择器
+_selector_cache: Dict[str, List[List[Tuple[str, str, Optional[str]]]]] = {}
+
+def parse_selector(selector: str) -> List[List[Tuple[str, str, Optional[str]]]]:
+    """
+    解析由后代组合符连接的选择器
+    
+    Args:
+        selector: 如 'div.related-info div.indent span.short'
+    
+    Returns:
+        每一级的条件列表，条件为 (类型, 名称, 值)，类型为 tag、id、class 或 attr
+    
+    Raises:
+        ValueError: 选择器含有不支持的语法
+    """
+    cached = _selector_cache.get(selector)
+    if cached is not None:
+        return cached
+    
+    chain = []
+    for compound in _split_compounds(selector.strip()):
+        conditions = []
+        position = 0
+        while position < len(compound):
+            match = SELECTOR_TOKEN_PATTERN.match(compound, position)
+            if not match:
+                raise ValueError(f"不支持的选择器: {selector}")
+            tag, id_, class_, attr = match.group(1, 2, 3, 4)
+            if tag:
+                conditions.append(("tag", tag.lower(), None))
+            elif id_:
+                conditions.append(("id", id_, None))
+            elif class_:
+                conditions.append(("class", class_, None))
+            else:
+                value = next((group for group in match.group(5, 6, 7) if group is not None), None)
+                conditions.append(("attr", attr, value))
+            position = match.end()
+        chain.append(conditions)
+    _selector_cache[selector] = chain
+    return chain
+
+def _split_compounds(selector: str) -> List[str]:
+    """按空白拆分选择器，属性值中的空白不拆分"""
+    parts, current, quote, depth = [], [], None, 0
+    for char in selector:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+        elif char.isspace() and depth == 0:
+            if current:
+                parts.append("".join(current))
+                current = []
+            continue
+        current.append(char)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+def _matches_compound(elem: HtmlElement, conditions: List[Tuple[str, str, Optional[str]]]) -> bool:
+    """元素是否满足一级选择器的全部条件"""
+    for kind, name, value in conditions:
+        if kind == "tag":
+            if elem.tag != name:
+                return False
+        elif kind == "id":
+            if elem.attrs.get("id") != name:
+                return False
+        elif kind == "class":
+            if name not in elem.classes:
+                return False
+        elif name not in elem.attrs or (value is not None and elem.attrs[name] != value):
+            return False
+    return True
+
+def _matches_chain(elem: HtmlElement, chain: List[List[Tuple[str, str, Optional[str]]]]) -> bool:
+    """
+    元素是否匹配整个选择器
+    
+    同DOM的 querySelector，祖先条件在整个文档中判断，查询范围只限制返回的元素
+    """
+    if not _matches_compound(elem, chain[-1]):
+        return False
+    ancestor = elem.parent
+    for conditions in reversed(chain[:-1]):
+        while ancestor is not None and not _matches_compound(ancestor, conditions):
+            ancestor = ancestor.parent
+        if ancestor is None:
+            return False
+        ancestor = ancestor.parent
+    return True
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""
+豆瓣联想接口解析模块，解析 /j/subject_suggest 返回的JSON，并按标题相似度、年份和类型为候选结果排序
+"""
+import re
+import json
+import unicodedata
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
+
+# 影视类型
+KIND_MOVIE = "movie"
+KIND_TV = "tv"
+
+# 标题末尾用空格或括号分开的年份，如 "霸王别姬 1993"、"霸王别姬(1993)"；"请回答1988" 中的数字是标题的一部分。
+# "Blade Runner 2049" 这样的标题也符合该格式，只有没有条目与完整名称相同时才作为年份使用
+TRAILING_YEAR_PATTERN = re.compile(r"^(.*?)(?:\s+|\s*[(（\[])((?:19|20)\d{2})[)）\]]?\s*$")
+
+# 剧集标题的特征，如 "第二季"、"Season 2"、"S02"
+TV_TITLE_PATTERN = re.compile(r"第[一二三四五六七八九十\d]+季|season\s*\d+|\bS\d{1,2}\b", re.IGNORECASE)
+
+# 年份一致、相差一年（上映年份与首映年份不同）和不一致时的得分调整
+YEAR_MATCH_BONUS = 0.3
+YEAR_NEAR_BONUS = 0.1
+YEAR_MISMATCH_PENALTY = 0.2
+
+# 类型一致和不一致时的得分调整
+KIND_MATCH_BONUS = 0.15
+KIND_MISMATCH_PENALTY = 0.15
+
+class SuggestCandidate:
+    """联想接口返回的一个影视条目"""
+    
+    def __init__(self, subject_id: str, title: str, sub_title: str = "",
+                 year: Optional[int] = None, kind: str = KIND_MOVIE):
+        """
+        Args:
+            subject_id: 豆瓣详情页ID
+            title: 中文标题
+            sub_title: 原名
+            year: 年份
+            kind: movie 或 tv
+        """
+        self.subject_id = subject_id
+        self.title = title
+        self.sub_title = sub_title
+        self.year = year
+        self.kind = kind
+        # 标题相似度和总分，由 rank_candidates 计算
+        self.similarity = 0.0
+        self.score = 0.0
+    
+    def __repr__(self) -> str:
+        return f"SuggestCandidate({self.subject_id!r}, {self.title!r}, {self.year!r}, {self.kind!r}, score={self.score:.2f})"
+
+def parse_query(title: str) -> Tuple[str, Optional[str], Optional[int], Optional[str]]:
+    """
+    从输入的名称中提取可能的年份和类型提示
+    
+    末尾用空格或括号分开的四位年份可能是年份提示，也可能是标题的一部分，由 pick_candidate 根据联想结果判断；
+    只剩年份时（如《2046》）按名称处理。名称中有"第二季"等字样时视为剧集
+    
+    Args:
+        title: 用户输入的影视名称
+    
+    Returns:
+        (完整名称, 去掉年份的名称, 年份, 类型)，末尾没有年份时去掉年份的名称和年份为None，没有类型提示时类型为None
+    """
+    full_name = title.strip()
+    name, year = None, None
+    match = TRAILING_YEAR_PATTERN.match(full_name)
+    if match and match.group(1).strip():
+        name, year = match.group(1).strip(), int(match.group(2))
+    kind = KIND_TV if TV_TITLE_PATTERN.search(full_name) else None
+    return full_name, name, year, kind
+
+def parse_suggest(text: str) -> List[SuggestCandidate]:
+    """
+    解析联想接口的响应
+    
+    只保留影视条目，人物等其他条目忽略；有集数的条目视为剧集
+    
+    Args:
+        text: 响应的JSON文本
+    
+    Returns:
+        候选结果，保持接口返回的顺序
+    
+    Raises:
+        ValueError: 响应不是JSON数组（如被重定向到验证页）
+    """
+    items = json.loads(text)
+    if not isinstance(items, list):
+        raise ValueError("联想接口的响应不是数组")
+    
+    candidates = []
+    for item in items:
+        if not isinstance(item, dict) or item.get("type", "movie") != "movie" or not item.get("id"):
+            continue
+        year = str(item.get("year") or "")
+        candidates.append(SuggestCandidate(
+            str(item["id"]),
+            item.get("title") or "",
+            item.get("sub_title") or "",
+            int(year) if year.isdigit() else None,
+            KIND_TV if item.get("episode") else KIND_MOVIE
+        ))
+    return candidates
+
+def normalize_title(title: str) -> str:
+    """统一全角半角和大小写，去掉空白和标点，用于比较标题"""
+    return re.sub(r"[\W_]+", "", unicodedata.normalize("NFKC", title).lower())
+
+def title_similarity(query: str, candidate: SuggestCandidate) -> float:
+    """
+    查询名称与候选结果标题的相似度，中文标题和原名取较高者
+    
+    Returns:
+        0到1之间的相似度，标题相同时为1
+    """
+    query = normalize_title(query)
+    best = 0.0
+    for title in (candidate.title, candidate.sub_title):
+        title = normalize_title(title)
+        if not title:
+            continue
+        if title == query:
+            return 1.0
+        best = max(best, SequenceMatcher(None, query, title).ratio())
+    return best
+
+def rank_candidates(candidates: List[SuggestCandidate], name: str,
+                    year: Optional[int] = None, kind: Optional[str] = None,
+                    alt_name: Optional[str] = None) -> List[SuggestCandidate]:
+    """
+    为候选结果打分并排序
+    
+    得分以标题相似度为基础，指定了年份或类型时再按是否一致加减分；
+    得分相同时保持接口返回的顺序（接口已按热度排序）
+    
+    Args:
+        candidates: 候选结果
+        name: 查询名称
+        year: 年份，None表示不限
+        kind: movie 或 tv，None表示不限
+        alt_name: 另一个查询名称（如去掉年份的名称），相似度取两者中较高者
+    
+    Returns:
+        按得分从高到低排列的候选结果
+    """
+    for candidate in candidates:
+        candidate.similarity = title_similarity(name, candidate)
+        if alt_name:
+            candidate.similarity = max(candidate.similarity, title_similarity(alt_name, candidate))
+        score = candidate.similarity
+        if year is not None and candidate.year is not None:
+            difference = abs(candidate.year - year)
+            if difference == 0:
+                score += YEAR_MATCH_BONUS
+            elif difference == 1:
+                score += YEAR_NEAR_BONUS
+            else:
+                score -= YEAR_MISMATCH_PENALTY
+        if kind is not None:
+            score += KIND_MATCH_BONUS if candidate.kind == kind else -KIND_MISMATCH_PENALTY
+        candidate.score = score
+    return sorted(candidates, key=lambda candidate: candidate.score, reverse=True)
+
+def pick_candidate(candidates: List[SuggestCandidate], title: str,
+                   min_similarity: float) -> Optional[SuggestCandidate]:
+    """
+    从联想结果中选出与输入最匹配的影视
+    
+    末尾的数字只在没有条目与完整名称相同时才作为年份提示，
+    "Blade Runner 2049"、"Death Race 2000" 会选中标题相同的条目，而不是按年份挑选同名的其他影片
+    
+    Args:
+        candidates: parse_suggest 的结果
+        title: 用户输入的影视名称，可以带年份
+        min_similarity: 最佳结果的标题相似度低于该值时视为没有找到
+    
+    Returns:
+        最匹配的候选结果，没有足够接近的结果时返回None
+    """
+    full_name, name, year, kind = parse_query(title)
+    if year is not None and any(title_similarity(full_name, candidate) == 1.0 for candidate in candidates):
+        name, year = None, None
+    ranked = rank_candidates(candidates, full_name, year, kind, alt_name=name)
+    if not ranked or ranked[0].similarity < min_similarity:
+        return None
+    return ranked[0]
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+Notion记录定时刷新程序，在请求预算内重新抓取最可能变化的记录并更新评分
+"""
+import os
+import sys
+import asyncio
+import argparse
+from typing import Optional
+
+from config.logging_config import setup_logger
+from config.settings import DOUBAN_COOKIES, REFRESH_HOURLY_BUDGET, REFRESH_STATE_PATH
+
+# 创建日志记录器
+logger = setup_logger("refresh")
+
+async def refresh(once: bool, budget: Optional[int], dry_run: bool, state_path: str) -> bool:
+    """
+    运行刷新调度
+    
+    Args:
+        once: 只执行一轮（适合由cron调用）
+        budget: 每小时请求预算
+        dry_run: 只输出本轮计划，不访问豆瓣
+        state_path: 刷新状态数据库路径
+    
+    Returns:
+        是否成功启动
+    """
+    from sync.notion_sync import NotionSyncModule, test_database_connection
+    from sync.refresh_scheduler import RefreshScheduler, RefreshState
+    
+    database_id = os.environ.get("NOTION_DATABASE_ID")
+    token = os.environ.get("NOTION_TOKEN")
+    if not database_id or not token:
+        logger.error("未设置Notion配置，请设置NOTION_DATABASE_ID和NOTION_TOKEN环境变量")
+        return False
+    
+    notion_sync = NotionSyncModule(database_id, token)
+    loop = asyncio.get_running_loop()
+    success, message = await loop.run_in_executor(
+        None, lambda: test_database_connection(database_id, token, session=notion_sync.session)
+    )
+    logger.info(message)
+    if not success:
+        notion_sync.close()
+        return False
+    
+    state = RefreshState(state_path)
+    browser = None
+    try:
+        if dry_run:
+            scheduler = RefreshScheduler(notion_sync, None, state, budget)
+            candidates = await loop.run_in_executor(None, scheduler.collect_candidates)
+            for candidate in scheduler.plan(candidates, budget):
+                print(f"{candidate.score:10.2f}  {candidate.title}  评分: {candidate.rating}  "
+                      f"地址: {candidate.subject_url or '待搜索'}")
+            return True
+        
+        from core.browser import PlaywrightBrowser
+        from scrapers.douban_scraper import DoubanScraper
+        
+        browser = PlaywrightBrowser(headless=True, cookies=DOUBAN_COOKIES)
+        scraper = DoubanScraper(browser)
+        await browser.init_browser()
+        
+        scheduler = RefreshScheduler(notion_sync, scraper, state, budget)
+        if once:
+            await scheduler.run_once()
+        else:
+            await scheduler.run_forever()
+        return True
+    finally:
+        if browser:
+            await browser.close()
+        state.close()
+        notion_sync.close()
+
+def main():
+    """程序主入口"""
+    parser = argparse.ArgumentParser(description="按过期程度刷新Notion中的影视评分")
+    parser.add_argument("--once", action="store_true", help="只执行一轮，适合由cron每小时调用")
+    parser.add_argument("--budget", type=int, default=REFRESH_HOURLY_BUDGET, help="每小时最多访问豆瓣的次数")
+    parser.add_argument("--dry-run", action="store_true", help="只输出本轮要刷新的记录，不访问豆瓣")
+    parser.add_argument("--state", type=str, default=REFRESH_STATE_PATH, help="刷新状态数据库路径")
+    args = parser.parse_args()
+    
+    try:
+        ok = asyncio.run(refresh(args.once, args.budget, args.dry_run, args.state))
+    except KeyboardInterrupt:
+        print("\n刷新已停止")
+        sys.exit(130)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,220 @@
+"""
+保存页面重新解析程序，把保存的豆瓣详情页HTML并行解析为影视数据，写入JSON Lines文件或同步到Notion
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config.logging_config import setup_logger
+from config.settings import DOUBAN_MOVIE_BASE_URL
+
+# 创建日志记录器
+logger = setup_logger("reparse")
+
+# 可解析的文件扩展名
+HTML_EXTENSIONS = (".html", ".htm", ".html.gz", ".html.zst")
+
+# 从文件名推断详情页ID，如 subject_1292052.html
+SUBJECT_FILENAME_PATTERN = re.compile(r"subject_(\d+)")
+
+# 调试信息目录的索引文件
+DEBUG_INDEX_FILENAME = "index.jsonl"
+
+# 页面归档的索引文件
+ARCHIVE_INDEX_FILENAME = "index.db"
+
+# 输出进度的间隔(秒)
+PROGRESS_INTERVAL = 5.0
+
+def _debug_capture_urls(directory: str) -> Dict[str, str]:
+    """读取调试信息目录的索引，返回 文件名 -> 页面地址"""
+    urls: Dict[str, str] = {}
+    try:
+        with open(os.path.join(directory, DEBUG_INDEX_FILENAME), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                for name in entry.get("files", []):
+                    urls[name] = entry.get("url", "")
+    except OSError:
+        pass
+    return urls
+
+def iter_sources(paths: List[str]) -> Iterator[Tuple[str, str]]:
+    """
+    列出要解析的页面
+    
+    目录中有 index.db 时按页面归档读取每个详情页最新的一次归档；否则递归查找HTML文件，
+    页面地址依次取自调试信息索引、文件名中的详情页ID，都没有时由解析时从页面中读取
+    
+    Args:
+        paths: 文件、目录或页面归档目录
+    
+    Returns:
+        (文件路径, 页面地址) 的迭代器，地址可能为空
+    """
+    for path in paths:
+        if os.path.isfile(path):
+            match = SUBJECT_FILENAME_PATTERN.search(os.path.basename(path))
+            yield path, f"{DOUBAN_MOVIE_BASE_URL}/subject/{match.group(1)}/" if match else ""
+            continue
+        
+        if os.path.exists(os.path.join(path, ARCHIVE_INDEX_FILENAME)):
+            from core.archive import HtmlArchive
+            archive = HtmlArchive(path)
+            try:
+                for url, object_path in archive.latest_documents("%/subject/%"):
+                    yield object_path, url
+            finally:
+                archive.close()
+            continue
+        
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            urls = _debug_capture_urls(root)
+            for name in sorted(files):
+                if not name.endswith(HTML_EXTENSIONS):
+                    continue
+                url = urls.get(name, "")
+                match = SUBJECT_FILENAME_PATTERN.search(name)
+                if not url and match:
+                    url = f"{DOUBAN_MOVIE_BASE_URL}/subject/{match.group(1)}/"
+                yield os.path.join(root, name), url
+
+def read_page(path: str) -> str:
+    """
+    读取保存的页面，按扩展名解压
+    
+    Args:
+        path: 文件路径，支持 .gz 和 .zst 压缩
+    
+    Returns:
+        HTML文本
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".gz"):
+        data = gzip.decompress(data)
+    elif path.endswith(".zst"):
+        from core.archive import CODEC_ZSTD, decompress
+        data = decompress(CODEC_ZSTD, data)
+    return data.decode("utf-8", "replace")
+
+def parse_page(source: Tuple[str, str]) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """
+    在工作进程中解析一个页面，出错时返回错误信息，不影响其他文件
+    
+    Args:
+        source: (文件路径, 页面地址)
+    
+    Returns:
+        (文件路径, 影视数据, 错误信息)，成功时错误信息为None
+    """
+    from parsers.douban_parser import DoubanParser
+    
+    path, url = source
+    try:
+        movie_data = DoubanParser.parse_html(read_page(path), url)
+    except Exception as e:
+        return path, None, f"{e.__class__.__name__}: {e}"
+    if not movie_data.get("title"):
+        # 验证页、搜索页等不是详情页
+        return path, None, "未找到标题，不是详情页"
+    return path, movie_data, None
+
+def reparse(paths: List[str], output: Optional[str], sync: bool, workers: int, chunksize: int) -> Dict[str, Any]:
+    """
+    并行解析保存的页面，结果按文件顺序写入JSON Lines文件或同步到Notion
+    
+    Args:
+        paths: 文件、目录或页面归档目录
+        output: JSON Lines输出路径，None表示不写文件
+        sync: 是否同步到Notion
+        workers: 解析进程数
+        chunksize: 每次交给工作进程的文件数
+    
+    Returns:
+        统计信息
+    """
+    notion_sync = None
+    if sync:
+        from sync.notion_sync import NotionSyncModule
+        notion_sync = NotionSyncModule()
+    
+    stats = {"files": 0, "parsed": 0, "failed": 0, "synced": 0, "sync_failed": 0}
+    started = time.monotonic()
+    reported = started
+    out = open(output, "w", encoding="utf-8") if output else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map按提交顺序返回结果，输出顺序与文件顺序一致，结果边解析边写出
+            for path, movie_data, error in executor.map(parse_page, iter_sources(paths), chunksize=chunksize):
+                stats["files"] += 1
+                if error:
+                    stats["failed"] += 1
+                    logger.warning(f"解析 {path} 失败: {error}")
+                else:
+                    stats["parsed"] += 1
+                    if out:
+                        out.write(movie_data.to_json() + "\n")
+                    if notion_sync:
+                        try:
+                            notion_sync.sync_movie(movie_data)
+                            stats["synced"] += 1
+                        except Exception as e:
+                            stats["sync_failed"] += 1
+                            logger.error(f"同步 {movie_data.get('title')} 失败: {e}")
+                
+                now = time.monotonic()
+                if now - reported >= PROGRESS_INTERVAL:
+                    reported = now
+                    logger.info(f"已处理 {stats['files']} 个文件，{stats['files'] / (now - started):.1f} 个/秒，失败 {stats['failed']} 个")
+    finally:
+        if out:
+            out.close()
+        if notion_sync:
+            notion_sync.close()
+    
+    elapsed = time.monotonic() - started
+    stats["seconds"] = round(elapsed, 2)
+    stats["files_per_second"] = round(stats["files"] / elapsed, 1) if elapsed > 0 else 0.0
+    return stats
+
+def main():
+    """程序主入口"""
+    parser = argparse.ArgumentParser(description="重新解析保存的豆瓣详情页")
+    parser.add_argument("paths", nargs="+", help="HTML文件、目录（如调试信息目录）或页面归档目录")
+    parser.add_argument("--output", type=str, help="JSON Lines输出文件")
+    parser.add_argument("--sync", action="store_true", help="解析结果同步到Notion")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="解析进程数")
+    parser.add_argument("--chunksize", type=int, default=16, help="每次交给工作进程的文件数")
+    args = parser.parse_args()
+    
+    if not args.output and not args.sync:
+        parser.error("请指定 --output 或 --sync")
+    if args.sync and not (os.environ.get("NOTION_DATABASE_ID") and os.environ.get("NOTION_TOKEN")):
+        parser.error("未设置Notion配置，请设置NOTION_DATABASE_ID和NOTION_TOKEN环境变量")
+    
+    try:
+        stats = reparse(args.paths, args.output, args.sync, max(1, args.workers), max(1, args.chunksize))
+    except KeyboardInterrupt:
+        print("\n解析已中断")
+        sys.exit(130)
+    
+    print(
+        f"处理 {stats['files']} 个文件，解析成功 {stats['parsed']} 个，失败 {stats['failed']} 个，"
+        f"耗时 {stats['seconds']} 秒（{stats['files_per_second']} 个/秒）"
+    )
+    if args.sync:
+        print(f"同步成功 {stats['synced']} 个，失败 {stats['sync_failed']} 个")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
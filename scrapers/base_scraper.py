@@ -1,78 +1,168 @@
 """
 爬虫基类，提供所有爬虫的通用方法
 """
-from typing import Optional, Dict, Any
-
-from playwright.async_api import Page, TimeoutError
+import time
+from typing import Optional, Dict, Any, Tuple, TYPE_CHECKING
 
 from core.browser import PlaywrightBrowser
+from core.pacing import PacingScheduler, navigation_pacer
+from core.antibot import AntiBotBlocked, DomainCooldown, domain_cooldown, inspect_page
+from core.identity import Identity, IdentityPool, identity_pool
+from core.deadline import DeadlineExceeded, check_deadline
+from core.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    navigation_limiter,
+    OUTCOME_OK,
+    OUTCOME_ERROR,
+    OUTCOME_TIMEOUT,
+    OUTCOME_BLOCKED
+)
 from config.logging_config import setup_logger
 from config.settings import DEFAULT_RETRY_TIMES
 
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
 # 创建日志记录器
 logger = setup_logger('base_scraper')
 
 class BaseScraper:
     """爬虫基类，提供基本功能"""
     
-    def __init__(self, browser: PlaywrightBrowser, retry_times: int = DEFAULT_RETRY_TIMES):
+    def __init__(self, browser: PlaywrightBrowser, retry_times: int = DEFAULT_RETRY_TIMES,
+                 limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                 cooldown: Optional[DomainCooldown] = None,
+                 pacer: Optional[PacingScheduler] = None,
+                 identities: Optional[IdentityPool] = None):
         """
         初始化爬虫
         
         Args:
             browser: Playwright浏览器管理器实例
             retry_times: 重试次数
+            limiter: 导航并发控制，默认使用进程内共用的 navigation_limiter
+            cooldown: 反爬拦截后的域名冷却，默认使用进程内共用的 domain_cooldown
+            pacer: 请求节奏控制，默认使用进程内共用的 navigation_pacer
+            identities: 访问身份池，默认使用进程内共用的 identity_pool
         """
         self.browser = browser
         self.retry_times = retry_times
+        self.limiter = limiter or navigation_limiter
+        self.cooldown = cooldown or domain_cooldown
+        self.pacer = pacer or navigation_pacer
+        self.identities = identities or identity_pool
+    
+    async def _navigate_limited(self, page: "Page", url: str, scope: str = "") -> Tuple[str, float, Optional[str]]:
+        """
+        在并发控制和节奏控制下导航，并判断导航结果
+        
+        Args:
+            page: Playwright页面对象
+            url: 目标URL
+            scope: 请求节奏的计算范围（访问身份名）
+            
+        Returns:
+            (导航结果 OUTCOME_*, 耗时秒数, 被拦截时的判断依据)
+        
+        Raises:
+            AntiBotBlocked: 排队期间域名进入冷却
+            DeadlineExceeded: 请求已超过截止时间
+        """
+        from playwright.async_api import TimeoutError
+        
+        async with self.limiter.slot():
+            # 同一站点的请求过于密集时等待，排队期间其他任务可能已被拦截；回放归档时不访问网络，无需等待
+            if not self.browser.archive.replaying:
+                await self.pacer.wait(url, scope)
+            self.cooldown.check(url)
+            started = time.monotonic()
+            try:
+                response = await self.browser.goto(page, url)
+            except DeadlineExceeded:
+                raise
+            except TimeoutError as e:
+                # 按剩余时间缩短的超时不代表豆瓣变慢，不计入并发控制
+                check_deadline("导航")
+                logger.error(f"导航到 {url} 超时: {e}")
+                return OUTCOME_TIMEOUT, time.monotonic() - started, None
+            except Exception as e:
+                logger.error(f"导航到 {url} 失败: {e}")
+                return OUTCOME_ERROR, time.monotonic() - started, None
+            elapsed = time.monotonic() - started
+        
+        status = response.status if response else 0
+        reason = await inspect_page(page, status)
+        if reason:
+            return OUTCOME_BLOCKED, elapsed, reason
+        return (OUTCOME_ERROR if status >= 500 else OUTCOME_OK), elapsed, None
     
-    async def navigate_with_retry(self, url: str) -> Optional[Page]:
+    def _record(self, url: str, identity: Identity, outcome: Optional[str], elapsed: float) -> float:
         """
-        带重试功能的页面导航
+        把导航结果计入并发控制、域名冷却和身份健康度，并归还身份
+        
+        Returns:
+            被拦截时该身份的冷却秒数
+        """
+        if outcome is not None:
+            self.limiter.record(outcome, elapsed)
+            if outcome == OUTCOME_OK:
+                self.cooldown.success(url)
+        return self.identities.release(identity, outcome, elapsed)
+    
+    async def navigate_with_retry(self, url: str) -> Optional["Page"]:
+        """
+        带重试功能的页面导航，每次尝试从身份池租用一个访问身份
         
         Args:
             url: 目标URL
             
         Returns:
             成功打开的页面对象，失败返回None
+        
+        Raises:
+            AntiBotBlocked: 域名冷却中，或所有身份都已被拦截
+            DeadlineExceeded: 请求已超过截止时间
         """
         for attempt in range(self.retry_times):
+            # 请求已超时、域名冷却中或所有身份都在冷却中时不发出请求
+            check_deadline("导航")
+            self.cooldown.check(url)
+            identity = self.identities.acquire(url)
+            page = None
+            outcome, elapsed, reason = None, 0.0, None
             try:
-                # 随机延迟，避免频繁请求
-                await self.browser.random_sleep()
+                # 在身份对应的浏览器上下文中创建新页面
+                page = await self.browser.new_page(identity)
                 
-                # 创建新页面
-                page = await self.browser.new_page()
+                # 导航到目标页面，请求间隔和同时进行的导航数由节奏控制和并发控制决定
+                outcome, elapsed, reason = await self._navigate_limited(page, url, identity.name)
+                if outcome == OUTCOME_OK:
+                    # 模拟人类行为
+                    await self.browser.simulate_human_behavior(page)
+                    return page
                 
-                # 如果是重试，先访问首页，再访问目标页面
-                if attempt > 0:
-                    await self.browser.navigate(page, "https://www.google.com/")
-                    await self.browser.random_sleep(1.0, 2.0)
-                
-                # 导航到目标页面
-                if not await self.browser.navigate(page, url):
+            except (AntiBotBlocked, DeadlineExceeded):
+                if page:
                     await page.close()
-                    continue
-                
-                # 模拟人类行为
-                await self.browser.simulate_human_behavior(page)
+                raise
                 
-                return page
-                
-            except TimeoutError:
-                logger.warning(f"页面加载超时，尝试继续处理...")
-                if 'page' in locals():
-                    await self.browser.save_debug_info(page, f"timeout_debug_{attempt}")
-                    await page.close()
-                    
             except Exception as e:
                 logger.error(f"页面导航出错: {e}")
-                if 'page' in locals():
-                    await self.browser.save_debug_info(page, f"error_navigate_{attempt}")
-                    await page.close()
+                if page:
+                    await self.browser.save_debug_info(page, "navigate_error", f"{e.__class__.__name__} 第 {attempt + 1} 次")
                     
-                # 失败后等待更长时间
-                await self.browser.random_sleep(3.0, 5.0)
+            finally:
+                identity_cooldown = self._record(url, identity, outcome, elapsed)
+            
+            if page:
+                if outcome == OUTCOME_BLOCKED:
+                    await self.browser.save_debug_info(page, "blocked", reason)
+                await page.close()
+            if outcome == OUTCOME_BLOCKED:
+                if self.identities.available_count() == 0:
+                    # 验证页不会自行消失，所有身份都被拦截后整个站点暂停，其他任务也不再发出请求
+                    raise self.cooldown.block(url, reason, max(identity_cooldown, self.identities.next_available_in()))
+                logger.warning(f"身份 {identity.name} 访问 {url} 被拦截 ({reason})，换用其他身份重试")
         
         logger.error(f"导航到 {url} 失败，已重试 {self.retry_times} 次")
-        return None 
\ No newline at end of file
+        return None
\ No newline at end of file
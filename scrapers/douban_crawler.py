@@ -0,0 +1,235 @@
+"""
+豆瓣目录爬取模块，从标签页和榜单页出发发现并抓取影视详情页
+"""
+import os
+import re
+import time
+import asyncio
+from typing import Dict, List, Optional
+from urllib.parse import quote, urljoin
+
+from core.antibot import AntiBotBlocked
+from core.browser import PlaywrightBrowser
+from core.pacing import PacingScheduler
+from core.frontier import CrawlFrontier, SubjectSeenSet
+from scrapers.base_scraper import BaseScraper
+from scrapers.douban_scraper import DoubanScraper
+from config.logging_config import setup_logger
+from config.settings import DOUBAN_MOVIE_BASE_URL, CRAWL_HOST_INTERVAL, CRAWL_CHECKPOINT_INTERVAL
+
+# 创建日志记录器
+logger = setup_logger('douban_crawler')
+
+# 详情页ID
+SUBJECT_ID_PATTERN = re.compile(r'/subject/(\d+)')
+
+# 队列优先级：先展开列表页，再按发现深度抓取详情页
+LIST_PRIORITY = 100.0
+SUBJECT_PRIORITY = 10.0
+
+class DoubanCrawler(BaseScraper):
+    """
+    豆瓣目录爬虫
+    
+    列表页（标签页、Top250等）中的详情页链接和下一页链接加入持久化优先级队列，
+    详情页通过 DoubanScraper.get_movie_by_url 解析，并沿"喜欢这部电影的人也喜欢"继续发现。
+    详情页ID用位图去重，队列、结果和去重集合定期保存，中断后重新运行即可继续
+    """
+    
+    def __init__(self,
+                 browser: PlaywrightBrowser,
+                 state_dir: str,
+                 host_interval: float = CRAWL_HOST_INTERVAL,
+                 max_depth: int = 1,
+                 checkpoint_interval: float = CRAWL_CHECKPOINT_INTERVAL,
+                 retry_times: int = 3):
+        """
+        初始化目录爬虫
+        
+        Args:
+            browser: Playwright浏览器管理器实例
+            state_dir: 队列、结果和去重集合的保存目录
+            host_interval: 同一域名的最小请求间隔(秒)
+            max_depth: 沿推荐链接发现详情页的最大深度，0表示只抓取列表页中的条目
+            checkpoint_interval: 保存进度的间隔(秒)
+            retry_times: 重试次数
+        """
+        # 列表页和详情页共用同一个节奏控制，同一站点的请求至少间隔 host_interval 秒
+        pacer = PacingScheduler(interval=host_interval, burst=1)
+        super().__init__(browser, retry_times, pacer=pacer)
+        self.detail_scraper = DoubanScraper(browser, retry_times, pacer=pacer)
+        self.frontier = CrawlFrontier(os.path.join(state_dir, "frontier.db"))
+        self.seen = SubjectSeenSet(os.path.join(state_dir, "seen.bin"))
+        self.max_depth = max_depth
+        self.checkpoint_interval = checkpoint_interval
+        self._last_checkpoint = time.monotonic()
+        self.crawled = 0
+    
+    @staticmethod
+    def top250_url() -> str:
+        """Top250榜单首页地址"""
+        return f"{DOUBAN_MOVIE_BASE_URL}/top250"
+    
+    @staticmethod
+    def tag_url(tag: str) -> str:
+        """标签页首页地址"""
+        return f"{DOUBAN_MOVIE_BASE_URL}/tag/{quote(tag)}?start=0&type=T"
+    
+    @staticmethod
+    def subject_url(subject_id: int) -> str:
+        """根据ID生成详情页地址"""
+        return f"{DOUBAN_MOVIE_BASE_URL}/subject/{subject_id}/"
+    
+    def add_seeds(self, urls: List[str]) -> int:
+        """
+        加入起始列表页，已加入过的地址忽略
+        
+        Args:
+            urls: 列表页地址
+        
+        Returns:
+            新加入的数量
+        """
+        added = self.frontier.push_many((url, "list", LIST_PRIORITY, 0) for url in urls)
+        self.frontier.commit()
+        return added
+    
+    def _enqueue_subjects(self, hrefs: List[str], depth: int) -> int:
+        """
+        将未见过的详情页加入队列
+        
+        Args:
+            hrefs: 页面中的链接
+            depth: 这些详情页的发现深度
+        
+        Returns:
+            新加入的数量
+        """
+        items = []
+        for href in hrefs:
+            match = SUBJECT_ID_PATTERN.search(href or "")
+            if match and self.seen.add(int(match.group(1))):
+                items.append((self.subject_url(int(match.group(1))), "subject", SUBJECT_PRIORITY - depth, depth))
+        return self.frontier.push_many(items)
+    
+    async def crawl_list(self, url: str, depth: int):
+        """
+        抓取列表页，加入其中的详情页和下一页
+        
+        Args:
+            url: 列表页地址
+            depth: 列表页深度
+        """
+        page = await self.navigate_with_retry(url)
+        if not page:
+            raise RuntimeError(f"列表页加载失败: {url}")
+        
+        try:
+            # 一次调用取回整页链接，避免逐个元素往返
+            hrefs = await page.eval_on_selector_all("#content a[href*='/subject/']", "links => links.map(a => a.href)")
+            added = self._enqueue_subjects(hrefs, depth)
+            
+            next_elem = await page.query_selector("span.next a")
+            next_href = await next_elem.get_attribute("href") if next_elem else None
+            if next_href:
+                self.frontier.push(urljoin(page.url, next_href), "list", LIST_PRIORITY, depth)
+            logger.info(f"列表页 {url}: 新发现 {added} 个详情页，{'有' if next_href else '没有'}下一页")
+        finally:
+            await page.close()
+    
+    async def crawl_subject(self, url: str, depth: int):
+        """
+        抓取并保存详情页，未达到最大深度时加入推荐条目
+        
+        Args:
+            url: 详情页地址
+            depth: 详情页深度
+        """
+        recommendations: List[str] = []
+        
+        async def collect_recommendations(page):
+            if depth < self.max_depth:
+                recommendations.extend(await page.eval_on_selector_all(
+                    "#recommendations dd a", "links => links.map(a => a.href)"
+                ))
+        
+        movie_data = await self.detail_scraper.get_movie_by_url(url, on_page=collect_recommendations)
+        if not movie_data:
+            raise RuntimeError(f"详情页抓取失败: {url}")
+        
+        subject_id = int(SUBJECT_ID_PATTERN.search(url).group(1))
+        self.frontier.store_subject(subject_id, movie_data)
+        self.crawled += 1
+        added = self._enqueue_subjects(recommendations, depth + 1)
+        logger.info(f"已抓取: {movie_data.get('title')} (本次 {self.crawled} 部，新发现 {added} 个)")
+    
+    def checkpoint(self, force: bool = False):
+        """
+        保存进度，先提交队列和结果，再保存去重集合
+        
+        去重集合落后于队列时，重新发现的地址会被队列忽略，不会丢失条目
+        
+        Args:
+            force: 是否忽略保存间隔立即保存
+        """
+        if not force and time.monotonic() - self._last_checkpoint < self.checkpoint_interval:
+            return
+        self.frontier.commit()
+        self.seen.save()
+        self._last_checkpoint = time.monotonic()
+        logger.info(f"已保存进度: {self.frontier.stats()}，已见 {len(self.seen)} 个ID")
+    
+    async def run(self, concurrency: int = 1, max_subjects: Optional[int] = None) -> Dict[str, int]:
+        """
+        处理队列直到为空或达到抓取上限
+        
+        Args:
+            concurrency: 并发任务数，同一域名的请求间隔仍受限制，被反爬拦截后全部暂停到冷却结束
+            max_subjects: 本次最多抓取的详情页数量
+        
+        Returns:
+            队列统计
+        """
+        in_flight = 0
+        
+        async def worker():
+            nonlocal in_flight
+            while max_subjects is None or self.crawled < max_subjects:
+                # 被反爬拦截后所有任务一起暂停到冷却结束
+                await self.cooldown.wait()
+                item = self.frontier.pop()
+                if item is None:
+                    # 其他任务可能还会发现新条目
+                    if in_flight == 0:
+                        return
+                    await asyncio.sleep(0.5)
+                    continue
+                
+                url, kind, depth = item
+                in_flight += 1
+                try:
+                    if kind == "list":
+                        await self.crawl_list(url, depth)
+                    else:
+                        await self.crawl_subject(url, depth)
+                    self.frontier.complete(url)
+                except AntiBotBlocked as e:
+                    logger.warning(f"处理 {url} 时被拦截，放回队列: {e}")
+                    self.frontier.release(url)
+                except Exception as e:
+                    logger.error(f"处理 {url} 失败: {e}")
+                    self.frontier.fail(url, self.retry_times)
+                finally:
+                    in_flight -= 1
+                self.checkpoint()
+        
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        finally:
+            self.checkpoint(force=True)
+        return self.frontier.stats()
+    
+    def close(self):
+        """保存进度并关闭队列数据库"""
+        self.checkpoint(force=True)
+        self.frontier.close()
\ No newline at end of file
@@ -0,0 +1,258 @@
+"""
+豆瓣列表爬取模块，遍历用户的看过/想看列表和豆列
+"""
+import re
+import time
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from core.browser import PlaywrightBrowser
+from core.utils import atomic_write_json, read_json
+from scrapers.base_scraper import BaseScraper
+from config.logging_config import setup_logger
+from config.settings import DOUBAN_MOVIE_BASE_URL
+
+# 创建日志记录器
+logger = setup_logger('douban_list_scraper')
+
+# 支持的列表地址：用户看过/想看列表、豆列
+LIST_URL_PATTERNS = {
+    "collect": re.compile(r'/people/([^/]+)/collect'),
+    "wish": re.compile(r'/people/([^/]+)/wish'),
+    "doulist": re.compile(r'/doulist/(\d+)'),
+}
+
+# 列表条目的链接选择器，按列表类型依次尝试
+ITEM_LINK_SELECTORS = [
+    ".grid-view .item .title a",
+    ".list-view .item .title a",
+    ".doulist-item .title a",
+]
+
+# 详情页ID，只匹配链接路径的开头
+SUBJECT_ID_PATTERN = re.compile(r'^/subject/(\d+)')
+
+# 电影详情页所在的域名，读书、音乐等子域名的 /subject/ 链接不是影视条目
+MOVIE_NETLOC = urlsplit(DOUBAN_MOVIE_BASE_URL).netloc
+
+class ListImportCheckpoint:
+    """
+    列表导入进度，记录当前页地址和已处理的条目，中断后可从原处继续
+    
+    当前页处理完之前不会前进到下一页，同一页中已完成的条目通过ID跳过
+    """
+    
+    def __init__(self, path: str, list_url: str):
+        """
+        加载或新建导入进度
+        
+        Args:
+            path: 进度文件路径
+            list_url: 列表地址
+        """
+        self.path = path
+        self.list_url = list_url
+        self.page_url = list_url
+        self.done: Dict[str, str] = {}
+        self.failed: Dict[str, str] = {}
+        self.finished = False
+        
+        data = read_json(path)
+        if data and data.get("list_url") == list_url:
+            self.page_url = data.get("page_url") or list_url
+            self.done = data.get("done", {})
+            self.failed = data.get("failed", {})
+            self.finished = data.get("finished", False)
+            logger.info(f"从进度文件恢复: 已完成 {len(self.done)} 条，当前页 {self.page_url}")
+        elif data:
+            logger.warning(f"进度文件属于其他列表，将重新开始: {path}")
+    
+    def is_done(self, subject_id: str) -> bool:
+        """条目是否已处理完成"""
+        return subject_id in self.done
+    
+    def mark_done(self, subject_id: str, status: str = "synced"):
+        """
+        标记条目处理完成并保存
+        
+        Args:
+            subject_id: 详情页ID
+            status: 处理结果
+        """
+        self.done[subject_id] = status
+        self.failed.pop(subject_id, None)
+        self.save()
+    
+    def mark_failed(self, subject_id: str, reason: str):
+        """
+        记录失败的条目并保存，重新运行时会再次尝试
+        
+        Args:
+            subject_id: 详情页ID
+            reason: 失败原因
+        """
+        self.failed[subject_id] = reason
+        self.save()
+    
+    def advance(self, next_page_url: Optional[str]):
+        """
+        当前页处理完成，前进到下一页并保存
+        
+        Args:
+            next_page_url: 下一页地址，None表示列表已结束
+        """
+        if next_page_url:
+            self.page_url = next_page_url
+        else:
+            self.finished = True
+        self.save()
+    
+    def save(self):
+        """原子写入进度文件"""
+        atomic_write_json(self.path, {
+            "list_url": self.list_url,
+            "page_url": self.page_url,
+            "done": self.done,
+            "failed": self.failed,
+            "finished": self.finished,
+            "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+
+class DoubanListScraper(BaseScraper):
+    """
+    豆瓣列表抓取器
+    
+    逐页遍历列表，每取到一页就在后台开始加载下一页，
+    调用方处理当前页条目的同时下一页已在加载
+    """
+    
+    def __init__(self, browser: PlaywrightBrowser, retry_times: int = 3):
+        """
+        初始化列表抓取器
+        
+        Args:
+            browser: Playwright浏览器管理器实例
+            retry_times: 重试次数
+        """
+        super().__init__(browser, retry_times)
+    
+    @staticmethod
+    def list_key(url: str) -> str:
+        """
+        获取列表的唯一标识，用于命名进度文件
+        
+        例如: https://movie.douban.com/people/ahbei/collect -> collect_ahbei
+        
+        Args:
+            url: 列表地址
+        
+        Returns:
+            列表标识
+        
+        Raises:
+            ValueError: 不支持的列表地址
+        """
+        for kind, pattern in LIST_URL_PATTERNS.items():
+            match = pattern.search(urlsplit(url).path)
+            if match:
+                return f"{kind}_{match.group(1)}"
+        raise ValueError(f"不支持的列表地址: {url}，仅支持看过/想看列表和豆列")
+    
+    @staticmethod
+    def subject_url(subject_id: str) -> str:
+        """根据ID生成详情页地址"""
+        return f"{DOUBAN_MOVIE_BASE_URL}/subject/{subject_id}/"
+    
+    @staticmethod
+    def subject_id_from_href(href: str) -> Optional[str]:
+        """
+        从链接中提取电影详情页ID
+        
+        Args:
+            href: 链接地址（绝对地址）
+        
+        Returns:
+            详情页ID，不是电影域名下的详情页链接时返回None
+        """
+        parts = urlsplit(href or "")
+        if parts.netloc != MOVIE_NETLOC:
+            return None
+        match = SUBJECT_ID_PATTERN.match(parts.path)
+        return match.group(1) if match else None
+    
+    async def fetch_list_page(self, url: str) -> Tuple[List[str], Optional[str]]:
+        """
+        获取一页列表中的详情页ID和下一页地址
+        
+        Args:
+            url: 列表页地址
+        
+        Returns:
+            (详情页ID列表, 下一页地址)，加载失败时抛出RuntimeError
+        """
+        page = await self.navigate_with_retry(url)
+        if not page:
+            raise RuntimeError(f"列表页加载失败: {url}")
+        
+        try:
+            hrefs: List[str] = []
+            for selector in ITEM_LINK_SELECTORS:
+                # 一次调用取回整页链接，避免逐个元素往返
+                hrefs = await page.eval_on_selector_all(selector, "links => links.map(a => a.href)")
+                if hrefs:
+                    break
+            if not hrefs:
+                # 页面结构变化时，退回到内容区中所有详情页链接，同样只保留电影域名下的链接
+                hrefs = await page.eval_on_selector_all(
+                    "#content a[href*='/subject/']", "links => links.map(a => a.href)"
+                )
+            
+            subject_ids = []
+            for href in hrefs:
+                subject_id = self.subject_id_from_href(href)
+                if subject_id and subject_id not in subject_ids:
+                    subject_ids.append(subject_id)
+            
+            next_url = None
+            next_elem = await page.query_selector("span.next a, link[rel='next']")
+            if next_elem:
+                href = await next_elem.get_attribute("href")
+                if href:
+                    next_url = urljoin(page.url, href)
+            
+            logger.info(f"列表页 {url} 共 {len(subject_ids)} 条，{'有' if next_url else '没有'}下一页")
+            return subject_ids, next_url
+        finally:
+            await page.close()
+    
+    async def iter_pages(self, start_url: str) -> AsyncIterator[Tuple[str, List[str], Optional[str]]]:
+        """
+        从指定页开始遍历列表，产出当前页的同时预取下一页
+        
+        Args:
+            start_url: 起始列表页地址
+        
+        Yields:
+            (当前页地址, 详情页ID列表, 下一页地址)
+        
+        Raises:
+            RuntimeError: 列表页加载失败
+            AntiBotBlocked: 被反爬拦截
+        """
+        url = start_url
+        pending = asyncio.ensure_future(self.fetch_list_page(url))
+        try:
+            while pending is not None:
+                subject_ids, next_url = await pending
+                pending = asyncio.ensure_future(self.fetch_list_page(next_url)) if next_url else None
+                yield url, subject_ids, next_url
+                url = next_url
+        finally:
+            # 提前结束遍历时（调用方 aclose）等待预取任务取消完成，避免其在浏览器关闭后继续运行
+            if pending is not None and not pending.done():
+                pending.cancel()
+                try:
+                    await pending
+                except (asyncio.CancelledError, Exception):
+                    pass
\ No newline at end of file
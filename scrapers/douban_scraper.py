@@ -1,37 +1,59 @@
 """
 豆瓣影视数据爬取模块
 """
-from typing import Dict, List, Optional, Any
-
-from playwright.async_api import TimeoutError
+from typing import Dict, List, Optional, Any, Awaitable, Callable, Iterable, TYPE_CHECKING
+from urllib.parse import quote, urlsplit
 
 from core.browser import PlaywrightBrowser
+from core.antibot import AntiBotBlocked
+from core.deadline import DeadlineExceeded, check_deadline
+from core.pacing import PacingScheduler
 from scrapers.base_scraper import BaseScraper
 from parsers.douban_parser import DoubanParser
+from parsers.subject_suggest import parse_suggest, pick_candidate
 from config.logging_config import setup_logger
-from config.settings import DOUBAN_COOKIES
+from config.settings import (
+    DOUBAN_COOKIES,
+    DOUBAN_SEARCH_BASE_URL,
+    DOUBAN_MOVIE_BASE_URL,
+    DOUBAN_SUGGEST_ENABLED,
+    DOUBAN_SUGGEST_MIN_SIMILARITY
+)
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page
 
 # 创建日志记录器
 logger = setup_logger('douban_scraper')
 
+# 读取联想接口响应的脚本，浏览器把JSON显示在 <pre> 中
+SUGGEST_BODY_SCRIPT = """
+    () => {
+        const pre = document.querySelector("body > pre");
+        return (pre || document.body || document.documentElement).textContent;
+    }
+"""
+
 class DoubanScraper(BaseScraper):
     """豆瓣影视数据抓取器"""
     
-    def __init__(self, browser: PlaywrightBrowser, retry_times: int = 3):
+    def __init__(self, browser: PlaywrightBrowser, retry_times: int = 3,
+                 pacer: Optional[PacingScheduler] = None):
         """
         初始化豆瓣数据抓取器
         
         Args:
             browser: Playwright浏览器管理器实例
             retry_times: 重试次数
+            pacer: 请求节奏控制，默认使用进程内共用的 navigation_pacer
         """
-        super().__init__(browser, retry_times)
+        super().__init__(browser, retry_times, pacer=pacer)
         
         # 豆瓣Cookie - 使用配置中的Cookie
         self.douban_cookies = DOUBAN_COOKIES
         
         # 设置豆瓣特有的请求头
-        self.browser.headers["referer"] = "https://movie.douban.com/"
+        self.browser.headers["referer"] = f"{DOUBAN_MOVIE_BASE_URL}/"
         
         # 如果提供了豆瓣Cookie，则添加到浏览器
         if hasattr(self.browser, 'cookies') and self.browser.cookies:
@@ -44,22 +66,90 @@ class DoubanScraper(BaseScraper):
         """
         搜索电影，返回详情页URL
         
+        先查询轻量的联想接口，接口不可用或没有足够接近的结果时再渲染搜索页
+        
+        Args:
+            title: 电影名称，可以在末尾带年份，如 "霸王别姬 1993"
+            
+        Returns:
+            详情页URL或None
+        
+        Raises:
+            AntiBotBlocked: 域名冷却中，或所有身份都已被拦截
+            DeadlineExceeded: 请求已超过截止时间
+        """
+        if DOUBAN_SUGGEST_ENABLED:
+            detail_url = await self.search_suggest(title)
+            if detail_url:
+                return detail_url
+        return await self.search_page(title)
+    
+    async def search_suggest(self, title: str) -> Optional[str]:
+        """
+        通过豆瓣联想接口搜索，按标题相似度、年份和类型选出最匹配的结果
+        
+        接口只返回JSON，在访问身份的浏览器上下文中请求（共用Cookie、请求节奏和反爬检测），
+        不需要渲染搜索页
+        
+        Args:
+            title: 电影名称，可以在末尾带年份
+            
+        Returns:
+            详情页URL，接口不可用或没有足够接近的结果时返回None
+        
+        Raises:
+            AntiBotBlocked: 域名冷却中，或所有身份都已被拦截
+            DeadlineExceeded: 请求已超过截止时间
+        """
+        # 查询完整名称，末尾的数字可能是标题的一部分（如 Blade Runner 2049），是否为年份由排序时判断
+        suggest_url = f"{DOUBAN_MOVIE_BASE_URL}/j/subject_suggest?q={quote(title.strip())}"
+        
+        page = await self.navigate_with_retry(suggest_url)
+        if not page:
+            return None
+        try:
+            text = await page.evaluate(SUGGEST_BODY_SCRIPT)
+        except Exception as e:
+            logger.warning(f"读取联想接口响应失败，改用搜索页: {e}")
+            return None
+        finally:
+            await page.close()
+        
+        try:
+            candidates = parse_suggest(text or "")
+        except ValueError as e:
+            logger.warning(f"联想接口响应无效，改用搜索页: {e}")
+            return None
+        
+        best = pick_candidate(candidates, title, DOUBAN_SUGGEST_MIN_SIMILARITY)
+        if best is None:
+            logger.info(f"联想接口没有与 {title} 足够接近的结果（{len(candidates)} 个候选），改用搜索页")
+            return None
+        
+        detail_url = f"{DOUBAN_MOVIE_BASE_URL}/subject/{best.subject_id}/"
+        logger.info(f"通过联想接口找到影视详情页: {best.title} ({best.year}) {detail_url}")
+        return detail_url
+    
+    async def search_page(self, title: str) -> Optional[str]:
+        """
+        渲染豆瓣搜索页，返回第一个结果的详情页URL
+        
         Args:
             title: 电影名称
             
         Returns:
             详情页URL或None
+        
+        Raises:
+            DeadlineExceeded: 请求已超过截止时间
         """
-        search_url = f"https://search.douban.com/movie/subject_search?search_text={title}&cat=1002"
+        search_url = f"{DOUBAN_SEARCH_BASE_URL}/movie/subject_search?search_text={title}&cat=1002"
         
         page = await self.navigate_with_retry(search_url)
         if not page:
             return None
         
         try:
-            # 延迟等待，模拟真实用户行为
-            await self.browser.random_sleep(2.0, 4.0)
-            
             # 等待页面完全加载
             try:
                 # 尝试不同的选择器，因为页面结构可能有变化
@@ -68,6 +158,8 @@ class DoubanScraper(BaseScraper):
                         await self.browser.wait_for_selector(page, selector, timeout=5000)
                         logger.info(f"找到选择器: {selector}")
                         break
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 logger.warning(f"等待选择器超时，尝试继续: {e}")
             
@@ -78,7 +170,7 @@ class DoubanScraper(BaseScraper):
                 ".result-list .result h3 a", 
                 ".result_list .item-root a",
                 ".search-results .item h3 a",
-                "a[href^='https://movie.douban.com/subject/']"
+                f"a[href^='{DOUBAN_MOVIE_BASE_URL}/subject/']"
             ]:
                 items = await page.query_selector_all(selector)
                 if items and len(items) > 0:
@@ -88,10 +180,11 @@ class DoubanScraper(BaseScraper):
             
             if not first_result:
                 # 最后的备选方案：使用URL模式直接查找链接
+                subject_host = urlsplit(DOUBAN_MOVIE_BASE_URL).netloc
                 all_links = await page.query_selector_all("a")
                 for link in all_links:
                     href = await link.get_attribute("href")
-                    if href and "movie.douban.com/subject/" in href:
+                    if href and f"{subject_host}/subject/" in href:
                         first_result = link
                         logger.info(f"使用链接模式找到结果: {href}")
                         break
@@ -99,7 +192,7 @@ class DoubanScraper(BaseScraper):
             if not first_result:
                 logger.warning(f"未找到影视: {title}")
                 # 保存页面调试信息
-                await self.browser.save_debug_info(page, f"search_debug_{title.replace(' ', '_')}")
+                await self.browser.save_debug_info(page, "search_not_found", title)
                 await page.close()
                 return None
             
@@ -109,27 +202,49 @@ class DoubanScraper(BaseScraper):
             await page.close()
             return detail_url
         
+        except DeadlineExceeded:
+            await page.close()
+            raise
+        
         except Exception as e:
             logger.error(f"搜索影视出错: {e}")
             try:
                 # 保存页面调试信息
-                await self.browser.save_debug_info(page, f"error_debug_{title.replace(' ', '_')}")
+                await self.browser.save_debug_info(page, "search_error", title)
                 await page.close()
             except:
                 pass
             return None
         
-    async def get_movie_by_url(self, url: str) -> Dict[str, Any]:
+    async def get_movie_by_url(self, url: str,
+                               on_page: Optional[Callable[["Page"], Awaitable[None]]] = None,
+                               fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
         """
         从URL获取电影详情
         
         Args:
             url: 电影详情页URL
+            on_page: 解析完成、关闭页面前的回调，可用于从同一页面提取其他信息
+            fields: 只提取这些字段，返回部分数据；None表示提取全部字段
             
         Returns:
             电影数据字典
+        
+        Raises:
+            AntiBotBlocked: 被反爬拦截时立即抛出，不再重试
+            DeadlineExceeded: 请求已超过截止时间
         """
+        from playwright.async_api import TimeoutError
+        
+        # 在访问页面前检查字段名，避免无效字段被当作抓取失败重试
+        if fields is not None:
+            fields = set(fields)
+            DoubanParser.resolve_fields(fields)
+        
         for attempt in range(self.retry_times):
+            check_deadline("获取详情")
+            # 每次尝试重新开始，避免异常处理中关闭上一次已关闭的页面
+            page = None
             try:
                 logger.info(f"获取电影详情 (尝试 {attempt+1}/{self.retry_times}): {url}")
                 
@@ -143,26 +258,33 @@ class DoubanScraper(BaseScraper):
                     logger.warning("等待页面内容超时，尝试继续处理...")
                 
                 # 使用解析器提取数据
-                movie_data = await DoubanParser.extract_movie_data(page)
+                movie_data = await DoubanParser.extract_movie_data(page, fields)
+                if on_page:
+                    await on_page(page)
                 
                 # 关闭页面
                 await page.close()
                 return movie_data
                 
+            except AntiBotBlocked:
+                raise
+            
+            except DeadlineExceeded:
+                if page is not None:
+                    await page.close()
+                raise
+                
             except TimeoutError:
                 logger.warning(f"页面加载超时，尝试继续处理...")
-                if 'page' in locals():
-                    await self.browser.save_debug_info(page, f"timeout_debug_{attempt}")
+                if page is not None:
+                    await self.browser.save_debug_info(page, "detail_timeout", f"{url} 第 {attempt + 1} 次")
                     await page.close()
                     
             except Exception as e:
                 logger.error(f"获取电影详情出错: {e}")
-                if 'page' in locals():
-                    await self.browser.save_debug_info(page, f"error_detail_{attempt}")
+                if page is not None:
+                    await self.browser.save_debug_info(page, "detail_error", f"{url} 第 {attempt + 1} 次")
                     await page.close()
-                    
-                # 失败后等待更长时间
-                await self.browser.random_sleep(3.0, 5.0)
                 
         logger.error(f"获取电影详情失败，已重试 {self.retry_times} 次: {url}")
         return {}
@@ -0,0 +1,268 @@
+"""
+封面URL校验模块，在写入Notion之前确认海报地址可访问
+"""
+import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from config.logging_config import setup_logger
+from config.settings import (
+    COVER_CHECK_TIMEOUT,
+    COVER_CACHE_TTL,
+    COVER_PATTERN_FAILURE_LIMIT,
+    COVER_PATTERN_RETRY_INTERVAL
+)
+
+# 创建日志记录器
+logger = setup_logger('cover_validator')
+
+# 豆瓣海报的尺寸变体，按清晰度从高到低排列
+POSTER_SIZE_VARIANTS = [
+    ["l_ratio_poster", "m_ratio_poster", "s_ratio_poster"],
+    ["raw", "l", "m", "s"],
+    ["lpst", "mpst", "spst"],
+]
+
+# 豆瓣图片服务器，img9为Notion可正常访问的CDN域名
+DOUBAN_IMAGE_HOSTS = ["img9.doubanio.com", "img1.doubanio.com", "img2.doubanio.com", "img3.doubanio.com"]
+
+class CoverValidator:
+    """
+    封面URL校验器
+    
+    先检查原URL，不可用时再并发检查海报的各尺寸变体（HEAD请求，不支持时使用范围GET），
+    按URL缓存校验结果，并按"域名+尺寸"模式统计失败次数，
+    同一模式连续失败后直接跳过，不再发起网络请求；跳过期间每隔
+    pattern_retry_interval 秒放行一次检查，成功后恢复该模式
+    """
+    
+    def __init__(self,
+                 timeout: float = COVER_CHECK_TIMEOUT,
+                 cache_ttl: int = COVER_CACHE_TTL,
+                 pattern_failure_limit: int = COVER_PATTERN_FAILURE_LIMIT,
+                 pattern_retry_interval: float = COVER_PATTERN_RETRY_INTERVAL,
+                 max_workers: int = 4):
+        """
+        初始化封面校验器
+        
+        Args:
+            timeout: 单次检查的超时时间(秒)
+            cache_ttl: 校验结果缓存时间(秒)
+            pattern_failure_limit: 同一URL模式连续失败多少次后直接判定不可用
+            pattern_retry_interval: 模式被跳过期间放行一次检查的间隔(秒)
+            max_workers: 并发检查的线程数
+        """
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.pattern_failure_limit = pattern_failure_limit
+        self.pattern_retry_interval = pattern_retry_interval
+        self.max_workers = max_workers
+        
+        # URL -> (是否可用, 过期时间)
+        self._url_verdicts: Dict[str, Tuple[bool, float]] = {}
+        # URL模式 -> (连续失败次数, 过期时间, 下次放行检查的时间)
+        self._pattern_failures: Dict[str, Tuple[int, float, float]] = {}
+        self._lock = threading.Lock()
+        self._session = None
+    
+    @property
+    def session(self):
+        """检查图片使用的HTTP会话，不携带Notion认证头"""
+        if self._session is None:
+            import requests
+            
+            self._session = requests.Session()
+        return self._session
+    
+    @staticmethod
+    def url_pattern(url: str) -> str:
+        """
+        获取URL模式，去掉图片ID，只保留域名和路径中的尺寸部分
+        
+        例如: https://img9.doubanio.com/view/photo/l_ratio_poster/public/p480747492.jpg
+              -> img9.doubanio.com/view/photo/l_ratio_poster/public
+        
+        Args:
+            url: 图片URL
+        
+        Returns:
+            URL模式
+        """
+        parts = urlsplit(url)
+        path = parts.path.rsplit('/', 1)[0]
+        return f"{parts.netloc}{path}"
+    
+    @staticmethod
+    def candidates(url: str) -> List[str]:
+        """
+        生成封面URL的候选列表，按优先级排列：先尺寸从大到小，同尺寸下原域名优先
+        
+        Args:
+            url: 封面URL
+        
+        Returns:
+            候选URL列表，第一个为优先级最高的变体
+        """
+        sized_urls = [url]
+        for variants in POSTER_SIZE_VARIANTS:
+            pattern = r'/(' + '|'.join(re.escape(v) for v in variants) + r')/'
+            match = re.search(pattern, url)
+            if match:
+                sized_urls = [url[:match.start()] + f"/{size}/" + url[match.end():] for size in variants]
+                break
+        
+        result = []
+        for sized_url in sized_urls:
+            result.append(sized_url)
+            host = urlsplit(sized_url).netloc
+            # 豆瓣图片在原域名之外，再尝试CDN域名
+            if host in DOUBAN_IMAGE_HOSTS and host != DOUBAN_IMAGE_HOSTS[0]:
+                result.append(sized_url.replace(host, DOUBAN_IMAGE_HOSTS[0], 1))
+        # 去重并保持顺序
+        return list(dict.fromkeys(result))
+    
+    def _cached_verdict(self, url: str) -> Optional[bool]:
+        """
+        读取缓存的校验结果，没有或已过期返回None
+        
+        URL模式被跳过时返回False；到了放行时间则返回None，由调用方检查一次，
+        同时把下次放行时间后移，其他调用方在本次检查完成前仍直接跳过
+        """
+        now = time.time()
+        with self._lock:
+            verdict = self._url_verdicts.get(url)
+            if verdict and verdict[1] > now:
+                return verdict[0]
+            
+            pattern = self.url_pattern(url)
+            failures = self._pattern_failures.get(pattern)
+            if failures and failures[1] > now and failures[0] >= self.pattern_failure_limit:
+                count, expires, retry_at = failures
+                if now < retry_at:
+                    return False
+                self._pattern_failures[pattern] = (count, expires, now + self.pattern_retry_interval)
+        return None
+    
+    def _record(self, url: str, ok: bool):
+        """记录实际检查（或Notion拒绝）的结果，缓存中读到的结果不经过这里，不会延长跳过时间"""
+        now = time.time()
+        expires = now + self.cache_ttl
+        pattern = self.url_pattern(url)
+        with self._lock:
+            self._url_verdicts[url] = (ok, expires)
+            if ok:
+                self._pattern_failures.pop(pattern, None)
+            else:
+                count = self._pattern_failures.get(pattern, (0, 0, 0))[0]
+                self._pattern_failures[pattern] = (count + 1, expires, now + self.pattern_retry_interval)
+    
+    def mark_bad(self, url: str):
+        """
+        将URL标记为不可用，例如Notion拒绝了该封面
+        
+        Args:
+            url: 图片URL
+        """
+        if url:
+            self._record(url, False)
+    
+    def _probe(self, url: str) -> bool:
+        """
+        发送网络请求检查图片是否可访问
+        
+        Args:
+            url: 图片URL
+        
+        Returns:
+            是否可用
+        """
+        import requests
+        
+        try:
+            response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+            # 部分服务器不支持HEAD，改用只取开头字节的GET请求
+            if response.status_code in (403, 405, 501):
+                response.close()
+                response = self.session.get(
+                    url,
+                    headers={"Range": "bytes=0-1023"},
+                    timeout=self.timeout,
+                    stream=True
+                )
+                response.close()
+            
+            content_type = response.headers.get("Content-Type", "")
+            return response.status_code in (200, 206) and content_type.startswith("image/")
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"检查封面URL失败: {url}, {e}")
+            return False
+    
+    def check(self, url: str) -> bool:
+        """
+        检查单个URL是否可用，优先使用缓存结果
+        
+        Args:
+            url: 图片URL
+        
+        Returns:
+            是否可用
+        """
+        cached = self._cached_verdict(url)
+        if cached is not None:
+            return cached
+        return self._probe_and_record(url)
+    
+    def _probe_and_record(self, url: str) -> bool:
+        """检查URL并记录结果，不读取缓存"""
+        ok = self._probe(url)
+        self._record(url, ok)
+        return ok
+    
+    def select(self, url: str) -> Optional[str]:
+        """
+        返回可用的封面URL
+        
+        先检查原URL，可用时直接返回；不可用时再并发检查其余变体，
+        按优先级依次等待结果，遇到第一个可用的变体即返回，取消尚未开始的检查
+        
+        Args:
+            url: 封面URL
+        
+        Returns:
+            可用的封面URL，全部不可用返回None
+        """
+        if not url:
+            return None
+        
+        if self.check(url):
+            return url
+        
+        candidates = [candidate for candidate in self.candidates(url) if candidate != url]
+        verdicts = {candidate: self._cached_verdict(candidate) for candidate in candidates}
+        pending = [candidate for candidate, verdict in verdicts.items() if verdict is None]
+        
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) if pending else None
+        try:
+            # 按优先级提交，线程池也按此顺序执行；放行判断已在 _cached_verdict 中完成，这里不再读取缓存
+            futures = {candidate: executor.submit(self._probe_and_record, candidate) for candidate in pending}
+            for candidate in candidates:
+                ok = verdicts[candidate] if candidate not in futures else futures[candidate].result()
+                if ok:
+                    logger.info(f"封面URL替换为可用变体: {candidate}")
+                    return candidate
+        finally:
+            if executor is not None:
+                # 已开始的检查在后台完成并记录结果，不阻塞返回
+                executor.shutdown(wait=False, cancel_futures=True)
+        
+        logger.warning(f"封面URL及其变体均不可用: {url}")
+        return None
+    
+    def close(self):
+        """关闭HTTP会话"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
\ No newline at end of file
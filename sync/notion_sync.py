@@ -4,20 +4,52 @@ Notion同步模块，将影视数据同步到Notion数据库
 import os
 import json
 import time
-import requests
-from typing import Dict, List, Union, Optional, Any
+from typing import Dict, Iterator, List, Union, Optional, Any
 
 from config.logging_config import setup_logger
-from config.settings import NOTION_API_VERSION, NOTION_API_BASE_URL
+from config.settings import (
+    NOTION_API_VERSION,
+    NOTION_API_BASE_URL,
+    NOTION_DOUBAN_URL_PROPERTY,
+    NOTION_REQUEST_TIMEOUT,
+    COVER_VALIDATION_ENABLED
+)
+from core.deadline import budget, check_deadline
+from core.models import MovieRecord, Person
 from sync.sync_base import BaseSyncModule, SyncException
+from sync.cover_validator import CoverValidator
 
 # 创建日志记录器
 logger = setup_logger("notion_sync")
 
+class NotionAPIError(SyncException):
+    """Notion API返回的错误，保留状态码和错误代码供调用方区分错误原因"""
+    
+    def __init__(self, message: str, status_code: int, code: str = "", detail: str = ""):
+        """
+        Args:
+            message: 错误信息
+            status_code: HTTP状态码
+            code: Notion错误代码，如 validation_error
+            detail: Notion返回的错误说明
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.detail = detail
+    
+    @property
+    def is_cover_error(self) -> bool:
+        """是否为封面无效导致的属性校验错误"""
+        detail = self.detail.lower()
+        return (self.status_code == 400 and self.code == "validation_error"
+                and ("cover" in detail or "image url" in detail))
+
 class NotionSyncModule(BaseSyncModule):
     """Notion同步写入模块，用于将影视数据写入Notion数据库"""
     
-    def __init__(self, database_id: str = None, token: str = None, retry_times: int = 3, retry_delay: int = 2):
+    def __init__(self, database_id: str = None, token: str = None, retry_times: int = 3, retry_delay: int = 2,
+                 cover_validator: Optional[CoverValidator] = None):
         """
         初始化Notion同步模块
         
@@ -26,6 +58,7 @@ class NotionSyncModule(BaseSyncModule):
             token: Notion API Token
             retry_times: 最大重试次数
             retry_delay: 初始重试延迟(秒)
+            cover_validator: 封面校验器，默认按配置创建
         """
         super().__init__(retry_times, retry_delay)
         
@@ -47,8 +80,34 @@ class NotionSyncModule(BaseSyncModule):
             "Content-Type": "application/json"
         }
         
+        # HTTP会话，首次请求时创建，之后复用连接
+        self._session = None
+        
+        # 封面校验器，写入前检查封面可用性，避免Notion拒绝后重复请求
+        if cover_validator is None and COVER_VALIDATION_ENABLED:
+            cover_validator = CoverValidator()
+        self.cover_validator = cover_validator
+        
         logger.info(f"Notion同步模块初始化完成，数据库ID: {self.database_id}")
     
+    @property
+    def session(self):
+        """复用TCP/TLS连接的HTTP会话"""
+        if self._session is None:
+            import requests
+            
+            self._session = requests.Session()
+            self._session.headers.update(self.headers)
+        return self._session
+    
+    def close(self):
+        """关闭HTTP会话"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        if self.cover_validator is not None:
+            self.cover_validator.close()
+    
     def convert_data_format(self, movie_data: Dict) -> Dict:
         """
         将影视数据转换为Notion属性格式
@@ -66,11 +125,13 @@ class NotionSyncModule(BaseSyncModule):
         将影视数据转换为Notion属性格式
         
         Args:
-            movie_data: 影视数据字典
+            movie_data: 影视数据，MovieRecord 或字典
             
         Returns:
             Notion格式的属性字典
         """
+        # 人员统一为 Person，无需再判断字典或字符串等格式
+        movie_data = MovieRecord.coerce(movie_data)
         properties = {}
         
         # 名称 (标题类型)：影片标题
@@ -85,92 +146,10 @@ class NotionSyncModule(BaseSyncModule):
                 "select": {"name": movie_data["category"]}
             }
             
-        # 导演 (富文本类型)：导演信息，带链接
-        if "directors" in movie_data and movie_data["directors"]:
-            rich_text_array = []
-            for i, director in enumerate(movie_data["directors"]):
-                # 添加导演名称，带链接
-                if isinstance(director, dict) and "url" in director and "name" in director:
-                    rich_text_array.append({
-                        "type": "text",
-                        "text": {
-                            "content": director["name"],
-                            "link": {"url": director["url"]}
-                        }
-                    })
-                else:
-                    # 兼容旧数据格式
-                    rich_text_array.append({
-                        "type": "text",
-                        "text": {"content": director if isinstance(director, str) else director.get("name", "")}
-                    })
-                
-                # 添加分隔符，除了最后一个
-                if i < len(movie_data["directors"]) - 1:
-                    rich_text_array.append({
-                        "type": "text",
-                        "text": {"content": " / "}
-                    })
-            
-            properties["导演"] = {"rich_text": rich_text_array}
-        
-        # 编剧 (富文本类型)：编剧信息，带链接
-        if "screenwriters" in movie_data and movie_data["screenwriters"]:
-            rich_text_array = []
-            for i, screenwriter in enumerate(movie_data["screenwriters"]):
-                # 添加编剧名称，带链接
-                if isinstance(screenwriter, dict) and "url" in screenwriter and "name" in screenwriter:
-                    rich_text_array.append({
-                        "type": "text",
-                        "text": {
-                            "content": screenwriter["name"],
-                            "link": {"url": screenwriter["url"]}
-                        }
-                    })
-                else:
-                    # 兼容旧数据格式
-                    rich_text_array.append({
-                        "type": "text",
-                        "text": {"content": screenwriter if isinstance(screenwriter, str) else screenwriter.get("name", "")}
-                    })
-                
-                # 添加分隔符，除了最后一个
-                if i < len(movie_data["screenwriters"]) - 1:
-                    rich_text_array.append({
-                        "type": "text",
-                        "text": {"content": " / "}
-                    })
-            
-            properties["编剧"] = {"rich_text": rich_text_array}
-        
-        # 主演 (富文本类型)：演员信息，带链接
-        if "actors" in movie_data and movie_data["actors"]:
-            rich_text_array = []
-            for i, actor in enumerate(movie_data["actors"]):
-                # 添加演员名称，带链接
-                if isinstance(actor, dict) and "url" in actor and "name" in actor:
-                    rich_text_array.append({
-                        "type": "text",
-                        "text": {
-                            "content": actor["name"],
-                            "link": {"url": actor["url"]}
-                        }
-                    })
-                else:
-                    # 兼容旧数据格式
-                    rich_text_array.append({
-                        "type": "text",
-                        "text": {"content": actor if isinstance(actor, str) else actor.get("name", "")}
-                    })
-                
-                # 添加分隔符，除了最后一个
-                if i < len(movie_data["actors"]) - 1:
-                    rich_text_array.append({
-                        "type": "text",
-                        "text": {"content": " / "}
-                    })
-            
-            properties["主演"] = {"rich_text": rich_text_array}
+        # 导演、编剧、主演 (富文本类型)：人员姓名，带豆瓣链接
+        for key, name in (("directors", "导演"), ("screenwriters", "编剧"), ("actors", "主演")):
+            if key in movie_data and movie_data[key]:
+                properties[name] = {"rich_text": self._people_rich_text(movie_data[key])}
         
         # 类型 (多选类型)：影片类型标签
         if "genres" in movie_data and movie_data["genres"]:
@@ -219,8 +198,40 @@ class NotionSyncModule(BaseSyncModule):
                 "rich_text": [{"text": {"content": movie_data["aka"]}}]
             }
         
+        # 豆瓣链接 (URL类型)：仅在配置了属性名时写入，数据库中需有同名属性
+        if NOTION_DOUBAN_URL_PROPERTY and movie_data.get("url"):
+            properties[NOTION_DOUBAN_URL_PROPERTY] = {
+                "url": movie_data["url"]
+            }
+        
         return properties
     
+    @staticmethod
+    def _people_rich_text(people: List[Person]) -> List[Dict]:
+        """
+        人员列表转换为富文本，姓名带豆瓣链接，用 " / " 分隔
+        
+        Args:
+            people: 人员列表
+            
+        Returns:
+            Notion富文本数组
+        """
+        rich_text_array = []
+        for i, person in enumerate(people):
+            text = {"content": person.name}
+            if person.url:
+                text["link"] = {"url": person.url}
+            rich_text_array.append({"type": "text", "text": text})
+            
+            # 添加分隔符，除了最后一个
+            if i < len(people) - 1:
+                rich_text_array.append({
+                    "type": "text",
+                    "text": {"content": " / "}
+                })
+        return rich_text_array
+    
     def _get_rating_icon(self, rating: float) -> Dict:
         """
         根据评分获取对应的图标配置
@@ -258,7 +269,7 @@ class NotionSyncModule(BaseSyncModule):
             "type": "emoji",
             "emoji": emoji
         }
-
+    
     def _is_valid_image_url(self, url: str) -> bool:
         """
         检查URL是否是有效的图片URL
@@ -284,7 +295,7 @@ class NotionSyncModule(BaseSyncModule):
                 return False
                 
         return True
-
+    
     def _process_cover_url(self, url: str) -> str:
         """
         处理封面URL，确保其能被Notion正确显示
@@ -312,7 +323,31 @@ class NotionSyncModule(BaseSyncModule):
             return None
             
         return url
-
+    
+    def _resolve_cover_url(self, url: str) -> Optional[str]:
+        """
+        处理封面URL，并在启用校验时选出可访问的最佳尺寸变体
+        
+        Args:
+            url: 原始封面URL
+            
+        Returns:
+            可写入Notion的封面URL，不可用时返回None
+        """
+        processed_url = self._process_cover_url(url)
+        if processed_url and self.cover_validator is not None:
+            return self.cover_validator.select(processed_url)
+        return processed_url
+    
+    def _build_cover(self, url: str) -> Dict:
+        """构造Notion外部封面对象"""
+        return {
+            "type": "external",
+            "external": {
+                "url": url
+            }
+        }
+    
     def add_to_database(self, properties: Dict, cover_url: str = None, rating: float = None) -> Dict:
         """
         向Notion数据库添加新记录
@@ -331,17 +366,12 @@ class NotionSyncModule(BaseSyncModule):
             "properties": properties
         }
         
-        # 设置封面图片
-        processed_cover_url = self._process_cover_url(cover_url)
+        # 设置封面图片，写入前已校验可用性
+        processed_cover_url = self._resolve_cover_url(cover_url)
         if processed_cover_url:
             logger.info(f"设置页面封面，原始URL: {cover_url}")
             logger.info(f"处理后的URL: {processed_cover_url}")
-            payload["cover"] = {
-                "type": "external",
-                "external": {
-                    "url": processed_cover_url
-                }
-            }
+            payload["cover"] = self._build_cover(processed_cover_url)
         else:
             logger.warning(f"未能设置封面，无效的URL: {cover_url}")
         
@@ -357,18 +387,20 @@ class NotionSyncModule(BaseSyncModule):
             response = self._make_api_request("POST", url, payload)
             logger.info(f"已成功向数据库添加新记录: {response.get('id')}")
             return response
-        except Exception as e:
+        except NotionAPIError as e:
             logger.error(f"添加数据库记录失败: {e}")
             
-            # 如果失败了，尝试不带封面再次添加
-            if processed_cover_url and "cover" in payload:
+            # 封面被Notion拒绝时不带封面再次添加，并记住该封面不可用；限流、超时等其他错误与封面无关
+            if e.is_cover_error and "cover" in payload:
                 logger.warning("尝试不带封面重新添加记录")
+                if self.cover_validator is not None:
+                    self.cover_validator.mark_bad(processed_cover_url)
                 del payload["cover"]
                 return self._make_api_request("POST", url, payload)
             else:
                 # 重新抛出异常
                 raise
-
+    
     def update_database_item(self, item_id: str, properties: Dict, cover_url: str = None, rating: float = None) -> Dict:
         """
         更新Notion数据库中的记录
@@ -385,16 +417,11 @@ class NotionSyncModule(BaseSyncModule):
         url = f"{self.api_base_url}/pages/{item_id}"
         payload = {"properties": properties}
         
-        # 设置封面图片
-        processed_cover_url = self._process_cover_url(cover_url)
+        # 设置封面图片，写入前已校验可用性
+        processed_cover_url = self._resolve_cover_url(cover_url)
         if processed_cover_url:
             logger.info(f"设置页面封面，处理后的URL: {processed_cover_url}")
-            payload["cover"] = {
-                "type": "external",
-                "external": {
-                    "url": processed_cover_url
-                }
-            }
+            payload["cover"] = self._build_cover(processed_cover_url)
         
         # 设置图标(根据评分)
         icon = self._get_rating_icon(rating)
@@ -405,18 +432,68 @@ class NotionSyncModule(BaseSyncModule):
             response = self._make_api_request("PATCH", url, payload)
             logger.info(f"已成功更新数据库记录: {item_id}")
             return response
-        except Exception as e:
+        except NotionAPIError as e:
             logger.error(f"更新数据库记录失败: {e}")
             
-            # 如果失败了，尝试不带封面再次更新
-            if processed_cover_url and "cover" in payload:
+            # 封面被Notion拒绝时不带封面再次更新，并记住该封面不可用；限流、超时等其他错误与封面无关
+            if e.is_cover_error and "cover" in payload:
                 logger.warning("尝试不带封面重新更新记录")
+                if self.cover_validator is not None:
+                    self.cover_validator.mark_bad(processed_cover_url)
                 del payload["cover"]
                 return self._make_api_request("PATCH", url, payload)
             else:
                 # 重新抛出异常
                 raise
     
+    def update_movie_fields(self, item_id: str, movie_data: Dict, extra_properties: Dict = None) -> Dict:
+        """
+        用部分影视数据更新已有记录，只写入数据中包含的字段
+        
+        未包含的属性保持不变，因此不要求标题和类别，适合只提取了部分字段的重新抓取结果
+        
+        Args:
+            item_id: 数据库记录ID
+            movie_data: 部分影视数据字典
+            extra_properties: 额外写入的Notion格式属性
+            
+        Returns:
+            API响应
+        """
+        if not movie_data:
+            raise SyncException("影视数据不能为空")
+        
+        properties = self.convert_to_notion_properties(movie_data)
+        if extra_properties:
+            properties.update(extra_properties)
+        return self.update_database_item(item_id, properties,
+                                         cover_url=movie_data.get('cover_url'),
+                                         rating=movie_data.get('rating'))
+    
+    def query_database(self, filter: Dict = None, page_size: int = 100) -> Iterator[Dict]:
+        """
+        遍历数据库中的记录，自动处理分页
+        
+        Args:
+            filter: Notion查询过滤条件
+            page_size: 每次请求的记录数，最大100
+            
+        Yields:
+            Notion页面对象
+        """
+        url = f"{self.api_base_url}/databases/{self.database_id}/query"
+        payload: Dict[str, Any] = {"page_size": page_size}
+        if filter:
+            payload["filter"] = filter
+        
+        while True:
+            response = self._make_api_request("POST", url, payload)
+            for page in response.get("results", []):
+                yield page
+            if not response.get("has_more"):
+                break
+            payload["start_cursor"] = response.get("next_cursor")
+    
     def sync_data(self, movie_data: Dict) -> Dict:
         """
         同步影视数据到Notion数据库
@@ -455,7 +532,7 @@ class NotionSyncModule(BaseSyncModule):
             "status": "added", 
             "item_id": response.get("id"), 
             "title": movie_data.get("title"),
-            "has_cover": bool(cover_url),
+            "has_cover": bool(response.get("cover")),
             "rating": rating
         }
         
@@ -489,16 +566,24 @@ class NotionSyncModule(BaseSyncModule):
             
         Returns:
             API响应
+        
+        Raises:
+            DeadlineExceeded: 当前请求已超过截止时间
         """
+        # requests导入较慢，首次发送请求时再导入
+        import requests
+        
         retries = 0
         while retries <= self.max_retries:
+            # 请求有截止时间时按剩余时间缩短超时，超时后不再重试
+            timeout = budget(NOTION_REQUEST_TIMEOUT, "Notion请求")
             try:
                 if method.upper() == "GET":
-                    response = requests.get(url, headers=self.headers)
+                    response = self.session.get(url, timeout=timeout)
                 elif method.upper() == "POST":
-                    response = requests.post(url, headers=self.headers, json=payload)
+                    response = self.session.post(url, json=payload, timeout=timeout)
                 elif method.upper() == "PATCH":
-                    response = requests.patch(url, headers=self.headers, json=payload)
+                    response = self.session.patch(url, json=payload, timeout=timeout)
                 else:
                     raise SyncException(f"不支持的HTTP方法: {method}")
                 
@@ -511,6 +596,8 @@ class NotionSyncModule(BaseSyncModule):
                 # 获取更详细的错误信息
                 error_detail = ""
                 response_text = ""
+                error_code = ""
+                error_message = ""
                 
                 if hasattr(e, 'response') and e.response is not None:
                     status_code = e.response.status_code
@@ -520,6 +607,8 @@ class NotionSyncModule(BaseSyncModule):
                         response_text = e.response.text
                         error_json = e.response.json()
                         error_detail = f"错误详情: {json.dumps(error_json, ensure_ascii=False)}"
+                        error_code = error_json.get("code", "")
+                        error_message = error_json.get("message", "")
                     except:
                         error_detail = f"无法解析错误响应: {response_text[:200]}"
                     
@@ -528,25 +617,25 @@ class NotionSyncModule(BaseSyncModule):
                     
                     # 处理不同错误类型
                     if status_code == 401:
-                        raise SyncException(f"Notion API认证失败，请检查Token: {error_detail}")
+                        raise NotionAPIError(f"Notion API认证失败，请检查Token: {error_detail}", status_code, error_code, error_message)
                     elif status_code == 403:
-                        raise SyncException(f"没有权限访问该资源，请检查数据库权限设置: {error_detail}")
+                        raise NotionAPIError(f"没有权限访问该资源，请检查数据库权限设置: {error_detail}", status_code, error_code, error_message)
                     elif status_code == 404:
-                        raise SyncException(f"资源未找到: {url}, {error_detail}")
+                        raise NotionAPIError(f"资源未找到: {url}, {error_detail}", status_code, error_code, error_message)
                     elif status_code == 400:
-                        raise SyncException(f"请求格式错误: {error_detail}")
+                        raise NotionAPIError(f"请求格式错误: {error_detail}", status_code, error_code, error_message)
                     elif status_code == 429:
                         # 速率限制错误，等待更长时间
-                        retry_after = int(e.response.headers.get('Retry-After', self.retry_delay * 2))
+                        retry_after = float(e.response.headers.get('Retry-After', self.retry_delay * 2))
                         logger.warning(f"API速率限制，等待 {retry_after} 秒后重试")
-                        time.sleep(retry_after)
+                        time.sleep(budget(retry_after, "Notion重试等待"))
                         continue
                 
                 # 一般错误的指数退避重试
                 if retries <= self.max_retries:
                     wait_time = self.retry_delay * (2 ** (retries - 1))
                     logger.warning(f"API请求失败: {str(e)}，{wait_time} 秒后重试 ({retries}/{self.max_retries})")
-                    time.sleep(wait_time)
+                    time.sleep(budget(wait_time, "Notion重试等待"))
                 else:
                     logger.error(f"API请求失败，已达到最大重试次数: {str(e)}")
                     if response_text:
@@ -555,16 +644,30 @@ class NotionSyncModule(BaseSyncModule):
         
         raise SyncException("API请求失败，超出重试次数")
 
-def test_database_connection(database_id, token):
-    """测试Notion数据库连接是否正常"""
+def test_database_connection(database_id, token, session=None):
+    """
+    测试Notion数据库连接是否正常
+    
+    Args:
+        database_id: Notion数据库ID
+        token: Notion API Token
+        session: 可选的HTTP会话，传入时复用其连接
+        
+    Returns:
+        (是否成功, 描述信息)
+    """
+    import requests
+    
+    http = session or requests
     url = f"{NOTION_API_BASE_URL}/databases/{database_id}"
     headers = {
         "Authorization": f"Bearer {token}",
         "Notion-Version": NOTION_API_VERSION
     }
     
+    check_deadline("测试Notion连接")
     try:
-        response = requests.get(url, headers=headers)
+        response = http.get(url, headers=headers, timeout=budget(NOTION_REQUEST_TIMEOUT, "测试Notion连接"))
         response.raise_for_status()
         database_info = response.json()
         return True, f"数据库连接成功，标题: {database_info.get('title', [{}])[0].get('text', {}).get('content', '未知')}"
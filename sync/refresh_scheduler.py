@@ -0,0 +1,393 @@
+"""
+定时刷新模块，按过期程度挑选已同步的记录重新抓取并更新评分
+"""
+import os
+import re
+import math
+import time
+import asyncio
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from core.antibot import AntiBotBlocked
+from config.logging_config import setup_logger
+from config.settings import REFRESH_HOURLY_BUDGET, REFRESH_STATE_PATH, NOTION_DOUBAN_URL_PROPERTY
+from sync.notion_sync import NotionSyncModule
+
+# 创建日志记录器
+logger = setup_logger('refresh_scheduler')
+
+# 新记录的初始波动值，以及每次检查后波动值的衰减系数
+INITIAL_VOLATILITY = 0.2
+VOLATILITY_DECAY = 0.7
+
+# 没有评分的记录（未上映或评价人数不足）很可能即将出现评分
+UNRATED_VOLATILITY = 0.5
+
+# 评价人数未知时按1000人估算
+DEFAULT_VOTES = 1000
+
+# 刷新时只提取这些字段，跳过其余提取器
+REFRESH_FIELDS = ("rating", "votes")
+
+class RefreshState:
+    """
+    刷新状态，保存每条记录的豆瓣地址、上次检查时间和评分波动
+    
+    使用本地SQLite保存，Notion中不需要额外的属性
+    """
+    
+    def __init__(self, path: str = REFRESH_STATE_PATH):
+        """
+        打开或创建状态数据库
+        
+        Args:
+            path: 数据库文件路径
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # 遍历数据库时在线程池中读取状态，调用方保证不会并发访问
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                page_id TEXT PRIMARY KEY,
+                subject_url TEXT,
+                title TEXT,
+                rating REAL,
+                votes INTEGER,
+                volatility REAL NOT NULL,
+                last_checked REAL,
+                checks INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.commit()
+    
+    def get(self, page_id: str) -> Optional[Dict[str, Any]]:
+        """获取记录状态，不存在返回None"""
+        row = self.conn.execute("SELECT * FROM entries WHERE page_id = ?", (page_id,)).fetchone()
+        return dict(row) if row else None
+    
+    def set_subject_url(self, page_id: str, title: str, subject_url: str):
+        """记录通过搜索找到的豆瓣地址"""
+        self.conn.execute(
+            "INSERT INTO entries (page_id, subject_url, title, volatility) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(page_id) DO UPDATE SET subject_url = excluded.subject_url",
+            (page_id, subject_url, title, INITIAL_VOLATILITY)
+        )
+        self.conn.commit()
+    
+    def record_check(self, page_id: str, title: str, subject_url: Optional[str],
+                     old_rating: Optional[float], new_rating: Optional[float], votes: Optional[int]):
+        """
+        记录一次检查结果，并更新评分波动值
+        
+        波动值是评分变化幅度的指数移动平均，评分出现或消失按变化1分计算
+        
+        Args:
+            page_id: Notion页面ID
+            title: 标题
+            subject_url: 豆瓣详情页地址
+            old_rating: 检查前的评分
+            new_rating: 检查后的评分
+            votes: 评价人数
+        """
+        if old_rating is None and new_rating is None:
+            change = 0.0
+        elif old_rating is None or new_rating is None:
+            change = 1.0
+        else:
+            change = abs(new_rating - old_rating)
+        
+        current = self.get(page_id)
+        previous = current["volatility"] if current else INITIAL_VOLATILITY
+        volatility = VOLATILITY_DECAY * previous + (1 - VOLATILITY_DECAY) * change
+        
+        self.conn.execute(
+            "INSERT INTO entries (page_id, subject_url, title, rating, votes, volatility, last_checked, checks) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 1) "
+            "ON CONFLICT(page_id) DO UPDATE SET subject_url = excluded.subject_url, title = excluded.title, "
+            "rating = excluded.rating, votes = excluded.votes, volatility = excluded.volatility, "
+            "last_checked = excluded.last_checked, checks = entries.checks + 1",
+            (page_id, subject_url, title, new_rating, votes, volatility, time.time())
+        )
+        self.conn.commit()
+    
+    def close(self):
+        """关闭数据库"""
+        self.conn.close()
+
+class RefreshCandidate:
+    """待刷新的记录"""
+    
+    def __init__(self, page_id: str, title: str, rating: Optional[float], subject_url: Optional[str],
+                 release_year: Optional[int], last_checked: float, votes: Optional[int], volatility: float):
+        """
+        初始化待刷新记录
+        
+        Args:
+            page_id: Notion页面ID
+            title: 标题
+            rating: Notion中当前的评分
+            subject_url: 豆瓣详情页地址，未知时为None
+            release_year: 上映年份
+            last_checked: 上次检查时间（时间戳），从未检查过时为Notion最后编辑时间
+            votes: 评价人数
+            volatility: 评分波动值
+        """
+        self.page_id = page_id
+        self.title = title
+        self.rating = rating
+        self.subject_url = subject_url
+        self.release_year = release_year
+        self.last_checked = last_checked
+        self.votes = votes
+        self.volatility = volatility
+        self.score = 0.0
+    
+    @property
+    def cost(self) -> int:
+        """刷新需要的豆瓣请求数，地址未知时需要先搜索"""
+        return 1 if self.subject_url else 2
+
+def staleness_score(candidate: RefreshCandidate, now: Optional[float] = None) -> float:
+    """
+    估算记录自上次检查以来发生变化的可能性
+    
+    分数 = 距上次检查天数 × 活跃度 × 新片系数 × 波动值：
+    - 活跃度按评价人数的对数计算，评价越多的影视每天新增的评价也越多
+    - 近一年上映的影视评分变化最快，三年内次之
+    - 波动值来自历次检查的评分变化，没有评分的记录取较高的值
+    
+    Args:
+        candidate: 待刷新记录
+        now: 当前时间戳
+    
+    Returns:
+        分数，越大越应该刷新
+    """
+    now = now or time.time()
+    age_days = max(now - candidate.last_checked, 0.0) / 86400.0
+    
+    votes = candidate.votes if candidate.votes is not None else DEFAULT_VOTES
+    activity = 1.0 + math.log10(1 + votes)
+    
+    recency = 1.0
+    if candidate.release_year:
+        years = datetime.fromtimestamp(now).year - candidate.release_year
+        if years <= 1:
+            recency = 3.0
+        elif years <= 3:
+            recency = 1.5
+    
+    volatility = candidate.volatility
+    if candidate.rating is None:
+        volatility = max(volatility, UNRATED_VOLATILITY)
+    
+    return age_days * activity * recency * (volatility + 0.05)
+
+def _plain_text(prop: Optional[Dict]) -> str:
+    """提取Notion标题或富文本属性的纯文本"""
+    if not prop:
+        return ""
+    items = prop.get("title") or prop.get("rich_text") or []
+    return "".join(item.get("plain_text") or item.get("text", {}).get("content", "") for item in items)
+
+def _parse_time(value: Optional[str]) -> float:
+    """解析Notion的ISO时间，失败返回0"""
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+class RefreshScheduler:
+    """
+    刷新调度器
+    
+    遍历数据库中的记录，按 staleness_score 排序，在每小时的请求预算内
+    重新抓取分数最高的记录，评分变化时更新Notion
+    """
+    
+    def __init__(self,
+                 notion_sync: NotionSyncModule,
+                 scraper,
+                 state: RefreshState,
+                 hourly_budget: int = REFRESH_HOURLY_BUDGET,
+                 url_property: str = NOTION_DOUBAN_URL_PROPERTY):
+        """
+        初始化刷新调度器
+        
+        Args:
+            notion_sync: Notion同步模块
+            scraper: 豆瓣爬虫（DoubanScraper），需已启动浏览器
+            state: 刷新状态
+            hourly_budget: 每小时最多访问豆瓣的次数
+            url_property: 保存豆瓣链接的Notion属性名，为空时通过搜索查找地址
+        """
+        self.notion_sync = notion_sync
+        self.scraper = scraper
+        self.state = state
+        self.hourly_budget = hourly_budget
+        self.url_property = url_property
+    
+    def _to_candidate(self, page: Dict) -> RefreshCandidate:
+        """将Notion页面转换为待刷新记录"""
+        properties = page.get("properties", {})
+        saved = self.state.get(page["id"]) or {}
+        
+        subject_url = saved.get("subject_url")
+        if self.url_property:
+            subject_url = (properties.get(self.url_property) or {}).get("url") or subject_url
+        
+        year_match = re.search(r'(\d{4})', _plain_text(properties.get("首播")))
+        return RefreshCandidate(
+            page_id=page["id"],
+            title=_plain_text(properties.get("名称")),
+            rating=(properties.get("评分") or {}).get("number"),
+            subject_url=subject_url,
+            release_year=int(year_match.group(1)) if year_match else None,
+            last_checked=saved.get("last_checked") or _parse_time(page.get("last_edited_time")),
+            votes=saved.get("votes"),
+            volatility=saved.get("volatility", INITIAL_VOLATILITY)
+        )
+    
+    def collect_candidates(self) -> List[RefreshCandidate]:
+        """
+        遍历数据库并计算每条记录的分数
+        
+        Returns:
+            按分数从高到低排列的待刷新记录
+        """
+        now = time.time()
+        candidates = []
+        for page in self.notion_sync.query_database():
+            candidate = self._to_candidate(page)
+            if not candidate.title:
+                continue
+            candidate.score = staleness_score(candidate, now)
+            candidates.append(candidate)
+        candidates.sort(key=lambda c: c.score, reverse=True)
+        return candidates
+    
+    @staticmethod
+    def plan(candidates: List[RefreshCandidate], budget: int) -> List[RefreshCandidate]:
+        """
+        在请求预算内按分数挑选记录
+        
+        Args:
+            candidates: 按分数排序的待刷新记录
+            budget: 可用的豆瓣请求数
+        
+        Returns:
+            本轮要刷新的记录
+        """
+        selected = []
+        for candidate in candidates:
+            if candidate.score <= 0:
+                break
+            if candidate.cost <= budget:
+                selected.append(candidate)
+                budget -= candidate.cost
+            if budget <= 0:
+                break
+        return selected
+    
+    async def refresh(self, candidate: RefreshCandidate) -> str:
+        """
+        重新抓取一条记录，评分变化时更新Notion
+        
+        Args:
+            candidate: 待刷新记录
+        
+        Returns:
+            "updated"、"unchanged" 或 "not_found"
+        """
+        loop = asyncio.get_running_loop()
+        
+        if not candidate.subject_url:
+            candidate.subject_url = await self.scraper.search_movie(candidate.title)
+            if not candidate.subject_url:
+                logger.warning(f"未找到豆瓣地址: {candidate.title}")
+                self.state.record_check(candidate.page_id, candidate.title, None,
+                                        candidate.rating, candidate.rating, candidate.votes)
+                return "not_found"
+            self.state.set_subject_url(candidate.page_id, candidate.title, candidate.subject_url)
+        
+        movie_data = await self.scraper.get_movie_by_url(candidate.subject_url, fields=REFRESH_FIELDS)
+        if not movie_data:
+            # 同样记录检查时间，避免抓取失败的记录每轮都排在最前
+            logger.warning(f"重新抓取失败: {candidate.title}")
+            self.state.record_check(candidate.page_id, candidate.title, candidate.subject_url,
+                                    candidate.rating, candidate.rating, candidate.votes)
+            return "not_found"
+        
+        new_rating = movie_data.get("rating")
+        if new_rating is None and candidate.rating is not None:
+            # 评分消失多半是页面不完整（登录墙、选择器失效），按抓取失败处理，不清空Notion中的评分
+            logger.warning(f"未能提取评分，保留原评分: {candidate.title} ({candidate.rating})")
+            self.state.record_check(candidate.page_id, candidate.title, candidate.subject_url,
+                                    candidate.rating, candidate.rating, candidate.votes)
+            return "not_found"
+        
+        self.state.record_check(candidate.page_id, candidate.title, candidate.subject_url,
+                                candidate.rating, new_rating, movie_data.get("votes"))
+        
+        if new_rating == candidate.rating:
+            logger.info(f"评分未变化: {candidate.title} ({new_rating})")
+            return "unchanged"
+        
+        # 只写入评分（和豆瓣链接），保留用户在Notion中编辑过的其他属性
+        extra_properties = None
+        if self.url_property and movie_data.get("url"):
+            extra_properties = {self.url_property: {"url": movie_data["url"]}}
+        await loop.run_in_executor(
+            None, lambda: self.notion_sync.update_movie_fields(
+                candidate.page_id, {"rating": new_rating}, extra_properties
+            )
+        )
+        logger.info(f"评分已更新: {candidate.title} {candidate.rating} -> {new_rating}")
+        return "updated"
+    
+    async def run_once(self, budget: Optional[int] = None) -> Dict[str, int]:
+        """
+        执行一轮刷新，请求在一小时内均匀分布
+        
+        Args:
+            budget: 本轮请求预算，默认为每小时预算
+        
+        Returns:
+            各结果的数量
+        """
+        budget = self.hourly_budget if budget is None else budget
+        loop = asyncio.get_running_loop()
+        candidates = await loop.run_in_executor(None, self.collect_candidates)
+        selected = self.plan(candidates, budget)
+        logger.info(f"共 {len(candidates)} 条记录，本轮刷新 {len(selected)} 条，预算 {budget} 次请求")
+        
+        results = {"updated": 0, "unchanged": 0, "not_found": 0, "failed": 0}
+        interval = 3600.0 / max(self.hourly_budget, 1)
+        for index, candidate in enumerate(selected):
+            if index:
+                await asyncio.sleep(interval * candidate.cost)
+            try:
+                results[await self.refresh(candidate)] += 1
+            except AntiBotBlocked as e:
+                # 冷却时间通常长于本轮剩余时间，剩下的记录留到下一轮
+                logger.warning(f"刷新 {candidate.title} 时被拦截，结束本轮: {e}")
+                results["failed"] += 1
+                break
+            except Exception as e:
+                logger.error(f"刷新 {candidate.title} 失败: {e}")
+                results["failed"] += 1
+        logger.info(f"本轮刷新结束: {results}")
+        return results
+    
+    async def run_forever(self):
+        """每小时执行一轮刷新"""
+        while True:
+            started = time.monotonic()
+            await self.run_once()
+            await asyncio.sleep(max(0.0, 3600.0 - (time.monotonic() - started)))
\ No newline at end of file
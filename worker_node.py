@@ -0,0 +1,101 @@
+"""
+任务队列工作节点程序，从任务代理领取影视任务，抓取豆瓣数据并同步到Notion
+
+可以在多台主机（不同出口IP）上运行，共用同一个任务代理
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+from typing import Optional
+
+from config.logging_config import setup_logger
+from config.settings import DOUBAN_COOKIES, JOB_BROKER_URL
+
+# 创建日志记录器
+logger = setup_logger("worker_node")
+
+async def run_worker(broker_url: str, concurrency: int, max_jobs: Optional[int]) -> bool:
+    """
+    运行工作节点
+    
+    Args:
+        broker_url: 任务代理地址
+        concurrency: 同时处理的任务数
+        max_jobs: 最多处理的任务数
+    
+    Returns:
+        是否成功启动
+    """
+    from core.browser import PlaywrightBrowser
+    from scrapers.douban_scraper import DoubanScraper
+    from sync.notion_sync import NotionSyncModule, test_database_connection
+    from jobs.broker import create_broker
+    from jobs.worker import JobWorker
+    
+    database_id = os.environ.get("NOTION_DATABASE_ID")
+    token = os.environ.get("NOTION_TOKEN")
+    if not database_id or not token:
+        logger.error("未设置Notion配置，请设置NOTION_DATABASE_ID和NOTION_TOKEN环境变量")
+        return False
+    
+    notion_sync = NotionSyncModule(database_id, token)
+    loop = asyncio.get_running_loop()
+    success, message = await loop.run_in_executor(
+        None, lambda: test_database_connection(database_id, token, session=notion_sync.session)
+    )
+    logger.info(message)
+    if not success:
+        notion_sync.close()
+        return False
+    
+    broker = create_broker(broker_url)
+    browser = PlaywrightBrowser(headless=True, cookies=DOUBAN_COOKIES)
+    try:
+        await browser.init_browser()
+        worker = JobWorker(broker, DoubanScraper(browser), notion_sync, concurrency)
+        await worker.run(max_jobs)
+        return True
+    finally:
+        await browser.close()
+        broker.close()
+        notion_sync.close()
+
+def main():
+    """程序主入口"""
+    parser = argparse.ArgumentParser(description="任务队列工作节点")
+    parser.add_argument("--broker", type=str, default=JOB_BROKER_URL,
+                        help="任务代理地址，如 redis://主机:6379/0 或 sqlite:///jobs.db")
+    parser.add_argument("--concurrency", type=int, default=2, help="同时处理的任务数")
+    parser.add_argument("--max-jobs", type=int, default=None, help="处理指定数量的任务后退出")
+    parser.add_argument("--list-dead", action="store_true", help="列出死信队列中的任务后退出")
+    parser.add_argument("--requeue-dead", type=str, action="append", default=[], help="将死信任务重新排队，可多次指定")
+    args = parser.parse_args()
+    
+    if not args.broker:
+        parser.error("请通过 --broker 或 JOB_BROKER_URL 指定任务代理地址")
+    
+    if args.list_dead or args.requeue_dead:
+        from jobs.broker import create_broker
+        
+        broker = create_broker(args.broker)
+        try:
+            for job_id in args.requeue_dead:
+                print(f"{job_id}: {'已重新排队' if broker.requeue_dead(job_id) else '不在死信队列中'}")
+            if args.list_dead:
+                for job in broker.dead_letters():
+                    print(json.dumps({key: job[key] for key in ("id", "attempts", "payload", "error")}, ensure_ascii=False))
+        finally:
+            broker.close()
+        return
+    
+    try:
+        ok = asyncio.run(run_worker(args.broker, args.concurrency, args.max_jobs))
+    except KeyboardInterrupt:
+        print("\n工作节点已停止，未确认的任务会在可见性超时后重新投递")
+        sys.exit(130)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+多进程抓取模块，每个工作进程持有独立的浏览器，由协调者分发任务并汇总结果
+"""
\ No newline at end of file
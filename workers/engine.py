@@ -0,0 +1,380 @@
+"""
+多进程抓取引擎
+
+协调者通过 multiprocessing 队列把标题或详情页地址分发给工作进程，每个工作进程
+运行独立的事件循环和浏览器并同时处理多个页面，结果经结果队列汇总回协调者。
+单个事件循环和一个Chromium只能支撑少量并发，多进程可以用满容器的全部CPU
+"""
+import queue
+import asyncio
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, List, Optional, TYPE_CHECKING
+
+from config.logging_config import setup_logger
+from config.settings import DOUBAN_COOKIES, DOUBAN_SEARCH_BASE_URL, PACING_INTERVAL, WORKER_PAGE_CONCURRENCY
+
+if TYPE_CHECKING:
+    from core.deadline import Deadline
+
+# 创建日志记录器
+logger = setup_logger('scrape_engine')
+
+# 任务类型
+TASK_TITLE = "title"
+TASK_URL = "url"
+
+# 结果队列中的消息类型
+MSG_READY = "ready"
+MSG_TAKEN = "taken"
+MSG_RESULT = "result"
+MSG_BLOCKED = "blocked"
+MSG_METRICS = "metrics"
+
+# 工作进程意外退出后最多重启的次数
+MAX_RESTARTS = 3
+
+class WorkerError(Exception):
+    """工作进程处理任务出错或意外退出"""
+    pass
+
+async def _worker_loop(worker_id: int, task_queue, result_queue, page_concurrency: int, workers: int):
+    """
+    工作进程的事件循环：启动浏览器，同时运行 page_concurrency 个任务消费者
+    
+    Args:
+        worker_id: 工作进程编号
+        task_queue: 任务队列，收到None时退出
+        result_queue: 结果队列
+        page_concurrency: 同时处理的页面数
+        workers: 工作进程总数，各进程按比例放慢请求节奏，合计不超过单进程的请求频率
+    """
+    from core.antibot import AntiBotBlocked
+    from core.browser import PlaywrightBrowser
+    from core.deadline import Deadline
+    from core.pacing import PacingScheduler
+    from scrapers.douban_scraper import DoubanScraper
+    
+    loop = asyncio.get_running_loop()
+    browser = PlaywrightBrowser(headless=True, cookies=DOUBAN_COOKIES)
+    scraper = DoubanScraper(browser, pacer=PacingScheduler(interval=PACING_INTERVAL * workers))
+    await browser.init_browser()
+    result_queue.put((MSG_READY, worker_id, None, None))
+    
+    async def consume():
+        while True:
+            # 队列读取是阻塞调用，放到线程中执行，不阻塞其他页面
+            task = await loop.run_in_executor(None, task_queue.get)
+            if task is None:
+                return
+            
+            task_id, kind, value, fields, expires_at = task
+            result_queue.put((MSG_TAKEN, worker_id, task_id, None))
+            try:
+                if kind == TASK_TITLE:
+                    scrape = scraper.get_movie_by_title(value)
+                else:
+                    scrape = scraper.get_movie_by_url(value, fields=fields)
+                # 提交方已不再等待的任务到截止时间后立即取消，不再占用页面
+                if expires_at is not None:
+                    movie_data = await Deadline(expires_at=expires_at).run(scrape)
+                else:
+                    movie_data = await scrape
+                result_queue.put((MSG_RESULT, worker_id, task_id, (movie_data, None)))
+            except AntiBotBlocked as e:
+                # 交给协调者记录冷却，其他工作进程的任务在协调者处就会被拒绝
+                result_queue.put((MSG_BLOCKED, worker_id, task_id, (e.url, e.reason, e.retry_after)))
+            except Exception as e:
+                logger.error(f"工作进程 {worker_id} 处理 {value} 出错: {e}")
+                result_queue.put((MSG_RESULT, worker_id, task_id, ({}, str(e))))
+            # 浏览器的页面数、内存和回收记录汇总到协调者
+            result_queue.put((MSG_METRICS, worker_id, None, browser.metrics()))
+    
+    try:
+        await asyncio.gather(*(consume() for _ in range(page_concurrency)))
+    finally:
+        await browser.close()
+
+def _worker_main(worker_id: int, task_queue, result_queue, page_concurrency: int, workers: int):
+    """工作进程入口"""
+    logger.info(f"工作进程 {worker_id} 启动")
+    try:
+        asyncio.run(_worker_loop(worker_id, task_queue, result_queue, page_concurrency, workers))
+    except KeyboardInterrupt:
+        pass
+    logger.info(f"工作进程 {worker_id} 退出")
+
+class ScrapeEngine:
+    """
+    多进程抓取引擎
+    
+    submit 返回 concurrent.futures.Future，可在任意线程中等待，也可以通过
+    asyncio.wrap_future 在事件循环中等待。工作进程意外退出时，其已领取的任务
+    以 WorkerError 结束，工作进程会被重新启动。任一工作进程被反爬拦截后，
+    冷却结束前提交的任务直接以 AntiBotBlocked 结束，不再分发给工作进程
+    """
+    
+    def __init__(self, workers: Optional[int] = None, page_concurrency: int = WORKER_PAGE_CONCURRENCY):
+        """
+        初始化抓取引擎
+        
+        Args:
+            workers: 工作进程数，None表示根据CPU和内存限制自动确定
+            page_concurrency: 每个工作进程同时处理的页面数
+        """
+        if not workers:
+            from workers.limits import default_worker_count
+            workers = default_worker_count()
+        self.workers = workers
+        self.page_concurrency = max(1, page_concurrency)
+        
+        # Chromium和事件循环都不适合fork，工作进程使用spawn启动
+        self._mp = multiprocessing.get_context("spawn")
+        self._task_queue = None
+        self._result_queue = None
+        self._processes: Dict[int, Any] = {}
+        self._restarts: Dict[int, int] = {}
+        self._ready = set()
+        self._browser_metrics: Dict[int, Dict[str, Any]] = {}
+        
+        # 任务ID -> Future，以及已领取任务所在的工作进程
+        self._futures: Dict[int, Future] = {}
+        self._taken: Dict[int, int] = {}
+        self._task_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._collector: Optional[threading.Thread] = None
+        self._running = False
+        self._stopping = False
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def start(self):
+        """启动工作进程和结果收集线程"""
+        if self._running:
+            return
+        self._task_queue = self._mp.Queue()
+        self._result_queue = self._mp.Queue()
+        self._running = True
+        self._stopping = False
+        for worker_id in range(self.workers):
+            self._spawn(worker_id)
+        
+        self._collector = threading.Thread(target=self._collect, name="scrape-engine-collector", daemon=True)
+        self._collector.start()
+        logger.info(f"抓取引擎已启动: {self.workers} 个工作进程，每个同时处理 {self.page_concurrency} 个页面")
+    
+    def _spawn(self, worker_id: int):
+        """启动一个工作进程"""
+        process = self._mp.Process(
+            target=_worker_main,
+            args=(worker_id, self._task_queue, self._result_queue, self.page_concurrency, self.workers),
+            name=f"scrape-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[worker_id] = process
+    
+    def submit(self, kind: str, value: str, fields: Optional[Iterable[str]] = None,
+               deadline: Optional["Deadline"] = None) -> Future:
+        """
+        提交抓取任务
+        
+        Args:
+            kind: TASK_TITLE（按标题搜索）或 TASK_URL（详情页地址）
+            value: 标题或详情页地址
+            fields: 只提取这些字段，仅对 TASK_URL 有效
+            deadline: 请求的截止时间，工作进程到期后取消该任务
+        
+        Returns:
+            结果为影视数据字典的Future，未找到时结果为空字典
+        """
+        from core.antibot import AntiBotBlocked, domain_cooldown
+        from core.deadline import DeadlineExceeded
+        
+        if kind not in (TASK_TITLE, TASK_URL):
+            raise ValueError(f"不支持的任务类型: {kind}")
+        if not self._running or self._stopping:
+            raise RuntimeError("抓取引擎未启动")
+        
+        future: Future = Future()
+        try:
+            if deadline is not None:
+                deadline.check("提交抓取任务")
+            domain_cooldown.check(value if kind == TASK_URL else DOUBAN_SEARCH_BASE_URL)
+        except (AntiBotBlocked, DeadlineExceeded) as e:
+            future.set_exception(e)
+            return future
+        with self._lock:
+            task_id = next(self._task_ids)
+            self._futures[task_id] = future
+        self._task_queue.put((
+            task_id, kind, value,
+            sorted(fields) if fields is not None else None,
+            deadline.expires_at if deadline is not None else None
+        ))
+        return future
+    
+    def scrape_title(self, title: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """按标题抓取影视数据，阻塞到完成"""
+        return self.submit(TASK_TITLE, title).result(timeout)
+    
+    def scrape_url(self, url: str, fields: Optional[Iterable[str]] = None,
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        """按详情页地址抓取影视数据，阻塞到完成"""
+        return self.submit(TASK_URL, url, fields).result(timeout)
+    
+    def map_titles(self, titles: List[str], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        并行抓取多个标题，结果顺序与输入一致
+        
+        Args:
+            titles: 标题列表
+            timeout: 每个任务的等待时间(秒)
+        
+        Returns:
+            影视数据列表，失败的任务为空字典
+        """
+        futures = [self.submit(TASK_TITLE, title) for title in titles]
+        results = []
+        for title, future in zip(titles, futures):
+            try:
+                results.append(future.result(timeout))
+            except Exception as e:
+                logger.error(f"抓取 {title} 失败: {e}")
+                results.append({})
+        return results
+    
+    def stats(self) -> Dict[str, Any]:
+        """引擎状态：工作进程数、已就绪数、等待中和处理中的任务数，以及各工作进程最近上报的浏览器状态"""
+        with self._lock:
+            pending = len(self._futures)
+            in_progress = len(self._taken)
+        return {
+            "workers": self.workers,
+            "alive": sum(1 for process in self._processes.values() if process.is_alive()),
+            "ready": len(self._ready),
+            "pending": pending - in_progress,
+            "in_progress": in_progress,
+            "browsers": [
+                dict(metrics, worker=worker_id)
+                for worker_id, metrics in sorted(self._browser_metrics.items())
+            ],
+        }
+    
+    def _collect(self):
+        """结果收集线程：把工作进程的结果交给对应的Future，并检查工作进程是否存活"""
+        while self._running or self._futures:
+            try:
+                kind, worker_id, task_id, payload = self._result_queue.get(timeout=1.0)
+            except queue.Empty:
+                if not self._running:
+                    break
+                self._check_workers()
+                continue
+            except (EOFError, OSError):
+                break
+            
+            if kind == MSG_READY:
+                self._ready.add(worker_id)
+                continue
+            if kind == MSG_METRICS:
+                self._browser_metrics[worker_id] = payload
+                continue
+            
+            with self._lock:
+                if kind == MSG_TAKEN:
+                    self._taken[task_id] = worker_id
+                    continue
+                future = self._futures.pop(task_id, None)
+                self._taken.pop(task_id, None)
+            
+            # 提交方超时或断开后已取消等待
+            if future is None or future.cancelled():
+                continue
+            if kind == MSG_BLOCKED:
+                from core.antibot import domain_cooldown
+                
+                url, reason, retry_after = payload
+                future.set_exception(domain_cooldown.block(url, reason, retry_after))
+                continue
+            movie_data, error = payload
+            if error:
+                future.set_exception(WorkerError(error))
+            else:
+                future.set_result(movie_data)
+    
+    def _check_workers(self):
+        """结束已退出工作进程领取的任务，并在重启次数内重新启动它"""
+        if self._stopping:
+            return
+        for worker_id, process in list(self._processes.items()):
+            if process.is_alive():
+                continue
+            
+            self._ready.discard(worker_id)
+            with self._lock:
+                lost = [task_id for task_id, owner in self._taken.items() if owner == worker_id]
+                futures = [self._futures.pop(task_id) for task_id in lost]
+                for task_id in lost:
+                    del self._taken[task_id]
+            for future in futures:
+                future.set_exception(WorkerError(f"工作进程 {worker_id} 意外退出 (退出码 {process.exitcode})"))
+            
+            restarts = self._restarts.get(worker_id, 0)
+            if restarts >= MAX_RESTARTS:
+                logger.error(f"工作进程 {worker_id} 已重启 {restarts} 次，不再重启")
+                del self._processes[worker_id]
+                continue
+            logger.warning(f"工作进程 {worker_id} 意外退出 (退出码 {process.exitcode})，重新启动")
+            self._restarts[worker_id] = restarts + 1
+            self._spawn(worker_id)
+        
+        # 没有可用的工作进程时，排队中的任务不会再被处理
+        if not self._processes:
+            self._fail_pending(WorkerError("没有可用的工作进程"))
+    
+    def _fail_pending(self, error: Exception):
+        """以指定异常结束所有未完成的任务"""
+        with self._lock:
+            futures = list(self._futures.values())
+            self._futures.clear()
+            self._taken.clear()
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+    
+    def close(self, timeout: float = 30.0):
+        """
+        停止引擎：通知工作进程处理完已领取的任务后退出
+        
+        Args:
+            timeout: 等待每个工作进程退出的时间(秒)，超时后强制结束
+        """
+        if not self._running:
+            return
+        self._stopping = True
+        
+        # 每个消费者各取一个结束标记
+        for _ in range(len(self._processes) * self.page_concurrency):
+            self._task_queue.put(None)
+        for process in self._processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f"工作进程 {process.name} 未能按时退出，强制结束")
+                process.terminate()
+                process.join()
+        
+        self._running = False
+        if self._collector:
+            self._collector.join(timeout)
+        self._fail_pending(WorkerError("抓取引擎已停止"))
+        self._processes.clear()
+        self._ready.clear()
+        logger.info("抓取引擎已停止")
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""
+容器资源限制检测，用于确定默认的工作进程数
+"""
+import os
+from typing import Optional
+
+from config.logging_config import setup_logger
+from config.settings import WORKER_MEMORY_MB
+
+# 创建日志记录器
+logger = setup_logger('worker_limits')
+
+# cgroup 挂载点
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+def _read_first_line(path: str) -> Optional[str]:
+    """读取文件第一行，文件不存在或不可读时返回None"""
+    try:
+        with open(path, "r") as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+def available_cpus() -> float:
+    """
+    当前进程可用的CPU数量
+    
+    取CPU亲和性和cgroup配额（v2的cpu.max或v1的cfs_quota_us）中较小的值
+    
+    Returns:
+        可用CPU数量，配额限制时可能不是整数
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = float(len(os.sched_getaffinity(0)))
+    else:
+        cpus = float(os.cpu_count() or 1)
+    
+    # cgroup v2: "quota period" 或 "max period"
+    cpu_max = _read_first_line(os.path.join(CGROUP_ROOT, "cpu.max"))
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            cpus = min(cpus, int(quota) / int(period))
+        return cpus
+    
+    # cgroup v1
+    quota = _read_first_line(os.path.join(CGROUP_ROOT, "cpu", "cpu.cfs_quota_us"))
+    period = _read_first_line(os.path.join(CGROUP_ROOT, "cpu", "cpu.cfs_period_us"))
+    if quota and period and int(quota) > 0:
+        cpus = min(cpus, int(quota) / int(period))
+    return cpus
+
+def available_memory_mb() -> Optional[int]:
+    """
+    当前进程可用的内存(MB)
+    
+    优先读取cgroup内存限制（v2的memory.max或v1的limit_in_bytes），没有限制时使用物理内存
+    
+    Returns:
+        可用内存，无法确定时返回None
+    """
+    limit = _read_first_line(os.path.join(CGROUP_ROOT, "memory.max"))
+    if limit is None:
+        limit = _read_first_line(os.path.join(CGROUP_ROOT, "memory", "memory.limit_in_bytes"))
+    
+    physical = None
+    try:
+        physical = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        pass
+    
+    # 未限制时v2为"max"，v1为一个接近2^63的大数
+    if limit and limit.isdigit() and (physical is None or int(limit) < physical):
+        return int(limit) // (1024 * 1024)
+    return physical // (1024 * 1024) if physical else None
+
+def default_worker_count(memory_per_worker_mb: int = WORKER_MEMORY_MB) -> int:
+    """
+    根据CPU和内存限制计算默认的工作进程数
+    
+    每个工作进程占用一个CPU，并为其浏览器预留 memory_per_worker_mb 内存
+    
+    Args:
+        memory_per_worker_mb: 每个工作进程预留的内存(MB)
+    
+    Returns:
+        工作进程数，至少为1
+    """
+    cpus = available_cpus()
+    count = max(1, int(cpus))
+    
+    memory_mb = available_memory_mb()
+    if memory_mb is not None and memory_per_worker_mb > 0:
+        count = min(count, max(1, memory_mb // memory_per_worker_mb))
+    
+    logger.info(f"可用CPU: {cpus:g}，可用内存: {memory_mb if memory_mb is not None else '未知'}MB，默认工作进程数: {count}")
+    return count
\ No newline at end of file